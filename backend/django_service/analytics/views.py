@@ -5,6 +5,7 @@ from django.db.models import Count, Avg, Sum, Q
 from django.utils import timezone
 from datetime import timedelta, datetime
 from pipelines.models import PipelineRun, Pipeline
+from cicd_integrations import stats_rollup
 
 
 @api_view(['GET'])
@@ -27,37 +28,17 @@ def execution_stats(request):
         else:
             start_date = timezone.now() - timedelta(days=7)
         
-        # 基础查询集
-        executions = PipelineRun.objects.filter(created_at__gte=start_date)
-        
-        # 统计数据
-        total_executions = executions.count()
-        successful_executions = executions.filter(status='success').count()
-        failed_executions = executions.filter(status='failed').count()
-        running_executions = executions.filter(status='running').count()
-        
-        # 计算成功率
-        success_rate = (successful_executions / total_executions * 100) if total_executions > 0 else 0
-        
-        # 计算平均执行时间（秒）
-        completed_executions = executions.filter(
-            status__in=['success', 'failed'],
-            started_at__isnull=False,
-            completed_at__isnull=False
-        )
-        
-        avg_duration = 0
-        total_duration = 0
-        if completed_executions.exists():
-            durations = []
-            for execution in completed_executions:
-                if execution.started_at and execution.completed_at:
-                    duration = (execution.completed_at - execution.started_at).total_seconds()
-                    durations.append(duration)
-            
-            if durations:
-                avg_duration = sum(durations) / len(durations)
-                total_duration = sum(durations)
+        # 计数与耗时来自执行统计汇总桶，运行中的执行数实时查询
+        summary = stats_rollup.aggregate(stats_rollup.PIPELINE_RUN, start_date)
+        total_executions = summary['total']
+        successful_executions = summary['success']
+        failed_executions = summary['failed']
+        running_executions = PipelineRun.objects.filter(
+            created_at__gte=start_date, status='running'
+        ).count()
+        success_rate = summary['success_rate']
+        avg_duration = summary['avg_duration']
+        total_duration = summary['duration_sum']
         
         stats = {
             'total_executions': total_executions,
@@ -103,48 +84,17 @@ def execution_trends(request):
         else:
             days = 7
         
-        trends = []
-        for i in range(days):
-            date = timezone.now().date() - timedelta(days=days-1-i)
-            start_datetime = timezone.make_aware(datetime.combine(date, datetime.min.time()))
-            end_datetime = start_datetime + timedelta(days=1)
-            
-            day_executions = PipelineRun.objects.filter(
-                created_at__gte=start_datetime,
-                created_at__lt=end_datetime
-            )
-            
-            total = day_executions.count()
-            successful = day_executions.filter(status='success').count()
-            failed = day_executions.filter(status='failed').count()
-            success_rate = (successful / total * 100) if total > 0 else 0
-            
-            # 计算平均执行时间
-            completed_day_executions = day_executions.filter(
-                status__in=['success', 'failed'],
-                started_at__isnull=False,
-                completed_at__isnull=False
-            )
-            
-            avg_duration = 0
-            if completed_day_executions.exists():
-                durations = []
-                for execution in completed_day_executions:
-                    if execution.started_at and execution.completed_at:
-                        duration = (execution.completed_at - execution.started_at).total_seconds()
-                        durations.append(duration)
-                
-                if durations:
-                    avg_duration = sum(durations) / len(durations)
-            
-            trends.append({
-                'date': date.isoformat(),
-                'total': total,
-                'successful': successful,
-                'failed': failed,
-                'success_rate': round(success_rate, 1),
-                'avg_duration': round(avg_duration)
-            })
+        trends = [
+            {
+                'date': day['date'],
+                'total': day['total'],
+                'successful': day['success'],
+                'failed': day['failed'],
+                'success_rate': round(day['success_rate'], 1),
+                'avg_duration': round(day['avg_duration'])
+            }
+            for day in stats_rollup.daily_series(stats_rollup.PIPELINE_RUN, days)
+        ]
         
         return Response(trends)
         
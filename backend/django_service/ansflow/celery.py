@@ -49,6 +49,16 @@ app.conf.beat_schedule = {
         'schedule': 300.0,  # 5 minutes
         'options': {'queue': 'medium_priority'},
     },
+    'reconcile-remote-executions': {
+        'task': 'cicd_integrations.tasks.reconcile_remote_executions',
+        'schedule': 15.0,  # 15 seconds，只检查到期的远程执行
+        'options': {'queue': 'medium_priority'},
+    },
+    'follow-remote-logs': {
+        'task': 'cicd_integrations.tasks.follow_remote_logs',
+        'schedule': 5.0,  # 5 seconds，增量读取远程执行的新增日志
+        'options': {'queue': 'medium_priority'},
+    },
     'monitor-long-running-executions': {
         'task': 'cicd_integrations.tasks.monitor_long_running_executions',
         'schedule': 1800.0,  # 30 minutes
@@ -283,6 +283,81 @@ CELERY_TASK_DEFAULT_RETRY_DELAY = 60  # 重试间隔60秒
 # Beat调度器配置
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# 共享步骤线程池配置（进程级，所有流水线执行共用）
+STEP_WORKER_POOL = {
+    'MAX_WORKERS': env.int('STEP_POOL_MAX_WORKERS', default=32),  # 全局最大并发步骤数
+    'PER_PIPELINE_LIMIT': env.int('STEP_POOL_PER_PIPELINE_LIMIT', default=10),  # 单条流水线最大并发步骤数
+    'IDLE_TIMEOUT': env.int('STEP_POOL_IDLE_TIMEOUT', default=60),  # 空闲线程回收时间（秒）
+}
+
+# 步骤结果缓存配置（内容寻址，跨执行复用确定性步骤的结果）
+STEP_RESULT_CACHE = {
+    'ENABLED': env.bool('STEP_RESULT_CACHE_ENABLED', default=False),
+    'CACHE_ALIAS': 'pipeline',  # 使用的缓存后端，可指向文件缓存
+    'TTL': env.int('STEP_RESULT_CACHE_TTL', default=7 * 24 * 3600),  # 条目存活时间（秒），命中时续期
+    # 命中缓存只复用结果、不重建工作区中的构建产物，build 等有副作用的步骤默认不缓存；步骤配置 cache: true/false 可覆盖
+    'CACHEABLE_STEP_TYPES': ['test', 'security_scan'],
+}
+
+# 执行事件发布（Redis pub/sub，供 FastAPI WebSocket 服务按执行订阅推送）
+EXECUTION_EVENTS_ENABLED = env.bool('EXECUTION_EVENTS_ENABLED', default=True)
+EXECUTION_EVENTS_CACHE_ALIAS = 'default'  # 使用该缓存后端的 Redis 连接发布
+
+# Ansible 执行统计接口结果缓存时间（秒），0 表示不缓存
+ANSIBLE_STATS_CACHE_TTL = env.int('ANSIBLE_STATS_CACHE_TTL', default=30)
+# Ansible 动态清单渲染结果缓存时间（秒），按清单指纹失效，0 表示不缓存
+ANSIBLE_INVENTORY_CACHE_TTL = env.int('ANSIBLE_INVENTORY_CACHE_TTL', default=3600)
+
+# Ansible 批量主机连通性检查（一批主机一次 ansible 调用）
+ANSIBLE_CONNECTIVITY_CHECK = {
+    'FORKS': env.int('ANSIBLE_CHECK_FORKS', default=50),  # ansible 并发连接数
+    'TIMEOUT': env.int('ANSIBLE_CHECK_TIMEOUT', default=10),  # 单台主机 SSH 连接超时（秒）
+    'BATCH_SIZE': env.int('ANSIBLE_CHECK_BATCH_SIZE', default=500),  # 每个 Celery 任务检查的主机数
+}
+
+# Jenkins 作业目录（单次 tree 查询 + 按工具缓存，Jenkins webhook 到达时失效）
+JENKINS_CATALOG = {
+    'TTL': env.int('JENKINS_CATALOG_TTL', default=60),  # 目录缓存时间（秒）
+    'POOL_MAXSIZE': env.int('JENKINS_POOL_MAXSIZE', default=10),  # 每个 Jenkins 地址的最大连接数
+    'TIMEOUT': 30,  # 作业列表请求超时（秒）
+}
+
+# 远程执行跟踪（webhook 事件为主，统一兜底轮询按间隔退避）
+REMOTE_EXECUTION_TRACKER = {
+    'MIN_INTERVAL': env.int('REMOTE_TRACKER_MIN_INTERVAL', default=15),  # 状态变化后的检查间隔（秒）
+    'MAX_INTERVAL': env.int('REMOTE_TRACKER_MAX_INTERVAL', default=300),  # 最大检查间隔（秒）
+    'MAX_DURATION': 6 * 3600,  # 超过该时长仍未结束的执行标记为超时（秒）
+    'SWEEP_BATCH': 200,  # 单次扫描最多检查的执行数
+    'CONCURRENCY': 20,  # 单个工具的并发状态查询数
+}
+
+# 远程执行日志增量跟踪（Jenkins progressiveText / GitLab trace Range）
+REMOTE_LOG_FOLLOWER = {
+    'BATCH': 100,  # 单次扫描最多跟踪的执行数
+    'CONCURRENCY': env.int('REMOTE_LOG_FOLLOWER_CONCURRENCY', default=10),  # 同时读取日志的执行数
+    'REQUEST_TIMEOUT': 60,  # 单个执行一轮读取的超时（秒）
+    'MAX_RANGE_BYTES': 1024 * 1024,  # Jenkins 构建 / GitLab 作业每轮读取的最大字节数
+    'DRAIN_WINDOW': 3600,  # 执行结束后继续补读剩余日志的时间窗口（秒）
+    'MAX_ACTIVE_AGE': 24 * 3600,  # 超过该时长仍处于进行中的执行不再跟踪（秒）
+}
+
+# CI/CD 适配器共享 HTTP 连接池（按 CI 地址复用连接）
+CICD_HTTP_POOL = {
+    'MAX_CONNECTIONS': env.int('CICD_HTTP_MAX_CONNECTIONS', default=20),  # 每个 CI 地址的最大连接数
+    'MAX_KEEPALIVE': env.int('CICD_HTTP_MAX_KEEPALIVE', default=10),  # 每个 CI 地址保持的空闲连接数
+    'KEEPALIVE_EXPIRY': 60,  # 空闲连接保持时间（秒）
+    'TIMEOUT': 30,  # 请求超时（秒）
+    'CONNECT_TIMEOUT': 10,  # 建立连接超时（秒）
+    'HTTP2': env.bool('CICD_HTTP2_ENABLED', default=True),  # 需要安装 h2
+    'TOKEN_TTL': 600,  # Jenkins crumb 等短期令牌缓存时间（秒）
+}
+
+# CI/CD 工具健康检查（共享事件循环内并发执行）
+CICD_HEALTH_CHECK = {
+    'TIMEOUT': env.int('CICD_HEALTH_CHECK_TIMEOUT', default=15),  # 单个工具的检查超时（秒）
+    'CONCURRENCY': 20,  # 同时进行的检查数
+}
+
 # Redis Cache Configuration - 多数据库优化配置
 CACHES = {
     'default': {
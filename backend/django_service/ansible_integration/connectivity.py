@@ -0,0 +1,185 @@
+"""
+批量主机连通性检查
+为一批主机生成一份临时 inventory（每台主机的地址、端口、用户和认证方式写成主机变量），
+只启动一次 `ansible all -m ping`，由 forks 控制并发；通过 json 回调插件解析每台主机的结果，
+最后用 bulk_update 一次写回主机状态。
+"""
+import json
+import logging
+import os
+import subprocess
+import tempfile
+from math import ceil
+from typing import Any, Dict, List
+
+import yaml
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AnsibleHost
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_CONFIG = {
+    'FORKS': 50,         # ansible 并发连接数
+    'TIMEOUT': 10,       # 单台主机 SSH 连接超时（秒）
+    'BATCH_SIZE': 500,   # 每个 Celery 任务检查的主机数
+}
+
+
+def get_check_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_CHECK_CONFIG)
+    config.update(getattr(settings, 'ANSIBLE_CONNECTIVITY_CHECK', {}) or {})
+    return config
+
+
+def host_alias(host: AnsibleHost) -> str:
+    return f"host_{host.id}"
+
+
+def _write_secret(directory: str, name: str, content: str) -> str:
+    path = os.path.join(directory, name)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(content)
+    return path
+
+
+def build_inventory(hosts: List[AnsibleHost], directory: str) -> Dict[str, Any]:
+    """生成 YAML inventory 数据；SSH 私钥按凭据去重写入 directory"""
+    key_paths: Dict[int, str] = {}
+    inventory_hosts = {}
+
+    for host in hosts:
+        host_vars = {
+            'ansible_host': host.ip_address,
+            'ansible_port': host.port,
+        }
+        if host.username:
+            host_vars['ansible_user'] = host.username
+
+        credential = host.credential
+        if credential is not None:
+            if credential.credential_type == 'ssh_key' and credential.ssh_private_key:
+                if credential.id not in key_paths:
+                    decrypted_ssh_key = credential.get_decrypted_ssh_key()
+                    if decrypted_ssh_key:
+                        # 确保SSH密钥格式正确
+                        if not decrypted_ssh_key.endswith('\n'):
+                            decrypted_ssh_key += '\n'
+                        key_paths[credential.id] = _write_secret(
+                            directory, f"credential_{credential.id}.pem", decrypted_ssh_key
+                        )
+                    else:
+                        key_paths[credential.id] = None
+                        logger.warning(f"SSH密钥解密失败或为空: credential={credential.id}")
+                if key_paths[credential.id]:
+                    host_vars['ansible_ssh_private_key_file'] = key_paths[credential.id]
+            elif credential.credential_type == 'password' and credential.password:
+                decrypted_password = credential.get_decrypted_password()
+                if decrypted_password:
+                    host_vars['ansible_password'] = decrypted_password
+                else:
+                    logger.warning(f"密码解密失败或为空: credential={credential.id}")
+
+        inventory_hosts[host_alias(host)] = host_vars
+
+    return {'all': {'hosts': inventory_hosts}}
+
+
+def parse_ping_results(output: str) -> Dict[str, Dict[str, Any]]:
+    """
+    解析 json 回调插件的输出
+
+    Returns:
+        dict: 主机别名 -> {'success': bool, 'message': str}
+    """
+    results = {}
+    data = json.loads(output)
+    for play in data.get('plays', []):
+        for task in play.get('tasks', []):
+            for alias, result in task.get('hosts', {}).items():
+                if result.get('unreachable'):
+                    results[alias] = {'success': False, 'message': result.get('msg') or '主机不可达'}
+                elif result.get('failed'):
+                    results[alias] = {'success': False, 'message': result.get('msg') or '连接失败'}
+                else:
+                    results[alias] = {'success': True, 'message': '连接成功'}
+    return results
+
+
+def check_hosts(hosts: List[AnsibleHost], forks: int = None, timeout: int = None) -> List[Dict[str, Any]]:
+    """
+    检查一批主机的连通性并批量更新主机状态
+
+    Returns:
+        list: 每台主机的检查结果
+    """
+    if not hosts:
+        return []
+
+    config = get_check_config()
+    forks = forks or config['FORKS']
+    timeout = timeout or config['TIMEOUT']
+    # 进程总超时：按并发批次估算，外加 ansible 启动时间
+    process_timeout = timeout * ceil(len(hosts) / forks) * 2 + 30
+
+    env = dict(os.environ)
+    env.update({
+        'ANSIBLE_STDOUT_CALLBACK': 'json',
+        'ANSIBLE_LOAD_CALLBACK_PLUGINS': '1',
+        'ANSIBLE_RETRY_FILES_ENABLED': '0',
+    })
+
+    with tempfile.TemporaryDirectory(prefix='ansflow-ping-') as directory:
+        inventory_path = _write_secret(
+            directory, 'inventory.yml',
+            yaml.safe_dump(build_inventory(hosts, directory), allow_unicode=True)
+        )
+        cmd = [
+            'ansible', 'all',
+            '-i', inventory_path,
+            '-m', 'ping',
+            '--forks', str(forks),
+            f'--timeout={timeout}',
+        ]
+        logger.info(f"批量检查主机连通性: {len(hosts)} 台主机, forks={forks}")
+
+        try:
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, timeout=process_timeout, env=env
+            )
+            try:
+                parsed = parse_ping_results(result.stdout)
+                fallback_message = '未返回检查结果'
+            except ValueError:
+                parsed = {}
+                fallback_message = (result.stderr or result.stdout or '连通性检查失败').strip()
+        except subprocess.TimeoutExpired:
+            parsed = {}
+            fallback_message = '连接超时'
+        except Exception as e:
+            parsed = {}
+            fallback_message = str(e)
+
+    now = timezone.now()
+    results = []
+    for host in hosts:
+        outcome = parsed.get(host_alias(host), {'success': False, 'message': fallback_message})
+        host.status = 'active' if outcome['success'] else 'failed'
+        host.check_message = outcome['message']
+        host.last_check = now
+        host.updated_at = now
+        results.append({
+            'host_id': host.id,
+            'hostname': host.hostname,
+            'success': outcome['success'],
+            'status': host.status,
+            'message': host.check_message,
+        })
+
+    AnsibleHost.objects.bulk_update(hosts, ['status', 'check_message', 'last_check', 'updated_at'])
+
+    succeeded = sum(1 for result in results if result['success'])
+    logger.info(f"批量主机连通性检查完成: 成功 {succeeded}/{len(hosts)}")
+    return results
@@ -0,0 +1,172 @@
+"""
+动态清单生成
+清单主机、清单主机组和组成员关系各用一次查询加载，成员关系在内存中建立索引后渲染 INI/YAML。
+渲染结果按清单指纹（各相关表的行数与最近更新时间）缓存，清单未变化时重复生成直接复用。
+"""
+import hashlib
+import logging
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import AnsibleHostGroupMembership, InventoryGroup, InventoryHost
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'ansible:inventory_content'
+
+
+def inventory_fingerprint(inventory) -> str:
+    """清单内容指纹：任何参与渲染的行新增、删除或更新都会改变指纹"""
+    hosts = InventoryHost.objects.filter(inventory=inventory).aggregate(
+        count=Count('id'), updated=Max('updated_at'), host_updated=Max('host__updated_at')
+    )
+    groups = InventoryGroup.objects.filter(inventory=inventory).aggregate(
+        count=Count('id'), updated=Max('updated_at'), group_updated=Max('group__updated_at')
+    )
+    memberships = AnsibleHostGroupMembership.objects.filter(
+        group__inventorygroup__inventory=inventory
+    ).aggregate(count=Count('id'), updated=Max('updated_at'))
+
+    parts = [inventory.format_type, inventory.updated_at, hosts, groups, memberships]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def _host_line(ih, variables: Dict[str, Any]) -> str:
+    host = ih.host
+    host_line = f"{ih.inventory_name} ansible_host={host.ip_address}"
+    if host.port != 22:
+        host_line += f" ansible_port={host.port}"
+    if host.username:
+        host_line += f" ansible_user={host.username}"
+    for key, value in variables.items():
+        host_line += f" {key}={value}"
+    return host_line
+
+
+def _host_vars(ih, variables: Dict[str, Any]) -> Dict[str, Any]:
+    host = ih.host
+    host_vars = {
+        'ansible_host': host.ip_address,
+        'ansible_user': host.username or 'root',
+    }
+    if host.port != 22:
+        host_vars['ansible_port'] = host.port
+    host_vars.update(variables)
+    return host_vars
+
+
+def _dict_to_yaml(data, indent=0):
+    # 简单YAML格式字符串（避免依赖PyYAML）
+    yaml_str = ""
+    prefix = "  " * indent
+    for key, value in data.items():
+        yaml_str += f"{prefix}{key}:\n"
+        if isinstance(value, dict):
+            yaml_str += _dict_to_yaml(value, indent + 1)
+        else:
+            yaml_str += f"{prefix}  {value}\n"
+    return yaml_str
+
+
+def _render(inventory) -> Dict[str, Any]:
+    inventory_hosts = list(
+        InventoryHost.objects.filter(inventory=inventory, is_active=True).select_related('host')
+    )
+    inventory_groups = list(
+        InventoryGroup.objects.filter(inventory=inventory, is_active=True).select_related('group')
+    )
+    hosts_by_id = {ih.host_id: ih for ih in inventory_hosts}
+
+    # 成员关系矩阵：只取清单中激活的主机组与激活主机之间的关系
+    members_by_group: Dict[int, List[AnsibleHostGroupMembership]] = {}
+    for membership in AnsibleHostGroupMembership.objects.filter(
+        group_id__in=[ig.group_id for ig in inventory_groups],
+        host_id__in=list(hosts_by_id)
+    ).order_by('id'):
+        members_by_group.setdefault(membership.group_id, []).append(membership)
+    grouped_host_ids = {
+        membership.host_id for members in members_by_group.values() for membership in members
+    }
+    ungrouped = [ih for ih in inventory_hosts if ih.host_id not in grouped_host_ids]
+
+    if inventory.format_type == 'ini':
+        lines = []
+
+        # 不属于任何主机组的主机放入[ungrouped]组
+        if ungrouped:
+            lines.append('[ungrouped]')
+            lines.extend(_host_line(ih, ih.host_variables or {}) for ih in ungrouped)
+            lines.append('')
+
+        for ig in inventory_groups:
+            lines.append(f'[{ig.inventory_name}]')
+            for membership in members_by_group.get(ig.group_id, []):
+                ih = hosts_by_id[membership.host_id]
+                # 合并清单变量和组成员变量
+                combined_vars = dict(ih.host_variables or {})
+                combined_vars.update(membership.variables or {})
+                lines.append(_host_line(ih, combined_vars))
+
+            if ig.group_variables:
+                lines.append('')
+                lines.append(f'[{ig.inventory_name}:vars]')
+                for key, value in ig.group_variables.items():
+                    lines.append(f'{key}={value}')
+
+            lines.append('')
+
+        content = '\n'.join(lines).strip()
+    else:
+        inventory_data = {'all': {'hosts': {}, 'children': {}}}
+
+        for ih in ungrouped:
+            inventory_data['all']['hosts'][ih.inventory_name] = _host_vars(ih, ih.host_variables or {})
+
+        for ig in inventory_groups:
+            group_data = {'hosts': {}}
+            for membership in members_by_group.get(ig.group_id, []):
+                ih = hosts_by_id[membership.host_id]
+                combined_vars = dict(ih.host_variables or {})
+                combined_vars.update(membership.variables or {})
+                group_data['hosts'][ih.inventory_name] = _host_vars(ih, combined_vars)
+            if ig.group_variables:
+                group_data['vars'] = dict(ig.group_variables)
+            inventory_data['all']['children'][ig.inventory_name] = group_data
+
+        content = _dict_to_yaml(inventory_data)
+
+    return {
+        'content': content,
+        'hosts_count': len(inventory_hosts),
+        'groups_count': len(inventory_groups),
+    }
+
+
+def generate_inventory_content(inventory) -> Dict[str, Any]:
+    """
+    生成清单内容，返回 content / hosts_count / groups_count
+
+    结果按清单指纹缓存 ANSIBLE_INVENTORY_CACHE_TTL 秒（0 表示不缓存）
+    """
+    ttl = getattr(settings, 'ANSIBLE_INVENTORY_CACHE_TTL', 0)
+    if not ttl:
+        return _render(inventory)
+
+    cache_key = f"{CACHE_KEY_PREFIX}:{inventory.id}:{inventory_fingerprint(inventory)}"
+    try:
+        cached = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"读取清单缓存失败: inventory={inventory.id} - {e}")
+        cached = None
+    if cached is not None:
+        return cached
+
+    result = _render(inventory)
+    try:
+        cache.set(cache_key, result, ttl)
+    except Exception as e:
+        logger.warning(f"写入清单缓存失败: inventory={inventory.id} - {e}")
+    return result
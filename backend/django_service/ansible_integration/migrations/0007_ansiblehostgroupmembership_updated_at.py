@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-16 12:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ansible_integration', '0006_inventorygroup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ansiblehostgroupmembership',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='更新时间'),
+            preserve_default=False,
+        ),
+    ]
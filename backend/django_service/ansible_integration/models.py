@@ -635,6 +635,7 @@ class AnsibleHostGroupMembership(models.Model):
     )
     variables = models.JSONField(default=dict, verbose_name='主机变量')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
 
     class Meta:
         db_table = 'ansible_host_group_membership'
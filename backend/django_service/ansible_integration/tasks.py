@@ -483,6 +483,24 @@ def check_host_connectivity(host_id):
         }
 
 
+@shared_task
+def check_hosts_connectivity_batch(host_ids):
+    """
+    批量检查主机连通性：一批主机只启动一次 ansible 进程
+    
+    Args:
+        host_ids (list): AnsibleHost记录的ID列表
+    
+    Returns:
+        list: 每台主机的检查结果
+    """
+    from .models import AnsibleHost
+    from .connectivity import check_hosts
+    
+    hosts = list(AnsibleHost.objects.filter(id__in=host_ids).select_related('credential'))
+    return check_hosts(hosts)
+
+
 @shared_task
 def gather_host_facts(host_id):
     """
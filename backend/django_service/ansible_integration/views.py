@@ -3,9 +3,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
-from django.db.models import Q, Count, Avg
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Count, Avg, F, DurationField, ExpressionWrapper
 from django.utils import timezone
 from datetime import timedelta
+from urllib.parse import urlencode
 import hashlib
 import os
 import tempfile
@@ -246,193 +249,15 @@ class AnsibleInventoryViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def generate_inventory(self, request, pk=None):
         """生成动态清单内容，包含主机和主机组"""
-        from .models import InventoryHost, InventoryGroup, AnsibleHostGroupMembership
+        from .inventory_builder import generate_inventory_content
         
         inventory = self.get_object()
-        # 获取清单中的主机
-        inventory_hosts = InventoryHost.objects.filter(
-            inventory=inventory, 
-            is_active=True
-        ).select_related('host')
-        
-        # 获取清单中的主机组
-        inventory_groups = InventoryGroup.objects.filter(
-            inventory=inventory,
-            is_active=True
-        ).select_related('group')
-        
-        # 生成INI格式的清单
-        if inventory.format_type == 'ini':
-            lines = []
-            
-            # 添加单独的主机（不属于任何主机组的）
-            ungrouped_hosts = []
-            for ih in inventory_hosts:
-                # 检查主机是否属于清单中的任何主机组
-                host_in_group = False
-                for ig in inventory_groups:
-                    if AnsibleHostGroupMembership.objects.filter(
-                        host=ih.host, 
-                        group=ig.group
-                    ).exists():
-                        host_in_group = True
-                        break
-                
-                if not host_in_group:
-                    host_line = f"{ih.inventory_name} ansible_host={ih.host.ip_address}"
-                    if ih.host.port != 22:
-                        host_line += f" ansible_port={ih.host.port}"
-                    if ih.host.username:
-                        host_line += f" ansible_user={ih.host.username}"
-                    
-                    # 添加主机变量
-                    if ih.host_variables:
-                        for key, value in ih.host_variables.items():
-                            host_line += f" {key}={value}"
-                    
-                    ungrouped_hosts.append(host_line)
-            
-            # 如果有未分组的主机，添加[ungrouped]组
-            if ungrouped_hosts:
-                lines.append('[ungrouped]')
-                lines.extend(ungrouped_hosts)
-                lines.append('')
-            
-            # 添加主机组
-            for ig in inventory_groups:
-                group = ig.group
-                lines.append(f'[{ig.inventory_name}]')
-                
-                # 获取组内的主机（通过membership关系）
-                memberships = AnsibleHostGroupMembership.objects.filter(
-                    group=group
-                ).select_related('host')
-                
-                for membership in memberships:
-                    host = membership.host
-                    # 检查该主机是否也在清单中
-                    try:
-                        ih = InventoryHost.objects.get(inventory=inventory, host=host, is_active=True)
-                        host_line = f"{ih.inventory_name} ansible_host={host.ip_address}"
-                        if host.port != 22:
-                            host_line += f" ansible_port={host.port}"
-                        if host.username:
-                            host_line += f" ansible_user={host.username}"
-                        
-                        # 添加主机变量（合并清单变量和组成员变量）
-                        combined_vars = {}
-                        if ih.host_variables:
-                            combined_vars.update(ih.host_variables)
-                        if membership.variables:
-                            combined_vars.update(membership.variables)
-                        
-                        for key, value in combined_vars.items():
-                            host_line += f" {key}={value}"
-                        
-                        lines.append(host_line)
-                    except InventoryHost.DoesNotExist:
-                        continue
-                
-                # 添加组变量
-                if ig.group_variables:
-                    lines.append('')
-                    lines.append(f'[{ig.inventory_name}:vars]')
-                    for key, value in ig.group_variables.items():
-                        lines.append(f'{key}={value}')
-                
-                lines.append('')
-            
-            dynamic_content = '\n'.join(lines).strip()
-            
-        else:
-            # YAML格式
-            inventory_data = {'all': {'hosts': {}, 'children': {}}}
-            
-            # 添加单独的主机
-            for ih in inventory_hosts:
-                # 检查主机是否属于清单中的任何主机组
-                host_in_group = False
-                for ig in inventory_groups:
-                    if AnsibleHostGroupMembership.objects.filter(
-                        host=ih.host, 
-                        group=ig.group
-                    ).exists():
-                        host_in_group = True
-                        break
-                
-                if not host_in_group:
-                    host_vars = {
-                        'ansible_host': ih.host.ip_address,
-                        'ansible_user': ih.host.username or 'root',
-                    }
-                    if ih.host.port != 22:
-                        host_vars['ansible_port'] = ih.host.port
-                    
-                    # 合并主机变量
-                    if ih.host_variables:
-                        host_vars.update(ih.host_variables)
-                    
-                    inventory_data['all']['hosts'][ih.inventory_name] = host_vars
-            
-            # 添加主机组
-            for ig in inventory_groups:
-                group_data = {'hosts': {}, 'vars': {}}
-                
-                # 获取组内的主机（通过membership关系）
-                memberships = AnsibleHostGroupMembership.objects.filter(
-                    group=ig.group
-                ).select_related('host')
-                
-                for membership in memberships:
-                    host = membership.host
-                    try:
-                        ih = InventoryHost.objects.get(inventory=inventory, host=host, is_active=True)
-                        host_vars = {
-                            'ansible_host': host.ip_address,
-                            'ansible_user': host.username or 'root',
-                        }
-                        if host.port != 22:
-                            host_vars['ansible_port'] = host.port
-                        
-                        # 合并主机变量（清单变量 + 组成员变量）
-                        if ih.host_variables:
-                            host_vars.update(ih.host_variables)
-                        if membership.variables:
-                            host_vars.update(membership.variables)
-                        
-                        group_data['hosts'][ih.inventory_name] = host_vars
-                    except InventoryHost.DoesNotExist:
-                        continue
-                
-                # 添加组变量
-                if ig.group_variables:
-                    group_data['vars'].update(ig.group_variables)
-                
-                # 清理空的vars
-                if not group_data['vars']:
-                    del group_data['vars']
-                
-                inventory_data['all']['children'][ig.inventory_name] = group_data
-            
-            # 转换为简单YAML格式字符串（避免依赖PyYAML）
-            def dict_to_yaml(data, indent=0):
-                yaml_str = ""
-                prefix = "  " * indent
-                for key, value in data.items():
-                    yaml_str += f"{prefix}{key}:\n"
-                    if isinstance(value, dict):
-                        yaml_str += dict_to_yaml(value, indent + 1)
-                    else:
-                        yaml_str += f"{prefix}  {value}\n"
-                return yaml_str
-            
-            dynamic_content = dict_to_yaml(inventory_data)
-        
-        total_hosts = inventory_hosts.count()
-        total_groups = inventory_groups.count()
+        result = generate_inventory_content(inventory)
+        total_hosts = result['hosts_count']
+        total_groups = result['groups_count']
         
         return Response({
-            'content': dynamic_content,
+            'content': result['content'],
             'format_type': inventory.format_type,
             'hosts_count': total_hosts,
             'groups_count': total_groups,
@@ -1132,32 +957,43 @@ class AnsibleExecutionViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """获取执行统计信息"""
-        queryset = self.get_queryset()
-        
-        # 基础统计
-        total_executions = queryset.count()
-        successful_executions = queryset.filter(status='success').count()
-        failed_executions = queryset.filter(status='failed').count()
-        running_executions = queryset.filter(status='running').count()
-        pending_executions = queryset.filter(status='pending').count()
-        
-        # 成功率
-        success_rate = (successful_executions / total_executions * 100) if total_executions > 0 else 0
-        
-        # 平均执行时长（已完成的）
-        completed_executions = queryset.filter(
+        """获取执行统计信息（单条条件聚合查询，结果按用户和过滤参数短时缓存）"""
+        cache_ttl = getattr(settings, 'ANSIBLE_STATS_CACHE_TTL', 0)
+        cache_key = None
+        if cache_ttl:
+            params = urlencode(sorted(request.query_params.items()))
+            scope = 'all' if request.user.is_superuser else request.user.id
+            cache_key = 'ansible:execution_stats:' + hashlib.md5(f"{scope}?{params}".encode()).hexdigest()
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return Response(cached)
+
+        completed = Q(
             status__in=['success', 'failed'],
             started_at__isnull=False,
             completed_at__isnull=False
         )
-        avg_duration = 0
-        if completed_executions.exists():
-            durations = []
-            for execution in completed_executions:
-                if execution.duration:
-                    durations.append(execution.duration)
-            avg_duration = sum(durations) / len(durations) if durations else 0
+        # 基础统计与平均执行时长（已完成的）一次聚合得出，不再逐行加载执行记录
+        counts = self.get_queryset().order_by().aggregate(
+            total=Count('id'),
+            success=Count('id', filter=Q(status='success')),
+            failed=Count('id', filter=Q(status='failed')),
+            running=Count('id', filter=Q(status='running')),
+            pending=Count('id', filter=Q(status='pending')),
+            avg_duration=Avg(
+                ExpressionWrapper(F('completed_at') - F('started_at'), output_field=DurationField()),
+                filter=completed
+            ),
+        )
+        total_executions = counts['total']
+        successful_executions = counts['success']
+        failed_executions = counts['failed']
+        running_executions = counts['running']
+        pending_executions = counts['pending']
+        
+        # 成功率
+        success_rate = (successful_executions / total_executions * 100) if total_executions > 0 else 0
+        avg_duration = counts['avg_duration'].total_seconds() if counts['avg_duration'] else 0
         
         # 其他统计
         total_playbooks = AnsiblePlaybook.objects.count()
@@ -1178,6 +1014,8 @@ class AnsibleExecutionViewSet(viewsets.ModelViewSet):
         }
         
         serializer = AnsibleStatsSerializer(stats_data)
+        if cache_key:
+            cache.set(cache_key, serializer.data, cache_ttl)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -1963,27 +1801,29 @@ class AnsibleHostViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         from .models import AnsibleHost
-        hosts = AnsibleHost.objects.filter(id__in=host_ids)
+        from .connectivity import get_check_config
+        from .tasks import check_hosts_connectivity_batch
+        hosts = list(AnsibleHost.objects.filter(id__in=host_ids).values('id', 'hostname').order_by('id'))
         
+        # 每批主机一个任务，任务内一次 ansible 调用并发检查整批主机
+        batch_size = get_check_config()['BATCH_SIZE']
         results = []
-        for host in hosts:
+        for index in range(0, len(hosts), batch_size):
+            batch = hosts[index:index + batch_size]
             try:
-                # 异步检查连通性
-                from .tasks import check_host_connectivity
-                task_result = check_host_connectivity.delay(host.id)
-                
-                results.append({
-                    'host_id': host.id,
-                    'hostname': host.hostname,
+                task_result = check_hosts_connectivity_batch.delay([host['id'] for host in batch])
+                results.extend({
+                    'host_id': host['id'],
+                    'hostname': host['hostname'],
                     'task_id': task_result.id,
                     'message': '连通性检查已启动'
-                })
+                } for host in batch)
             except Exception as e:
-                results.append({
-                    'host_id': host.id,
-                    'hostname': host.hostname,
+                results.extend({
+                    'host_id': host['id'],
+                    'hostname': host['hostname'],
                     'error': str(e)
-                })
+                } for host in batch)
         
         return Response({
             'message': f'已启动 {len(results)} 个主机的连通性检查',
@@ -7,6 +7,8 @@ from dataclasses import dataclass
 import httpx
 import logging
 
+from .http_pool import get_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,13 +50,28 @@ class CICDAdapter(ABC):
         self.username = username
         self.token = token
         self.config = kwargs
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # 固定请求头（子类设置）；相同地址、请求头与用户名的适配器共用一个客户端
+        self.client_headers: Optional[Dict[str, str]] = None
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """当前事件循环中的共享客户端；显式设置的客户端优先"""
+        if self._client is not None:
+            return self._client
+        return get_client(self.base_url, self.client_headers, identity=self.username)
+    
+    @client.setter
+    def client(self, value: httpx.AsyncClient):
+        self._client = value
     
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        # 共享客户端由连接池统一管理，这里只关闭显式设置的客户端
+        if self._client is not None:
+            await self._client.aclose()
     
     @abstractmethod
     async def create_pipeline_file(self, pipeline_def: PipelineDefinition, project_path: str = "") -> str:
@@ -20,6 +20,9 @@ class AdapterFactory:
         'jenkins': JenkinsAdapter,
         'gitlab': GitLabCIAdapter,
         'github': GitHubActionsAdapter,
+        # CICDTool.tool_type 取值
+        'gitlab_ci': GitLabCIAdapter,
+        'github_actions': GitHubActionsAdapter,
     }
     
     @classmethod
@@ -4,7 +4,6 @@ GitHub Actions CI/CD 适配器实现
 import asyncio
 import logging
 from typing import Dict, Any, List
-import httpx
 import yaml
 
 from .base import CICDAdapter, PipelineDefinition, ExecutionResult
@@ -25,7 +24,7 @@ class GitHubActionsAdapter(CICDAdapter):
             'X-GitHub-Api-Version': '2022-11-28',
             'Content-Type': 'application/json'
         }
-        self.client = httpx.AsyncClient(headers=self.headers, timeout=30.0)
+        self.client_headers = self.headers
     
     def _convert_atomic_steps_to_github_actions(self, steps: List[Dict[str, Any]]) -> Dict[str, Any]:
         """将原子步骤转换为 GitHub Actions 工作流配置"""
@@ -4,7 +4,6 @@ GitLab CI/CD 适配器实现
 import asyncio
 import logging
 from typing import Dict, Any, List
-import httpx
 import yaml
 
 from .base import CICDAdapter, PipelineDefinition, ExecutionResult
@@ -22,7 +21,7 @@ class GitLabCIAdapter(CICDAdapter):
             'PRIVATE-TOKEN': token,
             'Content-Type': 'application/json'
         }
-        self.client = httpx.AsyncClient(headers=self.headers, timeout=30.0)
+        self.client_headers = self.headers
     
     def _convert_atomic_steps_to_gitlab_ci(self, steps: List[Dict[str, Any]]) -> Dict[str, Any]:
         """将原子步骤转换为 GitLab CI 配置"""
@@ -379,6 +378,56 @@ class GitLabCIAdapter(CICDAdapter):
             logger.error(f"Error getting GitLab CI logs: {e}")
             return f"Error getting logs: {str(e)}"
     
+    async def list_pipeline_jobs(self, pipeline_id: str) -> List[Dict[str, Any]]:
+        """获取流水线的全部作业（按 Link 头逐页读取，按作业ID排序）；请求失败时抛出 httpx 异常"""
+        url = f"{self.base_url}/api/v4/projects/{self.project_id}/pipelines/{pipeline_id}/jobs"
+        params = {'per_page': 100}
+        jobs = []
+        while url:
+            response = await self.client.get(url, params=params)
+            response.raise_for_status()
+            jobs.extend(response.json())
+            # next 链接已包含分页参数
+            url, params = response.links.get('next', {}).get('url'), None
+        return sorted(jobs, key=lambda job: job['id'])
+    
+    async def get_job_trace_range(self, job_id: int, start: int = 0, max_bytes: int = 1024 * 1024) -> Dict[str, Any]:
+        """
+        用 Range 请求读取作业日志中从字节偏移 start 开始的新内容，每次最多读取 max_bytes 字节
+
+        Returns:
+            {'data': bytes, 'next_position': int, 'has_more': bool, 'ranged': bool}；
+            服务器忽略 Range 返回完整日志时 ranged 为 False：start 之前的内容边读边丢弃，不在内存中缓存，
+            读满窗口后立即停止下载。请求失败时抛出 httpx 异常
+        """
+        url = f"{self.base_url}/api/v4/projects/{self.project_id}/jobs/{job_id}/trace"
+        headers = {'Range': f'bytes={start}-{start + max_bytes - 1}'}
+        data = bytearray()
+        async with self.client.stream('GET', url, headers=headers) as response:
+            if response.status_code == 416:
+                # 偏移之后暂时没有新内容
+                return {'data': b'', 'next_position': start, 'has_more': False, 'ranged': True}
+            response.raise_for_status()
+            
+            ranged = response.status_code == 206
+            skip = 0 if ranged else start
+            async for chunk in response.aiter_bytes():
+                if skip:
+                    dropped = min(skip, len(chunk))
+                    skip -= dropped
+                    chunk = chunk[dropped:]
+                data += chunk
+                if len(data) >= max_bytes:
+                    break
+        
+        data = bytes(data[:max_bytes])
+        return {
+            'data': data,
+            'next_position': start + len(data),
+            'has_more': len(data) >= max_bytes,
+            'ranged': ranged,
+        }
+    
     async def health_check(self) -> bool:
         """GitLab CI 健康检查"""
         try:
@@ -0,0 +1,270 @@
+"""
+适配器共享 HTTP 客户端
+httpx.AsyncClient 的连接绑定在创建它的事件循环上，因此客户端按（事件循环, 基础地址, 请求头, 身份）复用：
+- 同一事件循环内访问同一 CI 服务器的适配器共用一个连接池（keep-alive，安装了 h2 时启用 HTTP/2），
+  每个客户端即每个 CI 地址的连接数受 CICD_HTTP_POOL 限制
+- 同步代码（Celery 任务等）通过 run_async() 把协程提交到进程级的共享后台事件循环，
+  不同任务之间也能复用已建立的连接
+- Jenkins crumb 等短期令牌按客户端缓存并设置过期时间，与客户端的会话 Cookie 保持一致
+- get_pool_stats() 汇总客户端与连接数，并同步到 Prometheus 指标（如已安装 prometheus_client）
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Dict, Hashable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+# 可选依赖
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    from prometheus_client import Counter, Gauge
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP_POOL_CONFIG = {
+    'MAX_CONNECTIONS': 20,     # 每个 CI 地址（客户端）的最大连接数
+    'MAX_KEEPALIVE': 10,       # 每个 CI 地址保持的空闲连接数
+    'KEEPALIVE_EXPIRY': 60,    # 空闲连接保持时间（秒）
+    'TIMEOUT': 30,             # 请求超时（秒）
+    'CONNECT_TIMEOUT': 10,     # 建立连接超时（秒）
+    'HTTP2': True,             # 服务器支持时使用 HTTP/2（需要安装 h2）
+    'TOKEN_TTL': 600,          # crumb 等短期令牌的缓存时间（秒）
+}
+
+if PROMETHEUS_AVAILABLE:
+    http_pool_clients = Gauge(
+        'ansflow_cicd_http_clients',
+        'Number of pooled HTTP clients shared by CI/CD adapters'
+    )
+    http_pool_connections = Gauge(
+        'ansflow_cicd_http_connections',
+        'Connections held by pooled CI/CD HTTP clients',
+        ['host', 'state']
+    )
+    http_pool_requests = Counter(
+        'ansflow_cicd_http_requests_total',
+        'Requests sent through pooled CI/CD HTTP clients',
+        ['host']
+    )
+    http_pool_clients_created = Counter(
+        'ansflow_cicd_http_clients_created_total',
+        'Pooled CI/CD HTTP clients created (connection pools opened)',
+        ['host']
+    )
+    http_pool_token_cache = Counter(
+        'ansflow_cicd_http_token_cache_total',
+        'Short-lived CI/CD token cache lookups',
+        ['result']
+    )
+
+ClientKey = Tuple[str, Tuple[Tuple[str, str], ...], Optional[str]]
+
+# 事件循环 -> {客户端键: 客户端}；事件循环被回收后对应条目自动消失
+_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, httpx.AsyncClient]]' = (
+    weakref.WeakKeyDictionary()
+)
+# 客户端 -> {令牌键: (值, 过期时间)}；令牌随客户端（及其 Cookie）一起失效
+_tokens: 'weakref.WeakKeyDictionary[httpx.AsyncClient, Dict[Hashable, Tuple[Any, float]]]' = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+_known_hosts: set = set()
+
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+_shared_thread: Optional[threading.Thread] = None
+_shared_pid: Optional[int] = None
+_shared_lock = threading.Lock()
+
+
+def get_pool_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_HTTP_POOL_CONFIG)
+    try:
+        from django.conf import settings
+        if settings.configured:
+            config.update(getattr(settings, 'CICD_HTTP_POOL', {}) or {})
+    except ImportError:
+        pass
+    return config
+
+
+def _host(base_url: str) -> str:
+    return urlsplit(base_url).netloc.lower() or base_url
+
+
+def _client_key(base_url: str, headers: Optional[Dict[str, str]], identity: Optional[str]) -> ClientKey:
+    return base_url.rstrip('/').lower(), tuple(sorted((headers or {}).items())), identity or None
+
+
+def _purge_closed_loops() -> None:
+    # asyncio.run() 等临时事件循环关闭后，其客户端已无法使用，直接丢弃
+    for loop in [loop for loop in list(_clients.keys()) if loop.is_closed()]:
+        _clients.pop(loop, None)
+
+
+def _create_client(base_url: str, headers: Optional[Dict[str, str]]) -> httpx.AsyncClient:
+    config = get_pool_config()
+    host = _host(base_url)
+    event_hooks = {}
+    if PROMETHEUS_AVAILABLE:
+        async def count_request(request):
+            http_pool_requests.labels(host=host).inc()
+        event_hooks['request'] = [count_request]
+        http_pool_clients_created.labels(host=host).inc()
+
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=httpx.Timeout(config['TIMEOUT'], connect=config['CONNECT_TIMEOUT']),
+        limits=httpx.Limits(
+            max_connections=config['MAX_CONNECTIONS'],
+            max_keepalive_connections=config['MAX_KEEPALIVE'],
+            keepalive_expiry=config['KEEPALIVE_EXPIRY'],
+        ),
+        http2=bool(config['HTTP2']) and HTTP2_AVAILABLE,
+        event_hooks=event_hooks,
+    )
+
+
+def get_client(base_url: str, headers: Optional[Dict[str, str]] = None,
+               identity: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    获取当前事件循环中共用的客户端，必须在协程中调用
+
+    headers 为固定请求头；identity 区分同一地址下的不同账号（各自持有会话 Cookie）。
+    认证等按请求变化的参数应随请求传入，避免客户端数量膨胀
+    """
+    loop = asyncio.get_running_loop()
+    key = _client_key(base_url, headers, identity)
+    with _clients_lock:
+        loop_clients = _clients.get(loop)
+        if loop_clients is None:
+            _purge_closed_loops()
+            loop_clients = _clients[loop] = {}
+        client = loop_clients.get(key)
+        if client is None or client.is_closed:
+            client = _create_client(base_url, headers)
+            loop_clients[key] = client
+            _known_hosts.add(_host(base_url))
+    return client
+
+
+def get_cached_token(client: httpx.AsyncClient, key: Hashable) -> Optional[Any]:
+    """读取客户端上未过期的短期令牌"""
+    with _clients_lock:
+        entry = _tokens.get(client, {}).get(key)
+    hit = entry is not None and entry[1] > time.monotonic()
+    if PROMETHEUS_AVAILABLE:
+        http_pool_token_cache.labels(result='hit' if hit else 'miss').inc()
+    return entry[0] if hit else None
+
+
+def set_cached_token(client: httpx.AsyncClient, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+    ttl = get_pool_config()['TOKEN_TTL'] if ttl is None else ttl
+    with _clients_lock:
+        _tokens.setdefault(client, {})[key] = (value, time.monotonic() + ttl)
+
+
+def invalidate_token(client: httpx.AsyncClient, key: Hashable) -> None:
+    with _clients_lock:
+        _tokens.get(client, {}).pop(key, None)
+
+
+def _connection_counts(client: httpx.AsyncClient) -> Tuple[int, int]:
+    # httpx 没有公开连接池状态，这里读取 httpcore 连接池（读取失败按 0 计）
+    pool = getattr(getattr(client, '_transport', None), '_pool', None)
+    connections = list(getattr(pool, 'connections', []) or [])
+    idle = 0
+    for connection in connections:
+        try:
+            idle += 1 if connection.is_idle() else 0
+        except Exception:
+            pass
+    return len(connections) - idle, idle
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """汇总各 CI 地址的客户端数与连接数，并更新 Prometheus 指标"""
+    with _clients_lock:
+        _purge_closed_loops()
+        entries = [
+            (key, client)
+            for loop_clients in _clients.values()
+            for key, client in loop_clients.items()
+            if not client.is_closed
+        ]
+        known_hosts = set(_known_hosts)
+
+    hosts: Dict[str, Dict[str, int]] = {
+        host: {'clients': 0, 'active_connections': 0, 'idle_connections': 0} for host in known_hosts
+    }
+    for (base_url, _, _), client in entries:
+        active, idle = _connection_counts(client)
+        host_stats = hosts.setdefault(_host(base_url), {'clients': 0, 'active_connections': 0, 'idle_connections': 0})
+        host_stats['clients'] += 1
+        host_stats['active_connections'] += active
+        host_stats['idle_connections'] += idle
+
+    if PROMETHEUS_AVAILABLE:
+        http_pool_clients.set(len(entries))
+        for host, host_stats in hosts.items():
+            http_pool_connections.labels(host=host, state='active').set(host_stats['active_connections'])
+            http_pool_connections.labels(host=host, state='idle').set(host_stats['idle_connections'])
+
+    return {
+        'clients': len(entries),
+        'http2': bool(get_pool_config()['HTTP2']) and HTTP2_AVAILABLE,
+        'hosts': hosts,
+    }
+
+
+async def close_clients() -> None:
+    """关闭当前事件循环中的所有共享客户端（进程退出时调用）"""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        loop_clients = _clients.pop(loop, {})
+    for client in loop_clients.values():
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭共享HTTP客户端失败: {e}")
+
+
+def _get_shared_loop() -> asyncio.AbstractEventLoop:
+    global _shared_loop, _shared_thread, _shared_pid
+
+    pid = os.getpid()
+    if _shared_loop is not None and _shared_pid == pid and _shared_thread.is_alive():
+        return _shared_loop
+
+    with _shared_lock:
+        # fork 出的子进程（Celery prefork）不会继承父进程的线程，需要重新创建
+        if _shared_loop is None or _shared_pid != pid or not _shared_thread.is_alive():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name='cicd-adapter-loop', daemon=True
+            )
+            thread.start()
+            _shared_loop, _shared_thread, _shared_pid = loop, thread, pid
+    return _shared_loop
+
+
+def run_async(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    在进程级共享事件循环中执行协程并等待结果
+
+    不能在共享事件循环自身的协程中调用（会相互等待）
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_shared_loop())
+    return future.result(timeout)
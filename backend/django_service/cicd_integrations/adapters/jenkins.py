@@ -10,9 +10,12 @@ from datetime import datetime
 import httpx
 
 from .base import CICDAdapter, PipelineDefinition, ExecutionResult
+from .http_pool import get_cached_token, invalidate_token, set_cached_token
 
 logger = logging.getLogger(__name__)
 
+CRUMB_TOKEN_KEY = 'jenkins-crumb'
+
 
 class JenkinsAdapter(CICDAdapter):
     """Jenkins 适配器"""
@@ -50,20 +53,28 @@ class JenkinsAdapter(CICDAdapter):
             # 如果命令不包含单引号，使用单引号包围
             return f"sh '{command}'"
 
-    async def _get_crumb(self) -> Optional[Tuple[str, str]]:
-        """获取 Jenkins CSRF 保护令牌"""
+    async def _get_crumb(self, refresh: bool = False) -> Optional[Tuple[str, str]]:
+        """获取 Jenkins CSRF 保护令牌（按共享客户端缓存，refresh 时重新获取）"""
         if not self.crumb_issuer:
             return None
         
+        client = self.client
+        if not refresh:
+            crumb = get_cached_token(client, CRUMB_TOKEN_KEY)
+            if crumb:
+                return crumb
+        
         try:
-            response = await self.client.get(
+            response = await client.get(
                 f"{self.base_url}/crumbIssuer/api/json",
                 auth=self.auth
             )
             
             if response.status_code == 200:
                 crumb_data = response.json()
-                return crumb_data['crumbRequestField'], crumb_data['crumb']
+                crumb = (crumb_data['crumbRequestField'], crumb_data['crumb'])
+                set_cached_token(client, CRUMB_TOKEN_KEY, crumb)
+                return crumb
         except Exception as e:
             logger.warning(f"Failed to get Jenkins crumb: {e}")
         
@@ -75,18 +86,25 @@ class JenkinsAdapter(CICDAdapter):
         url: str, 
         **kwargs
     ) -> httpx.Response:
-        """发送经过认证的请求"""
-        headers = kwargs.get('headers', {})
+        """发送经过认证的请求；缓存的 crumb 被拒绝（403）时重新获取并重试一次"""
+        headers = dict(kwargs.get('headers') or {})
+        kwargs['auth'] = self.auth
         
         # 添加 CSRF 保护
         crumb = await self._get_crumb()
         if crumb:
             headers[crumb[0]] = crumb[1]
-        
         kwargs['headers'] = headers
-        kwargs['auth'] = self.auth
         
-        return await self.client.request(method, url, **kwargs)
+        response = await self.client.request(method, url, **kwargs)
+        if crumb and response.status_code == 403:
+            invalidate_token(self.client, CRUMB_TOKEN_KEY)
+            fresh_crumb = await self._get_crumb(refresh=True)
+            if fresh_crumb and fresh_crumb != crumb:
+                headers.pop(crumb[0], None)
+                headers[fresh_crumb[0]] = fresh_crumb[1]
+                response = await self.client.request(method, url, **kwargs)
+        return response
     
     def _convert_atomic_steps_to_jenkinsfile(self, steps: List[Dict[str, Any]]) -> str:
         """将原子步骤转换为 Jenkinsfile（支持并行组）"""
@@ -1220,6 +1238,36 @@ pipeline {{
                 'current_position': start_position
             }
     
+    async def get_console_increment(self, job_name: str, build_number: str, start: int = 0,
+                                    max_bytes: int = 1024 * 1024) -> Dict[str, Any]:
+        """
+        从字节偏移 start 增量读取控制台日志（progressiveText），每次最多读取 max_bytes 字节
+
+        Returns:
+            {'data': bytes, 'next_position': int, 'has_more': bool}；
+            next_position 是下次请求的 start：读完时取自 X-Text-Size，达到 max_bytes 时为 start 加已读字节数。
+            请求失败时抛出 httpx 异常
+        """
+        url = f"{self.base_url}/job/{job_name}/{build_number}/logText/progressiveText"
+        data = bytearray()
+        async with self.client.stream('GET', url, auth=self.auth, params={'start': start}) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                data += chunk
+                if len(data) >= max_bytes:
+                    break
+            text_size = response.headers.get('X-Text-Size')
+            more_data = response.headers.get('X-More-Data', 'false').lower() == 'true'
+        
+        if len(data) >= max_bytes:
+            # 超出单次上限的部分不再下载，下一轮从已读位置继续
+            return {'data': bytes(data[:max_bytes]), 'next_position': start + max_bytes, 'has_more': True}
+        return {
+            'data': bytes(data),
+            'next_position': int(text_size) if text_size else start + len(data),
+            'has_more': more_data,
+        }
+    
     async def get_queue_info(self) -> List[Dict[str, Any]]:
         """获取Jenkins构建队列信息"""
         try:
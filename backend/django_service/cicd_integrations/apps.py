@@ -8,4 +8,5 @@ class CicdIntegrationsConfig(AppConfig):
     
     def ready(self):
         """应用启动时的初始化"""
-        pass
+        from .stats_rollup import connect_run_signals
+        connect_run_signals()
@@ -7,10 +7,13 @@ from .step_executor import StepExecutor
 from .pipeline_executor import PipelineExecutor
 from .dependency_resolver import DependencyResolver
 from .execution_context import ExecutionContext
+from .step_worker_pool import StepWorkerPool, get_step_pool
 
 __all__ = [
     'StepExecutor',
     'PipelineExecutor', 
     'DependencyResolver',
-    'ExecutionContext'
+    'ExecutionContext',
+    'StepWorkerPool',
+    'get_step_pool'
 ]
@@ -28,6 +28,8 @@ class DependencyResolver:
         self.steps: Dict[int, StepNode] = {}
         self.dependency_graph: Dict[int, List[int]] = defaultdict(list)
         self.reverse_graph: Dict[int, List[int]] = defaultdict(list)
+        # 调度用的剩余依赖计数（入度），由 reset_pending_counts 初始化
+        self.pending_counts: Dict[int, int] = {}
     
     def add_step(self, step_node: StepNode) -> None:
         """添加步骤节点"""
@@ -176,13 +178,45 @@ class DependencyResolver:
             if self.can_execute_step(step_id, completed_steps):
                 ready_steps.append(step_id)
         
-        # 按优先级排序
-        ready_steps.sort(key=lambda x: (
+        return self.sort_by_priority(ready_steps)
+    
+    def sort_by_priority(self, step_ids: List[int]) -> List[int]:
+        """按优先级和名称排序步骤"""
+        return sorted(step_ids, key=lambda x: (
             self.steps[x].priority,
             self.steps[x].step_name
         ))
+    
+    def reset_pending_counts(self) -> List[int]:
+        """
+        初始化每个步骤的剩余依赖计数，返回可立即执行的步骤
+        配合 mark_step_completed 使用，调度时无需每次重新扫描全部步骤
+        """
+        self.pending_counts = {
+            step_id: len(self.reverse_graph.get(step_id, []))
+            for step_id in self.steps
+        }
+        return self.sort_by_priority([
+            step_id for step_id, count in self.pending_counts.items() if count == 0
+        ])
+    
+    def mark_step_completed(self, step_id: int) -> List[int]:
+        """
+        标记步骤成功完成，递减其下游步骤的依赖计数
+        返回因此变为可执行的步骤
+        """
+        if not self.pending_counts:
+            self.reset_pending_counts()
+        
+        newly_ready = []
+        for dependent_id in self.dependency_graph.get(step_id, []):
+            if dependent_id not in self.pending_counts:
+                continue
+            self.pending_counts[dependent_id] -= 1
+            if self.pending_counts[dependent_id] == 0:
+                newly_ready.append(dependent_id)
         
-        return ready_steps
+        return self.sort_by_priority(newly_ready)
     
     def get_step_dependencies(self, step_id: int) -> List[int]:
         """获取步骤的直接依赖"""
@@ -9,7 +9,10 @@ from datetime import datetime
 from django.utils import timezone
 from asgiref.sync import sync_to_async
 
+from common.execution_logger import ExecutionLogger
+from realtime.execution_events import publish_execution_status
 from ..models import AtomicStep, PipelineExecution, CICDTool
+from ..status_summary import record_execution_status
 from .execution_context import ExecutionContext
 from .dependency_resolver import DependencyResolver, StepNode
 from .step_executor import StepExecutor
@@ -389,15 +392,17 @@ class PipelineExecutor:
                 context.status = status
                 context.completed_at = timezone.now()
         
-        if error_message:
-            pipeline_execution.logs = (pipeline_execution.logs or '') + f"\n{error_message}"
-        
         # 保存执行上下文
         if context:
             pipeline_execution.metadata = pipeline_execution.metadata or {}
             pipeline_execution.metadata['execution_context'] = context.to_dict()
         
         await sync_to_async(pipeline_execution.save)()
+        await sync_to_async(record_execution_status)(pipeline_execution)
+        await sync_to_async(publish_execution_status)(pipeline_execution, error_message=error_message)
+        
+        if error_message:
+            await sync_to_async(ExecutionLogger.update_execution_logs)(pipeline_execution, error_message, append=True)
     
     async def cancel_pipeline(self, execution_id: int) -> bool:
         """取消流水线执行"""
@@ -0,0 +1,201 @@
+"""
+步骤结果缓存
+基于内容寻址的步骤结果缓存：缓存键由步骤配置、解析后的变量、输入制品和上游步骤输出计算，
+结果存放在 Django 缓存后端（默认 Redis 的 pipeline 库，也可配置为文件缓存），跨执行复用
+"""
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_CONFIG = {
+    'ENABLED': False,
+    'CACHE_ALIAS': 'pipeline',
+    'TTL': 7 * 24 * 3600,  # 缓存条目存活时间（秒），命中时续期
+    # 命中时只返回记录的结果，不会重建工作区中的文件，build 等产出制品的步骤需在步骤配置中显式 cache: true
+    'CACHEABLE_STEP_TYPES': ['test', 'security_scan'],
+}
+
+# 每次执行都会变化、不影响步骤结果的环境变量
+VOLATILE_ENV_KEYS = {
+    'EXECUTION_ID', 'BUILD_NUMBER', 'BUILD_URL', 'CI_PIPELINE_ID',
+    'STEP_ID', 'PWD', 'OLDPWD',
+}
+
+CACHE_KEY_PREFIX = 'step_result'
+
+
+class StepResultCache:
+    """步骤结果缓存"""
+
+    def __init__(self, cache_alias: str = 'pipeline', ttl: int = 7 * 24 * 3600,
+                 cacheable_step_types: Optional[Iterable[str]] = None, enabled: bool = True):
+        self.cache_alias = cache_alias
+        self.ttl = ttl
+        self.cacheable_step_types = set(cacheable_step_types or [])
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.cache_alias]
+
+    def is_cacheable(self, step_type: str, step_config: Optional[Dict[str, Any]] = None) -> bool:
+        """判断步骤是否可缓存：步骤配置中的 cache 字段优先，其次按步骤类型"""
+        if not self.enabled:
+            return False
+
+        explicit = (step_config or {}).get('cache')
+        if explicit is not None:
+            return bool(explicit)
+
+        return step_type in self.cacheable_step_types
+
+    def build_key(
+        self,
+        step_type: str,
+        step_config: Dict[str, Any],
+        variables: Optional[Dict[str, Any]] = None,
+        input_fingerprints: Optional[Dict[str, str]] = None,
+        upstream_outputs: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """计算内容寻址的缓存键"""
+        payload = {
+            'step_type': step_type,
+            'config': step_config or {},
+            'variables': {
+                key: value for key, value in (variables or {}).items()
+                if key not in VOLATILE_ENV_KEYS
+            },
+            'inputs': input_fingerprints or {},
+            'upstream': upstream_outputs or {},
+        }
+        canonical = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存结果，命中时续期"""
+        try:
+            cache_key = f"{CACHE_KEY_PREFIX}:{key}"
+            entry = self.backend.get(cache_key)
+            if entry is not None:
+                self.backend.touch(cache_key, self.ttl)
+        except Exception as e:
+            logger.warning(f"读取步骤缓存失败: {e}")
+            entry = None
+
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return entry
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """写入步骤结果"""
+        try:
+            self.backend.set(f"{CACHE_KEY_PREFIX}:{key}", result, self.ttl)
+        except Exception as e:
+            logger.warning(f"写入步骤缓存失败: {e}")
+
+    def invalidate(self, key: str) -> None:
+        """使单个缓存条目失效"""
+        try:
+            self.backend.delete(f"{CACHE_KEY_PREFIX}:{key}")
+        except Exception as e:
+            logger.warning(f"删除步骤缓存失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+            }
+
+
+def fingerprint_workspace(path: str) -> Optional[str]:
+    """
+    计算工作目录源码指纹（git HEAD + 未提交变更）
+    非 git 仓库返回 None
+    """
+    try:
+        head = subprocess.run(
+            ['git', '-C', path, 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, timeout=10
+        )
+        if head.returncode != 0:
+            return None
+
+        status = subprocess.run(
+            ['git', '-C', path, 'status', '--porcelain'],
+            capture_output=True, text=True, timeout=30
+        )
+        digest = hashlib.sha256(status.stdout.encode('utf-8')).hexdigest()
+        return f"{head.stdout.strip()}:{digest}"
+    except Exception as e:
+        logger.debug(f"计算工作目录指纹失败: {path} - {e}")
+        return None
+
+
+def fingerprint_files(base_dir: str, paths: List[str]) -> Dict[str, str]:
+    """计算声明的输入文件内容指纹，目录按其中所有文件计算"""
+    fingerprints = {}
+
+    for rel_path in paths:
+        full_path = os.path.join(base_dir, rel_path)
+        if os.path.isdir(full_path):
+            digest = hashlib.sha256()
+            for root, dirs, files in os.walk(full_path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    digest.update(os.path.relpath(file_path, full_path).encode('utf-8'))
+                    digest.update(_hash_file(file_path).encode('utf-8'))
+            fingerprints[rel_path] = digest.hexdigest()
+        elif os.path.isfile(full_path):
+            fingerprints[rel_path] = _hash_file(full_path)
+        else:
+            fingerprints[rel_path] = 'missing'
+
+    return fingerprints
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_step_result_cache: Optional[StepResultCache] = None
+
+
+def get_step_result_cache() -> StepResultCache:
+    """获取进程级步骤结果缓存，配置来自 settings.STEP_RESULT_CACHE"""
+    global _step_result_cache
+
+    if _step_result_cache is None:
+        config = {**DEFAULT_CACHE_CONFIG, **getattr(settings, 'STEP_RESULT_CACHE', {})}
+        _step_result_cache = StepResultCache(
+            cache_alias=config['CACHE_ALIAS'],
+            ttl=config['TTL'],
+            cacheable_step_types=config['CACHEABLE_STEP_TYPES'],
+            enabled=config['ENABLED']
+        )
+
+    return _step_result_cache
@@ -0,0 +1,228 @@
+"""
+步骤工作线程池
+进程级共享的步骤执行线程池，限制全局与单条流水线的并发数，
+按流水线轮转调度（公平共享），避免多条流水线同时运行时线程数失控
+"""
+import logging
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from django.conf import settings
+
+# 可选依赖
+try:
+    from prometheus_client import Gauge, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_CONFIG = {
+    'MAX_WORKERS': 32,          # 全局最大工作线程数
+    'PER_PIPELINE_LIMIT': 10,   # 单条流水线最大并发步骤数
+    'IDLE_TIMEOUT': 60,         # 空闲线程回收时间（秒）
+}
+
+if PROMETHEUS_AVAILABLE:
+    step_pool_queue_depth = Gauge(
+        'ansflow_step_pool_queue_depth',
+        'Number of steps waiting for a worker in the shared step pool'
+    )
+    step_pool_active_workers = Gauge(
+        'ansflow_step_pool_active_workers',
+        'Number of steps currently running in the shared step pool'
+    )
+    step_pool_wait_seconds = Histogram(
+        'ansflow_step_pool_wait_seconds',
+        'Time steps spend queued before a worker picks them up',
+        buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+    )
+
+
+class _PoolTask:
+    """线程池中的排队任务"""
+    __slots__ = ('future', 'fn', 'args', 'kwargs', 'pipeline_key', 'enqueued_at')
+
+    def __init__(self, future: Future, fn: Callable, args: Tuple, kwargs: Dict[str, Any], pipeline_key: Any):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.pipeline_key = pipeline_key
+        self.enqueued_at = time.monotonic()
+
+
+class StepWorkerPool:
+    """
+    共享步骤线程池
+
+    - 全局最多 max_workers 个步骤同时运行
+    - 同一流水线最多 per_pipeline_limit 个步骤同时运行
+    - 各流水线的排队任务按轮转顺序出队，长流水线不会饿死短流水线
+    """
+
+    def __init__(self, max_workers: int = 32, per_pipeline_limit: int = 10, idle_timeout: float = 60):
+        self.max_workers = max(1, int(max_workers))
+        self.per_pipeline_limit = max(1, int(per_pipeline_limit))
+        self.idle_timeout = idle_timeout
+
+        self._condition = threading.Condition()
+        # pipeline_key -> 排队任务；OrderedDict 的顺序即轮转顺序
+        self._queues: 'OrderedDict[Any, Deque[_PoolTask]]' = OrderedDict()
+        self._running: Dict[Any, int] = {}
+        self._workers = 0
+        self._idle_workers = 0
+        self._queued = 0
+        self._active = 0
+        self._total_wait = 0.0
+        self._dispatched = 0
+
+    def submit(self, pipeline_key: Any, fn: Callable, *args, **kwargs) -> Future:
+        """提交步骤任务，返回 Future"""
+        future = Future()
+        task = _PoolTask(future, fn, args, kwargs, pipeline_key)
+
+        with self._condition:
+            self._queues.setdefault(pipeline_key, deque()).append(task)
+            self._queued += 1
+            self._update_gauges()
+
+            # 空闲线程不足以消化排队任务时才扩容
+            if self._queued > self._idle_workers and self._workers < self.max_workers:
+                self._spawn_worker()
+            self._condition.notify()
+
+        return future
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取线程池状态"""
+        with self._condition:
+            return {
+                'max_workers': self.max_workers,
+                'per_pipeline_limit': self.per_pipeline_limit,
+                'workers': self._workers,
+                'idle_workers': self._idle_workers,
+                'active_steps': self._active,
+                'queue_depth': self._queued,
+                'queued_pipelines': len(self._queues),
+                'average_wait_seconds': (self._total_wait / self._dispatched) if self._dispatched else 0.0,
+            }
+
+    def _spawn_worker(self):
+        """创建新的工作线程（需持有锁）"""
+        self._workers += 1
+        thread = threading.Thread(
+            target=self._worker_loop,
+            name=f"StepPool-{self._workers}",
+            daemon=True
+        )
+        thread.start()
+
+    def _next_task(self) -> Optional[_PoolTask]:
+        """按轮转顺序取出下一个可执行的任务（需持有锁）"""
+        for pipeline_key in list(self._queues.keys()):
+            if self._running.get(pipeline_key, 0) >= self.per_pipeline_limit:
+                continue
+
+            queue = self._queues[pipeline_key]
+            task = queue.popleft()
+            if queue:
+                # 移到末尾，让其他流水线先获得下一个工作线程
+                self._queues.move_to_end(pipeline_key)
+            else:
+                del self._queues[pipeline_key]
+
+            self._queued -= 1
+            return task
+
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                task = self._next_task()
+                while task is None:
+                    self._idle_workers += 1
+                    notified = self._condition.wait(timeout=self.idle_timeout)
+                    self._idle_workers -= 1
+                    task = self._next_task()
+                    if task is None and not notified:
+                        # 空闲超时，回收线程
+                        self._workers -= 1
+                        return
+
+                self._running[task.pipeline_key] = self._running.get(task.pipeline_key, 0) + 1
+                self._active += 1
+                wait_seconds = time.monotonic() - task.enqueued_at
+                self._total_wait += wait_seconds
+                self._dispatched += 1
+                self._update_gauges()
+
+            if PROMETHEUS_AVAILABLE:
+                step_pool_wait_seconds.observe(wait_seconds)
+
+            self._run_task(task)
+
+            with self._condition:
+                remaining = self._running.get(task.pipeline_key, 1) - 1
+                if remaining > 0:
+                    self._running[task.pipeline_key] = remaining
+                else:
+                    self._running.pop(task.pipeline_key, None)
+                self._active -= 1
+                self._update_gauges()
+                # 该流水线可能有因并发限制而等待的任务
+                if self._queues:
+                    self._condition.notify()
+
+    def _run_task(self, task: _PoolTask):
+        if not task.future.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = task.fn(*task.args, **task.kwargs)
+        except BaseException as e:
+            task.future.set_exception(e)
+        else:
+            task.future.set_result(result)
+        finally:
+            # 工作线程长期存活，释放当前线程持有的数据库连接
+            try:
+                from django.db import close_old_connections
+                close_old_connections()
+            except Exception:
+                pass
+
+    def _update_gauges(self):
+        if PROMETHEUS_AVAILABLE:
+            step_pool_queue_depth.set(self._queued)
+            step_pool_active_workers.set(self._active)
+
+
+_step_pool: Optional[StepWorkerPool] = None
+_step_pool_lock = threading.Lock()
+
+
+def get_step_pool() -> StepWorkerPool:
+    """获取进程级共享的步骤线程池，配置来自 settings.STEP_WORKER_POOL"""
+    global _step_pool
+
+    if _step_pool is None:
+        with _step_pool_lock:
+            if _step_pool is None:
+                config = {**DEFAULT_POOL_CONFIG, **getattr(settings, 'STEP_WORKER_POOL', {})}
+                _step_pool = StepWorkerPool(
+                    max_workers=config['MAX_WORKERS'],
+                    per_pipeline_limit=config['PER_PIPELINE_LIMIT'],
+                    idle_timeout=config['IDLE_TIMEOUT']
+                )
+                logger.info(
+                    f"初始化共享步骤线程池: max_workers={_step_pool.max_workers}, "
+                    f"per_pipeline_limit={_step_pool.per_pipeline_limit}"
+                )
+
+    return _step_pool
@@ -2,9 +2,10 @@
 同步流水线执行器
 专为Celery任务设计的同步版本，避免异步调用问题
 """
-import time
 import logging
 import threading
+from collections import deque
+from concurrent.futures import Future
 from typing import Dict, Any, List, Set, Optional
 from datetime import datetime
 from django.utils import timezone
@@ -14,6 +15,9 @@ from ..models import AtomicStep, PipelineExecution, StepExecution
 from .execution_context import ExecutionContext
 from .dependency_resolver import DependencyResolver, StepNode
 from .sync_step_executor import SyncStepExecutor
+from .step_worker_pool import get_step_pool
+from realtime.execution_events import publish_execution_status
+from ..status_summary import record_execution_status
 
 # WebSocket通知支持
 try:
@@ -36,7 +40,6 @@ class SyncPipelineExecutor:
     def __init__(self):
         self.max_parallel_steps = 3  # 降低并行数以便调试
         self.step_timeout = 1800  # 单步超时时间（秒）
-        self.check_interval = 2  # 状态检查间隔
         self.notifier = None  # WebSocket通知器
     
     def execute_pipeline(
@@ -287,64 +290,80 @@ class SyncPipelineExecutor:
         context: ExecutionContext,
         tool_config: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """执行流水线步骤（同步版本）"""
+        """
+        执行流水线步骤（同步版本）
+        
+        事件驱动调度：步骤线程结束时通过条件变量唤醒调度循环，
+        调度循环根据依赖计数立即派发新就绪的下游步骤，无需轮询等待。
+        步骤提交到进程级共享线程池执行，受全局与单流水线并发限制。
+        """
         start_time = timezone.now()
         completed_steps: Set[int] = set()
-        running_steps: Dict[int, threading.Thread] = {}
+        running_steps: Dict[int, Future] = {}
         failed_steps: Set[int] = set()
+        step_pool = get_step_pool()
+        
+        # 步骤完成事件队列，由步骤线程写入，调度循环消费
+        finished_condition = threading.Condition()
+        finished_queue: deque = deque()
         
         # 统计信息
         total_steps = len(resolver.steps)
         successful_steps = 0
         
         try:
-            while len(completed_steps) < total_steps:
-                # 清理已完成的线程
-                self._cleanup_completed_threads(running_steps, completed_steps, failed_steps, context)
-                
-                # 获取可以执行的步骤
-                ready_steps = resolver.get_ready_steps(completed_steps, set(running_steps.keys()))
+            ready_steps = resolver.reset_pending_counts()
+            
+            while True:
+                # 启动新的步骤执行（控制并发数）
+                while ready_steps and len(running_steps) < self.max_parallel_steps:
+                    step_id = ready_steps.pop(0)
+                    
+                    # 提交到共享步骤线程池
+                    running_steps[step_id] = step_pool.submit(
+                        context.execution_id,
+                        self._run_step_and_notify,
+                        step_id, resolver, context, tool_config,
+                        finished_condition, finished_queue
+                    )
+                    logger.info(f"提交步骤到共享线程池: {step_id}")
                 
-                if not ready_steps and not running_steps:
+                if not running_steps:
                     # 没有可执行的步骤，且没有正在运行的步骤
                     remaining_steps = total_steps - len(completed_steps)
                     if remaining_steps > 0:
                         logger.warning(f"检测到无法执行的步骤，可能存在依赖问题。剩余步骤: {remaining_steps}")
                     break
                 
-                # 启动新的步骤执行（控制并发数）
-                while (ready_steps and len(running_steps) < self.max_parallel_steps):
-                    step_id = ready_steps.pop(0)
-                    
-                    # 创建并启动线程
-                    thread = threading.Thread(
-                        target=self._execute_single_step_thread,
-                        args=(step_id, resolver, context, tool_config),
-                        name=f"Step-{step_id}"
-                    )
-                    thread.daemon = True
-                    thread.start()
-                    
-                    running_steps[step_id] = thread
-                    logger.info(f"启动步骤执行线程: {step_id}")
+                # 等待任一步骤完成
+                with finished_condition:
+                    while not finished_queue:
+                        finished_condition.wait()
+                    finished_batch = list(finished_queue)
+                    finished_queue.clear()
                 
-                # 等待检查间隔
-                if running_steps:
-                    time.sleep(self.check_interval)
+                # 处理已完成的步骤，派发新就绪的下游步骤
+                newly_ready = self._collect_finished_steps(
+                    finished_batch, resolver, running_steps,
+                    completed_steps, failed_steps, context
+                )
+                ready_steps = resolver.sort_by_priority(ready_steps + newly_ready)
                 
                 # 检查是否有失败的关键步骤需要停止流水线
                 if self._should_stop_pipeline(resolver, failed_steps, context):
                     logger.warning("检测到关键步骤失败，停止流水线执行")
+                    # 取消仍在共享线程池中排队的步骤
+                    for step_id, future in list(running_steps.items()):
+                        if future.cancel():
+                            running_steps.pop(step_id)
                     # 等待当前运行的步骤完成
                     self._wait_for_running_steps(running_steps)
+                    self._collect_finished_steps(
+                        list(running_steps.keys()), resolver, running_steps,
+                        completed_steps, failed_steps, context
+                    )
                     break
             
-            # 等待所有运行中的步骤完成
-            self._wait_for_running_steps(running_steps)
-            
-            # 最终清理
-            self._cleanup_completed_threads(running_steps, completed_steps, failed_steps, context)
-            
             # 计算成功步骤数
             successful_steps = sum(
                 1 for step_name, result in context.step_results.items()
@@ -378,49 +397,66 @@ class SyncPipelineExecutor:
                 'execution_time': execution_time
             }
     
-    def _cleanup_completed_threads(
+    def _run_step_and_notify(
         self,
-        running_steps: Dict[int, threading.Thread],
+        step_id: int,
+        resolver: DependencyResolver,
+        context: ExecutionContext,
+        tool_config: Dict[str, Any],
+        finished_condition: threading.Condition,
+        finished_queue: deque
+    ) -> None:
+        """执行步骤，结束后（无论成败）通知调度循环"""
+        try:
+            self._execute_single_step_thread(step_id, resolver, context, tool_config)
+        finally:
+            with finished_condition:
+                finished_queue.append(step_id)
+                finished_condition.notify()
+    
+    def _collect_finished_steps(
+        self,
+        finished_step_ids: List[int],
+        resolver: DependencyResolver,
+        running_steps: Dict[int, Future],
         completed_steps: Set[int],
         failed_steps: Set[int],
         context: ExecutionContext
-    ):
-        """清理已完成的线程"""
-        completed_threads = []
+    ) -> List[int]:
+        """处理已结束的步骤，返回因此变为可执行的步骤"""
+        newly_ready = []
         
-        for step_id, thread in running_steps.items():
-            if not thread.is_alive():
-                completed_threads.append(step_id)
-                
-                # 检查步骤执行结果
-                step_result = context.step_results.get(f"step_{step_id}")
-                if step_result:
-                    if step_result.get('status') == 'success':
-                        completed_steps.add(step_id)
-                        # 如果步骤之前失败过但现在成功了，从失败集合中移除
-                        if step_id in failed_steps:
-                            failed_steps.remove(step_id)
-                            logger.info(f"步骤 {step_id} 重新执行成功，从失败列表中移除")
-                        logger.info(f"步骤 {step_id} 执行成功")
-                    else:
-                        failed_steps.add(step_id)
-                        logger.error(f"步骤 {step_id} 执行失败")
+        for step_id in finished_step_ids:
+            running_steps.pop(step_id, None)
+            
+            # 检查步骤执行结果
+            step_result = context.step_results.get(f"step_{step_id}")
+            if step_result:
+                if step_result.get('status') == 'success':
+                    completed_steps.add(step_id)
+                    # 如果步骤之前失败过但现在成功了，从失败集合中移除
+                    if step_id in failed_steps:
+                        failed_steps.remove(step_id)
+                        logger.info(f"步骤 {step_id} 重新执行成功，从失败列表中移除")
+                    logger.info(f"步骤 {step_id} 执行成功")
+                    newly_ready.extend(resolver.mark_step_completed(step_id))
                 else:
-                    # 没有结果记录，可能是异常退出
                     failed_steps.add(step_id)
-                    logger.error(f"步骤 {step_id} 没有执行结果，可能异常退出")
+                    logger.error(f"步骤 {step_id} 执行失败")
+            else:
+                # 没有结果记录，可能是异常退出
+                failed_steps.add(step_id)
+                logger.error(f"步骤 {step_id} 没有执行结果，可能异常退出")
         
-        # 移除已完成的线程
-        for step_id in completed_threads:
-            del running_steps[step_id]
+        return newly_ready
     
-    def _wait_for_running_steps(self, running_steps: Dict[int, threading.Thread]):
+    def _wait_for_running_steps(self, running_steps: Dict[int, Future]):
         """等待所有运行中的步骤完成"""
-        for step_id, thread in running_steps.items():
+        for step_id, future in running_steps.items():
             try:
-                thread.join(timeout=self.step_timeout)
-                if thread.is_alive():
-                    logger.warning(f"步骤 {step_id} 执行超时")
+                future.result(timeout=self.step_timeout)
+            except TimeoutError:
+                logger.warning(f"步骤 {step_id} 执行超时")
             except Exception as e:
                 logger.error(f"等待步骤 {step_id} 完成时出错: {str(e)}")
     
@@ -485,7 +521,10 @@ class SyncPipelineExecutor:
             step_executor = SyncStepExecutor(context)
             
             # 执行步骤
-            result = step_executor.execute_step(step_obj, tool_config)
+            result = step_executor.execute_step(
+                step_obj, tool_config,
+                dependency_keys=[f"step_{dep_id}" for dep_id in step_node.dependencies]
+            )
             
             # 保存结果
             context.step_results[step_key] = result
@@ -585,6 +624,9 @@ class SyncPipelineExecutor:
                 pipeline_execution.save()
                 
                 logger.info(f"更新流水线状态: {pipeline_execution.id} -> {status}")
+            
+            record_execution_status(pipeline_execution)
+            publish_execution_status(pipeline_execution, error_message=error_message)
                 
         except Exception as e:
             logger.error(f"更新流水线状态失败: {str(e)}")
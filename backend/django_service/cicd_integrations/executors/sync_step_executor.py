@@ -6,15 +6,21 @@ import logging
 import subprocess
 import json
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from django.utils import timezone
 from django.db import transaction
 
 from ..models import AtomicStep, StepExecution
+from ..log_store import execution_log_store
 from .execution_context import ExecutionContext
+from .step_cache import get_step_result_cache, fingerprint_files, fingerprint_workspace
+from common.streaming_process import run_streaming, LineBatcher
+from realtime.execution_events import publish_log_lines, publish_step_status
 
 logger = logging.getLogger(__name__)
+# 命令输出日志，沿用 ansflow 日志管道的处理器（文件 / Redis Stream）
+output_logger = logging.getLogger('ansflow.step_output')
 
 class SyncStepExecutor:
     """同步步骤执行器"""
@@ -22,11 +28,15 @@ class SyncStepExecutor:
     def __init__(self, context: ExecutionContext):
         self.context = context
         self.default_timeout = 1800  # 30分钟默认超时
+        self.current_step_name = None
+        self.current_step_execution_id = None
+        self._notifier = None
     
     def execute_step(
         self,
         step_obj,  # 可以是AtomicStep或PipelineStep
-        tool_config: Dict[str, Any]
+        tool_config: Dict[str, Any],
+        dependency_keys: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """
         执行步骤（同步版本）
@@ -34,16 +44,19 @@ class SyncStepExecutor:
         Args:
             step_obj: 步骤对象（AtomicStep或PipelineStep）
             tool_config: CI/CD工具配置
+            dependency_keys: 声明的上游步骤在 context.step_results 中的键，参与缓存键计算
         
         Returns:
             执行结果
         """
         start_time = timezone.now()
         step_execution = None
+        self.current_step_name = self._get_step_name(step_obj)
         
         try:
             # 创建步骤执行记录
             step_execution = self._create_step_execution(step_obj)
+            self.current_step_execution_id = step_execution.id
             
             # 更新步骤状态为运行中
             self._update_step_status(step_execution, 'running')
@@ -53,8 +66,23 @@ class SyncStepExecutor:
             # 准备执行环境
             execution_env = self._prepare_execution_environment(step_obj, tool_config)
             
-            # 根据步骤类型执行
-            result = self._execute_by_type(step_obj, execution_env, tool_config)
+            # 检查步骤结果缓存
+            step_cache = get_step_result_cache()
+            cache_key = self._get_step_cache_key(step_obj, dependency_keys or [])
+            cached_result = step_cache.get(cache_key) if cache_key else None
+            
+            if cached_result is not None:
+                logger.info(f"步骤命中结果缓存，跳过执行: {self._get_step_name(step_obj)} ({cache_key[:12]})")
+                result = dict(cached_result)
+            else:
+                # 根据步骤类型执行
+                result = self._execute_by_type(step_obj, execution_env, tool_config)
+                
+                if cache_key and result.get('success', False):
+                    step_cache.set(cache_key, result)
+            
+            if cache_key:
+                result['cache'] = {'hit': cached_result is not None, 'key': cache_key}
             
             # 更新步骤状态
             final_status = 'success' if result.get('success', False) else 'failed'
@@ -69,7 +97,8 @@ class SyncStepExecutor:
                 'output': result.get('output', ''),
                 'error_message': result.get('error_message'),
                 'artifacts': result.get('artifacts', []),
-                'metadata': result.get('metadata', {})
+                'metadata': result.get('metadata', {}),
+                'cache': result.get('cache')
             }
             
             logger.info(f"原子步骤执行完成: {self._get_step_name(step_obj)} - {final_status}")
@@ -94,6 +123,61 @@ class SyncStepExecutor:
                 'metadata': {}
             }
     
+    def _get_step_cache_key(self, step_obj, dependency_keys: List[str]) -> Optional[str]:
+        """
+        计算步骤结果缓存键
+        输入包括步骤配置、解析后的变量、工作目录源码指纹、声明的输入文件（cache_inputs）
+        以及声明的上游步骤输出（不含无关步骤，键不随其他步骤的完成情况变化）；
+        无法确定输入时返回None，不使用缓存
+        """
+        step_cache = get_step_result_cache()
+        step_type = self._get_step_type(step_obj)
+        step_config = self._get_step_config(step_obj) or {}
+        
+        if not step_cache.is_cacheable(step_type, step_config):
+            return None
+        
+        try:
+            workspace_path = self.context.get_workspace_path()
+            input_fingerprints = fingerprint_files(workspace_path, step_config.get('cache_inputs', []))
+            source_fingerprint = fingerprint_workspace(self.context.get_current_directory())
+            if source_fingerprint:
+                input_fingerprints['__source__'] = source_fingerprint
+            
+            if not input_fingerprints:
+                logger.debug(f"步骤 {self._get_step_name(step_obj)} 无法确定输入，不使用缓存")
+                return None
+            
+            # 上游步骤输出：优先使用其缓存键，工作目录路径替换为占位符以便跨执行比较
+            upstream_outputs = {}
+            for step_key in sorted(set(dependency_keys)):
+                step_result = self.context.step_results.get(step_key)
+                if step_result is None:
+                    logger.debug(f"步骤 {self._get_step_name(step_obj)} 的上游 {step_key} 无结果，不使用缓存")
+                    return None
+                upstream_cache = step_result.get('cache') or {}
+                upstream_outputs[step_key] = {
+                    'status': step_result.get('status'),
+                    'cache_key': upstream_cache.get('key'),
+                    'output': None if upstream_cache.get('key') else
+                        str(step_result.get('output', '')).replace(workspace_path, '<workspace>'),
+                    'artifacts': step_result.get('artifacts', []),
+                }
+            
+            variables = dict(self.context.environment)
+            variables.update(self.context.parameters)
+            
+            return step_cache.build_key(
+                step_type,
+                step_config,
+                variables=variables,
+                input_fingerprints=input_fingerprints,
+                upstream_outputs=upstream_outputs
+            )
+        except Exception as e:
+            logger.warning(f"计算步骤缓存键失败: {self._get_step_name(step_obj)} - {e}")
+            return None
+    
     def _create_step_execution(self, step) -> StepExecution:
         """创建步骤执行记录"""
         try:
@@ -178,6 +262,8 @@ class SyncStepExecutor:
                     step_execution.error_message = result.get('error_message', '') or ''
                 
                 step_execution.save()
+            
+            publish_step_status(step_execution, step_name=self.current_step_name)
                 
         except Exception as e:
             logger.error(f"更新步骤状态失败: {str(e)}")
@@ -710,14 +796,18 @@ class SyncStepExecutor:
             
             logger.info(f"从工作空间根目录 {workspace_root} 执行命令: {command}")
             
-            process = subprocess.run(
-                full_command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                env=execution_env,
-                timeout=timeout
-            )
+            on_output, batcher = self._create_output_streamer()
+            try:
+                process = run_streaming(
+                    full_command,
+                    shell=True,
+                    text=True,
+                    env=execution_env,
+                    timeout=timeout,
+                    on_output=on_output
+                )
+            finally:
+                batcher.close()
             
             # 检测目录变化并更新共享状态
             if process.returncode == 0:
@@ -814,14 +904,19 @@ class SyncStepExecutor:
             # 使用 cd && 确保在正确的目录中执行命令
             full_command = f"cd '{current_dir}' && {full_command}"
             
-            process = subprocess.run(
-                full_command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                env=execution_env,
-                timeout=timeout
-            )
+            # 流式执行，输出实时推送到日志管道和WebSocket
+            on_output, batcher = self._create_output_streamer()
+            try:
+                process = run_streaming(
+                    full_command,
+                    shell=True,
+                    text=True,
+                    env=execution_env,
+                    timeout=timeout,
+                    on_output=on_output
+                )
+            finally:
+                batcher.close()
             
             # 检测目录变化
             if update_working_dir and process.returncode == 0:
@@ -871,6 +966,47 @@ class SyncStepExecutor:
                 'working_directory': self.context.get_current_directory()
             }
     
+    def _get_notifier(self):
+        """获取WebSocket通知器（realtime应用不可用时返回None）"""
+        if self._notifier is None:
+            try:
+                from realtime.notifications import WebSocketNotifier
+                self._notifier = WebSocketNotifier(self.context.execution_id)
+            except Exception as e:
+                logger.debug(f"WebSocket通知不可用: {e}")
+                self._notifier = False
+        return self._notifier or None
+    
+    def _create_output_streamer(self):
+        """
+        创建命令输出回调
+        每行写入日志管道，按批追加到步骤日志分片并推送到WebSocket，返回 (on_output, batcher)；用完后调用 batcher.close()
+        """
+        step_name = self.current_step_name
+        step_execution_id = self.current_step_execution_id
+        execution_id = self.context.execution_id
+        notifier = self._get_notifier()
+        
+        def flush(lines):
+            message = '\n'.join(lines)
+            if step_execution_id:
+                execution_log_store.append(execution_id, message, step_execution_id=step_execution_id)
+            publish_log_lines(execution_id, message, step_name=step_name)
+            if notifier:
+                notifier.send_log_update(message, step_name=step_name)
+        
+        batcher = LineBatcher(flush)
+        
+        def on_output(stream_name, line):
+            output_logger.info(line, extra={
+                'execution_id': execution_id,
+                'step_name': step_name,
+                'stream': stream_name
+            })
+            batcher.add(line)
+        
+        return on_output, batcher
+    
     def _detect_and_handle_git_clone_directory(self, git_command: str, workspace_path: str) -> None:
         """
         检测Git clone命令创建的目录并自动切换到该目录
@@ -1135,17 +1271,22 @@ class SyncStepExecutor:
                 if not docker_executor.can_execute(step_type):
                     raise ValueError(f"Docker 执行器不支持步骤类型: {step_type}")
                 
-                # 准备上下文，包含当前工作目录信息
+                # 准备上下文，包含当前工作目录信息和输出回调
+                on_output, output_batcher = self._create_output_streamer()
                 docker_context = {
                     'working_directory': self.context.get_current_directory(),
                     'workspace_path': self.context.get_workspace_path(),
-                    'execution_env': execution_env
+                    'execution_env': execution_env,
+                    'output_callback': on_output
                 }
                 
                 logger.info(f"[DEBUG] 传递给Docker执行器的工作目录: {docker_context['working_directory']}")
                 
                 # 执行 Docker 步骤
-                result = docker_executor.execute_step(step_obj, docker_context)
+                try:
+                    result = docker_executor.execute_step(step_obj, docker_context)
+                finally:
+                    output_batcher.close()
                 
                 return {
                     'success': result.get('success', False),
@@ -0,0 +1,107 @@
+"""
+CI/CD 工具健康检查
+所有工具的检查在进程级共享事件循环中并发执行，每个工具单独限时，慢工具不会拖住其他工具；
+同一 CI 服务器的检查复用共享连接池，结果最后用 bulk_update 一次写回
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .adapters import AdapterFactory
+from .adapters.http_pool import run_async
+from .models import CICDTool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEALTH_CHECK_CONFIG = {
+    'TIMEOUT': 15,       # 单个工具的检查超时（秒）
+    'CONCURRENCY': 20,   # 同时进行的检查数
+}
+
+# (是否健康, 错误信息)；是否健康为 None 表示检查出错
+CheckOutcome = Tuple[Optional[bool], Optional[str]]
+
+
+def get_health_check_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_HEALTH_CHECK_CONFIG)
+    config.update(getattr(settings, 'CICD_HEALTH_CHECK', {}) or {})
+    return config
+
+
+async def _check_tool(tool: CICDTool, semaphore: asyncio.Semaphore, timeout: float) -> CheckOutcome:
+    async with semaphore:
+        try:
+            adapter = AdapterFactory.create_adapter(
+                tool.tool_type,
+                base_url=tool.base_url,
+                username=tool.username,
+                token=tool.token,
+                **tool.config
+            )
+            async with adapter:
+                is_healthy = await asyncio.wait_for(adapter.health_check(), timeout=timeout)
+            return bool(is_healthy), None
+        except asyncio.TimeoutError:
+            # 超时视为不可达，与适配器内部连接失败的处理一致
+            return False, f'健康检查超时（{timeout}秒）'
+        except Exception as e:
+            return None, str(e)
+
+
+async def _check_all(tools: List[CICDTool], config: Dict[str, Any]) -> List[CheckOutcome]:
+    semaphore = asyncio.Semaphore(config['CONCURRENCY'])
+    return await asyncio.gather(*(_check_tool(tool, semaphore, config['TIMEOUT']) for tool in tools))
+
+
+def check_tools(tools: List[CICDTool]) -> List[Dict[str, Any]]:
+    """并发检查一批工具并批量更新其健康状态，返回每个工具的检查结果"""
+    if not tools:
+        return []
+
+    config = get_health_check_config()
+    outcomes = run_async(_check_all(tools, config))
+
+    now = timezone.now()
+    results = []
+    for tool, (is_healthy, error) in zip(tools, outcomes):
+        tool.last_health_check = now
+        tool.updated_at = now
+        # 在 metadata 中存储健康状态
+        if not tool.metadata:
+            tool.metadata = {}
+
+        result = {
+            'tool_id': tool.id,
+            'tool_name': tool.name,
+            'tool_type': tool.tool_type,
+        }
+
+        if is_healthy is None:
+            tool.metadata['health_status'] = 'error'
+            tool.metadata['last_error'] = error
+            tool.status = 'error'
+            result.update({'status': 'error', 'error': error})
+            logger.error(f"Health check failed for tool {tool.name}: {error}")
+        else:
+            tool.metadata['health_status'] = 'healthy' if is_healthy else 'unhealthy'
+            tool.metadata['last_health_check_result'] = is_healthy
+            if error:
+                tool.metadata['last_error'] = error
+
+            # 根据健康检查结果更新 status
+            if is_healthy:
+                if tool.status not in ['active', 'authenticated']:
+                    tool.status = 'authenticated'
+            else:
+                if tool.status not in ['offline', 'error']:
+                    tool.status = 'needs_auth'
+            result['status'] = 'healthy' if is_healthy else 'unhealthy'
+            logger.info(f"Health check for tool {tool.name}: {result['status']}")
+
+        results.append(result)
+
+    CICDTool.objects.bulk_update(tools, ['last_health_check', 'metadata', 'status', 'updated_at'])
+    return results
@@ -0,0 +1,148 @@
+"""
+Jenkins 作业目录
+- 作业列表通过一次带 tree 过滤的 /api/json 请求获取，不再逐个作业请求详情
+- 同一 Jenkins 地址的请求共用进程内的 requests.Session（连接池 + keep-alive）
+- 作业目录按工具缓存在 Redis（与 FastAPI 服务共用的默认缓存库），短 TTL 兜底；
+  FastAPI 收到 Jenkins webhook 时按 Jenkins 地址删除缓存（键格式两侧一致）
+"""
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+JENKINS_CATALOG_KEY_PREFIX = 'ansflow:jenkins-catalog:'
+
+JOB_TREE = (
+    'jobs[_class,name,url,color,buildable,inQueue,description,'
+    'lastBuild[number,url,timestamp,result,duration],'
+    'healthReport[description,score,iconClassName,iconUrl]]'
+)
+
+DEFAULT_CATALOG_CONFIG = {
+    'TTL': 60,              # 目录缓存时间（秒），webhook 到达时提前失效
+    'POOL_MAXSIZE': 10,     # 每个 Jenkins 地址的最大连接数
+    'TIMEOUT': 30,          # 作业列表请求超时（秒）
+}
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_catalog_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_CATALOG_CONFIG)
+    config.update(getattr(settings, 'JENKINS_CATALOG', {}) or {})
+    return config
+
+
+def normalize_base_url(base_url: str) -> str:
+    return (base_url or '').rstrip('/').lower()
+
+
+def catalog_key(base_url: str) -> str:
+    digest = hashlib.sha1(normalize_base_url(base_url).encode()).hexdigest()[:16]
+    return f"{JENKINS_CATALOG_KEY_PREFIX}{digest}"
+
+
+def get_session(base_url: str) -> requests.Session:
+    """按 Jenkins 地址复用的 Session；认证信息随请求传入"""
+    key = normalize_base_url(base_url)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                pool_size = get_catalog_config()['POOL_MAXSIZE']
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[key] = session
+    return session
+
+
+def _get_redis_connection():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def _normalize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    last_build = job.get('lastBuild')
+    if isinstance(last_build, dict):
+        last_build = {
+            'number': last_build.get('number'),
+            'url': last_build.get('url'),
+            'timestamp': last_build.get('timestamp') or 0,
+            'result': last_build.get('result'),
+            'duration': last_build.get('duration') or 0
+        }
+    else:
+        last_build = None
+
+    return {
+        '_class': job.get('_class', ''),
+        'name': job.get('name', ''),
+        'url': job.get('url', ''),
+        'color': job.get('color') or 'grey',
+        'buildable': job.get('buildable', True),
+        'inQueue': job.get('inQueue', False),
+        'description': job.get('description') or '',
+        'lastBuild': last_build,
+        'healthReport': job.get('healthReport') or []
+    }
+
+
+def fetch_jobs(tool, auth=None) -> List[Dict[str, Any]]:
+    """一次请求获取全部作业及其最近构建；请求失败时抛出 requests 异常"""
+    response = get_session(tool.base_url).get(
+        f"{tool.base_url.rstrip('/')}/api/json",
+        params={'tree': JOB_TREE},
+        auth=auth,
+        timeout=get_catalog_config()['TIMEOUT'],
+        verify=False
+    )
+    response.raise_for_status()
+    return [_normalize_job(job) for job in response.json().get('jobs', [])]
+
+
+def get_jobs(tool, auth=None, refresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    读取工具的作业目录，缓存未命中或 refresh 时从 Jenkins 拉取
+
+    缓存读写失败只记录日志，直接访问 Jenkins
+    """
+    key = catalog_key(tool.base_url)
+    field = str(tool.id)
+
+    if not refresh:
+        try:
+            cached = _get_redis_connection().hget(key, field)
+            if cached:
+                return json.loads(cached)
+        except Exception as e:
+            logger.warning(f"读取Jenkins作业目录缓存失败: tool={tool.id} - {e}")
+
+    jobs = fetch_jobs(tool, auth)
+    try:
+        connection = _get_redis_connection()
+        pipe = connection.pipeline()
+        pipe.hset(key, field, json.dumps(jobs, ensure_ascii=False))
+        pipe.expire(key, get_catalog_config()['TTL'])
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"写入Jenkins作业目录缓存失败: tool={tool.id} - {e}")
+    return jobs
+
+
+def invalidate(base_url: str) -> None:
+    """删除某个 Jenkins 地址下所有工具的作业目录缓存"""
+    try:
+        _get_redis_connection().delete(catalog_key(base_url))
+    except Exception as e:
+        logger.warning(f"删除Jenkins作业目录缓存失败: {base_url} - {e}")
@@ -0,0 +1,176 @@
+"""
+执行日志分片存储
+只追加的日志存储：每次追加插入一个 ExecutionLogChunk，不再重写整段 logs 文本；
+读取按 (execution_id, stream_id, offset) 做范围读取，支持从任意偏移继续读取（tail）。
+新分片同时追加到 Redis 执行日志流，供实时跟踪
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+
+from realtime.execution_events import publish_log_chunk
+
+from .models import ExecutionLogChunk
+
+logger = logging.getLogger(__name__)
+
+# 流水线级日志使用的流ID
+PIPELINE_STREAM = 0
+
+
+class ExecutionLogStore:
+    """执行日志分片存储"""
+
+    # 进程内缓存的日志流写入位置数量上限
+    MAX_CACHED_POSITIONS = 2000
+    MAX_APPEND_RETRIES = 3
+
+    def __init__(self):
+        # (execution_id, stream_id) -> (next_seq, next_offset)
+        self._positions: 'OrderedDict[Tuple[int, int], Tuple[int, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, execution_id: int, content: str,
+               step_execution_id: Optional[int] = None,
+               initial_content: Optional[str] = None) -> Optional[ExecutionLogChunk]:
+        """
+        追加一段日志，返回新建的分片
+
+        Args:
+            initial_content: 日志流为空时写在首个分片前面的内容（用于接续 logs 字段中已有的日志）
+        """
+        if not content:
+            return None
+        if not content.endswith('\n'):
+            content += '\n'
+
+        stream_id = step_execution_id or PIPELINE_STREAM
+        key = (execution_id, stream_id)
+
+        for attempt in range(self.MAX_APPEND_RETRIES):
+            with self._lock:
+                position = self._positions.get(key)
+            if position is None or attempt > 0:
+                # 缓存缺失或并发写入冲突时从数据库重新加载写入位置
+                position = self._load_position(execution_id, stream_id)
+
+            seq, offset = position
+            if seq == 0 and initial_content:
+                content = initial_content.rstrip('\n') + '\n' + content
+                initial_content = None
+            try:
+                with transaction.atomic():
+                    chunk = ExecutionLogChunk.objects.create(
+                        pipeline_execution_id=execution_id,
+                        step_execution_id=step_execution_id,
+                        stream_id=stream_id,
+                        seq=seq,
+                        offset=offset,
+                        length=len(content),
+                        content=content
+                    )
+            except IntegrityError:
+                logger.debug(f"日志分片序号冲突，重试: execution={execution_id} stream={stream_id} seq={seq}")
+                continue
+
+            self._remember_position(key, (seq + 1, offset + len(content)))
+            # 提交后再追加到日志流，SSE 跟踪读到的分片一定已能从数据库读到
+            transaction.on_commit(lambda: publish_log_chunk(chunk))
+            return chunk
+
+        logger.error(f"追加日志分片失败: execution={execution_id} stream={stream_id}")
+        return None
+
+    def read(self, execution_id: int, step_execution_id: Optional[int] = None,
+             offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        从指定字符偏移读取日志
+
+        Returns:
+            {'content': str, 'offset': int, 'next_offset': int, 'has_more': bool}
+        """
+        stream_id = step_execution_id or PIPELINE_STREAM
+        offset = max(0, int(offset or 0))
+
+        chunks = ExecutionLogChunk.objects.filter(
+            pipeline_execution_id=execution_id,
+            stream_id=stream_id
+        ).order_by('seq')
+
+        # 跳过完全位于偏移之前的分片：从包含偏移的分片开始读
+        first = chunks.filter(offset__lte=offset).order_by('-seq').values_list('seq', flat=True).first()
+        if first is not None:
+            chunks = chunks.filter(seq__gte=first)
+
+        parts = []
+        size = 0
+        next_offset = offset
+        has_more = False
+
+        for chunk_offset, content in chunks.values_list('offset', 'content').iterator():
+            start = max(0, offset - chunk_offset)
+            if start >= len(content):
+                continue
+            piece = content[start:]
+
+            if limit is not None and size + len(piece) > limit:
+                piece = piece[:max(0, limit - size)]
+                has_more = True
+
+            parts.append(piece)
+            size += len(piece)
+            next_offset = chunk_offset + start + len(piece)
+
+            if has_more:
+                break
+
+        return {
+            'content': ''.join(parts),
+            'offset': offset,
+            'next_offset': next_offset,
+            'has_more': has_more,
+        }
+
+    def read_all(self, execution_id: int, step_execution_id: Optional[int] = None) -> str:
+        """读取整个日志流"""
+        return self.read(execution_id, step_execution_id)['content']
+
+    def tail(self, execution_id: int, step_execution_id: Optional[int] = None,
+             max_chars: int = 64 * 1024) -> Dict[str, Any]:
+        """读取日志流末尾 max_chars 个字符"""
+        size = self.get_size(execution_id, step_execution_id)
+        return self.read(execution_id, step_execution_id, offset=max(0, size - max_chars))
+
+    def get_size(self, execution_id: int, step_execution_id: Optional[int] = None) -> int:
+        """日志流当前总字符数"""
+        return self._load_position(execution_id, step_execution_id or PIPELINE_STREAM)[1]
+
+    def has_logs(self, execution_id: int, step_execution_id: Optional[int] = None) -> bool:
+        return ExecutionLogChunk.objects.filter(
+            pipeline_execution_id=execution_id,
+            stream_id=step_execution_id or PIPELINE_STREAM
+        ).exists()
+
+    def _load_position(self, execution_id: int, stream_id: int) -> Tuple[int, int]:
+        last = ExecutionLogChunk.objects.filter(
+            pipeline_execution_id=execution_id,
+            stream_id=stream_id
+        ).order_by('-seq').values('seq', 'offset', 'length').first()
+
+        if last is None:
+            return 0, 0
+        return last['seq'] + 1, last['offset'] + last['length']
+
+    def _remember_position(self, key: Tuple[int, int], position: Tuple[int, int]):
+        with self._lock:
+            self._positions[key] = position
+            self._positions.move_to_end(key)
+            while len(self._positions) > self.MAX_CACHED_POSITIONS:
+                self._positions.popitem(last=False)
+
+
+# 全局日志存储实例
+execution_log_store = ExecutionLogStore()
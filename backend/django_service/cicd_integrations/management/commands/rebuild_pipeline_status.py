@@ -0,0 +1,25 @@
+"""
+根据执行记录回填/重建流水线状态汇总（PipelineStatusSummary）
+"""
+from django.core.management.base import BaseCommand
+from pipelines.models import Pipeline
+from cicd_integrations.status_summary import rebuild_status_summary
+
+
+class Command(BaseCommand):
+    help = '根据执行记录重建流水线状态汇总'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pipeline', type=int, help='只重建指定流水线ID')
+
+    def handle(self, *args, **options):
+        pipelines = Pipeline.objects.select_related('project').order_by('id')
+        if options.get('pipeline'):
+            pipelines = pipelines.filter(id=options['pipeline'])
+
+        rebuilt = 0
+        for pipeline in pipelines.iterator():
+            if rebuild_status_summary(pipeline) is not None:
+                rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"已重建 {rebuilt} 条流水线状态汇总"))
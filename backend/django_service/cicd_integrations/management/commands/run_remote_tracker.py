@@ -0,0 +1,35 @@
+"""
+常驻运行远程执行跟踪器：阻塞读取 webhook 状态事件并立即更新执行，定期执行兜底轮询
+（未运行该命令时，由 Celery beat 的 reconcile_remote_executions 每 15 秒处理一次）
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from cicd_integrations.remote_tracker import (
+    consume_remote_events, get_tracker_config, reconcile_remote_executions
+)
+
+
+class Command(BaseCommand):
+    help = '运行远程执行跟踪器（webhook 事件 + 兜底轮询）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--block', type=int, default=5000, help='等待webhook事件的阻塞时间（毫秒）')
+
+    def handle(self, *args, **options):
+        interval = get_tracker_config()['MIN_INTERVAL']
+        next_sweep = 0.0
+        self.stdout.write(self.style.SUCCESS('远程执行跟踪器已启动'))
+
+        while True:
+            try:
+                consume_remote_events(block_ms=options['block'])
+                if time.monotonic() >= next_sweep:
+                    reconcile_remote_executions()
+                    next_sweep = time.monotonic() + interval
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                self.stderr.write(f"远程执行跟踪出错: {e}")
+                time.sleep(1)
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.23 on 2026-10-16 08:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cicd_integrations', '0012_alter_atomicstep_step_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionLogChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream_id', models.BigIntegerField(default=0, help_text='日志流ID，步骤执行ID或0')),
+                ('seq', models.PositiveIntegerField(help_text='分片序号')),
+                ('offset', models.BigIntegerField(help_text='分片在日志流中的起始字符偏移')),
+                ('length', models.PositiveIntegerField(help_text='分片字符数')),
+                ('content', models.TextField(help_text='分片内容')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pipeline_execution', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_chunks', to='cicd_integrations.pipelineexecution')),
+                ('step_execution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='log_chunks', to='cicd_integrations.stepexecution')),
+            ],
+            options={
+                'verbose_name': 'Execution Log Chunk',
+                'verbose_name_plural': 'Execution Log Chunks',
+                'ordering': ['pipeline_execution', 'stream_id', 'seq'],
+                'indexes': [models.Index(fields=['pipeline_execution', 'stream_id', 'offset'], name='idx_log_chunk_offset')],
+                'unique_together': {('pipeline_execution', 'stream_id', 'seq')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-16 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_management', '0001_initial'),
+        ('pipelines', '0013_remove_pipelinestep_docker_project'),
+        ('cicd_integrations', '0013_executionlogchunk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineStatusSummary',
+            fields=[
+                ('pipeline', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='status_summary', serialize=False, to='pipelines.pipeline')),
+                ('pipeline_name', models.CharField(max_length=255)),
+                ('project_name', models.CharField(blank=True, max_length=255)),
+                ('last_execution_status', models.CharField(blank=True, max_length=20)),
+                ('last_execution_time', models.DateTimeField(blank=True, null=True)),
+                ('recent_results', models.JSONField(default=list)),
+                ('success_rate', models.FloatField(default=0, help_text='最近执行成功率（0~1）')),
+                ('avg_duration', models.FloatField(blank=True, help_text='最近执行平均耗时（秒）', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_execution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cicd_integrations.pipelineexecution')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pipeline_status_summaries', to='project_management.project')),
+            ],
+            options={
+                'verbose_name': 'Pipeline Status Summary',
+                'verbose_name_plural': 'Pipeline Status Summaries',
+                'indexes': [models.Index(fields=['last_execution_status', '-updated_at'], name='idx_status_summary_status'), models.Index(fields=['project', '-updated_at'], name='idx_status_summary_project'), models.Index(fields=['-updated_at'], name='idx_status_summary_updated')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cicd_integrations', '0014_pipelinestatussummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionStatsBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('pipeline_execution', 'PipelineExecution'), ('pipeline_run', 'PipelineRun')], max_length=32)),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket_start', models.DateTimeField(help_text='桶起始时间（按创建时间归桶）')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('success', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0, help_text='取消或超时')),
+                ('duration_sum', models.FloatField(default=0, help_text='耗时合计（秒）')),
+                ('duration_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Execution Stats Bucket',
+                'verbose_name_plural': 'Execution Stats Buckets',
+                'unique_together': {('source', 'granularity', 'bucket_start')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pipelineexecution',
+            index=models.Index(fields=['created_at'], name='idx_pipeline_exec_created'),
+        ),
+    ]
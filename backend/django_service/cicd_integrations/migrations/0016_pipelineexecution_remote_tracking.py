@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-16 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cicd_integrations', '0015_executionstatsbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pipelineexecution',
+            name='next_status_check_at',
+            field=models.DateTimeField(blank=True, help_text='下一次远程状态检查时间', null=True),
+        ),
+        migrations.AddField(
+            model_name='pipelineexecution',
+            name='status_check_interval',
+            field=models.PositiveIntegerField(default=0, help_text='当前远程状态检查间隔（秒）'),
+        ),
+        migrations.AddIndex(
+            model_name='pipelineexecution',
+            index=models.Index(fields=['external_id'], name='idx_pipeline_exec_external'),
+        ),
+        migrations.AddIndex(
+            model_name='pipelineexecution',
+            index=models.Index(fields=['status', 'next_status_check_at'], name='idx_pipeline_exec_next_check'),
+        ),
+    ]
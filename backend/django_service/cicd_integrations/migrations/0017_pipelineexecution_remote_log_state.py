@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-16 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cicd_integrations', '0016_pipelineexecution_remote_tracking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pipelineexecution',
+            name='remote_log_state',
+            field=models.JSONField(blank=True, default=dict, help_text='远程日志跟踪位置'),
+        ),
+    ]
@@ -351,6 +351,12 @@ class PipelineExecution(models.Model):
                                     related_name='triggered_executions')
     trigger_data = models.JSONField(default=dict, help_text="触发时的数据")
     
+    # 远程执行兜底状态检查（webhook 为主，见 remote_tracker）
+    next_status_check_at = models.DateTimeField(null=True, blank=True, help_text="下一次远程状态检查时间")
+    status_check_interval = models.PositiveIntegerField(default=0, help_text="当前远程状态检查间隔（秒）")
+    # 远程日志增量跟踪位置（见 remote_log_follower）
+    remote_log_state = models.JSONField(default=dict, blank=True, help_text="远程日志跟踪位置")
+    
     # 时间戳
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -360,6 +366,13 @@ class PipelineExecution(models.Model):
         verbose_name = "Pipeline Execution"
         verbose_name_plural = "Pipeline Executions"
         # 移除unique_together约束，因为本地执行没有cicd_tool和external_id
+        indexes = [
+            # 统计汇总按创建时间区间重算
+            models.Index(fields=['created_at'], name='idx_pipeline_exec_created'),
+            # webhook 事件按外部ID匹配执行，兜底轮询按下一次检查时间扫描
+            models.Index(fields=['external_id'], name='idx_pipeline_exec_external'),
+            models.Index(fields=['status', 'next_status_check_at'], name='idx_pipeline_exec_next_check'),
+        ]
     
     def __str__(self):
         return f"{self.pipeline.name} - {self.external_id} ({self.status})"
@@ -447,3 +460,120 @@ class StepExecution(models.Model):
         if self.started_at and self.completed_at:
             return self.completed_at - self.started_at
         return None
+
+
+class ExecutionLogChunk(models.Model):
+    """
+    执行日志分片（只追加）
+    每个日志流（流水线级日志或某个步骤的日志）由按 seq 递增的分片组成，
+    追加日志只插入新分片，读取时按字符偏移做范围读取
+    """
+    
+    pipeline_execution = models.ForeignKey(PipelineExecution, on_delete=models.CASCADE,
+                                          related_name='log_chunks')
+    step_execution = models.ForeignKey(StepExecution, on_delete=models.CASCADE,
+                                      related_name='log_chunks', null=True, blank=True)
+    
+    # 日志流标识：步骤执行ID，流水线级日志为0（避免可空字段参与唯一约束）
+    stream_id = models.BigIntegerField(default=0, help_text="日志流ID，步骤执行ID或0")
+    seq = models.PositiveIntegerField(help_text="分片序号")
+    offset = models.BigIntegerField(help_text="分片在日志流中的起始字符偏移")
+    length = models.PositiveIntegerField(help_text="分片字符数")
+    content = models.TextField(help_text="分片内容")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['pipeline_execution', 'stream_id', 'seq']
+        verbose_name = "Execution Log Chunk"
+        verbose_name_plural = "Execution Log Chunks"
+        unique_together = ['pipeline_execution', 'stream_id', 'seq']
+        indexes = [
+            models.Index(fields=['pipeline_execution', 'stream_id', 'offset'], name='idx_log_chunk_offset'),
+        ]
+    
+    def __str__(self):
+        return f"Execution {self.pipeline_execution_id} stream {self.stream_id} #{self.seq}"
+
+
+class PipelineStatusSummary(models.Model):
+    """
+    流水线状态汇总（读模型）
+    每条流水线一行，执行状态变化时由执行器更新，Dashboard 等高频查询直接读取，
+    不再按执行记录逐条 count() 计算
+    """
+    
+    # 滚动统计窗口：最近多少次已结束的执行
+    ROLLING_WINDOW = 20
+    
+    pipeline = models.OneToOneField('pipelines.Pipeline', on_delete=models.CASCADE,
+                                    primary_key=True, related_name='status_summary')
+    project = models.ForeignKey('project_management.Project', on_delete=models.CASCADE,
+                                related_name='pipeline_status_summaries')
+    pipeline_name = models.CharField(max_length=255)
+    project_name = models.CharField(max_length=255, blank=True)
+    
+    last_execution = models.ForeignKey(PipelineExecution, on_delete=models.SET_NULL,
+                                       null=True, blank=True, related_name='+')
+    last_execution_status = models.CharField(max_length=20, blank=True)
+    last_execution_time = models.DateTimeField(null=True, blank=True)
+    
+    # 最近 ROLLING_WINDOW 次已结束执行：[[execution_id, status, duration_seconds], ...]
+    recent_results = models.JSONField(default=list)
+    success_rate = models.FloatField(default=0, help_text="最近执行成功率（0~1）")
+    avg_duration = models.FloatField(null=True, blank=True, help_text="最近执行平均耗时（秒）")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Pipeline Status Summary"
+        verbose_name_plural = "Pipeline Status Summaries"
+        indexes = [
+            models.Index(fields=['last_execution_status', '-updated_at'], name='idx_status_summary_status'),
+            models.Index(fields=['project', '-updated_at'], name='idx_status_summary_project'),
+            models.Index(fields=['-updated_at'], name='idx_status_summary_updated'),
+        ]
+    
+    def __str__(self):
+        return f"{self.pipeline_name} ({self.last_execution_status or 'never run'})"
+
+
+class ExecutionStatsBucket(models.Model):
+    """
+    执行统计汇总（按分钟/小时/天分桶）
+    执行状态变化时重算所在的桶，Dashboard 和统计接口按桶求和，
+    不再对执行记录逐条 count() 或在 Python 中累加耗时
+    """
+    
+    SOURCES = [
+        ('pipeline_execution', 'PipelineExecution'),
+        ('pipeline_run', 'PipelineRun'),
+    ]
+    
+    GRANULARITIES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    
+    source = models.CharField(max_length=32, choices=SOURCES)
+    granularity = models.CharField(max_length=10, choices=GRANULARITIES)
+    bucket_start = models.DateTimeField(help_text="桶起始时间（按创建时间归桶）")
+    
+    total = models.PositiveIntegerField(default=0)
+    success = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0, help_text="取消或超时")
+    # 已结束（成功/失败）且有起止时间的执行的耗时合计
+    duration_sum = models.FloatField(default=0, help_text="耗时合计（秒）")
+    duration_count = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Execution Stats Bucket"
+        verbose_name_plural = "Execution Stats Buckets"
+        unique_together = ['source', 'granularity', 'bucket_start']
+    
+    def __str__(self):
+        return f"{self.source} {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M}"
@@ -0,0 +1,277 @@
+"""
+远程执行日志增量跟踪
+- Jenkins：从上次的字节偏移请求 logText/progressiveText?start=<offset>，按 X-Text-Size 推进偏移，
+  X-More-Data 为 false 后跟踪结束；已读过的部分不会再次下载
+- GitLab CI：逐个作业用 Range: bytes=<offset>- 读取 trace 的新增字节；服务器不支持 Range 的作业每次都要从头下载，
+  只在作业结束后读取
+新内容按整行追加到执行日志分片存储（流水线级日志流，同时进入 SSE 日志流），并发布到执行事件频道推送给
+WebSocket 订阅者。跟踪位置保存在 PipelineExecution.remote_log_state，进程重启后从原偏移继续
+"""
+import asyncio
+import copy
+import logging
+import math
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+
+from realtime.execution_events import publish_log_lines
+
+from .adapters.http_pool import run_async
+from .log_store import execution_log_store
+from .models import PipelineExecution
+
+logger = logging.getLogger(__name__)
+
+FOLLOWED_TOOL_TYPES = ('jenkins', 'gitlab_ci')
+ACTIVE_STATUSES = ('pending', 'running')
+# manual 作业可能随后被手动触发并产生日志，不视为已结束
+GITLAB_FINISHED_JOB_STATUSES = ('success', 'failed', 'canceled', 'skipped')
+
+LOCK_KEY_PREFIX = 'remote-log-follow'
+TASK_LOCK_KEY = f'{LOCK_KEY_PREFIX}:task'
+
+DEFAULT_FOLLOWER_CONFIG = {
+    'BATCH': 100,                  # 单次扫描最多跟踪的执行数
+    'CONCURRENCY': 10,             # 同时读取日志的执行数
+    'REQUEST_TIMEOUT': 60,         # 单个执行一轮读取的超时（秒）
+    'MAX_RANGE_BYTES': 1024 * 1024,  # Jenkins 构建 / GitLab 作业每轮读取的最大字节数
+    'APPEND_CHUNK_CHARS': 256 * 1024,  # 追加到日志存储的单个分片大小
+    'DRAIN_WINDOW': 3600,          # 执行结束后继续补读剩余日志的时间窗口（秒）
+    'MAX_ACTIVE_AGE': 24 * 3600,   # 超过该时长仍处于进行中的执行视为状态卡住，不再跟踪（秒）
+}
+
+
+def get_follower_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_FOLLOWER_CONFIG)
+    config.update(getattr(settings, 'REMOTE_LOG_FOLLOWER', {}) or {})
+    return config
+
+
+def is_followed(execution: PipelineExecution) -> bool:
+    """是否增量跟踪该执行的日志；Jenkins 执行需要带构建号（job#build）才能定位日志"""
+    tool = execution.cicd_tool
+    if not tool or not execution.external_id or tool.tool_type not in FOLLOWED_TOOL_TYPES:
+        return False
+    return tool.tool_type != 'jenkins' or '#' in execution.external_id
+
+
+def complete_utf8_length(data: bytes) -> int:
+    """data 中完整 UTF-8 字符的前缀长度；末尾被截断的多字节字符留到下一轮"""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue  # 续字节，继续向前找首字节
+        if byte & 0x80 == 0:
+            return len(data)
+        needed = 2 if byte & 0xE0 == 0xC0 else 3 if byte & 0xF0 == 0xE0 else 4
+        return len(data) if back >= needed else len(data) - back
+    return len(data)
+
+
+def take_lines(pending: str, data: bytes, final: bool = False, max_pending: int = 64 * 1024) -> Tuple[str, str]:
+    """
+    把上一轮留下的内容与新字节合并，返回 (可追加的整行文本, 留到下一轮的内容)
+
+    pending 以十六进制保存未凑成整行的字节；final 时全部输出，
+    超长的无换行内容超过 max_pending 时按完整字符输出，避免跟踪状态无限增长
+    """
+    buffer = bytes.fromhex(pending or '') + data
+    if final:
+        return buffer.decode('utf-8', errors='replace'), ''
+
+    cut = buffer.rfind(b'\n') + 1
+    if len(buffer) - cut > max_pending:
+        cut = complete_utf8_length(buffer)
+    return buffer[:cut].decode('utf-8', errors='replace'), buffer[cut:].hex()
+
+
+async def _read_jenkins(adapter, execution: PipelineExecution, state: Dict[str, Any],
+                        parts: List[str], config) -> None:
+    job_name, build_number = execution.external_id.split('#', 1)
+
+    increment = await adapter.get_console_increment(
+        job_name, build_number, start=state.get('offset', 0), max_bytes=config['MAX_RANGE_BYTES']
+    )
+    finished = not increment['has_more']
+    text, state['pending'] = take_lines(state.get('pending', ''), increment['data'], final=finished)
+    state['offset'] = increment['next_position']
+    state['complete'] = finished
+    parts.append(text)
+
+
+async def _read_gitlab(adapter, execution: PipelineExecution, state: Dict[str, Any],
+                       parts: List[str], config) -> None:
+    jobs_state = state.setdefault('jobs', {})
+
+    for job in await adapter.list_pipeline_jobs(execution.external_id):
+        job_state = jobs_state.setdefault(str(job['id']), {'offset': 0, 'pending': ''})
+        if job_state.get('complete') or job.get('status') in ('created', 'pending'):
+            continue
+        if job_state.get('no_range') and job.get('status') not in GITLAB_FINISHED_JOB_STATUSES:
+            # 服务器忽略 Range 时每轮都要从头下载，进行中的作业等结束后再读
+            continue
+
+        increment = await adapter.get_job_trace_range(
+            job['id'], start=job_state['offset'], max_bytes=config['MAX_RANGE_BYTES']
+        )
+        finished = job.get('status') in GITLAB_FINISHED_JOB_STATUSES and not increment['has_more']
+        text, job_state['pending'] = take_lines(job_state['pending'], increment['data'], final=finished)
+        job_state['offset'] = increment['next_position']
+        job_state['complete'] = finished
+        job_state['no_range'] = not increment['ranged']
+
+        if text:
+            if state.get('current_job') != job['id']:
+                parts.append(f"=== Job: {job['name']} ===\n")
+                state['current_job'] = job['id']
+            parts.append(text)
+
+    state['complete'] = (
+        execution.status not in ACTIVE_STATUSES
+        and all(job_state.get('complete') for job_state in jobs_state.values())
+    )
+
+
+async def _read_execution(execution: PipelineExecution, state: Dict[str, Any], parts: List[str], config) -> None:
+    """
+    读取新增日志追加到 parts，同时推进 state 中的偏移
+
+    每段文本与对应偏移在同一步中更新，中途超时或出错时已读取的部分仍与偏移一致，可以保存
+    """
+    from .adapters import AdapterFactory
+
+    tool = execution.cicd_tool
+    adapter = AdapterFactory.create_adapter(
+        tool.tool_type,
+        base_url=tool.base_url,
+        username=tool.username,
+        token=tool.token,
+        **tool.config
+    )
+    async with adapter:
+        if tool.tool_type == 'jenkins':
+            await _read_jenkins(adapter, execution, state, parts, config)
+        else:
+            await _read_gitlab(adapter, execution, state, parts, config)
+
+
+async def _read_all(items, config) -> List[str]:
+    semaphore = asyncio.Semaphore(config['CONCURRENCY'])
+
+    async def read(execution, state):
+        parts: List[str] = []
+        async with semaphore:
+            try:
+                await asyncio.wait_for(
+                    _read_execution(execution, state, parts, config), timeout=config['REQUEST_TIMEOUT']
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"读取远程执行日志超时，保存已读取部分: execution={execution.id}")
+            except Exception as e:
+                logger.warning(f"读取远程执行日志失败: execution={execution.id} - {e}")
+        return ''.join(parts)
+
+    return await asyncio.gather(*(read(execution, state) for execution, state in items))
+
+
+def _append(execution: PipelineExecution, text: str, config) -> None:
+    size = config['APPEND_CHUNK_CHARS']
+    for start in range(0, len(text), size):
+        execution_log_store.append(execution.id, text[start:start + size])
+    publish_log_lines(execution.id, text.rstrip('\n'), source='remote_ci')
+
+
+def _batch_lock_timeout(count: int, config) -> int:
+    """一批执行最坏情况下的耗时：按并发数分轮读取，每轮最长 REQUEST_TIMEOUT，另留一轮用于写入日志"""
+    rounds = math.ceil(count / max(config['CONCURRENCY'], 1)) + 1
+    return rounds * config['REQUEST_TIMEOUT']
+
+
+def follow_executions(executions: List[PipelineExecution]) -> Dict[str, int]:
+    """
+    读取一批远程执行的新增日志并写入日志存储
+
+    每个执行同一时间只由一个进程跟踪（缓存锁），拿不到锁的执行留给下一轮；
+    每次尝试（无论成败）都记录 last_attempt，定时扫描按它轮换，读取持续失败的执行不会一直占用名额
+    """
+    config = get_follower_config()
+    candidates = [
+        execution for execution in executions
+        if is_followed(execution) and not (execution.remote_log_state or {}).get('complete')
+    ]
+    lock_timeout = _batch_lock_timeout(len(candidates), config)
+    locked = [
+        execution for execution in candidates
+        if cache.add(f"{LOCK_KEY_PREFIX}:{execution.id}", 1, lock_timeout)
+    ]
+
+    appended = completed = 0
+    try:
+        if not locked:
+            return {'followed': 0, 'appended': 0, 'completed': 0}
+
+        # 读取在副本上进行，写入日志成功后才保存新的偏移
+        items = [(execution, copy.deepcopy(execution.remote_log_state or {})) for execution in locked]
+        for _, state in items:
+            state['last_attempt'] = time.time()
+        texts = run_async(_read_all(items, config))
+
+        for (execution, state), text in zip(items, texts):
+            if text:
+                _append(execution, text, config)
+                appended += len(text)
+            execution.remote_log_state = state
+            execution.save(update_fields=['remote_log_state'])
+            if state.get('complete'):
+                completed += 1
+    finally:
+        cache.delete_many([f"{LOCK_KEY_PREFIX}:{execution.id}" for execution in locked])
+
+    return {'followed': len(locked), 'appended': appended, 'completed': completed}
+
+
+def follow_remote_logs() -> Dict[str, int]:
+    """
+    跟踪进行中的远程执行，以及刚结束但日志尚未读完的执行
+
+    定时任务间隔短于一批的最坏耗时，上一轮未结束时本轮直接跳过，避免多轮扫描重叠
+    """
+    config = get_follower_config()
+    if not cache.add(TASK_LOCK_KEY, 1, _batch_lock_timeout(config['BATCH'], config)):
+        return {'followed': 0, 'appended': 0, 'completed': 0, 'skipped': 1}
+    try:
+        return _follow_pending(config)
+    finally:
+        cache.delete(TASK_LOCK_KEY)
+
+
+def _follow_pending(config) -> Dict[str, int]:
+    """
+    选出本轮要跟踪的执行：从未尝试过的优先，其余按上次尝试时间轮换；
+    结束超过补读窗口、或进行中超过 MAX_ACTIVE_AGE（状态卡住）的执行不再跟踪
+    """
+    now = timezone.now()
+    drain_since = now - timedelta(seconds=config['DRAIN_WINDOW'])
+    active_since = now - timedelta(seconds=config['MAX_ACTIVE_AGE'])
+
+    executions = list(
+        PipelineExecution.objects.filter(
+            Q(cicd_tool__tool_type='gitlab_ci') | Q(cicd_tool__tool_type='jenkins', external_id__contains='#'),
+            status__in=ACTIVE_STATUSES + ('success', 'failed', 'cancelled', 'timeout'),
+        ).exclude(external_id='').exclude(
+            remote_log_state__complete=True
+        ).exclude(
+            status__in=('success', 'failed', 'cancelled', 'timeout'), completed_at__lt=drain_since
+        ).exclude(
+            status__in=ACTIVE_STATUSES, created_at__lt=active_since
+        ).select_related('cicd_tool').defer('logs').order_by(
+            F('remote_log_state__last_attempt').asc(nulls_first=True), 'id'
+        )[:config['BATCH']]
+    )
+    return follow_executions(executions)
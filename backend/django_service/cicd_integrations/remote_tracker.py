@@ -0,0 +1,422 @@
+"""
+远程执行跟踪
+外部 CI/CD 工具（Jenkins / GitLab CI / GitHub Actions）上运行的执行不再各占一个 worker 轮询：
+- FastAPI 服务收到 webhook 后把规范化的状态事件写入 Redis Stream（ansflow:remote-run-events），
+  这里消费后立即更新对应的 PipelineExecution
+- 轮询只作为兜底：一次扫描所有到期的进行中执行，按工具分组并发查询状态；
+  状态未变化时检查间隔翻倍（MIN_INTERVAL -> MAX_INTERVAL），变化后重置，收到 webhook 后推迟到最大间隔
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .adapters.http_pool import run_async
+from .models import PipelineExecution, StepExecution
+from .status_summary import record_execution_status
+
+logger = logging.getLogger(__name__)
+
+REMOTE_RUN_EVENTS_STREAM = 'ansflow:remote-run-events'
+CONSUMER_GROUP = 'remote-tracker'
+
+ACTIVE_STATUSES = ('pending', 'running')
+TERMINAL_STATUSES = ('success', 'failed', 'cancelled', 'timeout')
+
+DEFAULT_TRACKER_CONFIG = {
+    'MIN_INTERVAL': 15,          # 状态变化后的检查间隔（秒）
+    'MAX_INTERVAL': 300,         # 状态长期不变或已有 webhook 时的检查间隔（秒）
+    'MAX_DURATION': 6 * 3600,    # 超过该时长仍未结束的执行标记为超时（秒）
+    'SWEEP_BATCH': 200,          # 单次扫描最多检查的执行数
+    'CONCURRENCY': 20,           # 单个工具的并发状态查询数
+    'STATUS_TIMEOUT': 15,        # 单次状态查询超时（秒）
+    'CLAIM_IDLE': 60,            # 已读取但超过该时长仍未确认的事件（消费进程已退出）由其他进程接管（秒）
+    'CONSUMER_IDLE': 3600,       # 超过该时长未活动且没有未确认事件的消费者从消费组中删除（秒）
+}
+
+STATUS_MAPPING = {
+    # Jenkins
+    'SUCCESS': 'success',
+    'FAILURE': 'failed',
+    'ABORTED': 'cancelled',
+    'UNSTABLE': 'failed',
+    'IN_PROGRESS': 'running',
+    'NOT_BUILT': 'pending',
+    # GitLab CI
+    'success': 'success',
+    'failed': 'failed',
+    'canceled': 'cancelled',
+    'cancelled': 'cancelled',
+    'running': 'running',
+    'pending': 'pending',
+    'created': 'pending',
+    'manual': 'pending',
+    # GitHub Actions
+    'completed': 'success',
+    'failure': 'failed',
+    'in_progress': 'running',
+    'queued': 'pending',
+    'requested': 'pending',
+    # 通用状态
+    'unknown': 'running',
+    'error': 'failed'
+}
+
+
+def get_tracker_config() -> Dict[str, Any]:
+    config = dict(DEFAULT_TRACKER_CONFIG)
+    config.update(getattr(settings, 'REMOTE_EXECUTION_TRACKER', {}) or {})
+    return config
+
+
+def map_external_status(external_status: str) -> str:
+    """映射外部CI/CD工具的状态到内部状态"""
+    return STATUS_MAPPING.get((external_status or 'unknown').lower(), 'running')
+
+
+def start_tracking(execution: PipelineExecution) -> None:
+    """远程执行触发成功后调用，安排第一次兜底检查"""
+    interval = get_tracker_config()['MIN_INTERVAL']
+    execution.status_check_interval = interval
+    execution.next_status_check_at = timezone.now() + timedelta(seconds=interval)
+    execution.save(update_fields=['status_check_interval', 'next_status_check_at'])
+
+
+# ---- 状态应用 ----
+
+def _sync_step_statuses(execution: PipelineExecution, pipeline_status: str):
+    """远程执行没有逐步骤的状态，按流水线状态推进本地步骤记录"""
+    from realtime.execution_events import publish_step_status
+
+    now = timezone.now()
+    steps = list(
+        StepExecution.objects.filter(pipeline_execution_id=execution.id, status__in=ACTIVE_STATUSES)
+        .select_related('atomic_step').order_by('order')
+    )
+    if not steps:
+        return
+
+    if pipeline_status == 'running':
+        # 流水线开始运行时把第一个步骤设为running，其他保持pending
+        first = steps[0]
+        if first.status != 'pending':
+            return
+        first.status = 'running'
+        first.started_at = now
+        updated = [first]
+    elif pipeline_status in TERMINAL_STATUSES:
+        if pipeline_status in ('success', 'timeout'):
+            final_step_status = pipeline_status
+        else:
+            final_step_status = 'failed'  # failed, cancelled 都映射为 failed
+        for step in steps:
+            step.status = final_step_status
+            step.completed_at = now
+            if not step.started_at:
+                step.started_at = now
+        updated = steps
+    else:
+        return
+
+    StepExecution.objects.bulk_update(updated, ['status', 'started_at', 'completed_at'])
+    for step in updated:
+        publish_step_status(step, step.atomic_step.name if step.atomic_step_id else None)
+
+
+def apply_remote_status(execution: PipelineExecution, external_status: Optional[str],
+                        source: str = 'poll') -> bool:
+    """
+    应用一次远程状态观测并安排下一次兜底检查
+
+    Args:
+        external_status: 外部状态；为空表示本次查询失败，只做退避
+        source: 'webhook' 或 'poll'
+
+    Returns:
+        bool: 执行状态是否发生变化
+    """
+    from realtime.execution_events import publish_execution_status
+
+    config = get_tracker_config()
+    now = timezone.now()
+    internal_status = map_external_status(external_status) if external_status else None
+
+    with transaction.atomic():
+        locked = PipelineExecution.objects.select_for_update().filter(id=execution.id).first()
+        if locked is None or locked.status not in ACTIVE_STATUSES:
+            return False
+
+        changed = internal_status is not None and internal_status != locked.status
+        # 已在运行的执行不因外部排队状态回退
+        if changed and internal_status == 'pending' and locked.status == 'running':
+            changed = False
+
+        if source == 'webhook':
+            interval = config['MAX_INTERVAL']
+        elif changed:
+            interval = config['MIN_INTERVAL']
+        else:
+            interval = min(max(locked.status_check_interval, config['MIN_INTERVAL']) * 2, config['MAX_INTERVAL'])
+
+        update_fields = ['status_check_interval', 'next_status_check_at']
+        locked.status_check_interval = interval
+        locked.next_status_check_at = now + timedelta(seconds=interval)
+
+        if changed:
+            locked.status = internal_status
+            update_fields.append('status')
+            if internal_status == 'running' and not locked.started_at:
+                locked.started_at = now
+                update_fields.append('started_at')
+            if internal_status in TERMINAL_STATUSES:
+                locked.completed_at = now
+                locked.next_status_check_at = None
+                update_fields.append('completed_at')
+
+        locked.save(update_fields=update_fields)
+
+    for field in ('status', 'started_at', 'completed_at', 'status_check_interval', 'next_status_check_at'):
+        setattr(execution, field, getattr(locked, field))
+
+    if not changed:
+        return False
+
+    logger.info(f"Remote execution {execution.id} status -> {internal_status} (via {source})")
+    _sync_step_statuses(locked, internal_status)
+    record_execution_status(locked)
+    publish_execution_status(locked)
+    if internal_status in TERMINAL_STATUSES:
+        from .tasks import fetch_remote_execution_logs
+        fetch_remote_execution_logs.delay(locked.id)
+    return True
+
+
+def _mark_timed_out(execution: PipelineExecution) -> None:
+    from realtime.execution_events import publish_execution_status
+
+    updated = PipelineExecution.objects.filter(
+        id=execution.id, status__in=ACTIVE_STATUSES
+    ).update(status='timeout', completed_at=timezone.now(), next_status_check_at=None)
+    if not updated:
+        return
+    execution.refresh_from_db()
+    logger.warning(f"Remote execution monitoring timeout: {execution.id}")
+    _sync_step_statuses(execution, 'timeout')
+    record_execution_status(execution)
+    publish_execution_status(execution)
+
+
+# ---- webhook 事件 ----
+
+def handle_remote_event(event: Dict[str, Any]) -> int:
+    """
+    处理一条规范化的远程状态事件
+
+    事件字段: tool_type, external_id, status, base_url（可选，用于区分同名 Jenkins 作业）
+    Returns:
+        int: 更新的执行数
+    """
+    external_id = event.get('external_id')
+    tool_type = event.get('tool_type')
+    if not external_id or not tool_type:
+        return 0
+
+    executions = PipelineExecution.objects.filter(
+        external_id=external_id,
+        cicd_tool__tool_type=tool_type,
+        status__in=ACTIVE_STATUSES
+    ).select_related('cicd_tool')
+
+    base_url = (event.get('base_url') or '').rstrip('/').lower()
+    updated = 0
+    for execution in executions:
+        if base_url and execution.cicd_tool.base_url.rstrip('/').lower() != base_url:
+            continue
+        if apply_remote_status(execution, event.get('status'), source='webhook'):
+            updated += 1
+    return updated
+
+
+def _get_redis_connection():
+    from django_redis import get_redis_connection
+    return get_redis_connection(getattr(settings, 'EXECUTION_EVENTS_CACHE_ALIAS', 'default'))
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def consume_remote_events(block_ms: Optional[int] = None, count: int = 100) -> int:
+    """
+    从 Redis Stream 读取并处理 webhook 状态事件（消费组保证多个进程不重复处理）
+
+    每轮先接管已退出进程留下的未确认事件，并清理其遗留的消费者，再读取新事件
+
+    Args:
+        block_ms: 阻塞等待新事件的毫秒数，为空时只处理已到达的事件
+    Returns:
+        int: 处理的事件数
+    """
+    connection = _get_redis_connection()
+    try:
+        connection.xgroup_create(REMOTE_RUN_EVENTS_STREAM, CONSUMER_GROUP, id='0', mkstream=True)
+    except Exception as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+    config = get_tracker_config()
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    processed = _claim_stale_events(connection, consumer, count, config)
+    _remove_idle_consumers(connection, consumer, config)
+
+    while True:
+        response = connection.xreadgroup(
+            CONSUMER_GROUP, consumer, {REMOTE_RUN_EVENTS_STREAM: '>'}, count=count, block=block_ms
+        )
+        entries = response[0][1] if response else []
+        processed += _handle_entries(connection, entries)
+        # 阻塞模式只等待一轮；非阻塞模式读到不足一页即已读完
+        if block_ms is not None or len(entries) < count:
+            return processed
+
+
+def _handle_entries(connection, entries) -> int:
+    processed = 0
+    for entry_id, fields in entries:
+        if not fields:
+            # 接管时事件已从 Stream 中删除，只确认
+            connection.xack(REMOTE_RUN_EVENTS_STREAM, CONSUMER_GROUP, entry_id)
+            continue
+        event = {_decode(key): _decode(value) for key, value in fields.items()}
+        try:
+            handle_remote_event(event)
+        except Exception as e:
+            logger.error(f"处理远程执行事件失败: {event} - {e}")
+        finally:
+            connection.xack(REMOTE_RUN_EVENTS_STREAM, CONSUMER_GROUP, entry_id)
+        processed += 1
+    return processed
+
+
+def _claim_stale_events(connection, consumer: str, count: int, config) -> int:
+    """用 XAUTOCLAIM 接管空闲超过 CLAIM_IDLE 的未确认事件并处理（读取后进程退出的事件）"""
+    processed = 0
+    start_id = '0-0'
+    while True:
+        try:
+            result = connection.xautoclaim(
+                REMOTE_RUN_EVENTS_STREAM, CONSUMER_GROUP, consumer,
+                min_idle_time=config['CLAIM_IDLE'] * 1000, start_id=start_id, count=count
+            )
+        except Exception as e:
+            logger.warning(f"接管未确认的远程执行事件失败: {e}")
+            return processed
+        start_id = _decode(result[0])
+        processed += _handle_entries(connection, result[1])
+        if start_id in ('0-0', '0'):
+            return processed
+
+
+def _remove_idle_consumers(connection, consumer: str, config) -> None:
+    """删除长时间未活动且没有未确认事件的消费者，避免进程重启后按 hostname-pid 命名的消费者不断累积"""
+    try:
+        consumers = connection.xinfo_consumers(REMOTE_RUN_EVENTS_STREAM, CONSUMER_GROUP)
+    except Exception as e:
+        logger.warning(f"读取远程执行事件消费者失败: {e}")
+        return
+
+    for info in consumers:
+        name = _decode(info['name'])
+        if name == consumer or info['pending'] or info['idle'] < config['CONSUMER_IDLE'] * 1000:
+            continue
+        try:
+            connection.xgroup_delconsumer(REMOTE_RUN_EVENTS_STREAM, CONSUMER_GROUP, name)
+        except Exception as e:
+            logger.warning(f"删除远程执行事件消费者 {name} 失败: {e}")
+
+
+# ---- 兜底轮询 ----
+
+async def _poll_tool(tool, executions: List[PipelineExecution], config) -> List[Tuple[PipelineExecution, Optional[str]]]:
+    from .adapters import AdapterFactory
+
+    adapter = AdapterFactory.create_adapter(
+        tool.tool_type,
+        base_url=tool.base_url,
+        username=tool.username,
+        token=tool.token,
+        **tool.config
+    )
+    semaphore = asyncio.Semaphore(config['CONCURRENCY'])
+
+    async def check(execution):
+        async with semaphore:
+            try:
+                status_data = await asyncio.wait_for(
+                    adapter.get_pipeline_status(execution.external_id), timeout=config['STATUS_TIMEOUT']
+                )
+                return execution, status_data.get('status', 'unknown')
+            except Exception as e:
+                logger.warning(f"Error checking remote execution {execution.id} status: {e}")
+                return execution, None
+
+    async with adapter:
+        return await asyncio.gather(*(check(execution) for execution in executions))
+
+
+async def _poll_all(groups, config):
+    results = await asyncio.gather(
+        *(_poll_tool(tool, executions, config) for tool, executions in groups),
+        return_exceptions=True
+    )
+    observations = []
+    for (tool, executions), result in zip(groups, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error polling CI/CD tool {tool.id}: {result}")
+            observations.extend((execution, None) for execution in executions)
+        else:
+            observations.extend(result)
+    return observations
+
+
+def reconcile_remote_executions() -> Dict[str, int]:
+    """扫描到期的进行中远程执行，按工具分组并发查询一次状态"""
+    config = get_tracker_config()
+    now = timezone.now()
+
+    due = list(
+        PipelineExecution.objects.filter(
+            Q(next_status_check_at__lte=now) | Q(next_status_check_at__isnull=True),
+            status__in=ACTIVE_STATUSES,
+            cicd_tool__isnull=False,
+        ).exclude(external_id='').select_related('cicd_tool')
+        .order_by('next_status_check_at')[:config['SWEEP_BATCH']]
+    )
+
+    timed_out = 0
+    groups: Dict[int, Tuple[Any, List[PipelineExecution]]] = {}
+    deadline = now - timedelta(seconds=config['MAX_DURATION'])
+    for execution in due:
+        if (execution.started_at or execution.created_at) < deadline:
+            _mark_timed_out(execution)
+            timed_out += 1
+            continue
+        groups.setdefault(execution.cicd_tool_id, (execution.cicd_tool, []))[1].append(execution)
+
+    changed = 0
+    if groups:
+        for execution, external_status in run_async(_poll_all(list(groups.values()), config)):
+            try:
+                if apply_remote_status(execution, external_status, source='poll'):
+                    changed += 1
+            except Exception as e:
+                logger.error(f"Failed to apply status for remote execution {execution.id}: {e}")
+
+    return {'checked': len(due) - timed_out, 'changed': changed, 'timed_out': timed_out}
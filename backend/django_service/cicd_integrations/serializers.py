@@ -2,6 +2,7 @@
 CI/CD 集成 API 序列化器
 """
 from rest_framework import serializers
+from common.execution_logger import ExecutionLogger
 from .models import CICDTool, AtomicStep, PipelineExecution, StepExecution, GitCredential
 
 
@@ -160,6 +161,8 @@ class StepExecutionSerializer(serializers.ModelSerializer):
     step_name = serializers.SerializerMethodField()
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     duration = serializers.ReadOnlyField()
+    # 追加写入的日志在日志分片表中，logs 字段只保存早期写入的内容
+    logs = serializers.SerializerMethodField()
     
     class Meta:
         model = StepExecution
@@ -181,6 +184,9 @@ class StepExecutionSerializer(serializers.ModelSerializer):
             return obj.atomic_step.name
         else:
             return f"Step {obj.order}"
+    
+    def get_logs(self, obj):
+        return ExecutionLogger.get_execution_logs(obj)
 
 
 class PipelineExecutionSerializer(serializers.ModelSerializer):
@@ -194,6 +200,7 @@ class PipelineExecutionSerializer(serializers.ModelSerializer):
     trigger_type_display = serializers.CharField(source='get_trigger_type_display', read_only=True)
     duration = serializers.ReadOnlyField()
     step_executions = StepExecutionSerializer(many=True, read_only=True)
+    logs = serializers.SerializerMethodField()
     
     class Meta:
         model = PipelineExecution
@@ -207,9 +214,12 @@ class PipelineExecutionSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'external_id', 'external_url', 'logs', 'artifacts',
+            'id', 'external_id', 'external_url', 'artifacts',
             'test_results', 'started_at', 'completed_at', 'created_at', 'updated_at'
         ]
+    
+    def get_logs(self, obj):
+        return ExecutionLogger.get_execution_logs(obj)
 
 
 class PipelineExecutionListSerializer(serializers.ModelSerializer):
@@ -9,8 +9,10 @@ from celery import shared_task
 from asgiref.sync import sync_to_async
 
 from .models import CICDTool, PipelineExecution, StepExecution, AtomicStep
+from .status_summary import record_execution_status
 from .adapters import AdapterFactory, PipelineDefinition, ExecutionResult
 from pipelines.models import Pipeline
+from common.execution_logger import ExecutionLogger
 from .executors import PipelineExecutor, ExecutionContext, DependencyResolver, StepExecutor
 from .executors.sync_pipeline_executor import SyncPipelineExecutor
 
@@ -190,6 +192,7 @@ class UnifiedCICDEngine:
                 execution.completed_at = timezone.now()
                 execution.logs = f"Execution failed: {str(e)}"
                 execution.save()
+                record_execution_status(execution)
             except Exception as save_error:
                 logger.error(f"Failed to save error state: {save_error}")
     
@@ -214,6 +217,7 @@ class UnifiedCICDEngine:
             execution.completed_at = timezone.now()
             execution.logs = "No pipeline steps or atomic steps found in pipeline"
             execution.save()
+            record_execution_status(execution)
             return
         
         logger.info(f"本地执行: 获取到 {len(pipeline_steps)} 个PipelineStep, {len(atomic_steps)} 个AtomicStep")
@@ -284,6 +288,7 @@ class UnifiedCICDEngine:
                 execution.logs = f"Parallel execution failed: {result.get('message', '')}"
             
             execution.save()
+            record_execution_status(execution)
             
             logger.info(f"Parallel pipeline execution completed: {execution.id} - {execution.status}")
             return result
@@ -337,6 +342,7 @@ class UnifiedCICDEngine:
                 execution.logs = f"Sequential execution with failure interruption failed: {result.get('message', '')}"
             
             execution.save()
+            record_execution_status(execution)
             
             success = result.get('success', False)
             logger.info(f"Local pipeline execution with failure interruption completed: {execution.id} - {'success' if success else 'failed'}")
@@ -363,17 +369,9 @@ class UnifiedCICDEngine:
             # 在外部工具上创建并执行流水线
             logger.info(f"Creating pipeline in {execution.cicd_tool.tool_type}")
             
-            # 运行异步代码
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            try:
-                # 创建并执行流水线
-                result = loop.run_until_complete(self._async_remote_execution(adapter, execution, pipeline_definition))
-                return result
-            finally:
-                loop.close()
+            # 在共享事件循环中创建并执行流水线，复用到 CI 服务器的连接
+            from .adapters.http_pool import run_async
+            return run_async(self._async_remote_execution(adapter, execution, pipeline_definition))
                 
         except Exception as e:
             logger.error(f"Remote execution failed for {execution.id}: {e}", exc_info=True)
@@ -382,6 +380,7 @@ class UnifiedCICDEngine:
             execution.completed_at = timezone.now()
             execution.logs = f"Remote execution failed: {str(e)}"
             execution.save()
+            record_execution_status(execution)
             return {'success': False, 'error_message': str(e)}
     
     async def _async_remote_execution(self, adapter, execution: PipelineExecution, pipeline_definition):
@@ -405,12 +404,13 @@ class UnifiedCICDEngine:
                 execution.status = 'running'
                 execution.started_at = timezone.now()
                 await sync_to_async(execution.save)(update_fields=['external_id', 'status', 'started_at'])
+                await sync_to_async(record_execution_status)(execution)
                 
                 logger.info(f"Pipeline created and triggered in {execution.cicd_tool.tool_type} with external ID: {external_id}")
                 
-                # 启动监控任务（在后台异步监控）
-                from .tasks import monitor_remote_execution
-                monitor_remote_execution.delay(execution.id)
+                # 交给远程执行跟踪器（webhook 更新 + 统一兜底轮询）
+                from .remote_tracker import start_tracking
+                await sync_to_async(start_tracking)(execution)
                 
                 return {'success': True, 'external_id': external_id}
             else:
@@ -528,54 +528,6 @@ class UnifiedCICDEngine:
             timeout=pipeline_config.get('timeout', 3600)
         )
     
-    async def _monitor_execution(self, execution: PipelineExecution, adapter):
-        """监控外部CI/CD工具的流水线执行状态"""
-        max_checks = 360  # 最多检查6小时 (每分钟检查一次)
-        check_count = 0
-        
-        while check_count < max_checks:
-            try:
-                status_data = await adapter.get_pipeline_status(execution.external_id)
-                current_status = status_data.get('status', 'unknown')
-                
-                # 更新执行状态
-                if current_status != execution.status:
-                    execution.status = current_status
-                    
-                    if current_status in ['success', 'failed', 'cancelled']:
-                        execution.completed_at = timezone.now()
-                        
-                        # 获取日志
-                        try:
-                            logs = await adapter.get_logs(execution.external_id)
-                            execution.logs = logs
-                        except Exception as e:
-                            logger.warning(f"Failed to get logs: {e}")
-                    
-                    await sync_to_async(execution.save)()
-                
-                # 如果执行完成，退出监控
-                if current_status in ['success', 'failed', 'cancelled', 'timeout']:
-                    logger.info(f"Pipeline execution completed: {execution.id} - {current_status}")
-                    break
-                
-                # 等待一分钟后再次检查
-                import asyncio
-                await asyncio.sleep(60)
-                check_count += 1
-            
-            except Exception as e:
-                logger.error(f"Error monitoring execution {execution.id}: {e}")
-                check_count += 1
-                import asyncio
-                await asyncio.sleep(60)
-        
-        # 如果超时仍未完成，标记为超时
-        if check_count >= max_checks:
-            execution.status = 'timeout'
-            execution.completed_at = timezone.now()
-            await sync_to_async(execution.save)()
-    
     async def cancel_execution(self, execution_id: int) -> bool:
         """取消流水线执行"""
         try:
@@ -603,6 +555,7 @@ class UnifiedCICDEngine:
                     execution.status = 'cancelled'
                     execution.completed_at = timezone.now()
                     await sync_to_async(execution.save)()
+                    await sync_to_async(record_execution_status)(execution)
                 
                 return success
         
@@ -617,35 +570,34 @@ class UnifiedCICDEngine:
                 lambda: PipelineExecution.objects.select_related('cicd_tool').get(id=execution_id)
             )()
             
-            # 首先尝试合并步骤日志
-            step_executions = await sync_to_async(
-                lambda: list(execution.step_executions.select_related('atomic_step', 'pipeline_step').all().order_by('order'))
-            )()
-            
-            if step_executions:
+            # 首先尝试合并步骤日志（日志分片按需读取，不再把合并结果回写到 logs 字段）
+            def combine_step_logs():
                 combined_logs = []
+                step_executions = execution.step_executions.select_related(
+                    'atomic_step', 'pipeline_step'
+                ).order_by('order')
                 for step in step_executions:
-                    if step.logs and step.logs.strip():
+                    step_logs = ExecutionLogger.get_execution_logs(step)
+                    if step_logs and step_logs.strip():
                         # 支持 pipeline_step 和 atomic_step
-                        step_name = await sync_to_async(lambda: step.step_name)()
-                        
-                        combined_logs.append(f"=== {step_name} ===")
-                        combined_logs.append(step.logs.strip())
+                        combined_logs.append(f"=== {step.step_name} ===")
+                        combined_logs.append(step_logs.strip())
                         combined_logs.append("")
-                
-                if combined_logs:
-                    logs = "\n".join(combined_logs)
-                    # 保存合并后的日志
-                    def save_logs():
-                        execution.logs = logs
-                        execution.save(update_fields=['logs'])
-                    
-                    await sync_to_async(save_logs)()
-                    return logs
+                return "\n".join(combined_logs)
+            
+            logs = await sync_to_async(combine_step_logs)()
+            if logs:
+                return logs
             
             # 如果没有步骤日志，但有执行日志，返回执行日志
-            if execution.logs:
-                return execution.logs
+            logs = await sync_to_async(ExecutionLogger.get_execution_logs)(execution)
+            if logs:
+                return logs
+            
+            # 增量跟踪的远程执行由 follow_remote_logs 定时读取，请求中只返回已写入的日志，不访问远程 CI
+            from .remote_log_follower import is_followed
+            if is_followed(execution):
+                return "日志跟踪中，暂无日志输出"
             
             # 如果是远程执行且有外部ID，从外部工具获取
             if execution.cicd_tool and execution.external_id:
@@ -0,0 +1,256 @@
+"""
+执行统计汇总维护与查询
+执行（PipelineExecution / PipelineRun）状态变化时，按其创建时间重算所在的分钟、小时、天三个桶；
+桶的内容总是由执行记录重新聚合得出，重复调用或乱序调用都不会算错。
+查询时把时间区间拆成尽量粗的整桶（天 -> 小时 -> 分钟），读取的行数与桶数成正比
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+from django.utils import timezone
+
+from .models import ExecutionStatsBucket, PipelineExecution
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_EXECUTION = 'pipeline_execution'
+PIPELINE_RUN = 'pipeline_run'
+
+GRANULARITY_STEPS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+# 从粗到细，区间拆分时优先使用粗粒度
+COARSE_TO_FINE = ('day', 'hour', 'minute')
+
+# 分钟桶只保留最近一段时间，更早的区间边缘按小时精度统计
+MINUTE_RETENTION = timedelta(days=2)
+
+COUNTER_FIELDS = ('total', 'success', 'failed', 'cancelled', 'duration_sum', 'duration_count')
+
+
+def _source_model(source: str):
+    if source == PIPELINE_EXECUTION:
+        return PipelineExecution
+    if source == PIPELINE_RUN:
+        from pipelines.models import PipelineRun
+        return PipelineRun
+    raise ValueError(f"未知的统计来源: {source}")
+
+
+def truncate(moment: datetime, granularity: str) -> datetime:
+    """把时间截断到桶起点（按当前时区）"""
+    moment = timezone.localtime(moment)
+    if granularity == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _aggregate_rows(source: str, start: datetime, end: datetime) -> Dict[str, Any]:
+    completed = Q(status__in=['success', 'failed'], started_at__isnull=False, completed_at__isnull=False)
+    result = _source_model(source).objects.filter(
+        created_at__gte=start, created_at__lt=end
+    ).aggregate(
+        total=Count('id'),
+        success=Count('id', filter=Q(status='success')),
+        failed=Count('id', filter=Q(status='failed')),
+        cancelled=Count('id', filter=Q(status__in=['cancelled', 'timeout'])),
+        duration=Sum(
+            ExpressionWrapper(F('completed_at') - F('started_at'), output_field=DurationField()),
+            filter=completed
+        ),
+        duration_count=Count('id', filter=completed),
+    )
+    duration = result.pop('duration')
+    result['duration_sum'] = duration.total_seconds() if duration else 0
+    return result
+
+
+def refresh_bucket(source: str, granularity: str, bucket_start: datetime) -> Optional[ExecutionStatsBucket]:
+    """由执行记录重算一个桶；桶内已没有执行时删除该桶"""
+    counters = _aggregate_rows(source, bucket_start, bucket_start + GRANULARITY_STEPS[granularity])
+    if not counters['total']:
+        ExecutionStatsBucket.objects.filter(
+            source=source, granularity=granularity, bucket_start=bucket_start
+        ).delete()
+        return None
+
+    bucket, _ = ExecutionStatsBucket.objects.update_or_create(
+        source=source, granularity=granularity, bucket_start=bucket_start, defaults=counters
+    )
+    return bucket
+
+
+def record_stats(source: str, instance) -> None:
+    """
+    执行创建或状态变化后调用，重算其所在的各粒度桶
+
+    更新失败只记录日志，不影响执行流程
+    """
+    try:
+        created_at = instance.created_at
+        if created_at is None:
+            return
+        for granularity in COARSE_TO_FINE:
+            if granularity == 'minute' and timezone.now() - created_at > MINUTE_RETENTION:
+                continue
+            refresh_bucket(source, granularity, truncate(created_at, granularity))
+    except Exception as e:
+        logger.warning(f"更新执行统计汇总失败: {source}={getattr(instance, 'id', None)} - {e}")
+
+
+def _cover(start: datetime, end: datetime) -> List[Tuple[str, datetime]]:
+    """把 [start, end) 拆成整桶列表；start 不在分钟边界时第一个分钟桶包含少量区间外的执行"""
+    minute_floor = timezone.now() - MINUTE_RETENTION
+    segments = []
+    current = truncate(start, 'minute')
+    while current < end:
+        for granularity in COARSE_TO_FINE:
+            step = GRANULARITY_STEPS[granularity]
+            if truncate(current, granularity) != current:
+                continue
+            if granularity != 'minute' and current + step > end:
+                continue
+            if granularity == 'minute' and current < minute_floor:
+                # 分钟桶已过保留期：退化为小时桶
+                granularity, current = 'hour', truncate(current, 'hour')
+                step = GRANULARITY_STEPS['hour']
+            segments.append((granularity, current))
+            current += step
+            break
+    return segments
+
+
+def aggregate(source: str, start: datetime, end: Optional[datetime] = None) -> Dict[str, Any]:
+    """统计 [start, end) 内创建的执行，每个粒度一次求和查询"""
+    end = end or timezone.now()
+    starts_by_granularity: Dict[str, List[datetime]] = {}
+    for granularity, bucket_start in _cover(start, end):
+        starts_by_granularity.setdefault(granularity, []).append(bucket_start)
+
+    totals = {field: 0 for field in COUNTER_FIELDS}
+    for granularity, starts in starts_by_granularity.items():
+        sums = ExecutionStatsBucket.objects.filter(
+            source=source, granularity=granularity, bucket_start__in=starts
+        ).aggregate(**{field: Sum(field) for field in COUNTER_FIELDS})
+        for field in COUNTER_FIELDS:
+            totals[field] += sums[field] or 0
+    return _with_rates(totals)
+
+
+def total(source: str) -> int:
+    """全部执行数：天桶不裁剪，求和即可"""
+    return ExecutionStatsBucket.objects.filter(
+        source=source, granularity='day'
+    ).aggregate(total=Sum('total'))['total'] or 0
+
+
+def daily_series(source: str, days: int, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """最近 days 天（含今天）的按天统计，一次查询"""
+    last_day = truncate(end or timezone.now(), 'day')
+    first_day = last_day - timedelta(days=days - 1)
+    buckets = {
+        bucket['bucket_start']: bucket
+        for bucket in ExecutionStatsBucket.objects.filter(
+            source=source, granularity='day', bucket_start__gte=first_day, bucket_start__lte=last_day
+        ).values('bucket_start', *COUNTER_FIELDS)
+    }
+
+    series = []
+    for index in range(days):
+        day = first_day + timedelta(days=index)
+        bucket = buckets.get(day) or {field: 0 for field in COUNTER_FIELDS}
+        series.append({'date': day.date().isoformat(), **_with_rates(bucket)})
+    return series
+
+
+def _with_rates(counters: Dict[str, Any]) -> Dict[str, Any]:
+    total = counters['total']
+    duration_count = counters['duration_count']
+    return {
+        **{field: counters[field] for field in COUNTER_FIELDS},
+        'success_rate': counters['success'] / total * 100 if total else 0,
+        'avg_duration': counters['duration_sum'] / duration_count if duration_count else 0,
+    }
+
+
+def backfill(source: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             granularities=COARSE_TO_FINE) -> int:
+    """
+    按执行记录回填 [start, end) 内的桶：对每个粒度按截断后的创建时间分组聚合，
+    一个粒度一次查询；返回写入的桶数
+    """
+    model = _source_model(source)
+    end = end or timezone.now()
+    written = 0
+    completed = Q(status__in=['success', 'failed'], started_at__isnull=False, completed_at__isnull=False)
+    trunc_functions = {'minute': TruncMinute, 'hour': TruncHour, 'day': TruncDay}
+
+    for granularity in granularities:
+        range_start = start
+        if granularity == 'minute':
+            retention_start = timezone.now() - MINUTE_RETENTION
+            range_start = max(start, retention_start) if start else retention_start
+
+        rows = model.objects.filter(created_at__lt=end)
+        if range_start:
+            rows = rows.filter(created_at__gte=truncate(range_start, granularity))
+        grouped = rows.annotate(
+            bucket_start=trunc_functions[granularity]('created_at')
+        ).values('bucket_start').annotate(
+            total=Count('id'),
+            success=Count('id', filter=Q(status='success')),
+            failed=Count('id', filter=Q(status='failed')),
+            cancelled=Count('id', filter=Q(status__in=['cancelled', 'timeout'])),
+            duration=Sum(
+                ExpressionWrapper(F('completed_at') - F('started_at'), output_field=DurationField()),
+                filter=completed
+            ),
+            duration_count=Count('id', filter=completed),
+        ).order_by('bucket_start')
+
+        for row in grouped.iterator():
+            duration = row.pop('duration')
+            bucket_start = row.pop('bucket_start')
+            ExecutionStatsBucket.objects.update_or_create(
+                source=source, granularity=granularity, bucket_start=bucket_start,
+                defaults={**row, 'duration_sum': duration.total_seconds() if duration else 0}
+            )
+            written += 1
+    return written
+
+
+def prune_minute_buckets() -> int:
+    """删除超过保留期的分钟桶"""
+    deleted, _ = ExecutionStatsBucket.objects.filter(
+        granularity='minute', bucket_start__lt=timezone.now() - MINUTE_RETENTION - timedelta(minutes=1)
+    ).delete()
+    return deleted
+
+
+# ---- PipelineRun 状态变化跟踪 ----
+# PipelineRun 在多处直接 save()，通过信号在创建或状态/完成时间变化时重算
+
+def _remember_run_state(sender, instance, **kwargs):
+    instance._stats_state = (instance.status, instance.completed_at)
+
+
+def _run_saved(sender, instance, created, **kwargs):
+    state = (instance.status, instance.completed_at)
+    if created or state != getattr(instance, '_stats_state', None):
+        instance._stats_state = state
+        record_stats(PIPELINE_RUN, instance)
+
+
+def connect_run_signals():
+    from django.db.models.signals import post_init, post_save
+    from pipelines.models import PipelineRun
+
+    post_init.connect(_remember_run_state, sender=PipelineRun, dispatch_uid='stats_rollup_run_init')
+    post_save.connect(_run_saved, sender=PipelineRun, dispatch_uid='stats_rollup_run_saved')
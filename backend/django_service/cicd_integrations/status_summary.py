@@ -0,0 +1,114 @@
+"""
+流水线状态汇总读模型维护
+执行状态变化时更新 PipelineStatusSummary：最近一次执行的ID/状态/时间，
+以及最近若干次已结束执行的成功率和平均耗时
+"""
+import logging
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+
+from .models import PipelineExecution, PipelineStatusSummary
+from .stats_rollup import PIPELINE_EXECUTION, record_stats
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('success', 'failed', 'cancelled', 'timeout')
+
+
+def _duration_seconds(execution: PipelineExecution) -> Optional[float]:
+    if execution.started_at and execution.completed_at:
+        return round((execution.completed_at - execution.started_at).total_seconds(), 3)
+    return None
+
+
+def _apply_rolling_stats(summary: PipelineStatusSummary):
+    results = summary.recent_results
+    summary.success_rate = (
+        sum(1 for _, status, _ in results if status == 'success') / len(results) if results else 0
+    )
+    durations = [duration for _, _, duration in results if duration is not None]
+    summary.avg_duration = sum(durations) / len(durations) if durations else None
+
+
+def _apply_execution(summary: PipelineStatusSummary, execution: PipelineExecution):
+    # 只有更新（或同一次）的执行才能覆盖“最近一次执行”
+    if summary.last_execution_id is None or execution.id >= summary.last_execution_id:
+        summary.last_execution_id = execution.id
+        summary.last_execution_status = execution.status
+        summary.last_execution_time = execution.started_at or execution.created_at
+
+    if execution.status in TERMINAL_STATUSES:
+        results = [result for result in summary.recent_results if result[0] != execution.id]
+        results.append([execution.id, execution.status, _duration_seconds(execution)])
+        results.sort(key=lambda result: result[0])
+        summary.recent_results = results[-PipelineStatusSummary.ROLLING_WINDOW:]
+        _apply_rolling_stats(summary)
+
+
+def record_execution_status(execution: PipelineExecution) -> Optional[PipelineStatusSummary]:
+    """
+    执行状态变化后调用，更新所属流水线的状态汇总
+
+    更新失败只记录日志，不影响执行流程；同时重算执行统计汇总桶
+    """
+    record_stats(PIPELINE_EXECUTION, execution)
+    try:
+        pipeline = execution.pipeline
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    summary = PipelineStatusSummary.objects.select_for_update().filter(
+                        pipeline_id=pipeline.id
+                    ).first()
+                    if summary is None:
+                        summary = PipelineStatusSummary(
+                            pipeline=pipeline,
+                            project_id=pipeline.project_id,
+                            pipeline_name=pipeline.name,
+                            project_name=pipeline.project.name if pipeline.project_id else '',
+                        )
+                        _apply_execution(summary, execution)
+                        summary.save(force_insert=True)
+                    else:
+                        summary.pipeline_name = pipeline.name
+                        _apply_execution(summary, execution)
+                        summary.save()
+                    return summary
+            except IntegrityError:
+                # 并发创建同一流水线的汇总，重试一次走更新分支
+                if attempt:
+                    raise
+    except Exception as e:
+        logger.warning(f"更新流水线状态汇总失败: execution={execution.id} - {e}")
+    return None
+
+
+def rebuild_status_summary(pipeline) -> Optional[PipelineStatusSummary]:
+    """根据执行记录重建一条流水线的状态汇总（用于回填或修复）"""
+    executions = list(
+        PipelineExecution.objects.filter(pipeline_id=pipeline.id)
+        .order_by('-id')[:PipelineStatusSummary.ROLLING_WINDOW * 2]
+    )
+    if not executions:
+        PipelineStatusSummary.objects.filter(pipeline_id=pipeline.id).delete()
+        return None
+
+    latest = executions[0]
+    summary = PipelineStatusSummary(
+        pipeline=pipeline,
+        project_id=pipeline.project_id,
+        pipeline_name=pipeline.name,
+        project_name=pipeline.project.name if pipeline.project_id else '',
+        last_execution_id=latest.id,
+        last_execution_status=latest.status,
+        last_execution_time=latest.started_at or latest.created_at,
+    )
+    terminal = [execution for execution in reversed(executions) if execution.status in TERMINAL_STATUSES]
+    summary.recent_results = [
+        [execution.id, execution.status, _duration_seconds(execution)]
+        for execution in terminal[-PipelineStatusSummary.ROLLING_WINDOW:]
+    ]
+    _apply_rolling_stats(summary)
+    summary.save()
+    return summary
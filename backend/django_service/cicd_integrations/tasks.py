@@ -6,7 +6,6 @@ from django.utils import timezone
 from django.db import transaction
 from typing import Dict, Any, List, Optional
 import logging
-import asyncio
 import json
 from datetime import datetime, timedelta
 
@@ -15,7 +14,11 @@ from .models import (
 )
 from pipelines.models import Pipeline
 from .services import UnifiedCICDEngine
+from .status_summary import record_execution_status
+from .health_checks import check_tools
 from .adapters import get_adapter
+from .adapters.http_pool import run_async
+from common.execution_logger import ExecutionLogger
 from celery import shared_task
 
 logger = logging.getLogger(__name__)
@@ -56,6 +59,7 @@ def execute_pipeline_async(self, execution_id: int):
         execution.status = 'running'
         execution.started_at = timezone.now()
         execution.save(update_fields=['status', 'started_at'])
+        record_execution_status(execution)
         
         logger.info(f"Starting pipeline execution {execution_id}")
         
@@ -85,6 +89,7 @@ def execute_pipeline_async(self, execution_id: int):
             execution.completed_at = timezone.now()
             execution.logs = str(e)
             execution.save(update_fields=['status', 'completed_at', 'logs'])
+            record_execution_status(execution)
         except:
             pass
         
@@ -99,78 +104,11 @@ def execute_pipeline_async(self, execution_id: int):
 @medium_priority_task(bind=True)
 def health_check_tools(self):
     """
-    定期健康检查所有CI/CD工具
+    定期健康检查所有CI/CD工具（并发检查，结果批量写回）
     """
     # 修复：使用正确的字段名和状态值
-    tools = CICDTool.objects.filter(status__in=['active', 'authenticated'])
-    results = []
-    
-    for tool in tools:
-        try:
-            adapter = get_adapter(tool.tool_type)(
-                base_url=tool.base_url,
-                username=tool.username,
-                token=tool.token,
-                **tool.config
-            )
-            
-            # 创建异步事件循环进行健康检查
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            is_healthy = loop.run_until_complete(adapter.health_check())
-            loop.close()
-            
-            # 更新工具状态
-            tool.last_health_check = timezone.now()
-            
-            # 在 metadata 中存储健康状态
-            if not tool.metadata:
-                tool.metadata = {}
-            tool.metadata['health_status'] = 'healthy' if is_healthy else 'unhealthy'
-            tool.metadata['last_health_check_result'] = is_healthy
-            
-            # 根据健康检查结果更新 status
-            if is_healthy:
-                if tool.status not in ['active', 'authenticated']:
-                    tool.status = 'authenticated'
-            else:
-                if tool.status not in ['offline', 'error']:
-                    tool.status = 'needs_auth'
-            
-            tool.save(update_fields=['last_health_check', 'metadata', 'status'])
-            
-            results.append({
-                'tool_id': tool.id,
-                'tool_name': tool.name,
-                'tool_type': tool.tool_type,
-                'status': 'healthy' if is_healthy else 'unhealthy'
-            })
-            
-            logger.info(f"Health check for tool {tool.name}: {'healthy' if is_healthy else 'unhealthy'}")
-            
-        except Exception as e:
-            tool.last_health_check = timezone.now()
-            
-            # 在 metadata 中存储错误状态
-            if not tool.metadata:
-                tool.metadata = {}
-            tool.metadata['health_status'] = 'error'
-            tool.metadata['last_error'] = str(e)
-            
-            # 设置错误状态
-            tool.status = 'error'
-            tool.save(update_fields=['last_health_check', 'metadata', 'status'])
-            
-            results.append({
-                'tool_id': tool.id,
-                'tool_name': tool.name,
-                'tool_type': tool.tool_type,
-                'status': 'error',
-                'error': str(e)
-            })
-            
-            logger.error(f"Health check failed for tool {tool.name}: {e}")
+    tools = list(CICDTool.objects.filter(status__in=['active', 'authenticated']))
+    results = check_tools(tools)
     
     return {
         'timestamp': timezone.now().isoformat(),
@@ -212,26 +150,21 @@ def sync_tool_jobs(tool_id: int):
     try:
         tool = CICDTool.objects.get(id=tool_id)
         
-        adapter = get_adapter(tool.tool_type)(
+        adapter = get_adapter(
+            tool.tool_type,
             base_url=tool.base_url,
             username=tool.username,
             token=tool.token,
             **tool.config
         )
         
-        # 创建异步事件循环
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         # 获取工具中的作业列表
         if tool.tool_type == 'jenkins':
-            jobs = loop.run_until_complete(adapter.list_jobs())
+            jobs = run_async(adapter.list_jobs())
         else:
             # 其他工具类型的同步逻辑
             jobs = []
         
-        loop.close()
-        
         synced_jobs = []
         for job in jobs:
             synced_jobs.append({
@@ -411,6 +344,7 @@ def _process_jenkins_build_event(payload: Dict[str, Any]) -> Dict[str, Any]:
         
         execution.logs = json.dumps(payload, indent=2)
         execution.save()
+        record_execution_status(execution)
         
         updated_executions.append({
             'execution_id': execution.id,
@@ -570,6 +504,7 @@ def execute_pipeline_task(self, execution_id: int, pipeline_id: int, trigger_typ
         execution.status = 'running'
         execution.started_at = timezone.now()
         execution.save(update_fields=['status', 'started_at'])
+        record_execution_status(execution)
         
         # 创建统一CICD引擎实例
         engine = UnifiedCICDEngine()
@@ -584,6 +519,7 @@ def execute_pipeline_task(self, execution_id: int, pipeline_id: int, trigger_typ
             execution.status = final_status
             execution.completed_at = timezone.now()
             execution.save(update_fields=['status', 'completed_at'])
+            record_execution_status(execution)
         
         logger.info(f"流水线任务执行完成: execution_id={execution_id}, success={result.get('success', False) if result else False}")
         
@@ -605,8 +541,9 @@ def execute_pipeline_task(self, execution_id: int, pipeline_id: int, trigger_typ
             execution = PipelineExecution.objects.get(id=execution_id)
             execution.status = 'failed'
             execution.completed_at = timezone.now()
-            execution.logs = (execution.logs or '') + f"\n任务执行错误: {str(e)}"
-            execution.save(update_fields=['status', 'completed_at', 'logs'])
+            execution.save(update_fields=['status', 'completed_at'])
+            record_execution_status(execution)
+            ExecutionLogger.update_execution_logs(execution, f"任务执行错误: {str(e)}", append=True)
         except:
             pass
         
@@ -1107,225 +1044,95 @@ def create_jenkins_job_config_for_step(step: AtomicStep) -> str:
 @shared_task(bind=True)
 def monitor_remote_execution(self, execution_id: int):
     """
-    监控远程CI/CD工具的流水线执行状态
+    登记远程CI/CD工具的流水线执行，交由远程执行跟踪器处理
+    
+    状态以 webhook 为主，兜底轮询由 reconcile_remote_executions 统一完成，不再为每个执行占用 worker
     
     Args:
         execution_id: PipelineExecution 的 ID
     """
+    from .remote_tracker import start_tracking
+    
     try:
-        execution = PipelineExecution.objects.select_related('cicd_tool').get(id=execution_id)
-        
-        if not execution.cicd_tool or not execution.external_id:
+        execution = PipelineExecution.objects.get(id=execution_id)
+        if not execution.cicd_tool_id or not execution.external_id:
             logger.error(f"No CI/CD tool or external ID for execution {execution_id}")
             return
-        
-        logger.info(f"Starting monitoring for remote execution {execution_id} (external ID: {execution.external_id})")
-        
-        from .adapters import AdapterFactory
-        
-        # 创建适配器
-        adapter = AdapterFactory.create_adapter(
-            execution.cicd_tool.tool_type,
-            base_url=execution.cicd_tool.base_url,
-            username=execution.cicd_tool.username,
-            token=execution.cicd_tool.token,
-            **execution.cicd_tool.config
-        )
-        
-        # 运行异步监控
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(
-                _async_monitor_remote_execution(adapter, execution)
-            )
-            return result
-        finally:
-            loop.close()
-            
+        start_tracking(execution)
     except PipelineExecution.DoesNotExist:
         logger.error(f"Pipeline execution {execution_id} not found")
-    except Exception as e:
-        logger.error(f"Error monitoring remote execution {execution_id}: {e}", exc_info=True)
-        
-        # 如果监控失败，标记执行为失败状态
-        try:
-            execution = PipelineExecution.objects.get(id=execution_id)
-            if execution.status in ['pending', 'running']:
-                execution.status = 'failed'
-                execution.completed_at = timezone.now()
-                execution.logs = f"Monitoring failed: {str(e)}"
-                execution.save()
-        except:
-            pass
 
 
-async def _async_monitor_remote_execution(adapter, execution: PipelineExecution):
-    """异步监控远程执行"""
-    from asgiref.sync import sync_to_async
+@medium_priority_task(bind=True)
+def reconcile_remote_executions(self):
+    """
+    远程执行状态兜底：先处理已到达的 webhook 事件，再统一检查到期的进行中执行
+    """
+    from .remote_tracker import consume_remote_events, reconcile_remote_executions as reconcile
     
-    max_checks = 360  # 最多检查6小时 (每分钟检查一次)
-    check_count = 0
+    try:
+        events = consume_remote_events()
+    except Exception as e:
+        logger.warning(f"Failed to consume remote execution events: {e}")
+        events = 0
     
-    async with adapter:
-        while check_count < max_checks:
-            try:
-                # 获取执行状态
-                status_data = await adapter.get_pipeline_status(execution.external_id)
-                current_status = status_data.get('status', 'unknown')
-                
-                logger.info(f"Remote execution {execution.id} status: {current_status}")
-                
-                # 映射外部状态到内部状态
-                internal_status = _map_external_status(current_status)
-                
-                # 更新执行状态
-                if internal_status != execution.status:
-                    execution.status = internal_status
-                    
-                    # 更新所有步骤的状态
-                    await _update_step_executions_status(execution, internal_status)
-                    
-                    if internal_status in ['success', 'failed', 'cancelled']:
-                        execution.completed_at = timezone.now()
-                        
-                        # 获取日志
-                        try:
-                            logs = await adapter.get_logs(execution.external_id)
-                            execution.logs = logs
-                        except Exception as e:
-                            logger.warning(f"Failed to get logs for {execution.external_id}: {e}")
-                            execution.logs = f"Execution completed but failed to get logs: {str(e)}"
-                    
-                    await sync_to_async(execution.save)()
-                    logger.info(f"Updated execution {execution.id} status to {internal_status}")
-                
-                # 如果执行完成，退出监控
-                if internal_status in ['success', 'failed', 'cancelled', 'timeout']:
-                    logger.info(f"Remote execution monitoring completed: {execution.id} - {internal_status}")
-                    return {'status': 'completed', 'final_status': internal_status}
-                
-                # 等待1分钟后再次检查
-                await asyncio.sleep(60)
-                check_count += 1
-            
-            except Exception as e:
-                logger.error(f"Error checking remote execution status: {e}")
-                check_count += 1
-                await asyncio.sleep(60)
-        
-        # 如果超时仍未完成，标记为超时
-        if check_count >= max_checks:
-            logger.warning(f"Remote execution monitoring timeout: {execution.id}")
-            execution.status = 'timeout'
-            execution.completed_at = timezone.now()
-            execution.logs = execution.logs + "\n\nExecution timed out after 6 hours"
-            
-            # 更新步骤状态为超时
-            await _update_step_executions_status(execution, 'timeout')
-            
-            await sync_to_async(execution.save)()
-            return {'status': 'timeout'}
-
-
-def _map_external_status(external_status: str) -> str:
-    """映射外部CI/CD工具的状态到内部状态"""
-    status_mapping = {
-        # Jenkins
-        'SUCCESS': 'success',
-        'FAILURE': 'failed',
-        'ABORTED': 'cancelled',
-        'UNSTABLE': 'failed',
-        'IN_PROGRESS': 'running',
-        'NOT_BUILT': 'pending',
-        # GitLab CI
-        'success': 'success',
-        'failed': 'failed',
-        'canceled': 'cancelled',
-        'cancelled': 'cancelled',
-        'running': 'running',
-        'pending': 'pending',
-        'created': 'pending',
-        'manual': 'pending',
-        # GitHub Actions
-        'completed': 'success',
-        'failure': 'failed',
-        'cancelled': 'cancelled',
-        'in_progress': 'running',
-        'queued': 'pending',
-        'requested': 'pending',
-        # 通用状态
-        'unknown': 'running',
-        'error': 'failed'
-    }
+    result = reconcile()
+    result['events'] = events
+    if events or result['checked']:
+        logger.info(f"Remote execution reconcile: {result}")
+    return result
+
+
+@medium_priority_task(bind=True)
+def follow_remote_logs(self):
+    """
+    增量读取远程执行（Jenkins / GitLab CI）的新增日志并推送给订阅者
+    """
+    from .remote_log_follower import follow_remote_logs as follow
     
-    return status_mapping.get(external_status.lower(), 'running')
+    result = follow()
+    if result['appended'] or result['completed']:
+        logger.debug(f"Remote log follow: {result}")
+    return result
 
 
-async def _update_step_executions_status(execution: PipelineExecution, pipeline_status: str):
-    """更新步骤执行状态"""
-    from asgiref.sync import sync_to_async
-    from .models import StepExecution
+@shared_task
+def fetch_remote_execution_logs(execution_id: int):
+    """远程执行结束后获取日志：增量跟踪的执行只补读剩余部分，其余获取完整日志"""
+    from .adapters import AdapterFactory
+    from .remote_log_follower import follow_executions, is_followed
     
     try:
-        logger.info(f"Updating step executions for pipeline {execution.id} to status {pipeline_status}")
-        
-        # 获取所有步骤执行记录（预取关联对象）
-        step_executions = await sync_to_async(list)(
-            StepExecution.objects.filter(pipeline_execution=execution)
-            .select_related('atomic_step')
-            .order_by('order')
+        execution = PipelineExecution.objects.select_related('cicd_tool').get(id=execution_id)
+    except PipelineExecution.DoesNotExist:
+        logger.error(f"Pipeline execution {execution_id} not found")
+        return
+    
+    tool = execution.cicd_tool
+    if not tool or not execution.external_id:
+        return
+    
+    if is_followed(execution):
+        # 拿不到跟踪锁时由 follow_remote_logs 在结束后的补读窗口内读完
+        follow_executions([execution])
+        return
+    
+    async def fetch():
+        adapter = AdapterFactory.create_adapter(
+            tool.tool_type,
+            base_url=tool.base_url,
+            username=tool.username,
+            token=tool.token,
+            **tool.config
         )
-        
-        if not step_executions:
-            logger.info(f"No step executions found for pipeline execution {execution.id}")
-            return
-        
-        logger.info(f"Found {len(step_executions)} step executions for pipeline {execution.id}")
-        for i, step in enumerate(step_executions):
-            # 由于我们使用了 select_related，atomic_step 已经预取，可以安全访问
-            logger.info(f"  Step {i+1}: {step.atomic_step.name} - current status: {step.status}")
-        
-        # 根据流水线状态更新步骤状态
-        if pipeline_status == 'running':
-            # 如果流水线正在运行，将第一个步骤设为running，其他保持pending
-            for i, step_exec in enumerate(step_executions):
-                if i == 0 and step_exec.status == 'pending':
-                    step_exec.status = 'running'
-                    step_exec.started_at = timezone.now()
-                    await sync_to_async(step_exec.save)()
-                    logger.info(f"Updated step {step_exec.atomic_step.name} to running")
-                    break
-        
-        elif pipeline_status in ['success', 'failed', 'cancelled', 'timeout']:
-            # 如果流水线完成，更新所有步骤状态
-            if pipeline_status == 'success':
-                final_step_status = 'success'
-            elif pipeline_status == 'timeout':
-                final_step_status = 'timeout'
-            else:
-                final_step_status = 'failed'  # failed, cancelled 都映射为 failed
-            
-            logger.info(f"Setting all pending/running steps to {final_step_status}")
-            
-            updated_count = 0
-            for step_exec in step_executions:
-                if step_exec.status in ['pending', 'running']:
-                    logger.info(f"Updating step {step_exec.atomic_step.name} from {step_exec.status} to {final_step_status}")
-                    step_exec.status = final_step_status
-                    step_exec.completed_at = timezone.now()
-                    if not step_exec.started_at:
-                        step_exec.started_at = step_exec.completed_at
-                    await sync_to_async(step_exec.save)()
-                    updated_count += 1
-                    logger.info(f"Successfully updated step {step_exec.atomic_step.name} to {final_step_status}")
-                else:
-                    logger.info(f"Step {step_exec.atomic_step.name} already has final status {step_exec.status}")
-            
-            logger.info(f"Updated {updated_count} step executions to {final_step_status}")
-        
-        logger.info(f"Finished updating step executions for pipeline {execution.id}")
-        
+        async with adapter:
+            return await adapter.get_logs(execution.external_id)
+    
+    try:
+        logs = run_async(fetch())
     except Exception as e:
-        logger.error(f"Failed to update step execution status for pipeline {execution.id}: {e}", exc_info=True)
+        logger.warning(f"Failed to get logs for {execution.external_id}: {e}")
+        logs = f"Execution completed but failed to get logs: {str(e)}"
+    
+    execution.logs = logs
+    execution.save(update_fields=['logs'])
@@ -1,3 +1,394 @@
-from django.test import TestCase
+import asyncio
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from . import remote_log_follower, remote_tracker
+from .adapters.gitlab_ci import GitLabCIAdapter
+from .adapters.http_pool import get_cached_token, invalidate_token, set_cached_token
+from .adapters.jenkins import JenkinsAdapter
+from .executors.dependency_resolver import DependencyResolver, StepNode
+from .executors.step_worker_pool import StepWorkerPool
+from .executors.step_cache import StepResultCache
+from .models import CICDTool, PipelineExecution, PipelineStatusSummary
+from .status_summary import _apply_execution
+from .stats_rollup import GRANULARITY_STEPS, _cover, truncate
+from .remote_log_follower import complete_utf8_length, take_lines
+from .remote_tracker import map_external_status
+
+
+class DependencyResolverSchedulingTests(SimpleTestCase):
+    """依赖计数调度测试"""
+
+    def _build_resolver(self):
+        resolver = DependencyResolver()
+        resolver.add_step(StepNode(1, 'checkout', 'fetch_code', [], {}))
+        resolver.add_step(StepNode(2, 'build', 'build', [1], {}, priority=2))
+        resolver.add_step(StepNode(3, 'lint', 'test', [1], {}, priority=1))
+        resolver.add_step(StepNode(4, 'deploy', 'deploy', [2, 3], {}))
+        return resolver
+
+    def test_reset_returns_root_steps(self):
+        resolver = self._build_resolver()
+        self.assertEqual(resolver.reset_pending_counts(), [1])
+
+    def test_mark_completed_releases_dependents_in_priority_order(self):
+        resolver = self._build_resolver()
+        resolver.reset_pending_counts()
+        self.assertEqual(resolver.mark_step_completed(1), [3, 2])
+        self.assertEqual(resolver.mark_step_completed(2), [])
+        self.assertEqual(resolver.mark_step_completed(3), [4])
+
+
+class StepWorkerPoolTests(SimpleTestCase):
+    """共享步骤线程池测试"""
+
+    def test_per_pipeline_limit_is_enforced(self):
+        pool = StepWorkerPool(max_workers=4, per_pipeline_limit=1)
+        release = threading.Event()
+        lock = threading.Lock()
+        running = {'current': 0, 'peak': 0}
+
+        def task():
+            with lock:
+                running['current'] += 1
+                running['peak'] = max(running['peak'], running['current'])
+            release.wait(timeout=5)
+            with lock:
+                running['current'] -= 1
+            return True
+
+        futures = [pool.submit('pipeline-a', task) for _ in range(3)]
+        other = pool.submit('pipeline-b', lambda: 'done')
+
+        self.assertEqual(other.result(timeout=5), 'done')
+        release.set()
+        self.assertTrue(all(future.result(timeout=5) for future in futures))
+        self.assertEqual(running['peak'], 1)
+
+    def test_exceptions_propagate_to_future(self):
+        pool = StepWorkerPool(max_workers=1, per_pipeline_limit=1)
+
+        def fail():
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            pool.submit('pipeline-a', fail).result(timeout=5)
+
+
+class StepResultCacheKeyTests(SimpleTestCase):
+    """步骤结果缓存键测试"""
+
+    def setUp(self):
+        self.cache = StepResultCache(cacheable_step_types=['build'])
+
+    def test_volatile_variables_do_not_change_key(self):
+        first = self.cache.build_key('build', {'build_command': 'make'}, {'EXECUTION_ID': '1', 'CI': 'true'})
+        second = self.cache.build_key('build', {'build_command': 'make'}, {'EXECUTION_ID': '2', 'CI': 'true'})
+        self.assertEqual(first, second)
+
+    def test_inputs_and_upstream_change_key(self):
+        base = self.cache.build_key('build', {}, input_fingerprints={'__source__': 'abc'})
+        self.assertNotEqual(base, self.cache.build_key('build', {}, input_fingerprints={'__source__': 'def'}))
+        self.assertNotEqual(base, self.cache.build_key(
+            'build', {}, input_fingerprints={'__source__': 'abc'},
+            upstream_outputs={'step_1': {'status': 'success'}}
+        ))
+
+    def test_step_config_overrides_cacheable_types(self):
+        self.assertTrue(self.cache.is_cacheable('build'))
+        self.assertFalse(self.cache.is_cacheable('build', {'cache': False}))
+        self.assertTrue(self.cache.is_cacheable('deploy', {'cache': True}))
+
+
+class PipelineStatusSummaryTests(SimpleTestCase):
+    """流水线状态汇总更新测试"""
+
+    def _execution(self, execution_id, status, seconds=None):
+        started_at = timezone.now()
+        return PipelineExecution(
+            id=execution_id, status=status, started_at=started_at,
+            completed_at=started_at + timedelta(seconds=seconds) if seconds is not None else None
+        )
+
+    def test_rolling_stats_count_each_execution_once(self):
+        summary = PipelineStatusSummary()
+        _apply_execution(summary, self._execution(1, 'running'))
+        _apply_execution(summary, self._execution(1, 'success', 10))
+        _apply_execution(summary, self._execution(1, 'success', 10))
+        _apply_execution(summary, self._execution(2, 'failed', 30))
+
+        self.assertEqual(summary.last_execution_id, 2)
+        self.assertEqual(summary.last_execution_status, 'failed')
+        self.assertEqual(len(summary.recent_results), 2)
+        self.assertEqual(summary.success_rate, 0.5)
+        self.assertEqual(summary.avg_duration, 20)
+
+    def test_older_execution_does_not_replace_latest(self):
+        summary = PipelineStatusSummary()
+        _apply_execution(summary, self._execution(5, 'running'))
+        _apply_execution(summary, self._execution(4, 'success', 5))
+
+        self.assertEqual(summary.last_execution_id, 5)
+        self.assertEqual(summary.last_execution_status, 'running')
+        self.assertEqual(summary.success_rate, 1)
+
+    def test_window_keeps_most_recent_results(self):
+        summary = PipelineStatusSummary()
+        for execution_id in range(1, PipelineStatusSummary.ROLLING_WINDOW + 6):
+            _apply_execution(summary, self._execution(execution_id, 'success', 1))
+
+        self.assertEqual(len(summary.recent_results), PipelineStatusSummary.ROLLING_WINDOW)
+        self.assertEqual(summary.recent_results[0][0], 6)
+
+
+class ExecutionStatsCoverTests(SimpleTestCase):
+    """统计区间拆分测试"""
+
+    def test_cover_is_contiguous(self):
+        end = truncate(timezone.now(), 'hour')
+        start = end - timedelta(hours=25, minutes=30)
+        segments = _cover(start, end)
+
+        current = start
+        for granularity, bucket_start in segments:
+            self.assertEqual(bucket_start, current)
+            current = bucket_start + GRANULARITY_STEPS[granularity]
+        self.assertEqual(current, end)
+        self.assertEqual(sum(1 for granularity, _ in segments if granularity == 'minute'), 30)
+
+    def test_expired_minutes_fall_back_to_hour_buckets(self):
+        start = truncate(timezone.now() - timedelta(days=10), 'hour') + timedelta(minutes=30)
+        segments = _cover(start, start + timedelta(hours=2))
+
+        self.assertEqual(segments[0], ('hour', truncate(start, 'hour')))
+        self.assertNotIn('minute', [granularity for granularity, _ in segments])
+
+
+class RemoteStatusMappingTests(SimpleTestCase):
+    """远程状态映射测试"""
+
+    def test_maps_tool_specific_statuses(self):
+        self.assertEqual(map_external_status('FAILURE'), 'failed')
+        self.assertEqual(map_external_status('canceled'), 'cancelled')
+        self.assertEqual(map_external_status('queued'), 'pending')
+
+    def test_unknown_status_keeps_execution_running(self):
+        self.assertEqual(map_external_status('waiting'), 'running')
+        self.assertEqual(map_external_status(None), 'running')
+
+
+class RemoteEventConsumeTests(SimpleTestCase):
+    """远程执行事件消费测试"""
+
+    def test_claims_stale_events_and_removes_idle_consumers(self):
+        connection = mock.Mock()
+        connection.xautoclaim.return_value = [b'0-0', [(b'1-0', {b'execution_id': b'7'}), (b'2-0', None)], []]
+        connection.xinfo_consumers.return_value = [
+            {'name': 'gone-1', 'pending': 0, 'idle': 7200 * 1000},
+            {'name': 'busy-2', 'pending': 3, 'idle': 7200 * 1000},
+            {'name': 'live-3', 'pending': 0, 'idle': 1000},
+        ]
+        connection.xreadgroup.return_value = []
+
+        with mock.patch.object(remote_tracker, '_get_redis_connection', return_value=connection), \
+                mock.patch.object(remote_tracker, 'handle_remote_event') as handle:
+            processed = remote_tracker.consume_remote_events()
+
+        self.assertEqual(processed, 1)
+        handle.assert_called_once_with({'execution_id': '7'})
+        self.assertEqual(connection.xack.call_count, 2)
+        connection.xgroup_delconsumer.assert_called_once_with(
+            remote_tracker.REMOTE_RUN_EVENTS_STREAM, remote_tracker.CONSUMER_GROUP, 'gone-1'
+        )
+
+
+class HttpPoolTokenCacheTests(SimpleTestCase):
+    """共享客户端短期令牌缓存测试"""
+
+    class _Client:
+        pass
+
+    def test_token_cached_per_client_until_expiry(self):
+        client, other = self._Client(), self._Client()
+        set_cached_token(client, 'jenkins-crumb', ('Jenkins-Crumb', 'abc'), ttl=60)
+
+        self.assertEqual(get_cached_token(client, 'jenkins-crumb'), ('Jenkins-Crumb', 'abc'))
+        self.assertIsNone(get_cached_token(other, 'jenkins-crumb'))
+
+        set_cached_token(client, 'jenkins-crumb', ('Jenkins-Crumb', 'abc'), ttl=0)
+        self.assertIsNone(get_cached_token(client, 'jenkins-crumb'))
+
+    def test_invalidate_token(self):
+        client = self._Client()
+        set_cached_token(client, 'jenkins-crumb', ('Jenkins-Crumb', 'abc'), ttl=60)
+        invalidate_token(client, 'jenkins-crumb')
+
+        self.assertIsNone(get_cached_token(client, 'jenkins-crumb'))
+
+
+class RemoteLogIncrementTests(SimpleTestCase):
+    """远程日志增量拼接测试"""
+
+    def test_partial_line_carried_to_next_read(self):
+        text, pending = take_lines('', b'line1\nhal')
+        self.assertEqual(text, 'line1\n')
+
+        text, pending = take_lines(pending, b'f\n')
+        self.assertEqual(text, 'half\n')
+        self.assertEqual(pending, '')
+
+    def test_final_read_flushes_pending(self):
+        _, pending = take_lines('', b'tail')
+        self.assertEqual(take_lines(pending, b'', final=True), ('tail', ''))
+
+    def test_split_multibyte_character_is_kept(self):
+        data = '构建'.encode()
+        self.assertEqual(complete_utf8_length(data[:-1]), 3)
+
+        text, pending = take_lines('', data[:-1], max_pending=1)
+        self.assertEqual(text, '构')
+        self.assertEqual(take_lines(pending, data[-1:] + b'\n')[0], '建\n')
+
+
+def _call_adapter(adapter, handler, method, *args, **kwargs):
+    """用 MockTransport 代替真实 CI 服务器调用适配器方法"""
+    async def call():
+        adapter.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with adapter:
+            return await getattr(adapter, method)(*args, **kwargs)
+    return asyncio.run(call())
+
+
+class RemoteLogAdapterReadTests(SimpleTestCase):
+    """Jenkins / GitLab 增量日志读取测试"""
+
+    def test_jenkins_offset_from_text_size_headers(self):
+        def handler(request):
+            self.assertEqual(request.url.params['start'], '100')
+            return httpx.Response(200, content=b'line\n', headers={'X-Text-Size': '105', 'X-More-Data': 'true'})
+
+        result = _call_adapter(JenkinsAdapter('http://jenkins', 'admin', 'token'), handler,
+                               'get_console_increment', 'app', '7', start=100)
+        self.assertEqual(result, {'data': b'line\n', 'next_position': 105, 'has_more': True})
+
+    def test_jenkins_finished_without_more_data(self):
+        def handler(request):
+            return httpx.Response(200, content=b'done\n', headers={'X-Text-Size': '5'})
+
+        result = _call_adapter(JenkinsAdapter('http://jenkins', 'admin', 'token'), handler,
+                               'get_console_increment', 'app', '7', start=0)
+        self.assertFalse(result['has_more'])
+        self.assertEqual(result['next_position'], 5)
+
+    def test_jenkins_read_capped_at_max_bytes(self):
+        def handler(request):
+            return httpx.Response(200, content=b'x' * 10, headers={'X-Text-Size': '1010', 'X-More-Data': 'false'})
+
+        result = _call_adapter(JenkinsAdapter('http://jenkins', 'admin', 'token'), handler,
+                               'get_console_increment', 'app', '7', start=1000, max_bytes=4)
+        self.assertEqual(result, {'data': b'xxxx', 'next_position': 1004, 'has_more': True})
+
+    def test_gitlab_partial_content(self):
+        def handler(request):
+            self.assertEqual(request.headers['Range'], 'bytes=5-8')
+            return httpx.Response(206, content=b'abcd')
+
+        result = _call_adapter(GitLabCIAdapter('http://gitlab', token='t', project_id='3'), handler,
+                               'get_job_trace_range', 11, start=5, max_bytes=4)
+        self.assertEqual(result, {'data': b'abcd', 'next_position': 9, 'has_more': True})
+
+    def test_gitlab_full_content_sliced_locally(self):
+        def handler(request):
+            return httpx.Response(200, content=b'0123456789')
+
+        result = _call_adapter(GitLabCIAdapter('http://gitlab', token='t', project_id='3'), handler,
+                               'get_job_trace_range', 11, start=5, max_bytes=3)
+        self.assertEqual(result, {'data': b'567', 'next_position': 8, 'has_more': True, 'ranged': False})
+
+        result = _call_adapter(GitLabCIAdapter('http://gitlab', token='t', project_id='3'), handler,
+                               'get_job_trace_range', 11, start=8, max_bytes=3)
+        self.assertEqual(result, {'data': b'89', 'next_position': 10, 'has_more': False, 'ranged': False})
+
+    def test_gitlab_range_not_satisfiable(self):
+        def handler(request):
+            return httpx.Response(416)
+
+        result = _call_adapter(GitLabCIAdapter('http://gitlab', token='t', project_id='3'), handler,
+                               'get_job_trace_range', 11, start=10, max_bytes=3)
+        self.assertEqual(result, {'data': b'', 'next_position': 10, 'has_more': False, 'ranged': True})
+
+    def test_gitlab_jobs_follow_next_page(self):
+        def handler(request):
+            if request.url.params.get('page') == '2':
+                return httpx.Response(200, json=[{'id': 1}])
+            next_url = 'http://gitlab/api/v4/projects/3/pipelines/9/jobs?page=2&per_page=100'
+            return httpx.Response(200, json=[{'id': 5}], headers={'Link': f'<{next_url}>; rel="next"'})
+
+        jobs = _call_adapter(GitLabCIAdapter('http://gitlab', token='t', project_id='3'), handler,
+                             'list_pipeline_jobs', '9')
+        self.assertEqual([job['id'] for job in jobs], [1, 5])
+
+
+class RemoteLogFollowTests(SimpleTestCase):
+    """远程日志跟踪偏移保存测试"""
+
+    def _execution(self, state=None):
+        tool = CICDTool(id=1, tool_type='jenkins', base_url='http://jenkins')
+        return PipelineExecution(id=42, cicd_tool=tool, external_id='app#7', status='running',
+                                 remote_log_state=state or {'offset': 10, 'pending': ''})
+
+    def _follow(self, execution, read, **config):
+        cache = mock.Mock()
+        cache.add.return_value = True
+        follower_config = dict(remote_log_follower.DEFAULT_FOLLOWER_CONFIG, **config)
+        with mock.patch.object(remote_log_follower, '_read_execution', read), \
+                mock.patch.object(remote_log_follower, 'get_follower_config', return_value=follower_config), \
+                mock.patch.object(remote_log_follower, 'cache', cache), \
+                mock.patch.object(remote_log_follower, 'execution_log_store') as store, \
+                mock.patch.object(remote_log_follower, 'publish_log_lines'), \
+                mock.patch.object(PipelineExecution, 'save') as save:
+            result = remote_log_follower.follow_executions([execution])
+        return result, store, save
+
+    def test_offset_saved_after_append(self):
+        async def read(execution, state, parts, config):
+            state['offset'] = 20
+            parts.append('new line\n')
+
+        execution = self._execution()
+        result, store, save = self._follow(execution, read)
+
+        store.append.assert_called_once_with(42, 'new line\n')
+        save.assert_called_once_with(update_fields=['remote_log_state'])
+        self.assertEqual(execution.remote_log_state['offset'], 20)
+        self.assertEqual(result['appended'], len('new line\n'))
+
+    def test_progress_kept_on_timeout(self):
+        async def read(execution, state, parts, config):
+            state['offset'] = 15
+            parts.append('first\n')
+            await asyncio.sleep(10)
+            state['offset'] = 99
+
+        execution = self._execution()
+        _, store, _ = self._follow(execution, read, REQUEST_TIMEOUT=0.05)
+
+        store.append.assert_called_once_with(42, 'first\n')
+        self.assertEqual(execution.remote_log_state['offset'], 15)
+
+    def test_attempt_recorded_on_failure(self):
+        async def read(execution, state, parts, config):
+            raise RuntimeError('boom')
+
+        execution = self._execution()
+        _, store, save = self._follow(execution, read)
+
+        store.append.assert_not_called()
+        save.assert_called_once_with(update_fields=['remote_log_state'])
+        self.assertEqual(execution.remote_log_state['offset'], 10)
+        self.assertIn('last_attempt', execution.remote_log_state)
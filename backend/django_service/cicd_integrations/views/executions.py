@@ -17,6 +17,7 @@ from ..serializers import (
     PipelineExecutionCreateSerializer
 )
 from ..services import cicd_engine
+from ..log_store import execution_log_store
 
 logger = logging.getLogger(__name__)
 
@@ -167,6 +168,20 @@ class PipelineExecutionViewSet(viewsets.ModelViewSet):
                 'required': False,
                 'description': 'Follow live logs (for running executions)',
                 'schema': {'type': 'boolean', 'default': False}
+            },
+            {
+                'name': 'offset',
+                'in': 'query',
+                'required': False,
+                'description': 'Read appended log chunks starting from this character offset',
+                'schema': {'type': 'integer'}
+            },
+            {
+                'name': 'limit',
+                'in': 'query',
+                'required': False,
+                'description': 'Maximum number of characters to return when offset is given',
+                'schema': {'type': 'integer', 'default': 65536}
             }
         ]
     )
@@ -179,8 +194,38 @@ class PipelineExecutionViewSet(viewsets.ModelViewSet):
         execution = self.get_object()
         step_id = request.query_params.get('step_id')
         follow = request.query_params.get('follow', 'false').lower() == 'true'
+        offset = request.query_params.get('offset')
+        
+        if offset is not None:
+            try:
+                offset = int(offset)
+                limit = int(request.query_params.get('limit', 64 * 1024))
+                step_execution_id = int(step_id) if step_id else None
+            except ValueError:
+                return Response(
+                    {'error': 'offset, limit and step_id must be integers'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
         try:
+            if offset is not None:
+                # 按偏移范围读取日志分片，客户端以 next_offset 继续拉取
+                chunk = execution_log_store.read(
+                    execution.id,
+                    step_execution_id=step_execution_id,
+                    offset=offset,
+                    limit=max(1, min(limit, 1024 * 1024))
+                )
+                return Response({
+                    'execution_id': execution.id,
+                    'step_id': step_id,
+                    'follow': follow,
+                    'logs': chunk['content'],
+                    'offset': chunk['offset'],
+                    'next_offset': chunk['next_offset'],
+                    'has_more': chunk['has_more']
+                })
+            
             if step_id:
                 # 获取特定步骤的日志
                 try:
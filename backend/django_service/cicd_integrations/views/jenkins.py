@@ -10,6 +10,8 @@ from requests.auth import HTTPBasicAuth
 import logging
 import requests
 
+from .. import jenkins_catalog
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,10 +33,14 @@ class JenkinsManagementMixin:
             return requests.auth.HTTPBasicAuth(tool.username, tool.token)
         return None
     
+    def _jenkins_http(self, tool):
+        """同一Jenkins地址共用的连接池会话"""
+        return jenkins_catalog.get_session(tool.base_url)
+    
     def _get_jenkins_crumb(self, tool, auth):
         """获取Jenkins CSRF token"""
         try:
-            response = requests.get(
+            response = self._jenkins_http(tool).get(
                 f"{tool.base_url}/crumbIssuer/api/json",
                 auth=auth,
                 timeout=10,
@@ -53,7 +59,7 @@ class JenkinsManagementMixin:
     
     @extend_schema(
         summary="List Jenkins jobs",
-        description="Get a list of all Jenkins jobs"
+        description="Get a list of all Jenkins jobs (cached per tool, pass refresh=true to bypass the cache)"
     )
     @action(detail=True, methods=['get'], url_path='jenkins/jobs')
     def jenkins_jobs(self, request, pk=None):
@@ -66,118 +72,20 @@ class JenkinsManagementMixin:
         
         try:
             auth = self._get_jenkins_auth(tool)
+            refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+            jobs = jenkins_catalog.get_jobs(tool, auth, refresh=refresh)
             
-            response = requests.get(
-                f"{tool.base_url}/api/json",
-                auth=auth,
-                timeout=10,
-                verify=False
-            )
+            return Response({
+                'tool_id': tool.id,
+                'jobs': jobs,
+                'total_jobs': len(jobs)
+            })
             
-            if response.status_code == 200:
-                jenkins_data = response.json()
-                jobs = jenkins_data.get('jobs', [])
-                
-                # 为每个作业获取更详细的信息
-                detailed_jobs = []
-                for job in jobs:
-                    try:
-                        job_response = requests.get(
-                            f"{job['url']}api/json",
-                            auth=auth,
-                            timeout=5,
-                            verify=False
-                        )
-                        if job_response.status_code == 200:
-                            job_detail = job_response.json()
-                            
-                            # 处理 lastBuild 字段，确保其结构完整
-                            last_build = job_detail.get('lastBuild')
-                            if last_build:
-                                # 如果构建结果为空且不在构建中，尝试获取最新状态
-                                if (last_build.get('result') is None and 
-                                    not job_detail.get('color', '').endswith('_anime')):
-                                    try:
-                                        # 主动获取最新构建状态
-                                        build_url = f"{last_build.get('url', '')}api/json"
-                                        if build_url != "api/json":  # 确保URL有效
-                                            build_response = requests.get(build_url, auth=auth, timeout=3)
-                                            if build_response.status_code == 200:
-                                                latest_build = build_response.json()
-                                                last_build = {
-                                                    'number': latest_build.get('number', last_build.get('number')),
-                                                    'url': latest_build.get('url', last_build.get('url')),
-                                                    'timestamp': latest_build.get('timestamp', last_build.get('timestamp', 0)),
-                                                    'result': latest_build.get('result'),  # 使用最新的result
-                                                    'duration': latest_build.get('duration', last_build.get('duration', 0))
-                                                }
-                                    except Exception as e:
-                                        logger.debug(f"Failed to get latest build status for {job['name']}: {e}")
-                                        # 如果获取失败，使用原始数据
-                                        pass
-                                
-                                # 确保 lastBuild 有完整的字段
-                                if not isinstance(last_build, dict):
-                                    last_build = {}
-                                
-                                last_build = {
-                                    'number': last_build.get('number'),
-                                    'url': last_build.get('url'),
-                                    'timestamp': last_build.get('timestamp', 0),  # 默认为0而不是None
-                                    'result': last_build.get('result'),
-                                    'duration': last_build.get('duration', 0)
-                                }
-                            
-                            detailed_jobs.append({
-                                '_class': job_detail.get('_class', ''),
-                                'name': job_detail.get('name', job['name']),
-                                'url': job_detail.get('url', job['url']),
-                                'color': job_detail.get('color', job['color']),
-                                'buildable': job_detail.get('buildable', True),
-                                'inQueue': job_detail.get('inQueue', False),
-                                'description': job_detail.get('description', ''),
-                                'lastBuild': last_build,
-                                'healthReport': job_detail.get('healthReport', [])
-                            })
-                        else:
-                            # 如果无法获取详细信息，使用基本信息并添加默认值
-                            detailed_jobs.append({
-                                '_class': job.get('_class', ''),
-                                'name': job.get('name', ''),
-                                'url': job.get('url', ''),
-                                'color': job.get('color', 'grey'),
-                                'buildable': True,
-                                'inQueue': False,
-                                'description': '',
-                                'lastBuild': None,
-                                'healthReport': []
-                            })
-                    except Exception as e:
-                        logger.warning(f"Failed to get details for job {job.get('name', 'unknown')}: {e}")
-                        # 添加基本信息
-                        detailed_jobs.append({
-                            '_class': job.get('_class', ''),
-                            'name': job.get('name', ''),
-                            'url': job.get('url', ''),
-                            'color': job.get('color', 'grey'),
-                            'buildable': True,
-                            'inQueue': False,
-                            'description': '',
-                            'lastBuild': None,
-                            'healthReport': []
-                        })
-                
-                return Response({
-                    'tool_id': tool.id,
-                    'jobs': detailed_jobs,
-                    'total_jobs': len(detailed_jobs)
-                })
-            else:
-                return Response(
-                    {'error': f'Failed to get Jenkins jobs: HTTP {response.status_code}'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-                
+        except requests.HTTPError as e:
+            return Response(
+                {'error': f'Failed to get Jenkins jobs: HTTP {e.response.status_code}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
         except Exception as e:
             logger.error(f"Failed to get Jenkins jobs for tool {tool.id}: {e}")
             return Response(
@@ -217,7 +125,7 @@ class JenkinsManagementMixin:
         try:
             auth = self._get_jenkins_auth(tool)
             
-            response = requests.get(
+            response = self._jenkins_http(tool).get(
                 f"{tool.base_url}/job/{job_name}/api/json",
                 auth=auth,
                 timeout=10,
@@ -291,7 +199,7 @@ class JenkinsManagementMixin:
                 # 如果有参数，使用带参数的构建URL
                 build_url = f"{tool.base_url}/job/{job_name}/buildWithParameters"
                 
-            response = requests.post(
+            response = self._jenkins_http(tool).post(
                 build_url,
                 auth=auth,
                 headers=headers,
@@ -301,6 +209,8 @@ class JenkinsManagementMixin:
             )
             
             if response.status_code in [200, 201]:
+                # 作业进入队列，作业目录缓存失效
+                jenkins_catalog.invalidate(tool.base_url)
                 return Response({
                     'tool_id': tool.id,
                     'job_name': job_name,
@@ -336,7 +246,7 @@ class JenkinsManagementMixin:
             
             # 获取作业的构建历史
             url = f"{tool.base_url}/job/{job_name}/api/json?tree=builds[number,url,timestamp,result,duration,description,estimatedDuration]"
-            response = requests.get(url, auth=auth, timeout=10, verify=False)
+            response = self._jenkins_http(tool).get(url, auth=auth, timeout=10, verify=False)
             
             if response.status_code == 200:
                 data = response.json()
@@ -361,7 +271,7 @@ class JenkinsManagementMixin:
                         try:
                             # 获取单个构建的最新状态
                             build_detail_url = f"{processed_build['url']}api/json"
-                            build_response = requests.get(build_detail_url, auth=auth, timeout=3)
+                            build_response = self._jenkins_http(tool).get(build_detail_url, auth=auth, timeout=3)
                             if build_response.status_code == 200:
                                 build_detail = build_response.json()
                                 # 更新结果，但保持其他字段不变
@@ -418,7 +328,7 @@ class JenkinsManagementMixin:
             
             # 获取构建的控制台日志
             url = f"{tool.base_url}/job/{job_name}/{build_number}/consoleText"
-            response = requests.get(url, auth=auth, timeout=30, verify=False)
+            response = self._jenkins_http(tool).get(url, auth=auth, timeout=30, verify=False)
             
             if response.status_code == 200:
                 return Response({
@@ -458,7 +368,7 @@ class JenkinsManagementMixin:
             
             # 获取构建详细信息
             url = f"{tool.base_url}/job/{job_name}/{build_number}/api/json"
-            response = requests.get(url, auth=auth, timeout=10, verify=False)
+            response = self._jenkins_http(tool).get(url, auth=auth, timeout=10, verify=False)
             
             if response.status_code == 200:
                 data = response.json()
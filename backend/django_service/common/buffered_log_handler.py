@@ -0,0 +1,257 @@
+"""
+缓冲日志处理器基类
+emit 只把格式化后的记录追加到有界缓冲区（deque.append，不加锁），
+由后台线程按批次取出并写入目标（Redis Streams / Channels 组），日志调用方不再等待网络往返。
+
+缓冲区写满时按策略丢弃：
+- drop_oldest: 丢弃最旧的记录（默认）
+- drop_newest: 丢弃新记录
+积压超过采样阈值后，低于 WARNING 的记录按 1/sample_rate 采样，WARNING 及以上始终保留。
+丢弃数按原因计数，可通过 get_stats() 和 Prometheus 指标查看。
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# 可选依赖
+try:
+    from prometheus_client import Counter as PrometheusCounter, Gauge
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+DROP_OLDEST = 'drop_oldest'
+DROP_NEWEST = 'drop_newest'
+
+DEFAULT_BUFFER_CONFIG = {
+    'MAX_BUFFER': 10000,        # 缓冲区最大记录数
+    'BATCH_SIZE': 200,          # 单批最大记录数
+    'FLUSH_INTERVAL': 0.5,      # 最长刷新间隔（秒）
+    'OVERFLOW_POLICY': DROP_OLDEST,
+    'SAMPLE_THRESHOLD': 0.8,    # 积压超过缓冲区的该比例后开始采样
+    'SAMPLE_RATE': 10,          # 采样时每 N 条低级别记录保留 1 条
+}
+
+if PROMETHEUS_AVAILABLE:
+    log_handler_dropped_total = PrometheusCounter(
+        'ansflow_log_handler_dropped_total',
+        'Log records dropped by buffered log handlers',
+        ['handler', 'reason']
+    )
+    log_handler_written_total = PrometheusCounter(
+        'ansflow_log_handler_written_total',
+        'Log records written by buffered log handlers',
+        ['handler']
+    )
+    log_handler_buffer_size = Gauge(
+        'ansflow_log_handler_buffer_size',
+        'Log records waiting in buffered log handlers',
+        ['handler']
+    )
+
+
+def get_buffer_config(name: str) -> Dict[str, Any]:
+    """读取缓冲配置：settings.LOG_HANDLER_BUFFER 的公共配置，再叠加 settings.LOG_HANDLER_BUFFER[name]"""
+    config = dict(DEFAULT_BUFFER_CONFIG)
+    try:
+        from django.conf import settings
+        overrides = getattr(settings, 'LOG_HANDLER_BUFFER', {}) or {}
+    except Exception:
+        overrides = {}
+    config.update({key: value for key, value in overrides.items() if key in DEFAULT_BUFFER_CONFIG})
+    config.update(overrides.get(name, {}))
+    return config
+
+
+class BufferedLogHandler(logging.Handler):
+    """
+    有界缓冲 + 后台批量刷新的日志处理器
+
+    子类实现 format_entry()（在调用线程中把记录转换为可序列化的数据）
+    和 write_batch()（在后台线程中写入一批数据，返回成功写入的条数）
+    """
+
+    handler_name = 'buffered'
+
+    def __init__(self, max_buffer: int = DEFAULT_BUFFER_CONFIG['MAX_BUFFER'],
+                 batch_size: int = DEFAULT_BUFFER_CONFIG['BATCH_SIZE'],
+                 flush_interval: float = DEFAULT_BUFFER_CONFIG['FLUSH_INTERVAL'],
+                 overflow_policy: str = DEFAULT_BUFFER_CONFIG['OVERFLOW_POLICY'],
+                 sample_threshold: float = DEFAULT_BUFFER_CONFIG['SAMPLE_THRESHOLD'],
+                 sample_rate: int = DEFAULT_BUFFER_CONFIG['SAMPLE_RATE']):
+        super().__init__()
+        if overflow_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"不支持的溢出策略: {overflow_policy}")
+
+        self.max_buffer = max(1, int(max_buffer))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.overflow_policy = overflow_policy
+        self.sample_from = int(self.max_buffer * sample_threshold) if sample_rate > 1 else None
+        self.sample_rate = max(1, int(sample_rate))
+        self.logger = logging.getLogger(f"{__name__}.{type(self).__name__}")
+
+        # drop_oldest 交给 deque(maxlen) 原子完成；drop_newest 在 append 前检查长度
+        self._buffer: Deque[Any] = deque(maxlen=self.max_buffer if overflow_policy == DROP_OLDEST else None)
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._sample_counter = 0
+        self._last_error_log = 0.0
+
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped_overflow': 0,
+            'dropped_sampled': 0,
+            'dropped_failed': 0,
+            'batches': 0,
+        }
+
+    # ---- 调用线程 ----
+
+    def emit(self, record: logging.LogRecord):
+        if self._stopped:
+            return
+        # 后台线程写入时第三方库（redis/channels）产生的日志不再回写，避免反馈循环
+        if self._thread is not None and threading.get_ident() == self._thread.ident:
+            return
+
+        try:
+            pending = len(self._buffer)
+            if self.sample_from is not None and pending >= self.sample_from and record.levelno < logging.WARNING:
+                self._sample_counter += 1
+                if self._sample_counter % self.sample_rate:
+                    self._count_drop('sampled')
+                    return
+
+            if pending >= self.max_buffer:
+                self._count_drop('overflow')
+                if self.overflow_policy == DROP_NEWEST:
+                    return
+
+            self._buffer.append(self.format_entry(record))
+            self._stats['enqueued'] += 1
+
+            self._ensure_worker()
+            if pending + 1 >= self.batch_size:
+                self._wakeup.set()
+        except Exception:
+            self.handleError(record)
+
+    def format_entry(self, record: logging.LogRecord) -> Any:
+        raise NotImplementedError
+
+    # ---- 后台线程 ----
+
+    def write_batch(self, entries: List[Any]) -> int:
+        raise NotImplementedError
+
+    def _ensure_worker(self):
+        # fork 之后（gunicorn/celery prefork）线程不会被继承，需要在子进程中重新启动
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+                return
+            self._thread_pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name=f"{type(self).__name__}-flush", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        self.on_worker_start()
+        try:
+            while not self._stopped:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self._drain()
+        finally:
+            self._drain()
+            self.on_worker_stop()
+
+    def on_worker_start(self):
+        """后台线程启动时调用（如创建线程专属的事件循环）"""
+
+    def on_worker_stop(self):
+        """后台线程退出前调用"""
+
+    def _drain(self):
+        while self._buffer:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._buffer.popleft())
+            except IndexError:
+                pass
+            if batch:
+                self._write(batch)
+        self._update_buffer_gauge()
+
+    def _write(self, batch: List[Any]):
+        try:
+            written = self.write_batch(batch)
+        except Exception as e:
+            written = 0
+            self._log_error(f"批量写入日志失败: {e}")
+
+        self._stats['batches'] += 1
+        self._stats['written'] += written
+        if PROMETHEUS_AVAILABLE and written:
+            log_handler_written_total.labels(handler=self.handler_name).inc(written)
+        if written < len(batch):
+            self._count_drop('failed', len(batch) - written)
+
+    def _count_drop(self, reason: str, count: int = 1):
+        self._stats[f'dropped_{reason}'] += count
+        if PROMETHEUS_AVAILABLE:
+            log_handler_dropped_total.labels(handler=self.handler_name, reason=reason).inc(count)
+
+    def _update_buffer_gauge(self):
+        if PROMETHEUS_AVAILABLE:
+            log_handler_buffer_size.labels(handler=self.handler_name).set(len(self._buffer))
+
+    def _log_error(self, message: str):
+        # 目标不可用时每分钟最多记录一次，错误日志本身经由该处理器时会被线程检查过滤
+        now = time.monotonic()
+        if now - self._last_error_log >= 60:
+            self._last_error_log = now
+            self.logger.error(message)
+
+    # ---- 生命周期 ----
+
+    def flush(self):
+        """唤醒后台线程立即写出缓冲区，最多等待一个刷新周期"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._wakeup.set()
+        deadline = time.monotonic() + max(self.flush_interval, 1.0)
+        while self._buffer and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        """停止后台线程并写出剩余记录"""
+        self._stopped = True
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread.ident != threading.get_ident():
+            thread.join(timeout=5)
+        super().close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats.update({
+            'handler': self.handler_name,
+            'buffered': len(self._buffer),
+            'max_buffer': self.max_buffer,
+            'overflow_policy': self.overflow_policy,
+            'worker_alive': bool(self._thread and self._thread.is_alive()),
+        })
+        return stats
@@ -27,6 +27,7 @@ class ExecutionLogger:
             execution.status = 'running'
             execution.started_at = timezone.now()
             execution.save()
+            ExecutionLogger._notify_status_change(execution)
             
             if log_message:
                 logger.info(log_message)
@@ -131,6 +132,7 @@ class ExecutionLogger:
                 execution.status = 'completed'
             
             execution.save()
+            ExecutionLogger._notify_status_change(execution)
             
             if log_message:
                 if status == 'success':
@@ -218,6 +220,7 @@ class ExecutionLogger:
                 execution.stderr = cancel_message
             
             execution.save()
+            ExecutionLogger._notify_status_change(execution)
             
             if log_message:
                 logger.info(log_message)
@@ -234,12 +237,28 @@ class ExecutionLogger:
         """
         更新执行日志
         
+        StepExecution/PipelineExecution 的追加写入进入只追加的日志分片表，
+        不再读-改-写整段 logs 字段
+        
         Args:
             execution: 执行对象
             logs: 日志内容
             append: 是否追加到现有日志
         """
         try:
+            if append and ExecutionLogger._supports_log_chunks(execution):
+                from cicd_integrations.log_store import execution_log_store
+                
+                if execution._meta.model_name == 'stepexecution':
+                    execution_log_store.append(
+                        execution.pipeline_execution_id, logs,
+                        step_execution_id=execution.id,
+                        initial_content=execution.logs
+                    )
+                else:
+                    execution_log_store.append(execution.id, logs)
+                return
+            
             if hasattr(execution, 'logs'):
                 if append and execution.logs:
                     execution.logs = f"{execution.logs}\n{logs}"
@@ -249,6 +268,66 @@ class ExecutionLogger:
         except Exception as e:
             logger.error(f"更新执行日志失败: {str(e)}")
     
+    @staticmethod
+    def get_execution_logs(execution: models.Model) -> str:
+        """
+        获取执行的完整日志
+        
+        - StepExecution：存在日志分片时以分片为准（首个分片已接续 logs 字段内容），否则返回 logs 字段
+        - PipelineExecution：logs 字段内容 + 追加写入的日志分片
+        
+        Args:
+            execution: 执行对象
+        """
+        logs = getattr(execution, 'logs', '') or ''
+        
+        if not ExecutionLogger._supports_log_chunks(execution):
+            return logs
+        
+        try:
+            from cicd_integrations.log_store import execution_log_store
+            
+            if execution._meta.model_name == 'stepexecution':
+                appended = execution_log_store.read_all(execution.pipeline_execution_id, execution.id)
+            else:
+                appended = execution_log_store.read_all(execution.id)
+        except Exception as e:
+            logger.error(f"读取日志分片失败: {str(e)}")
+            return logs
+        
+        if execution._meta.model_name == 'stepexecution':
+            return appended or logs
+        
+        if logs and appended:
+            return f"{logs}\n{appended}"
+        return logs or appended
+    
+    @staticmethod
+    def _notify_status_change(execution: models.Model) -> None:
+        """流水线/步骤执行状态变化时发布执行事件并更新流水线状态汇总，其他执行类型忽略"""
+        model_name = execution._meta.model_name
+        if execution._meta.app_label != 'cicd_integrations' or model_name not in ('pipelineexecution', 'stepexecution'):
+            return
+        
+        from realtime.execution_events import publish_execution_status, publish_step_status
+        if model_name == 'pipelineexecution':
+            from cicd_integrations.status_summary import record_execution_status
+            record_execution_status(execution)
+            publish_execution_status(execution)
+        else:
+            publish_step_status(execution, step_name=execution.step_name)
+    
+    @staticmethod
+    def _supports_log_chunks(execution: models.Model) -> bool:
+        """执行对象是否使用日志分片存储"""
+        meta = getattr(execution, '_meta', None)
+        return (
+            meta is not None
+            and meta.app_label == 'cicd_integrations'
+            and meta.model_name in ('stepexecution', 'pipelineexecution')
+            and getattr(execution, 'pk', None) is not None
+        )
+    
     @staticmethod
     def log_execution_info(
         execution: models.Model,
@@ -10,6 +10,8 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
 
+from .buffered_log_handler import BufferedLogHandler, get_buffer_config
+
 try:
     import redis
     from redis.exceptions import RedisError, ConnectionError
@@ -159,6 +161,26 @@ class RedisLogStreams:
             self.logger.error(f"Redis日志写入失败: {e}")
             return False
     
+    def write_logs_batch(self, log_list: List[Dict[str, Any]]) -> int:
+        """批量写入日志到Redis流（单次pipeline往返），返回写入条数"""
+        if not self._connected or not self.redis_client or not log_list:
+            return 0
+            
+        pipe = self.redis_client.pipeline(transaction=False)
+        now = str(time.time())
+        for log_data in log_list:
+            pipe.xadd(
+                self.config.stream_name,
+                {
+                    'timestamp': now,
+                    'data': json.dumps(log_data, ensure_ascii=False, default=str)
+                },
+                maxlen=self.config.max_len,
+                approximate=True
+            )
+        pipe.execute()
+        return len(log_list)
+    
     def read_logs_stream(self, count: int = 100, start_id: str = '$') -> List[Dict[str, Any]]:
         """读取日志流数据"""
         if not self._connected or not self.redis_client:
@@ -239,42 +261,40 @@ class RedisLogStreams:
         self._connected = False
 
 
-class AsyncRedisLogHandler(logging.Handler):
-    """异步Redis日志处理器（更新版）"""
+class AsyncRedisLogHandler(BufferedLogHandler):
+    """异步Redis日志处理器：记录进入缓冲区，由后台线程批量pipeline写入Redis流"""
+    
+    handler_name = 'redis_streams'
     
-    def __init__(self, redis_streams: RedisLogStreams):
-        super().__init__()
+    def __init__(self, redis_streams: RedisLogStreams, **buffer_options):
+        super().__init__(**buffer_options)
         self.redis_streams = redis_streams
-        self.logger = logging.getLogger(f"{__name__}.AsyncRedisLogHandler")
         
-    def emit(self, record: logging.LogRecord):
-        """发送日志记录到Redis流"""
-        try:
-            # 格式化日志记录
-            log_data = {
-                'timestamp': datetime.fromtimestamp(record.created).isoformat(),
-                'level': record.levelname,
-                'logger': record.name,
-                'message': record.getMessage(),
-            }
-            
-            # 添加额外信息
-            if hasattr(record, 'trace_id'):
-                log_data['trace_id'] = record.trace_id
-            if hasattr(record, 'user_id'):
-                log_data['user_id'] = record.user_id
-            if hasattr(record, 'service'):
-                log_data['service'] = record.service
-            if hasattr(record, 'extra'):
-                log_data['extra'] = record.extra
-            if hasattr(record, 'labels'):
-                log_data['labels'] = record.labels
-                
-            # 异步写入Redis流
-            self.redis_streams.write_log_sync(log_data)
+    def format_entry(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """格式化日志记录（在调用线程中完成，保证消息参数取的是记录时的值）"""
+        log_data = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        
+        # 添加额外信息
+        if hasattr(record, 'trace_id'):
+            log_data['trace_id'] = record.trace_id
+        if hasattr(record, 'user_id'):
+            log_data['user_id'] = record.user_id
+        if hasattr(record, 'service'):
+            log_data['service'] = record.service
+        if hasattr(record, 'extra'):
+            log_data['extra'] = record.extra
+        if hasattr(record, 'labels'):
+            log_data['labels'] = record.labels
             
-        except Exception as e:
-            self.logger.error(f"Redis日志处理失败: {e}")
+        return log_data
+    
+    def write_batch(self, entries: List[Dict[str, Any]]) -> int:
+        return self.redis_streams.write_logs_batch(entries)
 
 
 # 全局Redis日志流实例
@@ -307,7 +327,16 @@ def setup_redis_logging():
     redis_streams = get_redis_log_streams()
     if redis_streams:
         # 创建Redis日志处理器
-        redis_handler = AsyncRedisLogHandler(redis_streams)
+        config = get_buffer_config('redis_streams')
+        redis_handler = AsyncRedisLogHandler(
+            redis_streams,
+            max_buffer=config['MAX_BUFFER'],
+            batch_size=min(config['BATCH_SIZE'], redis_streams.config.batch_size),
+            flush_interval=config['FLUSH_INTERVAL'],
+            overflow_policy=config['OVERFLOW_POLICY'],
+            sample_threshold=config['SAMPLE_THRESHOLD'],
+            sample_rate=config['SAMPLE_RATE'],
+        )
         redis_handler.setLevel(logging.INFO)
         
         # 添加到根日志器
@@ -0,0 +1,287 @@
+"""
+流式子进程执行模块
+逐行读取子进程输出并实时回调（日志管道、WebSocket），内存中只保留有界的尾部输出，
+超出上限的完整输出写入临时文件，避免长时间构建把整份日志缓存在内存中；
+回调已逐行保存完整输出时，临时文件在进程结束后删除
+"""
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# 单个输出流在内存中保留的最大字节数
+DEFAULT_MAX_BUFFER_BYTES = 2 * 1024 * 1024
+
+OutputCallback = Callable[[str, str], None]
+
+
+class BoundedOutputBuffer:
+    """
+    有界输出缓冲区
+    内存中按环形缓冲保留最近 max_bytes 的输出；一旦超限，
+    之前和之后的全部输出都写入溢出文件，可通过 spill_path 获取完整内容
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BUFFER_BYTES, text: bool = True,
+                 spill_dir: Optional[str] = None, spill_prefix: str = 'ansflow_output_'):
+        self.max_bytes = max_bytes
+        self.text = text
+        self.spill_dir = spill_dir
+        self.spill_prefix = spill_prefix
+        self.spill_path: Optional[str] = None
+        self.total_bytes = 0
+        self._chunks: deque = deque()
+        self._buffered_bytes = 0
+        self._spill_file = None
+        self._lock = threading.Lock()
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > self._buffered_bytes
+
+    def append(self, chunk: Union[str, bytes]) -> None:
+        size = len(chunk.encode('utf-8', errors='replace')) if self.text else len(chunk)
+
+        with self._lock:
+            self.total_bytes += size
+            self._chunks.append((chunk, size))
+            self._buffered_bytes += size
+
+            if self._spill_file is not None:
+                self._write_spill(chunk)
+            elif self._buffered_bytes > self.max_bytes:
+                self._start_spill()
+
+            # 环形缓冲：丢弃最旧的输出
+            while self._buffered_bytes > self.max_bytes and len(self._chunks) > 1:
+                _, dropped = self._chunks.popleft()
+                self._buffered_bytes -= dropped
+
+    def _start_spill(self):
+        try:
+            fd, self.spill_path = tempfile.mkstemp(prefix=self.spill_prefix, suffix='.log', dir=self.spill_dir)
+            self._spill_file = os.fdopen(fd, 'wb')
+            for chunk, _ in self._chunks:
+                self._write_spill(chunk)
+            logger.info(f"输出超过 {self.max_bytes} 字节，完整输出写入: {self.spill_path}")
+        except Exception as e:
+            logger.warning(f"创建输出溢出文件失败，仅保留尾部输出: {e}")
+            self._spill_file = None
+
+    def _write_spill(self, chunk: Union[str, bytes]):
+        data = chunk.encode('utf-8', errors='replace') if self.text else chunk
+        self._spill_file.write(data)
+
+    def close(self):
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def discard_spill(self):
+        """关闭并删除溢出文件（完整输出已由调用方另行保存）"""
+        self.close()
+        with self._lock:
+            path, self.spill_path = self.spill_path, None
+        if path:
+            try:
+                os.unlink(path)
+            except OSError as e:
+                logger.warning(f"删除输出溢出文件失败 {path}: {e}")
+
+    def getvalue(self) -> Union[str, bytes]:
+        """返回内存中保留的输出，被截断时附带完整日志位置提示"""
+        with self._lock:
+            empty = '' if self.text else b''
+            content = empty.join(chunk for chunk, _ in self._chunks)
+            dropped = self.total_bytes - self._buffered_bytes
+
+        if dropped > 0:
+            notice = f"[... 已省略前 {dropped} 字节输出"
+            notice += f"，完整输出: {self.spill_path}" if self.spill_path else ""
+            notice += " ...]\n"
+            content = (notice if self.text else notice.encode('utf-8')) + content
+
+        return content
+
+
+class LineBatcher:
+    """
+    将逐行输出聚合为批次再回调，避免每行一次网络推送
+    达到 max_lines 或距上次推送超过 interval 秒时刷新；输出暂停时由后台线程在 interval 内推送已缓存的行，
+    用完后调用 close() 推送剩余行并停止后台线程
+    """
+
+    def __init__(self, flush: Callable[[List[str]], None], max_lines: int = 50, interval: float = 0.5):
+        self._flush = flush
+        self.max_lines = max_lines
+        self.interval = interval
+        self._lines: List[str] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._timer: Optional[threading.Thread] = None
+        self._closed = False
+
+    def add(self, line: str) -> None:
+        with self._lock:
+            self._lines.append(line)
+            if len(self._lines) < self.max_lines and time.monotonic() - self._last_flush < self.interval:
+                self._start_timer()
+                return
+            lines, self._lines = self._lines, []
+            self._last_flush = time.monotonic()
+
+        self._safe_flush(lines)
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._lines = self._lines, []
+            self._last_flush = time.monotonic()
+
+        if lines:
+            self._safe_flush(lines)
+
+    def close(self) -> None:
+        """推送剩余的行并停止后台线程"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self.flush()
+
+    def _start_timer(self):
+        # 调用方持有 self._lock
+        if self._timer is None and not self._closed:
+            self._timer = threading.Thread(target=self._timer_loop, name='line-batcher', daemon=True)
+            self._timer.start()
+
+    def _timer_loop(self):
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        return
+                    due = self._last_flush + self.interval - time.monotonic() if self._lines else self.interval
+                    if due > 0:
+                        self._wakeup.wait(due)
+                        continue
+                    lines, self._lines = self._lines, []
+                    self._last_flush = time.monotonic()
+                self._safe_flush(lines)
+        finally:
+            # 回调可能写数据库，释放本线程持有的连接
+            try:
+                from django.db import close_old_connections
+                close_old_connections()
+            except Exception:
+                pass
+
+    def _safe_flush(self, lines: List[str]):
+        try:
+            self._flush(lines)
+        except Exception as e:
+            logger.debug(f"推送输出批次失败: {e}")
+
+
+def _pump_stream(stream, stream_name: str, buffer: BoundedOutputBuffer,
+                 on_output: Optional[OutputCallback], text: bool):
+    try:
+        for line in iter(stream.readline, '' if text else b''):
+            buffer.append(line)
+            if on_output:
+                try:
+                    decoded = line if text else line.decode('utf-8', errors='replace')
+                    on_output(stream_name, decoded.rstrip('\r\n'))
+                except Exception as e:
+                    logger.debug(f"输出回调失败: {e}")
+    finally:
+        stream.close()
+
+
+def _finish_buffers(buffers: Sequence[BoundedOutputBuffer], keep_spill: bool):
+    for buffer in buffers:
+        if keep_spill:
+            buffer.close()
+        else:
+            buffer.discard_spill()
+
+
+def run_streaming(
+    command: Union[str, Sequence[str]],
+    shell: bool = False,
+    env: Optional[Dict[str, str]] = None,
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+    text: bool = True,
+    on_output: Optional[OutputCallback] = None,
+    max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES,
+    spill_dir: Optional[str] = None,
+    keep_spill: bool = False
+) -> subprocess.CompletedProcess:
+    """
+    运行子进程并流式读取输出，接口与 subprocess.run(capture_output=True) 保持兼容
+
+    Args:
+        on_output: 每读到一行调用 on_output(stream_name, line)，stream_name 为 'stdout' 或 'stderr'
+        max_buffer_bytes: 每个输出流在内存中保留的最大字节数
+        keep_spill: 保留溢出文件；默认在进程结束后删除，完整输出此时已逐行交给 on_output（如写入日志存储）
+
+    Returns:
+        subprocess.CompletedProcess，额外带有 stdout_spill_path / stderr_spill_path 属性
+        （keep_spill 且输出被截断时指向完整输出文件，否则为 None）
+
+    Raises:
+        subprocess.TimeoutExpired: 超时（子进程会被终止）
+    """
+    popen_kwargs: Dict[str, Any] = {
+        'shell': shell,
+        'env': env,
+        'cwd': cwd,
+        'stdout': subprocess.PIPE,
+        'stderr': subprocess.PIPE,
+    }
+    if text:
+        popen_kwargs.update({'text': True, 'encoding': 'utf-8', 'errors': 'replace', 'bufsize': 1})
+
+    stdout_buffer = BoundedOutputBuffer(max_buffer_bytes, text=text, spill_dir=spill_dir)
+    stderr_buffer = BoundedOutputBuffer(max_buffer_bytes, text=text, spill_dir=spill_dir)
+
+    process = subprocess.Popen(command, **popen_kwargs)
+    readers = [
+        threading.Thread(target=_pump_stream, args=(process.stdout, 'stdout', stdout_buffer, on_output, text), daemon=True),
+        threading.Thread(target=_pump_stream, args=(process.stderr, 'stderr', stderr_buffer, on_output, text), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        for reader in readers:
+            reader.join(timeout=5)
+        _finish_buffers((stdout_buffer, stderr_buffer), keep_spill)
+        raise subprocess.TimeoutExpired(
+            command, timeout, output=stdout_buffer.getvalue(), stderr=stderr_buffer.getvalue()
+        )
+
+    for reader in readers:
+        reader.join()
+    _finish_buffers((stdout_buffer, stderr_buffer), keep_spill)
+
+    completed = subprocess.CompletedProcess(
+        args=command,
+        returncode=returncode,
+        stdout=stdout_buffer.getvalue(),
+        stderr=stderr_buffer.getvalue()
+    )
+    completed.stdout_spill_path = stdout_buffer.spill_path
+    completed.stderr_spill_path = stderr_buffer.spill_path
+    return completed
@@ -9,6 +9,8 @@ from datetime import datetime
 from typing import Dict, Any, List, Set, Optional
 from dataclasses import dataclass, asdict
 
+from .buffered_log_handler import BufferedLogHandler, get_buffer_config
+
 try:
     from channels.generic.websocket import AsyncWebsocketConsumer
     from channels.exceptions import DenyConnection
@@ -331,6 +333,21 @@ class RealTimeLogConsumer(AsyncWebsocketConsumer):
                 
         except Exception as e:
             self.logger.error(f"发送日志消息失败: {e}")
+    
+    async def log_batch(self, event):
+        """处理来自房间组的批量日志消息（WebSocketLogHandler 按批次发送）"""
+        try:
+            now = datetime.now().isoformat()
+            for log_data in event['logs']:
+                if self.log_filter.matches(log_data):
+                    await self.send(text_data=json.dumps({
+                        'type': 'new_log',
+                        'log': log_data,
+                        'timestamp': now
+                    }))
+                    
+        except Exception as e:
+            self.logger.error(f"发送日志消息失败: {e}")
 
 
 class LogWebSocketService:
@@ -361,6 +378,23 @@ class LogWebSocketService:
         except Exception as e:
             self.logger.error(f"广播日志失败: {e}")
     
+    async def broadcast_log_batch(self, logs: List[Dict[str, Any]]):
+        """一次group_send广播一批日志，失败时抛出异常由调用方计数"""
+        if not CHANNELS_AVAILABLE or not logs:
+            return
+            
+        from channels.layers import get_channel_layer
+        
+        channel_layer = get_channel_layer()
+        if channel_layer:
+            await channel_layer.group_send(
+                "logs_realtime",
+                {
+                    'type': 'log_batch',
+                    'logs': logs
+                }
+            )
+    
     def get_connection_count(self) -> int:
         """获取活跃连接数"""
         return len(self.active_connections)
@@ -381,57 +415,70 @@ def get_websocket_service() -> LogWebSocketService:
 
 
 # 自定义日志处理器，支持WebSocket推送
-class WebSocketLogHandler(logging.Handler):
-    """WebSocket日志处理器"""
+class WebSocketLogHandler(BufferedLogHandler):
+    """
+    WebSocket日志处理器
     
-    def __init__(self):
-        super().__init__()
+    记录进入缓冲区，后台线程在自己的事件循环中按批次group_send，
+    不再为每条日志创建事件循环，也不会在调用方的事件循环里堆积广播任务
+    """
+    
+    handler_name = 'websocket'
+    
+    def __init__(self, **buffer_options):
+        super().__init__(**buffer_options)
         self.websocket_service = get_websocket_service()
-        self.logger = logging.getLogger(f"{__name__}.WebSocketLogHandler")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
-    def emit(self, record: logging.LogRecord):
-        """发送日志记录到WebSocket"""
-        try:
-            # 格式化日志记录
-            log_data = {
-                'timestamp': datetime.fromtimestamp(record.created).isoformat(),
-                'level': record.levelname,
-                'service': getattr(record, 'service', 'unknown'),
-                'logger': record.name,
-                'message': record.getMessage(),
-            }
+    def format_entry(self, record: logging.LogRecord) -> Dict[str, Any]:
+        """格式化日志记录"""
+        log_data = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'service': getattr(record, 'service', 'unknown'),
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        
+        # 添加额外信息
+        if hasattr(record, 'trace_id'):
+            log_data['trace_id'] = record.trace_id
+        if hasattr(record, 'user_id'):
+            log_data['user_id'] = record.user_id
+        if hasattr(record, 'extra'):
+            log_data['extra'] = record.extra
+        if hasattr(record, 'labels'):
+            log_data['labels'] = record.labels
             
-            # 添加额外信息
-            if hasattr(record, 'trace_id'):
-                log_data['trace_id'] = record.trace_id
-            if hasattr(record, 'user_id'):
-                log_data['user_id'] = record.user_id
-            if hasattr(record, 'extra'):
-                log_data['extra'] = record.extra
-            if hasattr(record, 'labels'):
-                log_data['labels'] = record.labels
-                
-            # 异步广播（如果可能）
-            try:
-                import asyncio
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    asyncio.create_task(self.websocket_service.broadcast_log(log_data))
-                else:
-                    asyncio.run(self.websocket_service.broadcast_log(log_data))
-            except RuntimeError:
-                # 没有运行的事件循环，跳过WebSocket推送
-                pass
-                
-        except Exception as e:
-            self.logger.error(f"WebSocket日志处理失败: {e}")
+        return log_data
+    
+    def on_worker_start(self):
+        # 通道层的连接绑定在事件循环上，后台线程始终复用同一个循环
+        self._loop = asyncio.new_event_loop()
+        
+    def on_worker_stop(self):
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+    
+    def write_batch(self, entries: List[Dict[str, Any]]) -> int:
+        self._loop.run_until_complete(self.websocket_service.broadcast_log_batch(entries))
+        return len(entries)
 
 
 def setup_websocket_logging():
     """设置WebSocket日志推送"""
     if CHANNELS_AVAILABLE:
         # 创建WebSocket日志处理器
-        ws_handler = WebSocketLogHandler()
+        config = get_buffer_config('websocket')
+        ws_handler = WebSocketLogHandler(
+            max_buffer=config['MAX_BUFFER'],
+            batch_size=config['BATCH_SIZE'],
+            flush_interval=config['FLUSH_INTERVAL'],
+            overflow_policy=config['OVERFLOW_POLICY'],
+            sample_threshold=config['SAMPLE_THRESHOLD'],
+            sample_rate=config['SAMPLE_RATE'],
+        )
         ws_handler.setLevel(logging.INFO)
         
         # 添加到根日志器
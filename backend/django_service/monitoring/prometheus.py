@@ -142,6 +142,17 @@ class DjangoMetricsCollector:
         except Exception as e:
             logger.warning(f"Failed to collect cache metrics: {e}")
     
+    @staticmethod
+    def collect_http_pool_metrics():
+        """Collect pooled CI/CD HTTP client metrics."""
+        try:
+            from cicd_integrations.adapters.http_pool import get_pool_stats
+            
+            get_pool_stats()
+            
+        except Exception as e:
+            logger.warning(f"Failed to collect HTTP pool metrics: {e}")
+    
     @staticmethod
     def collect_business_metrics():
         """Collect business-specific metrics."""
@@ -208,6 +219,7 @@ class CustomMetricsView(View):
         collector.collect_session_metrics()
         collector.collect_database_metrics()
         collector.collect_cache_metrics()
+        collector.collect_http_pool_metrics()
         collector.collect_business_metrics()
         
         # Generate metrics response
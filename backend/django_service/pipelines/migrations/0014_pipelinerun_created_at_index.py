@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pipelines', '0013_remove_pipelinestep_docker_project'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pipelinerun',
+            index=models.Index(fields=['created_at'], name='idx_pipeline_run_created'),
+        ),
+    ]
@@ -282,6 +282,10 @@ class PipelineRun(models.Model):
     class Meta:
         ordering = ['-run_number']
         unique_together = [['pipeline', 'run_number']]
+        indexes = [
+            # 统计汇总按创建时间区间重算
+            models.Index(fields=['created_at'], name='idx_pipeline_run_created'),
+        ]
         
     def __str__(self):
         return f"{self.pipeline.name} - Run #{self.run_number}"
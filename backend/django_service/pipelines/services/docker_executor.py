@@ -12,6 +12,7 @@ from typing import Dict, Any, Optional
 from django.utils import timezone
 from docker_integration.models import DockerRegistry
 from common.execution_logger import ExecutionLogger
+from common.streaming_process import run_streaming
 
 logger = logging.getLogger(__name__)
 
@@ -19,16 +20,22 @@ logger = logging.getLogger(__name__)
 class DockerManager:
     """真实的 Docker 管理器 - 执行实际的Docker命令"""
     
-    def __init__(self, enable_real_execution=True):
+    def __init__(self, enable_real_execution=True, output_callback=None):
         """
         初始化Docker管理器
         Args:
             enable_real_execution: 是否启用真实Docker命令执行，False时为模拟模式
+            output_callback: 输出回调 callback(stream_name, line)，命令输出逐行实时推送
         """
         self.enable_real_execution = enable_real_execution
+        self.output_callback = output_callback
+    
+    def _log_output_line(self, stream_name, line):
+        """默认输出回调：逐行写入日志管道"""
+        logger.info(f"[docker:{stream_name}] {line}")
     
     def _run_docker_command(self, command, capture_output=True):
-        """执行Docker命令"""
+        """执行Docker命令（流式读取输出）"""
         if not self.enable_real_execution:
             # 模拟模式
             logger.info(f"[模拟] 执行Docker命令: {' '.join(command)}")
@@ -41,11 +48,14 @@ class DockerManager:
         
         try:
             logger.info(f"执行Docker命令: {' '.join(command)}")
-            result = subprocess.run(
+            if not capture_output:
+                return subprocess.run(command, timeout=300)
+            
+            result = run_streaming(
                 command,
-                capture_output=capture_output,
                 text=False,  # 使用bytes处理输出
-                timeout=300  # 5分钟超时
+                timeout=300,  # 5分钟超时
+                on_output=self.output_callback or self._log_output_line
             )
             return result
         except subprocess.TimeoutExpired:
@@ -359,7 +369,10 @@ class DockerStepExecutor:
         
         try:
             # 创建 Docker 管理器 - 支持真实执行
-            docker_manager = DockerManager(enable_real_execution=self.enable_real_execution)
+            docker_manager = DockerManager(
+                enable_real_execution=self.enable_real_execution,
+                output_callback=context.get('output_callback')
+            )
             
             # 执行构建
             result = docker_manager.build_image(
@@ -416,7 +429,10 @@ class DockerStepExecutor:
         
         try:
             # 创建 Docker 管理器 - 支持真实执行  
-            docker_manager = DockerManager(enable_real_execution=self.enable_real_execution)
+            docker_manager = DockerManager(
+                enable_real_execution=self.enable_real_execution,
+                output_callback=context.get('output_callback')
+            )
             
             # 运行容器
             result = docker_manager.run_container(
@@ -528,7 +544,10 @@ class DockerStepExecutor:
         
         try:
             # 创建 Docker 管理器 - 支持真实执行
-            docker_manager = DockerManager(enable_real_execution=self.enable_real_execution)
+            docker_manager = DockerManager(
+                enable_real_execution=self.enable_real_execution,
+                output_callback=context.get('output_callback')
+            )
             
             # 登录仓库（如果需要）
             if username and password:
@@ -639,7 +658,10 @@ class DockerStepExecutor:
         
         try:
             # 创建 Docker 管理器 - 支持真实执行
-            docker_manager = DockerManager(enable_real_execution=self.enable_real_execution)
+            docker_manager = DockerManager(
+                enable_real_execution=self.enable_real_execution,
+                output_callback=context.get('output_callback')
+            )
             
             # 登录仓库（如果需要）
             if username and password and registry_url:
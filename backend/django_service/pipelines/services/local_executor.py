@@ -13,6 +13,7 @@ from ..tasks import execute_atomic_step_task
 from .docker_executor import DockerStepExecutor
 from .kubernetes_executor import KubernetesStepExecutor
 from common.execution_logger import ExecutionLogger
+from common.streaming_process import run_streaming
 
 logger = logging.getLogger(__name__)
 
@@ -548,14 +549,17 @@ class LocalPipelineExecutor:
             
             logger.info(f"🚀 [fetch_code] 执行命令: {git_command}")
             
-            # 执行git命令
-            result = subprocess.run(
+            # 执行git命令，输出逐行推送
+            output_callback = context.get('output_callback') or (
+                lambda stream_name, line: logger.info(f"[fetch_code:{stream_name}] {line}")
+            )
+            result = run_streaming(
                 git_command,
                 shell=True,
-                capture_output=True,
                 text=True,
                 cwd=working_directory,
-                timeout=step.timeout_seconds
+                timeout=step.timeout_seconds,
+                on_output=output_callback
             )
             
             # 执行后打印目录状态
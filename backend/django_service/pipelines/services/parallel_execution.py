@@ -10,13 +10,16 @@ import statistics
 import hashlib
 from common.execution_logger import ExecutionLogger
 import gc
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeoutError
 from typing import Dict, List, Any, Optional, Tuple
 from django.utils import timezone
 from django.db import transaction
 from ..models import Pipeline, PipelineRun, ParallelGroup
 from cicd_integrations.models import AtomicStep, StepExecution, PipelineExecution
 from pipelines.services.local_executor import LocalPipelineExecutor
+from cicd_integrations.executors.step_worker_pool import get_step_pool
+from cicd_integrations.executors.step_cache import get_step_result_cache
 # from cicd_integrations.executors.remote_executor import RemoteStepExecutor  # 暂时禁用
 
 # 可选依赖
@@ -281,75 +284,77 @@ class ParallelExecutionService:
             )
             step_executions.append(step_execution)
         
-        # 使用线程池执行并行步骤
+        # 使用共享步骤线程池执行并行步骤
         results = []
-        logger.info(f"创建线程池，最大工作线程数: {min(len(steps), self.max_parallel_workers)}")
+        step_pool = get_step_pool()
+        logger.info(f"提交到共享步骤线程池，当前状态: {step_pool.get_stats()}")
         
-        with ThreadPoolExecutor(max_workers=min(len(steps), self.max_parallel_workers)) as executor:
-            # 提交所有任务
-            future_to_step = {
-                executor.submit(self._execute_step_local, step_execution): step_execution
-                for step_execution in step_executions
-            }
-            
-            logger.info(f"已提交 {len(future_to_step)} 个并行任务到线程池")
-            
-            # 等待结果
-            completed_count = 0
-            failed_count = 0
-            
-            try:
-                for future in as_completed(future_to_step, timeout=timeout_seconds):
-                    step_execution = future_to_step[future]
-                    try:
-                        result = future.result()
-                        results.append(result)
-                        
-                        if result['success']:
-                            completed_count += 1
-                            step_execution.status = 'success'
-                            logger.info(f"步骤 {step_execution.atomic_step.name} 执行成功")
-                        else:
-                            failed_count += 1
-                            step_execution.status = 'failed'
-                            step_execution.error_message = result.get('error', 'Unknown error')
-                            logger.error(f"步骤 {step_execution.atomic_step.name} 执行失败: {result.get('error', 'Unknown error')}")
-                        
-                        step_execution.completed_at = timezone.now()
-                        step_execution.save()
-                        
-                        # 根据同步策略决定是否提前退出
-                        if sync_policy == 'fail_fast' and failed_count > 0:
-                            logger.info("Fail-fast策略触发，取消剩余任务")
-                            # 取消所有未完成的步骤
-                            self._cancel_parallel_remaining_steps(
-                                step_executions, completed_count + failed_count, 
-                                f"并行组中有步骤失败，策略为fail_fast"
-                            )
-                            break
-                        elif sync_policy == 'wait_any' and completed_count > 0:
-                            logger.info("Wait-any策略满足，取消剩余任务")
-                            # 取消所有未完成的步骤
-                            self._cancel_parallel_remaining_steps(
-                                step_executions, completed_count + failed_count,
-                                f"并行组中已有步骤完成，策略为wait_any"
-                            )
-                            break
-                            
-                    except Exception as e:
-                        logger.error(f"步骤执行异常: {e}")
-                        step_execution.status = 'failed'
-                        step_execution.error_message = str(e)
-                        step_execution.completed_at = timezone.now()
-                        step_execution.save()
+        future_to_step = {
+            step_pool.submit(pipeline_execution.id, self._execute_step_local, step_execution): step_execution
+            for step_execution in step_executions
+        }
+        
+        logger.info(f"已提交 {len(future_to_step)} 个并行任务到线程池")
+        
+        # 等待结果
+        completed_count = 0
+        failed_count = 0
+        
+        try:
+            for future in as_completed(future_to_step, timeout=timeout_seconds):
+                step_execution = future_to_step[future]
+                try:
+                    result = future.result()
+                    results.append(result)
+                    
+                    if result['success']:
+                        completed_count += 1
+                        step_execution.status = 'success'
+                        logger.info(f"步骤 {step_execution.atomic_step.name} 执行成功")
+                    else:
                         failed_count += 1
-            
-            except asyncio.TimeoutError:
-                logger.error(f"并行执行超时，超时时间: {timeout_seconds} 秒")
-                return {
-                    'success': False,
-                    'message': f'并行执行超时，超时时间: {timeout_seconds} 秒'
-                }
+                        step_execution.status = 'failed'
+                        step_execution.error_message = result.get('error', 'Unknown error')
+                        logger.error(f"步骤 {step_execution.atomic_step.name} 执行失败: {result.get('error', 'Unknown error')}")
+                    
+                    step_execution.completed_at = timezone.now()
+                    step_execution.save()
+                    
+                    # 根据同步策略决定是否提前退出
+                    if sync_policy == 'fail_fast' and failed_count > 0:
+                        logger.info("Fail-fast策略触发，取消剩余任务")
+                        self._cancel_pending_futures(future_to_step)
+                        # 取消所有未完成的步骤
+                        self._cancel_parallel_remaining_steps(
+                            step_executions, completed_count + failed_count, 
+                            f"并行组中有步骤失败，策略为fail_fast"
+                        )
+                        break
+                    elif sync_policy == 'wait_any' and completed_count > 0:
+                        logger.info("Wait-any策略满足，取消剩余任务")
+                        self._cancel_pending_futures(future_to_step)
+                        # 取消所有未完成的步骤
+                        self._cancel_parallel_remaining_steps(
+                            step_executions, completed_count + failed_count,
+                            f"并行组中已有步骤完成，策略为wait_any"
+                        )
+                        break
+                        
+                except Exception as e:
+                    logger.error(f"步骤执行异常: {e}")
+                    step_execution.status = 'failed'
+                    step_execution.error_message = str(e)
+                    step_execution.completed_at = timezone.now()
+                    step_execution.save()
+                    failed_count += 1
+        
+        except FuturesTimeoutError:
+            logger.error(f"并行执行超时，超时时间: {timeout_seconds} 秒")
+            self._cancel_pending_futures(future_to_step)
+            return {
+                'success': False,
+                'message': f'并行执行超时，超时时间: {timeout_seconds} 秒'
+            }
         
         # 评估整体结果
         total_steps = len(steps)
@@ -628,6 +633,14 @@ class ParallelExecutionService:
         if cancelled_count > 0:
             logger.info(f"Cancelled {cancelled_count} parallel steps due to: {reason}")
     
+    def _cancel_pending_futures(self, future_to_step: Dict[Any, Any]):
+        """
+        取消仍在共享线程池中排队的任务
+        """
+        cancelled = sum(1 for future in future_to_step if future.cancel())
+        if cancelled:
+            logger.info(f"已取消 {cancelled} 个排队中的并行任务")
+    
     def _execute_step_local(self, step_execution) -> Dict[str, Any]:
         """
         本地执行单个步骤
@@ -825,44 +838,39 @@ class ParallelExecutionService:
         
         logger.info(f"Hybrid allocation: {len(local_steps)} local, {len(remote_steps)} remote")
         
-        # 并行执行本地和远程步骤
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
-        
+        # 协调任务会阻塞等待自己提交的步骤，不能占用共享步骤线程池的工作线程（线程数较小时会互相等待），
+        # 远程部分在单独的线程中协调，本地部分在当前线程协调，只有叶子步骤提交到共享线程池
         results = []
+        remote_outcome: Dict[str, Any] = {}
+        remote_thread = None
         
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            futures = []
-            
-            # 提交本地并行任务
-            if local_steps:
-                local_future = executor.submit(
-                    self._execute_parallel_local,
-                    local_steps, pipeline_execution, sync_policy
-                )
-                futures.append(('local', local_future))
-            
-            # 提交远程并行任务
-            if remote_steps:
-                remote_future = executor.submit(
-                    self._execute_parallel_remote,
+        if remote_steps:
+            def coordinate_remote():
+                remote_outcome['result'] = self._run_hybrid_part(
+                    'remote', self._execute_parallel_remote,
                     remote_steps, pipeline, pipeline_execution, sync_policy
                 )
-                futures.append(('remote', remote_future))
-            
-            # 等待所有任务完成
-            for task_type, future in futures:
                 try:
-                    result = future.result()
-                    result['task_type'] = task_type
-                    results.append(result)
-                except Exception as e:
-                    logger.error(f"Hybrid {task_type} execution failed: {e}")
-                    results.append({
-                        'success': False,
-                        'message': f'{task_type} execution failed: {str(e)}',
-                        'task_type': task_type
-                    })
+                    from django.db import close_old_connections
+                    close_old_connections()
+                except Exception:
+                    pass
+            
+            remote_thread = threading.Thread(
+                target=coordinate_remote, name=f'hybrid-remote-{pipeline_execution.id}', daemon=True
+            )
+            remote_thread.start()
+        
+        if local_steps:
+            results.append(self._run_hybrid_part(
+                'local', self._execute_parallel_local, local_steps, pipeline_execution, sync_policy
+            ))
+        
+        if remote_thread is not None:
+            remote_thread.join()
+            results.append(remote_outcome.get('result') or {
+                'success': False, 'message': 'remote execution did not report a result', 'task_type': 'remote'
+            })
         
         # 评估混合执行结果
         total_success = all(r.get('success', False) for r in results)
@@ -875,6 +883,20 @@ class ParallelExecutionService:
             'remote_steps_count': len(remote_steps)
         }
 
+    def _run_hybrid_part(self, task_type: str, fn, *args) -> Dict[str, Any]:
+        """执行混合模式中的本地或远程部分，异常转换为失败结果"""
+        try:
+            result = fn(*args)
+            result['task_type'] = task_type
+            return result
+        except Exception as e:
+            logger.error(f"Hybrid {task_type} execution failed: {e}")
+            return {
+                'success': False,
+                'message': f'{task_type} execution failed: {str(e)}',
+                'task_type': task_type
+            }
+
     def _generate_gitlab_parallel_config(self, steps: List[AtomicStep], sync_policy: str) -> str:
         """
         生成GitLab CI的并行执行配置
@@ -1298,7 +1320,8 @@ class ParallelExecutionService:
     def _initialize_resource_pool(self, optimization_config: Dict[str, Any]) -> Dict[str, Any]:
         """初始化资源池"""
         return {
-            'step_cache': {} if optimization_config.get('enable_caching', True) else None,
+            'step_cache': optimization_config.get('enable_caching', True),
+            'step_outputs': {},  # 步骤ID/名称 -> 输出，用于计算下游步骤的缓存键
             'execution_history': [],
             'resource_locks': {},
             'priority_queue': [] if optimization_config.get('priority_scheduling', True) else None
@@ -1400,61 +1423,78 @@ class ParallelExecutionService:
         if optimization_config.get('priority_scheduling', True):
             steps = self._sort_steps_by_priority(steps)
         
-        # 使用优化的线程池
-        with ThreadPoolExecutor(max_workers=self.max_parallel_workers) as executor:
-            # 提交所有步骤
-            futures = {}
-            for step in steps:
-                # 检查缓存
-                if self._check_step_cache(step, resource_pool):
-                    continue
-                
-                future = executor.submit(
-                    self._execute_step_with_monitoring, 
-                    step, 
-                    pipeline, 
-                    pipeline_execution,
-                    resource_pool
-                )
-                futures[future] = step
-            
-            # 收集结果
-            successful_steps = 0
-            failed_steps = []
-            
-            for future in as_completed(futures, timeout=group_info.get('timeout_seconds', 300)):
+        # 使用共享步骤线程池
+        step_pool = get_step_pool()
+        # 提交所有步骤
+        futures = {}
+        cache_keys = {}
+        successful_steps = 0
+        for step in steps:
+            # 检查缓存
+            cache_key, cached_result = self._check_step_cache(step, pipeline_execution, resource_pool)
+            if cached_result is not None:
+                successful_steps += 1
+                continue
+            cache_keys[id(step)] = cache_key
+
+            future = step_pool.submit(
+                pipeline_execution.id,
+                self._execute_step_with_monitoring, 
+                step, 
+                pipeline, 
+                pipeline_execution,
+                resource_pool
+            )
+            futures[future] = step
+
+        # 收集结果
+        failed_steps = []
+        timeout_seconds = group_info.get('timeout_seconds') or 300
+        pending = set(futures)
+
+        try:
+            for future in as_completed(futures, timeout=timeout_seconds):
+                pending.discard(future)
                 step = futures[future]
                 try:
                     result = future.result()
+                    # 更新缓存
+                    self._update_step_cache(step, pipeline_execution, result, resource_pool, cache_keys.get(id(step)))
                     if result['success']:
                         successful_steps += 1
-                        # 更新缓存
-                        self._update_step_cache(step, result, resource_pool)
                     else:
                         failed_steps.append((step, result['message']))
-                        
+
                 except Exception as e:
                     logger.error(f"Step {step.get('name', 'unknown')} failed: {e}")
                     failed_steps.append((step, str(e)))
-            
-            # 根据同步策略判断成功
-            sync_policy = group_info.get('sync_policy', 'wait_all')
-            if sync_policy == 'wait_all' and failed_steps:
-                return {
-                    'success': False,
-                    'message': f'Parallel stage failed: {len(failed_steps)} steps failed'
-                }
-            elif sync_policy == 'wait_any' and successful_steps == 0:
-                return {
-                    'success': False,
-                    'message': 'Parallel stage failed: no steps succeeded'
-                }
-            
+        except FuturesTimeoutError:
+            # 排队中的步骤直接取消；已在运行的步骤无法中断，不再等待其结果
+            logger.error(f"并行阶段超时，超时时间: {timeout_seconds} 秒，未完成步骤: {len(pending)}")
+            self._cancel_pending_futures(pending)
             return {
-                'success': True,
-                'message': f'Parallel stage completed: {successful_steps} succeeded, {len(failed_steps)} failed'
+                'success': False,
+                'message': f'Parallel stage timed out after {timeout_seconds}s: {len(pending)} steps unfinished'
             }
-    
+
+        # 根据同步策略判断成功
+        sync_policy = group_info.get('sync_policy', 'wait_all')
+        if sync_policy == 'wait_all' and failed_steps:
+            return {
+                'success': False,
+                'message': f'Parallel stage failed: {len(failed_steps)} steps failed'
+            }
+        elif sync_policy == 'wait_any' and successful_steps == 0:
+            return {
+                'success': False,
+                'message': 'Parallel stage failed: no steps succeeded'
+            }
+
+        return {
+            'success': True,
+            'message': f'Parallel stage completed: {successful_steps} succeeded, {len(failed_steps)} failed'
+        }
+
     def _execute_sequential_stage_optimized(self, 
                                           stage: Dict[str, Any], 
                                           pipeline: Pipeline, 
@@ -1466,7 +1506,8 @@ class ParallelExecutionService:
         
         for step in steps:
             # 检查缓存
-            if self._check_step_cache(step, resource_pool):
+            cache_key, cached_result = self._check_step_cache(step, pipeline_execution, resource_pool)
+            if cached_result is not None:
                 continue
             
             result = self._execute_step_with_monitoring(
@@ -1476,14 +1517,14 @@ class ParallelExecutionService:
                 resource_pool
             )
             
+            # 更新缓存
+            self._update_step_cache(step, pipeline_execution, result, resource_pool, cache_key)
+            
             if not result['success']:
                 return {
                     'success': False,
                     'message': f'Sequential step failed: {result["message"]}'
                 }
-            
-            # 更新缓存
-            self._update_step_cache(step, result, resource_pool)
         
         return {'success': True, 'message': 'Sequential stage completed'}
     
@@ -1526,53 +1567,110 @@ class ParallelExecutionService:
         
         return sorted(steps, key=get_priority)
     
-    def _check_step_cache(self, step: Any, resource_pool: Dict[str, Any]) -> bool:
-        """检查步骤缓存"""
-        if not resource_pool.get('step_cache'):
-            return False
-        
-        step_id = getattr(step, 'id', None)
-        if not step_id:
-            return False
-        
-        # 简单的缓存策略：基于步骤ID和参数hash
-        step_hash = self._calculate_step_hash(step)
-        return step_hash in resource_pool['step_cache']
+    def _check_step_cache(self, step: Any, pipeline_execution,
+                          resource_pool: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        检查步骤缓存（持久化的步骤结果缓存）
+
+        Returns:
+            (缓存键, 命中的结果)；步骤不可缓存时缓存键为 None
+        """
+        cache_key = self._calculate_step_hash(step, pipeline_execution, resource_pool)
+        if cache_key is None:
+            return None, None
+        
+        cached_result = get_step_result_cache().get(cache_key)
+        if cached_result is not None:
+            logger.info(f"步骤命中结果缓存，跳过执行: {getattr(step, 'name', 'unknown')} ({cache_key[:12]})")
+            self._remember_step_output(step, cached_result, resource_pool)
+            self._record_step_cache_result(step, pipeline_execution, cache_key, True, cached_result)
+        return cache_key, cached_result
     
-    def _update_step_cache(self, step: Any, result: Dict[str, Any], resource_pool: Dict[str, Any]):
-        """更新步骤缓存"""
-        if not resource_pool.get('step_cache'):
+    def _update_step_cache(self, step: Any, pipeline_execution, result: Dict[str, Any],
+                           resource_pool: Dict[str, Any], cache_key: Optional[str]):
+        """记录步骤输出供下游步骤计算缓存键；成功结果写入缓存"""
+        self._remember_step_output(step, result, resource_pool)
+        if cache_key is None:
             return
         
-        step_hash = self._calculate_step_hash(step)
-        resource_pool['step_cache'][step_hash] = {
-            'result': result,
-            'timestamp': timezone.now(),
-            'step_name': getattr(step, 'name', 'unknown')
+        if result.get('success', False):
+            get_step_result_cache().set(cache_key, result)
+        self._record_step_cache_result(step, pipeline_execution, cache_key, False, result)
+    
+    def _remember_step_output(self, step: Any, result: Dict[str, Any], resource_pool: Dict[str, Any]):
+        """按步骤ID和名称记录输出（依赖可能以任一方式声明）"""
+        output = {
+            'success': result.get('success', False),
+            'output': result.get('output', ''),
+            'data': result.get('data', {}),
         }
-        
-        # 限制缓存大小
-        if len(resource_pool['step_cache']) > 1000:
-            # 移除最旧的条目
-            oldest_key = min(
-                resource_pool['step_cache'].keys(),
-                key=lambda k: resource_pool['step_cache'][k]['timestamp']
-            )
-            del resource_pool['step_cache'][oldest_key]
+        step_outputs = resource_pool.setdefault('step_outputs', {})
+        for ref in (getattr(step, 'id', None), getattr(step, 'name', None)):
+            if ref is not None:
+                step_outputs[str(ref)] = output
     
-    def _calculate_step_hash(self, step: Any) -> str:
-        """计算步骤hash"""
-        import hashlib
+    def _calculate_step_hash(self, step: Any, pipeline_execution, resource_pool: Dict[str, Any]) -> Optional[str]:
+        """
+        计算步骤缓存键：步骤配置、解析后的输入变量以及声明的上游步骤输出
+
+        步骤不可缓存，或声明的上游步骤在本次执行中还没有输出时返回 None
+        """
+        if not resource_pool.get('step_cache') or not getattr(step, 'id', None):
+            return None
         
-        step_data = {
-            'id': getattr(step, 'id', ''),
+        step_cache = get_step_result_cache()
+        step_type = getattr(step, 'step_type', '')
+        if not step_cache.is_cacheable(step_type, getattr(step, 'config', None)):
+            return None
+        
+        step_config = {
             'name': getattr(step, 'name', ''),
-            'type': getattr(step, 'type', ''),
-            'parameters': getattr(step, 'parameters', {})
+            'config': getattr(step, 'config', {}),
+            'parameters': getattr(step, 'parameters', {}),
         }
+        for field in ('command', 'ansible_parameters', 'docker_image', 'docker_tag',
+                      'docker_config', 'k8s_config'):
+            if hasattr(step, field):
+                step_config[field] = getattr(step, field)
+        
+        variables = dict((pipeline_execution.parameters or {}) if pipeline_execution else {})
+        variables.update(getattr(step, 'environment_vars', None) or {})
+        
+        step_outputs = resource_pool.get('step_outputs', {})
+        upstream_outputs = {}
+        for dependency in getattr(step, 'dependencies', None) or []:
+            output = step_outputs.get(str(dependency))
+            if output is None:
+                logger.debug(f"步骤 {step_config['name']} 的上游 {dependency} 无输出，不使用缓存")
+                return None
+            upstream_outputs[str(dependency)] = output
+        
+        return step_cache.build_key(
+            step_type, step_config, variables=variables, upstream_outputs=upstream_outputs
+        )
+    
+    def _record_step_cache_result(self, step: Any, pipeline_execution, cache_key: str,
+                                  hit: bool, result: Dict[str, Any]):
+        """在步骤执行记录上记录缓存命中情况，命中时步骤直接记为成功"""
+        if pipeline_execution is None:
+            return
         
-        step_str = json.dumps(step_data, sort_keys=True)
-        return hashlib.md5(step_str.encode()).hexdigest()
+        step_field = 'pipeline_step' if step._meta.model_name == 'pipelinestep' else 'atomic_step'
+        try:
+            step_execution, _ = StepExecution.objects.get_or_create(
+                pipeline_execution=pipeline_execution,
+                **{step_field: step},
+                defaults={'order': getattr(step, 'order', 0), 'status': 'pending'}
+            )
+            now = timezone.now()
+            step_execution.status = 'success' if result.get('success', False) else 'failed'
+            step_execution.output = {**(step_execution.output or {}), 'cache': {'hit': hit, 'key': cache_key}}
+            step_execution.logs = result.get('output', '') or step_execution.logs
+            step_execution.started_at = step_execution.started_at or now
+            step_execution.completed_at = now
+            step_execution.save()
+        except Exception as e:
+            logger.warning(f"记录步骤缓存结果失败: {getattr(step, 'name', 'unknown')} - {e}")
     
     def _check_memory_threshold(self, threshold_mb: int) -> bool:
         """检查内存使用是否超过阈值"""
@@ -1781,14 +1879,9 @@ class ParallelExecutionService:
         并行执行多个PipelineStep
         """
         import subprocess
-        from concurrent.futures import ThreadPoolExecutor, as_completed
         
         logger.info(f"开始本地并行执行 {len(steps)} 个PipelineStep，同步策略: {group_info.get('sync_policy', 'wait_all')}")
         
-        # 创建线程池
-        max_workers = min(len(steps), self.max_parallel_workers)
-        logger.info(f"创建线程池，最大工作线程数: {max_workers}")
-        
         def execute_single_pipeline_step(step):
             """执行单个PipelineStep"""
             logger.info(f"开始本地执行PipelineStep: {step.name}")
@@ -1885,23 +1978,26 @@ class ParallelExecutionService:
                     'error': str(e)
                 }
         
-        # 并行执行步骤
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交任务
-            futures = []
-            for step in steps:
-                future = executor.submit(execute_single_pipeline_step, step)
-                futures.append(future)
-                logger.info(f"  - PipelineStep: {step.name}, 顺序: {step.order}, 类型: {step.step_type}")
-            
-            logger.info(f"已提交 {len(futures)} 个并行任务到线程池")
-            
-            # 等待所有任务完成
-            results = []
-            success_count = 0
-            failed_count = 0
-            
-            for future in as_completed(futures):
+        # 通过共享步骤线程池并行执行步骤
+        step_pool = get_step_pool()
+        futures = {}
+        for step in steps:
+            future = step_pool.submit(pipeline_execution.id, execute_single_pipeline_step, step)
+            futures[future] = step
+            logger.info(f"  - PipelineStep: {step.name}, 顺序: {step.order}, 类型: {step.step_type}")
+        
+        logger.info(f"已提交 {len(futures)} 个并行任务到共享步骤线程池，当前状态: {step_pool.get_stats()}")
+        
+        # 等待所有任务完成；未配置并行组超时时，按全部步骤依次执行的最长时间等待
+        results = []
+        success_count = 0
+        failed_count = 0
+        timeout_seconds = group_info.get('timeout_seconds') or sum(step.timeout_seconds or 300 for step in steps)
+        pending = dict(futures)
+        
+        try:
+            for future in as_completed(futures, timeout=timeout_seconds):
+                pending.pop(future, None)
                 result = future.result()
                 results.append(result)
                 
@@ -1911,6 +2007,17 @@ class ParallelExecutionService:
                 else:
                     failed_count += 1
                     logger.error(f"PipelineStep {result['step_name']} 执行失败: {result.get('error', '')}")
+        except FuturesTimeoutError:
+            logger.error(f"并行执行超时，超时时间: {timeout_seconds} 秒，未完成步骤: {len(pending)}")
+            self._cancel_pending_futures(pending)
+            for step in pending.values():
+                failed_count += 1
+                results.append({
+                    'success': False,
+                    'step_name': step.name,
+                    'output': '',
+                    'error': f'并行执行超时（{timeout_seconds}秒）'
+                })
         
         # 根据同步策略判断整体结果
         sync_policy = group_info.get('sync_policy', 'wait_all')
@@ -7,10 +7,15 @@ import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
-from cicd_integrations.models import PipelineExecution, StepExecution
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Length
+from cicd_integrations.models import AtomicStep, ExecutionLogChunk, PipelineExecution, StepExecution
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_STATS_CACHE_KEY = 'realtime:global_system_stats'
+SYSTEM_STATS_CACHE_TTL = 5
+
 
 class PipelineMonitorConsumer(AsyncWebsocketConsumer):
     """
@@ -21,8 +26,15 @@ class PipelineMonitorConsumer(AsyncWebsocketConsumer):
     - Step execution progress
     - Real-time logs
     - Execution control commands
+    
+    Status messages carry step status rows only (no log bodies); step logs are
+    fetched page by page with {"type": "get_step_logs", "step_execution_id", "offset", "limit"}.
     """
     
+    # 单页日志的默认/最大字符数
+    LOG_PAGE_SIZE = 64 * 1024
+    MAX_LOG_PAGE_SIZE = 1024 * 1024
+    
     async def connect(self):
         """Handle WebSocket connection."""
         self.execution_id = self.scope['url_route']['kwargs']['execution_id']
@@ -61,6 +73,8 @@ class PipelineMonitorConsumer(AsyncWebsocketConsumer):
                 await self.send_execution_status()
             elif message_type == 'get_logs':
                 await self.send_execution_logs()
+            elif message_type == 'get_step_logs':
+                await self.send_step_logs(data)
             elif message_type == 'control':
                 await self.handle_control_command(data)
             else:
@@ -114,7 +128,7 @@ class PipelineMonitorConsumer(AsyncWebsocketConsumer):
     async def send_execution_logs(self):
         """Send execution logs to client."""
         try:
-            execution = await self.get_execution()
+            execution = await self.get_execution(include_logs=True)
             if not execution:
                 return
             
@@ -131,6 +145,33 @@ class PipelineMonitorConsumer(AsyncWebsocketConsumer):
             logger.error(f"Error sending execution logs: {e}")
             await self.send_error("Failed to get execution logs")
 
+    async def send_step_logs(self, data):
+        """Send one page of a step's logs to client."""
+        try:
+            step_execution_id = int(data['step_execution_id'])
+            offset = max(0, int(data.get('offset') or 0))
+            limit = max(1, min(int(data.get('limit') or self.LOG_PAGE_SIZE), self.MAX_LOG_PAGE_SIZE))
+        except (KeyError, TypeError, ValueError):
+            await self.send_error("step_execution_id, offset and limit must be integers")
+            return
+        
+        try:
+            page = await self.get_step_log_page(step_execution_id, offset, limit)
+            if page is None:
+                await self.send_error(f"Step execution {step_execution_id} not found")
+                return
+            
+            await self.send(text_data=json.dumps({
+                'type': 'step_logs',
+                'execution_id': self.execution_id,
+                'step_execution_id': step_execution_id,
+                **page
+            }))
+            
+        except Exception as e:
+            logger.error(f"Error sending step logs: {e}")
+            await self.send_error("Failed to get step logs")
+
     async def handle_control_command(self, data):
         """Handle pipeline control commands."""
         command = data.get('command')
@@ -201,14 +242,15 @@ class PipelineMonitorConsumer(AsyncWebsocketConsumer):
 
     # Database operations
     @database_sync_to_async
-    def get_execution(self):
-        """Get execution details from database."""
+    def get_execution(self, include_logs=False):
+        """Get execution details from database (the logs text only when asked for)."""
         try:
-            execution = PipelineExecution.objects.select_related('pipeline').get(
-                id=self.execution_id
-            )
+            queryset = PipelineExecution.objects.select_related('pipeline')
+            if not include_logs:
+                queryset = queryset.defer('logs')
+            execution = queryset.get(id=self.execution_id)
             
-            return {
+            data = {
                 'id': execution.id,
                 'status': execution.status,
                 'started_at': execution.started_at.isoformat() if execution.started_at else None,
@@ -216,60 +258,99 @@ class PipelineMonitorConsumer(AsyncWebsocketConsumer):
                 'updated_at': execution.updated_at.isoformat() if execution.updated_at else None,
                 'pipeline_name': execution.pipeline.name,
                 'trigger_type': execution.trigger_type,
-                'logs': execution.logs or '',
                 'parameters': execution.parameters or {}
             }
+            if include_logs:
+                data['logs'] = execution.logs or ''
+            return data
         except PipelineExecution.DoesNotExist:
             return None
 
     @database_sync_to_async
     def get_step_executions(self):
-        """Get step executions for the pipeline."""
+        """
+        Get step status rows for the pipeline in a single query.
+
+        Each atomic step is annotated with its latest step execution for this run;
+        log bodies are not loaded, only their size (see get_step_log_page).
+        """
         try:
-            # Get atomic steps for this execution's pipeline
-            from cicd_integrations.models import AtomicStep
-            
-            execution = PipelineExecution.objects.get(id=self.execution_id)
-            atomic_steps = AtomicStep.objects.filter(
-                pipeline=execution.pipeline
-            ).order_by('order')
-            
-            steps = []
-            for step in atomic_steps:
-                # Try to get step execution
-                try:
-                    step_execution = StepExecution.objects.get(
-                        pipeline_execution=execution,
-                        atomic_step=step
-                    )
-                    status = step_execution.status
-                    started_at = step_execution.started_at.isoformat() if step_execution.started_at else None
-                    completed_at = step_execution.completed_at.isoformat() if step_execution.completed_at else None
-                    logs = step_execution.logs or ''
-                except StepExecution.DoesNotExist:
-                    status = 'pending'
-                    started_at = None
-                    completed_at = None
-                    logs = ''
-                
-                steps.append({
-                    'id': step.id,
-                    'name': step.name,
-                    'step_type': step.step_type,
-                    'order': step.order,
-                    'status': status,
-                    'started_at': started_at,
-                    'completed_at': completed_at,
-                    'logs': logs,
-                    'config': step.config or {}
-                })
+            latest = StepExecution.objects.filter(
+                pipeline_execution_id=self.execution_id,
+                atomic_step_id=OuterRef('pk')
+            ).order_by('-id')
+            last_chunk = ExecutionLogChunk.objects.filter(
+                pipeline_execution_id=self.execution_id,
+                stream_id=OuterRef('step_execution_id')
+            ).order_by('-seq')
+            
+            rows = AtomicStep.objects.filter(
+                pipeline_id=Subquery(
+                    PipelineExecution.objects.filter(id=self.execution_id).values('pipeline_id')[:1]
+                )
+            ).order_by('order').annotate(
+                step_execution_id=Subquery(latest.values('id')[:1]),
+                execution_status=Subquery(latest.values('status')[:1]),
+                execution_started_at=Subquery(latest.values('started_at')[:1]),
+                execution_completed_at=Subquery(latest.values('completed_at')[:1]),
+                legacy_log_size=Subquery(latest.annotate(size=Length('logs')).values('size')[:1]),
+            ).annotate(
+                chunk_log_size=Subquery(last_chunk.annotate(end=F('offset') + F('length')).values('end')[:1]),
+            ).values(
+                'id', 'name', 'step_type', 'order', 'config',
+                'step_execution_id', 'execution_status', 'execution_started_at',
+                'execution_completed_at', 'legacy_log_size', 'chunk_log_size'
+            )
             
-            return steps
+            return [
+                {
+                    'id': row['id'],
+                    'name': row['name'],
+                    'step_type': row['step_type'],
+                    'order': row['order'],
+                    'status': row['execution_status'] or 'pending',
+                    'step_execution_id': row['step_execution_id'],
+                    'started_at': row['execution_started_at'].isoformat() if row['execution_started_at'] else None,
+                    'completed_at': row['execution_completed_at'].isoformat() if row['execution_completed_at'] else None,
+                    'log_size': row['chunk_log_size'] or row['legacy_log_size'] or 0,
+                    'config': row['config'] or {}
+                }
+                for row in rows
+            ]
             
         except Exception as e:
             logger.error(f"Error getting step executions: {e}")
             return []
 
+    @database_sync_to_async
+    def get_step_log_page(self, step_execution_id, offset, limit):
+        """
+        Read one page of a step's logs.
+
+        Logs written through the chunk store are range-read; older steps that only
+        have the legacy logs field are sliced from it.
+        """
+        from cicd_integrations.log_store import execution_log_store
+        
+        if not StepExecution.objects.filter(
+            id=step_execution_id, pipeline_execution_id=self.execution_id
+        ).exists():
+            return None
+        
+        if execution_log_store.has_logs(self.execution_id, step_execution_id):
+            return execution_log_store.read(
+                self.execution_id, step_execution_id=step_execution_id, offset=offset, limit=limit
+            )
+        
+        logs = StepExecution.objects.filter(id=step_execution_id).values_list('logs', flat=True).first() or ''
+        content = logs[offset:offset + limit]
+        return {
+            'content': content,
+            'offset': offset,
+            'next_offset': offset + len(content),
+            'has_more': offset + len(content) < len(logs)
+        }
+
     @database_sync_to_async
     def update_execution_status(self, status):
         """Update execution status in database."""
@@ -381,43 +462,48 @@ class GlobalMonitorConsumer(AsyncWebsocketConsumer):
     # Database operations
     @database_sync_to_async
     def get_system_stats(self):
-        """Get system statistics."""
+        """
+        Get system statistics.
+
+        Totals and success rate are read from the execution stats buckets and the
+        result is cached briefly, so each connected client does not scan the
+        execution table; only the running count is live.
+        """
         try:
+            from django.core.cache import cache
             from django.utils import timezone
             from datetime import timedelta
-            
+            from cicd_integrations import stats_rollup
+
+            cached = cache.get(SYSTEM_STATS_CACHE_KEY)
+            if cached is not None:
+                return cached
+
             now = timezone.now()
-            today = now.date()
-            
-            # Total executions
-            total_executions = PipelineExecution.objects.count()
-            
-            # Today's executions
-            today_executions = PipelineExecution.objects.filter(
-                created_at__date=today
-            ).count()
-            
+            source = stats_rollup.PIPELINE_EXECUTION
+
+            total_executions = stats_rollup.total(source)
+            today_executions = stats_rollup.aggregate(
+                source, stats_rollup.truncate(now, 'day'), now
+            )['total']
+
             # Running executions
             running_executions = PipelineExecution.objects.filter(
                 status='running'
             ).count()
-            
+
             # Success rate (last 24 hours)
-            yesterday = now - timedelta(days=1)
-            recent_executions = PipelineExecution.objects.filter(
-                created_at__gte=yesterday
-            )
-            total_recent = recent_executions.count()
-            successful_recent = recent_executions.filter(status='success').count()
-            success_rate = (successful_recent / total_recent * 100) if total_recent > 0 else 0
-            
-            return {
+            success_rate = stats_rollup.aggregate(source, now - timedelta(days=1), now)['success_rate']
+
+            stats = {
                 'total_executions': total_executions,
                 'today_executions': today_executions,
                 'running_executions': running_executions,
                 'success_rate': round(success_rate, 1),
                 'last_updated': now.isoformat()
             }
+            cache.set(SYSTEM_STATS_CACHE_KEY, stats, SYSTEM_STATS_CACHE_TTL)
+            return stats
             
         except Exception as e:
             logger.error(f"Error getting system stats: {e}")
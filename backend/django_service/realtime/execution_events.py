@@ -0,0 +1,130 @@
+"""
+执行事件发布
+执行器在状态变化时把增量事件发布到按执行划分的 Redis 频道（ansflow:execution:<id>），
+FastAPI WebSocket 服务每个执行只订阅一次并转发给该执行的所有连接，取代逐连接轮询数据库
+
+新写入的日志分片同时追加到 Redis Stream（ansflow:execution-log:<id>），
+供 FastAPI 的 SSE 日志跟踪用 XREAD BLOCK 读取
+"""
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_CHANNEL_PREFIX = 'ansflow:execution:'
+EXECUTION_LOG_STREAM_PREFIX = 'ansflow:execution-log:'
+# 日志流只用于跟踪最新输出，历史日志以数据库分片为准
+EXECUTION_LOG_STREAM_MAXLEN = 5000
+EXECUTION_LOG_STREAM_TTL = 24 * 3600
+TERMINAL_STATUSES = ('success', 'failed', 'cancelled', 'timeout')
+
+
+def get_execution_channel(execution_id: int) -> str:
+    return f"{EXECUTION_CHANNEL_PREFIX}{execution_id}"
+
+
+def _get_redis_connection():
+    from django_redis import get_redis_connection
+    return get_redis_connection(getattr(settings, 'EXECUTION_EVENTS_CACHE_ALIAS', 'default'))
+
+
+def publish_execution_event(execution_id: Optional[int], event_type: str, data: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    发布执行事件，消息体与 WebSocket 客户端收到的消息格式一致
+
+    发布失败只记录日志，不影响执行流程
+    """
+    if not execution_id or not getattr(settings, 'EXECUTION_EVENTS_ENABLED', True):
+        return False
+
+    message = {
+        'type': event_type,
+        'execution_id': execution_id,
+        'timestamp': timezone.now().isoformat(),
+        **(data or {})
+    }
+
+    try:
+        _get_redis_connection().publish(
+            get_execution_channel(execution_id),
+            json.dumps(message, ensure_ascii=False, default=str)
+        )
+        return True
+    except Exception as e:
+        logger.debug(f"发布执行事件失败: execution={execution_id} type={event_type} - {e}")
+        return False
+
+
+def publish_execution_status(execution, **extra) -> bool:
+    """发布流水线执行状态变化；执行结束时在日志流中写入结束标记"""
+    if execution.status in TERMINAL_STATUSES:
+        append_log_stream(execution.id, {'type': 'end', 'status': execution.status})
+
+    return publish_execution_event(execution.id, 'execution_update', {
+        'status': execution.status,
+        'started_at': execution.started_at,
+        'completed_at': execution.completed_at,
+        **extra
+    })
+
+
+def publish_step_status(step_execution, step_name: Optional[str] = None, **extra) -> bool:
+    """发布步骤状态变化（不携带完整日志）"""
+    execution_time = None
+    if step_execution.started_at and step_execution.completed_at:
+        execution_time = (step_execution.completed_at - step_execution.started_at).total_seconds()
+
+    return publish_execution_event(step_execution.pipeline_execution_id, 'step_progress', {
+        'step_id': step_execution.id,
+        'step_name': step_name,
+        'status': step_execution.status,
+        'execution_time': execution_time,
+        'error_message': step_execution.error_message or None,
+        **extra
+    })
+
+
+def publish_log_lines(execution_id: int, message: str, step_name: Optional[str] = None,
+                      level: str = 'info', source: str = 'step_output') -> bool:
+    """发布一批新的日志输出"""
+    return publish_execution_event(execution_id, 'log_entry', {
+        'message': message,
+        'level': level,
+        'step_name': step_name,
+        'source': source,
+    })
+
+
+def append_log_stream(execution_id: Optional[int], fields: Dict[str, Any]) -> bool:
+    """向执行日志流追加一条记录，失败只记录日志"""
+    if not execution_id or not getattr(settings, 'EXECUTION_EVENTS_ENABLED', True):
+        return False
+
+    key = f"{EXECUTION_LOG_STREAM_PREFIX}{execution_id}"
+    try:
+        connection = _get_redis_connection()
+        pipe = connection.pipeline(transaction=False)
+        pipe.xadd(key, {name: '' if value is None else str(value) for name, value in fields.items()},
+                  maxlen=EXECUTION_LOG_STREAM_MAXLEN, approximate=True)
+        pipe.expire(key, EXECUTION_LOG_STREAM_TTL)
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.debug(f"追加执行日志流失败: execution={execution_id} - {e}")
+        return False
+
+
+def publish_log_chunk(chunk) -> bool:
+    """把新写入的日志分片（ExecutionLogChunk）追加到执行日志流"""
+    return append_log_stream(chunk.pipeline_execution_id, {
+        'chunk_id': chunk.id,
+        'stream_id': chunk.stream_id,
+        'step_execution_id': chunk.step_execution_id,
+        'offset': chunk.offset,
+        'content': chunk.content,
+        'created_at': chunk.created_at.isoformat() if chunk.created_at else None,
+    })
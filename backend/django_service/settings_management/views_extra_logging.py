@@ -3,7 +3,10 @@ AnsFlow日志管理API视图 - Phase 3历史分析功能
 提供日志查询、历史分析、性能统计等功能
 """
 import os
+import copy
 import json
+import threading
+import time
 import gzip
 import logging
 from datetime import datetime, timedelta
@@ -35,12 +38,41 @@ except ImportError:
     PrometheusCounter = Histogram = Gauge = None
 
 
+from common.log_search_index import LogFile, LogSearchIndex
+
+
 logger = logging.getLogger(__name__)
 
+# 按日志目录共享的检索索引实例（LogQueryEngine 按请求创建）
+_search_indexes: Dict[str, LogSearchIndex] = {}
+_search_indexes_lock = threading.Lock()
+
+# 按日志目录共享的文件清单（LogFileIndexer 按请求创建）
+_file_manifests: Dict[str, Dict[str, Any]] = {}
+_file_manifests_lock = threading.Lock()
+# 正在刷新清单的日志目录，同一目录同时只有一个线程扫描
+_file_manifests_refreshing: set = set()
+
 
 class LogFileIndexer:
-    """日志文件索引器 - Phase 3核心功能"""
-    
+    """
+    日志文件索引器 - Phase 3核心功能
+
+    文件清单（路径、inode、大小、mtime、时间范围、服务、级别、行数及行偏移检查点）按日志目录
+    常驻内存，并持久化到 <日志目录>/.index/files.json。刷新时只重新扫描 mtime 变化的目录，
+    只对仍在写入的 .log 文件做 stat；已轮转的文件只在首次出现时读取一次
+    """
+
+    MANIFEST_VERSION = 1
+    REFRESH_INTERVAL = 5          # 两次增量刷新的最小间隔（秒）
+    SAVE_INTERVAL = 60            # 清单落盘的最小间隔（秒），目录结构变化时立即落盘
+    LINE_CHECKPOINT = 10000       # 每隔多少行记录一次行首字节偏移
+    READ_BLOCK_SIZE = 1024 * 1024
+    # 目录 mtime 精度可能只有1秒，刚修改过的目录下次仍重新扫描
+    DIR_MTIME_SLACK = 2
+
+    _TIMESTAMP_RE = re.compile(rb'(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})')
+
     def __init__(self, log_dir: str = None):
         # 统一日志管理：所有日志都存放在项目根目录的logs文件夹中
         project_root = Path(settings.BASE_DIR).parent.parent  # 项目根目录
@@ -51,34 +83,23 @@ class LogFileIndexer:
         self.log_dir = self.log_directories[0]
         self.cache_timeout = 300  # 5分钟缓存
         self.logger = logging.getLogger(__name__)
-        
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.log_dir / '.index' / 'files.json'
+
     def _get_logs_last_modified(self) -> float:
         """获取日志目录中最新文件的修改时间"""
-        latest_time = 0
-        for log_directory in self.log_directories:
-            if not log_directory.exists():
-                continue
-            try:
-                for log_file in log_directory.rglob('*.log*'):
-                    if log_file.is_file():
-                        mtime = log_file.stat().st_mtime
-                        latest_time = max(latest_time, mtime)
-            except Exception:
-                continue
-        return latest_time
-        
-    def build_file_index(self, days: int = 30) -> Dict[str, Any]:
-        """构建日志文件索引"""
-        # 为了确保索引的实时性，暂时禁用缓存
-        # cache_key = f"log_file_index_{days}"
-        # cache_time_key = f"log_file_index_time_{days}"
-        
-        # cached_index = cache.get(cache_key)
-        # cached_time = cache.get(cache_time_key, 0)
-        
-        # 直接重建索引，确保实时性
-        current_log_time = self._get_logs_last_modified()
-            
+        return max((entry['mtime'] for entry in self.file_entries()), default=0)
+
+    def build_file_index(self, days: int = 30, force: bool = False) -> Dict[str, Any]:
+        """
+        构建日志文件索引
+
+        Args:
+            days: 只返回最近 days 天内修改过的文件
+            force: 丢弃已有清单并全量重建
+        """
         index = {
             'files': [],
             'date_range': [],
@@ -87,78 +108,313 @@ class LogFileIndexer:
             'total_size': 0,
             'build_time': datetime.now().isoformat()
         }
-        
+
         try:
-            # 扫描所有配置的日志目录
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            for log_directory in self.log_directories:
-                if not log_directory.exists():
-                    self.logger.debug(f"日志目录不存在，跳过: {log_directory}")
+            entries = self.file_entries(force=force)
+            cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+
+            for entry in entries:
+                if entry['mtime'] < cutoff:
                     continue
-                    
-                self.logger.info(f"扫描日志目录: {log_directory}")
-                
-                for log_file in log_directory.rglob('*.log*'):
-                    if not log_file.is_file():
-                        continue
-                        
-                    try:
-                        file_stat = log_file.stat()
-                        file_time = datetime.fromtimestamp(file_stat.st_mtime)
-                        
-                        if file_time < cutoff_date:
-                            continue
-                            
-                        # 使用第一个日志目录作为相对路径基准
-                        try:
-                            relative_path = str(log_file.relative_to(self.log_directories[0]))
-                        except ValueError:
-                            # 如果文件不在第一个目录下，使用完整路径
-                            relative_path = str(log_file)
-                            
-                        file_info = {
-                            'path': str(log_file),
-                            'relative_path': relative_path,
-                            'size': file_stat.st_size,
-                            'modified': file_time.isoformat(),
-                            'is_compressed': log_file.suffix == '.gz',
-                            'service': self._extract_service_from_path(log_file),
-                            'level': self._extract_level_from_path(log_file)
-                        }
-                        
-                        index['files'].append(file_info)
-                        index['services'].add(file_info['service'])
-                        index['levels'].add(file_info['level'])
-                        index['total_size'] += file_stat.st_size
-                        
-                    except Exception as e:
-                        self.logger.warning(f"处理文件 {log_file} 时出错: {e}")
-                    
+
+                file_info = {
+                    'path': entry['path'],
+                    'relative_path': entry['relative_path'],
+                    'size': entry['size'],
+                    'modified': datetime.fromtimestamp(entry['mtime']).isoformat(),
+                    'is_compressed': entry['is_compressed'],
+                    'service': entry['service'],
+                    'level': entry['level'],
+                    'line_count': entry['line_count'],
+                    'time_range': list(entry['time_range']),
+                }
+
+                index['files'].append(file_info)
+                index['services'].add(file_info['service'])
+                index['levels'].add(file_info['level'])
+                index['total_size'] += entry['size']
+
             # 转换集合为列表以便序列化
             index['services'] = list(index['services'])
             index['levels'] = list(index['levels'])
-            
+
             # 按时间排序文件
             index['files'].sort(key=lambda x: x['modified'], reverse=True)
-            
+
             # 计算日期范围
             if index['files']:
                 dates = [f['modified'] for f in index['files']]
                 index['date_range'] = [min(dates), max(dates)]
-                
-            # 暂时禁用缓存，确保索引实时性
-            # cache.set(cache_key, index, 300)  # 5分钟缓存
-            # cache.set(cache_time_key, current_log_time, 300)
-            
-            self.logger.info(f"构建日志文件索引完成: {len(index['files'])} 个文件, "
-                           f"总大小 {index['total_size'] / 1024 / 1024:.2f}MB")
-            
+
+            self.logger.debug(f"构建日志文件索引完成: {len(index['files'])} 个文件, "
+                              f"总大小 {index['total_size'] / 1024 / 1024:.2f}MB")
+
         except Exception as e:
             self.logger.error(f"构建日志文件索引失败: {e}")
-            
+
         return index
-    
+
+    # ------------------------------------------------------------------
+    # 文件清单
+    # ------------------------------------------------------------------
+
+    def refresh_manifest(self, force: bool = False) -> Dict[str, Any]:
+        """
+        增量刷新并返回文件清单（进程内按日志目录共享）
+
+        锁内只取出共享清单；扫描目录、读取新增内容和落盘都在锁外的副本上进行，完成后在锁内替换共享清单，
+        已发布的清单不再原地修改。其他线程正在刷新同一目录时直接返回当前清单
+        """
+        key = str(self.log_dir)
+        with _file_manifests_lock:
+            manifest = _file_manifests.get(key)
+            if manifest is not None and not force and (
+                key in _file_manifests_refreshing
+                or time.monotonic() - manifest['_refreshed'] < self.REFRESH_INTERVAL
+            ):
+                return manifest
+            _file_manifests_refreshing.add(key)
+
+        try:
+            if force:
+                working = self._empty_manifest()
+            elif manifest is None:
+                working = self._load_manifest()
+            else:
+                working = copy.deepcopy(manifest)
+            self._scan_manifest(working, force)
+
+            with _file_manifests_lock:
+                _file_manifests[key] = working
+            return working
+        finally:
+            with _file_manifests_lock:
+                _file_manifests_refreshing.discard(key)
+
+    def file_entries(self, force: bool = False) -> List[Dict[str, Any]]:
+        """刷新清单并返回文件条目的副本"""
+        manifest = self.refresh_manifest(force=force)
+        return [dict(entry) for entry in manifest['files'].values()]
+
+    def _scan_manifest(self, manifest: Dict[str, Any], force: bool = False):
+        """扫描日志目录更新清单（调用方持有的副本），按需落盘"""
+        seen = set()
+        dirs_before = {path: record['mtime'] for path, record in manifest['dirs'].items()}
+        changed = False
+        for log_directory in self.log_directories:
+            if log_directory.exists():
+                changed |= self._scan_directory(manifest, str(log_directory), seen)
+
+        # 目录已不存在或文件已删除
+        for path in [path for path in manifest['files'] if path not in seen]:
+            del manifest['files'][path]
+            changed = True
+        for path in [path for path in manifest['dirs'] if not os.path.isdir(path)]:
+            del manifest['dirs'][path]
+
+        # 活动文件增长只更新内存中的清单，按间隔落盘；目录结构变化（新文件、轮转）立即落盘
+        now = time.monotonic()
+        dirs_changed = dirs_before != {path: record['mtime'] for path, record in manifest['dirs'].items()}
+        if force or dirs_changed or (changed and now - manifest.get('_saved', 0) >= self.SAVE_INTERVAL):
+            self._save_manifest(manifest)
+            manifest['_saved'] = now
+        manifest['_refreshed'] = now
+
+    def _empty_manifest(self) -> Dict[str, Any]:
+        return {'version': self.MANIFEST_VERSION, 'dirs': {}, 'files': {}, '_refreshed': 0}
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == self.MANIFEST_VERSION:
+                manifest['_refreshed'] = 0
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"日志文件清单无效，重新构建: {e}")
+        return self._empty_manifest()
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            data = {key: value for key, value in manifest.items() if not key.startswith('_')}
+            tmp_path = self.manifest_path.with_name(f"files.json.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            self.logger.warning(f"保存日志文件清单失败: {e}")
+
+    def _scan_directory(self, manifest: Dict[str, Any], directory: str, seen: set) -> bool:
+        """扫描一个目录，目录 mtime 未变化时沿用上次的文件列表，返回清单是否有变化"""
+        try:
+            dir_mtime = os.stat(directory).st_mtime
+        except OSError:
+            return False
+
+        changed = False
+        record = manifest['dirs'].get(directory)
+
+        if record is not None and record['mtime'] == dir_mtime:
+            # 目录内没有新增、删除或重命名：已轮转的文件不会变化，只检查仍在写入的 .log 文件
+            file_names, subdirs = record['files'], record['dirs']
+            for name in file_names:
+                path = os.path.join(directory, name)
+                seen.add(path)
+                if name.endswith('.log') or path not in manifest['files']:
+                    try:
+                        changed |= self._update_file(manifest, path, os.stat(path))
+                    except OSError:
+                        seen.discard(path)
+        else:
+            file_names, subdirs = [], []
+            # 本目录中已有条目按 inode 归档，轮转重命名的文件直接复用
+            by_inode = {
+                entry['inode']: entry for path, entry in manifest['files'].items()
+                if os.path.dirname(path) == directory
+            }
+            try:
+                with os.scandir(directory) as entries:
+                    for dir_entry in entries:
+                        if dir_entry.name.startswith('.'):
+                            continue
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            subdirs.append(dir_entry.name)
+                        elif '.log' in dir_entry.name and dir_entry.is_file():
+                            file_names.append(dir_entry.name)
+                            seen.add(dir_entry.path)
+                            changed |= self._update_file(
+                                manifest, dir_entry.path, dir_entry.stat(), by_inode
+                            )
+            except OSError as e:
+                self.logger.warning(f"扫描日志目录 {directory} 失败: {e}")
+                return changed
+
+            trusted = time.time() - dir_mtime > self.DIR_MTIME_SLACK
+            manifest['dirs'][directory] = {
+                'mtime': dir_mtime if trusted else None,
+                'files': file_names,
+                'dirs': subdirs,
+            }
+            changed = True
+
+        for name in subdirs:
+            changed |= self._scan_directory(manifest, os.path.join(directory, name), seen)
+        return changed
+
+    def _update_file(self, manifest: Dict[str, Any], path: str, stat: os.stat_result,
+                     by_inode: Optional[Dict[int, Dict]] = None) -> bool:
+        """按 inode/大小/mtime 更新单个文件的清单条目，返回是否有变化"""
+        files = manifest['files']
+        entry = files.get(path)
+
+        if entry is None and by_inode and stat.st_ino in by_inode:
+            # 轮转重命名：inode 不变，内容不变
+            previous = by_inode[stat.st_ino]
+            if previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+                entry = dict(previous, path=path, relative_path=self._relative_path(Path(path)))
+                files[path] = entry
+                return True
+
+        if entry is not None and entry['inode'] == stat.st_ino \
+                and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return False
+
+        file_path = Path(path)
+        if entry is None or entry['inode'] != stat.st_ino or stat.st_size < entry['size'] \
+                or entry['is_compressed']:
+            # 新文件、被替换或截断：从头建立条目
+            entry = {
+                'path': path,
+                'relative_path': self._relative_path(file_path),
+                'inode': stat.st_ino,
+                'size': 0,
+                'mtime': 0,
+                'is_compressed': file_path.suffix == '.gz',
+                'service': self._extract_service_from_path(file_path),
+                'level': self._extract_level_from_path(file_path),
+                'line_count': 0,
+                'line_offsets': [0],  # 第 i * LINE_CHECKPOINT 行（从0计）的行首字节偏移
+                'time_range': [None, None],
+            }
+            files[path] = entry
+
+        try:
+            if entry['is_compressed']:
+                # 压缩文件只读取首行时间，不解压全文统计行数
+                entry['time_range'] = [self._read_first_timestamp(file_path), None]
+            else:
+                self._scan_appended(file_path, entry, stat.st_size)
+        except OSError as e:
+            self.logger.warning(f"处理文件 {path} 时出错: {e}")
+
+        entry['size'] = stat.st_size
+        entry['mtime'] = stat.st_mtime
+        return True
+
+    def _scan_appended(self, file_path: Path, entry: Dict[str, Any], size: int):
+        """读取上次记录位置之后新增的内容，更新行数、行偏移检查点和时间范围"""
+        start = entry['size']
+        line_count = entry['line_count']
+        offsets = entry['line_offsets']
+
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            position = start
+            first_block = None
+            while position < size:
+                block = f.read(min(self.READ_BLOCK_SIZE, size - position))
+                if not block:
+                    break
+                if first_block is None:
+                    first_block = block
+
+                newlines = block.count(b'\n')
+                next_checkpoint = (line_count // self.LINE_CHECKPOINT + 1) * self.LINE_CHECKPOINT
+                if line_count + newlines >= next_checkpoint:
+                    # 跨过检查点时按行切分，累加行长度定位检查点行的下一行行首
+                    parts = block.split(b'\n')
+                    consumed, length = 0, 0
+                    for checkpoint in range(next_checkpoint, line_count + newlines + 1, self.LINE_CHECKPOINT):
+                        k = checkpoint - line_count
+                        length += sum(map(len, parts[consumed:k]))
+                        consumed = k
+                        offsets.append(position + length + k)
+                line_count += newlines
+                position += len(block)
+
+            tail_start = max(start, size - 4096)
+            f.seek(tail_start)
+            tail = f.read(size - tail_start)
+
+        entry['line_count'] = line_count
+        if entry['time_range'][0] is None and first_block:
+            entry['time_range'][0] = self._find_timestamp(first_block[:4096])
+        last = self._find_timestamp(tail, last=True)
+        if last:
+            entry['time_range'][1] = last
+
+    def _read_first_timestamp(self, file_path: Path) -> Optional[str]:
+        opener = gzip.open if file_path.suffix == '.gz' else open
+        with opener(file_path, 'rb') as f:
+            return self._find_timestamp(f.read(4096))
+
+    def _find_timestamp(self, data: bytes, last: bool = False) -> Optional[str]:
+        matches = self._TIMESTAMP_RE.findall(data)
+        if not matches:
+            return None
+        return (matches[-1] if last else matches[0]).decode('ascii').replace(' ', 'T')
+
+    def _relative_path(self, file_path: Path) -> str:
+        # 使用第一个日志目录作为相对路径基准
+        try:
+            return str(file_path.relative_to(self.log_directories[0]))
+        except ValueError:
+            # 如果文件不在第一个目录下，使用完整路径
+            return str(file_path)
+
     def _extract_service_from_path(self, file_path: Path) -> str:
         """从文件路径提取服务名"""
         path_parts = file_path.parts
@@ -197,44 +453,34 @@ class LogQueryEngine:
         limit = min(int(query_params.get('limit', 100)), 1000)
         offset = int(query_params.get('offset', 0))
         
-        # 为了确保搜索结果的实时性，暂时禁用搜索缓存
-        # cache_key = f"log_search_{hash(json.dumps(query_params, sort_keys=True))}"
-        # cached_result = cache.get(cache_key)
-        # if cached_result:
-        #     return cached_result
-        
         try:
-            # 获取相关文件
-            relevant_files = self._get_relevant_files(start_time, end_time, services)
-            
-            # 搜索日志条目
-            results = []
-            total_count = 0
+            # 通过检索索引定位匹配行：按时间桶剪枝，级别/服务位图过滤，倒排索引匹配关键字
+            search_index = self._get_search_index()
+            search_result = search_index.search(
+                query=keywords,
+                levels=levels,
+                services=services,
+                start=self._to_timestamp(start_time),
+                end=self._to_timestamp(end_time),
+                offset=offset,
+                limit=limit
+            )
             
-            for file_info in relevant_files[:10]:  # 限制搜索文件数量
-                file_results = self._search_in_file(
-                    file_info, keywords, levels, start_time, end_time
-                )
-                results.extend(file_results)
-                
-            # 排序和分页
-            results.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            total_count = len(results)
-            paginated_results = results[offset:offset + limit]
+            paginated_results = []
+            for hit in search_result['hits']:
+                log_entry = self._parse_log_line(hit.line, hit.line_number, self._get_file_info(hit.path))
+                if log_entry:
+                    paginated_results.append(log_entry)
             
-            result = {
+            total_count = search_result['total_count']
+            return {
                 'logs': paginated_results,
                 'total_count': total_count,
-                'files_searched': len(relevant_files),
+                'files_searched': search_index.get_stats()['files'],
                 'query_time': datetime.now().isoformat(),
                 'has_more': offset + len(paginated_results) < total_count
             }
             
-            # 为了确保搜索结果的实时性，暂时禁用搜索缓存
-            # cache.set(cache_key, result, 15)  # 15秒缓存
-            
-            return result
-            
         except Exception as e:
             self.logger.error(f"日志搜索失败: {e}")
             return {
@@ -244,72 +490,65 @@ class LogQueryEngine:
                 'query_time': datetime.now().isoformat()
             }
     
-    def _get_relevant_files(self, start_time: str, end_time: str, services: List[str]) -> List[Dict]:
-        """获取相关的日志文件"""
-        index = self.indexer.build_file_index()
-        relevant_files = []
-        
-        for file_info in index['files']:
-            # 服务过滤
-            if services and file_info['service'] not in services:
-                continue
-                
-            # 时间过滤（简单实现）
-            if start_time and file_info['modified'] < start_time:
-                continue
-            if end_time and file_info['modified'] > end_time:
-                continue
-                
-            relevant_files.append(file_info)
-            
-        return relevant_files
+    def _get_search_index(self) -> LogSearchIndex:
+        """获取日志目录对应的检索索引（进程内共享，索引文件存放在 <日志目录>/.index/django）"""
+        log_dir = str(self.indexer.log_dir)
+        with _search_indexes_lock:
+            search_index = _search_indexes.get(log_dir)
+            if search_index is None:
+                search_index = LogSearchIndex(
+                    log_dir, self._index_log_line, name='django', patterns=('**/*.log*',),
+                    file_source=self._indexed_log_files
+                )
+                _search_indexes[log_dir] = search_index
+        return search_index
+    
+    def _indexed_log_files(self) -> List[LogFile]:
+        """检索索引的文件来源：复用 LogFileIndexer 的增量文件清单，刷新时不再单独遍历日志目录"""
+        return [
+            LogFile(entry['path'], entry['inode'], entry['size'], entry['mtime'])
+            for entry in self.indexer.file_entries()
+        ]
+    
+    def _get_file_info(self, path: str) -> Dict:
+        """构造 _parse_log_line 所需的文件信息"""
+        file_path = Path(path)
+        try:
+            relative_path = str(file_path.relative_to(self.indexer.log_dir))
+        except ValueError:
+            relative_path = path
+        return {
+            'path': path,
+            'relative_path': relative_path,
+            'service': self.indexer._extract_service_from_path(file_path),
+        }
     
-    def _search_in_file(self, file_info: Dict, keywords: str, levels: List[str], 
-                       start_time: str, end_time: str) -> List[Dict]:
-        """在单个文件中搜索"""
-        results = []
-        file_path = Path(file_info['path'])
+    def _index_log_line(self, line: str, path: str):
+        """检索索引的行解析：返回 (时间戳, 级别, 服务, 检索文本)"""
+        file_info = self._get_file_info(path)
+        log_entry = self._parse_log_line(line, 0, file_info)
+        if not log_entry:
+            return None
         
+        timestamp = None if log_entry.get('raw') else self._to_timestamp(log_entry.get('timestamp'))
+        # 与原有关键字匹配范围一致：消息、logger 名和服务名
+        text = ' '.join([
+            str(log_entry.get('message', '')),
+            str(log_entry.get('logger', '')),
+            str(log_entry.get('service', ''))
+        ])
+        return timestamp, str(log_entry.get('level', 'INFO')), file_info['service'], text
+    
+    def _to_timestamp(self, value) -> Optional[float]:
+        """将 ISO / 传统日志格式的时间转换为时间戳，无法解析时返回 None"""
+        if not value:
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
         try:
-            # 打开文件（支持压缩文件）
-            if file_info.get('is_compressed'):
-                file_handle = gzip.open(file_path, 'rt', encoding='utf-8', errors='ignore')
-            else:
-                file_handle = open(file_path, 'r', encoding='utf-8', errors='ignore')
-            
-            with file_handle:
-                for line_num, line in enumerate(file_handle, 1):
-                    if len(results) >= 200:  # 限制单文件结果数量
-                        break
-                        
-                    try:
-                        # 尝试解析JSON格式的日志
-                        log_entry = self._parse_log_line(line, line_num, file_info)
-                        if not log_entry:
-                            continue
-                            
-                        # 级别过滤
-                        if levels and log_entry.get('level') not in levels:
-                            continue
-                            
-                        # 关键字过滤
-                        if keywords and not self._match_keywords(log_entry, keywords):
-                            continue
-                            
-                        # 时间过滤
-                        if not self._match_time_range(log_entry, start_time, end_time):
-                            continue
-                            
-                        results.append(log_entry)
-                        
-                    except Exception as e:
-                        # 跳过解析失败的行
-                        continue
-                        
-        except Exception as e:
-            self.logger.warning(f"读取文件 {file_path} 失败: {e}")
-            
-        return results
+            return datetime.fromisoformat(str(value).replace('Z', '+00:00').replace(',', '.')).timestamp()
+        except ValueError:
+            return None
     
     def _parse_log_line(self, line: str, line_num: int, file_info: Dict) -> Optional[Dict]:
         """解析日志行"""
@@ -354,41 +593,6 @@ class LogQueryEngine:
             'service': file_info['service'],
             'raw': True
         }
-    
-    def _match_keywords(self, log_entry: Dict, keywords: str) -> bool:
-        """关键字匹配"""
-        if not keywords:
-            return True
-            
-        # 支持多个关键字，用空格分隔
-        keyword_list = keywords.lower().split()
-        text_to_search = ' '.join([
-            str(log_entry.get('message', '')),
-            str(log_entry.get('logger', '')),
-            str(log_entry.get('service', ''))
-        ]).lower()
-        
-        # 所有关键字都要匹配（AND逻辑）
-        return all(keyword in text_to_search for keyword in keyword_list)
-    
-    def _match_time_range(self, log_entry: Dict, start_time: str, end_time: str) -> bool:
-        """时间范围匹配"""
-        if not start_time and not end_time:
-            return True
-            
-        entry_time = log_entry.get('timestamp', '')
-        if not entry_time:
-            return True
-            
-        try:
-            # 简单的字符串比较（假设时间格式一致）
-            if start_time and entry_time < start_time:
-                return False
-            if end_time and entry_time > end_time:
-                return False
-            return True
-        except:
-            return True
 
 
 class LogAnalyzer:
@@ -544,9 +748,9 @@ class LogFileIndexView(LogManagementAPIView):
                     'file_path': file_info['relative_path'],
                     'service': file_info['service'],
                     'size_mb': file_info['size'] / (1024 * 1024),  # 转换为MB
-                    'line_count': 0,  # 暂时设为0，可以后续优化
+                    'line_count': file_info['line_count'],
                     'last_modified': file_info['modified'],
-                    'date_range': index.get('date_range', []),
+                    'date_range': [t for t in file_info['time_range'] if t] or index.get('date_range', []),
                     'levels_found': [file_info['level']] if file_info['level'] else []
                 })
             
@@ -562,14 +766,9 @@ class LogFileIndexView(LogManagementAPIView):
     def post(self, request):
         """重建日志文件索引"""
         try:
-            # 清除缓存，强制重建索引
-            cache_keys = cache.keys('log_file_index_*') if hasattr(cache, 'keys') else []
-            for key in cache_keys:
-                cache.delete(key)
-            
-            # 重建索引
+            # 丢弃文件清单，强制全量重建索引
             days = int(request.data.get('days', 30))
-            index = self.indexer.build_file_index(days)
+            index = self.indexer.build_file_index(days, force=True)
             
             logger.info(f"重建日志索引完成: {len(index['files'])} 个文件")
             
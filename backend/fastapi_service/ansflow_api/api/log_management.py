@@ -5,7 +5,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any, Union
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel, Field
 import structlog
 import json
@@ -17,12 +17,14 @@ import aiofiles
 import asyncio
 from collections import defaultdict, Counter
 
+from ..utils.log_search_index import LogSearchIndex
+
 # 创建日志管理路由器
 log_router = APIRouter(prefix="/logs", tags=["日志管理"])
 logger = structlog.get_logger(__name__)
 
 # 日志文件基础路径
-LOG_BASE_PATH = Path("/Users/creed/Workspace/OpenSource/ansflow/logs")
+LOG_BASE_PATH = Path(os.getenv('LOG_DIR', '/Users/creed/Workspace/OpenSource/ansflow/logs'))
 
 class LogSearchParams(BaseModel):
     """日志搜索参数"""
@@ -114,130 +116,79 @@ def parse_log_line(line: str) -> Optional[LogEntry]:
     
     return None
 
+def _index_log_line(line: str, path: str):
+    """日志检索索引的行解析：返回 (时间戳, 级别, 服务, 检索文本)"""
+    log_entry = parse_log_line(line)
+    if not log_entry:
+        return None
+
+    timestamp = None
+    try:
+        timestamp = _parse_time(log_entry.timestamp).timestamp()
+    except ValueError:
+        pass
+    return timestamp, log_entry.level, log_entry.service, log_entry.message
+
+
+def _parse_time(value: str) -> datetime:
+    """解析 ISO 时间，不带时区的时间按 UTC 处理"""
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+# 日志检索索引，存放在 <LOG_BASE_PATH>/.index/fastapi 下，搜索时增量刷新
+log_search_index = LogSearchIndex(LOG_BASE_PATH, _index_log_line, name='fastapi')
+
+
 async def search_logs_in_files(params: LogSearchParams) -> LogSearchResult:
-    """在日志文件中搜索日志"""
-    logs = []
-    total_count = 0
-    
+    """
+    在日志文件中搜索日志
+    通过日志检索索引按时间桶、级别/服务位图和倒排索引定位匹配行，只回读需要返回的行
+    """
+    # 时间过滤
+    start_ts = None
+    end_ts = None
+    if params.start_time:
+        try:
+            start_ts = _parse_time(params.start_time).timestamp()
+        except ValueError:
+            pass
+    if params.end_time:
+        try:
+            end_ts = _parse_time(params.end_time).timestamp()
+        except ValueError:
+            pass
+
     try:
-        # 获取所有日志文件
-        log_files = []
-        if LOG_BASE_PATH.exists():
-            log_files = list(LOG_BASE_PATH.glob("**/*.log"))
-        
-        # 如果没有找到日志文件，返回空结果
-        if not log_files:
-            return LogSearchResult(
-                logs=[],
-                total_count=0,
-                page=1,
-                per_page=params.limit,
-                has_more=False
-            )
-        
-        # 时间过滤
-        start_dt = None
-        end_dt = None
-        if params.start_time:
-            try:
-                start_dt = datetime.fromisoformat(params.start_time.replace('Z', '+00:00'))
-            except:
-                pass
-        if params.end_time:
-            try:
-                end_dt = datetime.fromisoformat(params.end_time.replace('Z', '+00:00'))
-            except:
-                pass
-        
-        # 搜索日志文件
-        for log_file in log_files:
-            try:
-                async with aiofiles.open(log_file, 'r', encoding='utf-8') as f:
-                    line_number = 0
-                    async for line in f:
-                        line_number += 1
-                        
-                        log_entry = parse_log_line(line)
-                        if not log_entry:
-                            continue
-                        
-                        # 设置唯一ID
-                        log_entry.id = f"{log_file.name}:{line_number}"
-                        
-                        # 时间过滤
-                        if start_dt or end_dt:
-                            try:
-                                log_dt = datetime.fromisoformat(log_entry.timestamp.replace('Z', '+00:00'))
-                                if start_dt and log_dt < start_dt:
-                                    continue
-                                if end_dt and log_dt > end_dt:
-                                    continue
-                            except:
-                                continue
-                        
-                        # 级别过滤
-                        if params.levels and log_entry.level not in params.levels:
-                            continue
-                        
-                        # 服务过滤
-                        if params.services and log_entry.service not in params.services:
-                            continue
-                        
-                        # 关键词过滤
-                        if params.keywords:
-                            # 支持简单的AND、OR、NOT逻辑
-                            keywords = params.keywords.upper()
-                            message_upper = log_entry.message.upper()
-                            
-                            # 简单的关键词匹配
-                            if 'AND' in keywords:
-                                words = [w.strip() for w in keywords.split('AND')]
-                                if not all(word in message_upper for word in words):
-                                    continue
-                            elif 'OR' in keywords:
-                                words = [w.strip() for w in keywords.split('OR')]
-                                if not any(word in message_upper for word in words):
-                                    continue
-                            elif 'NOT' in keywords:
-                                parts = keywords.split('NOT')
-                                if len(parts) == 2:
-                                    required, excluded = parts[0].strip(), parts[1].strip()
-                                    if excluded in message_upper:
-                                        continue
-                                    if required and required not in message_upper:
-                                        continue
-                            else:
-                                if keywords not in message_upper:
-                                    continue
-                        
-                        total_count += 1
-                        
-                        # 分页处理
-                        if total_count > params.offset and len(logs) < params.limit:
-                            logs.append(log_entry)
-                        
-                        # 如果已经收集够了，可以提前结束
-                        if len(logs) >= params.limit:
-                            break
-                    
-                    # 如果已经收集够了，可以提前结束文件循环
-                    if len(logs) >= params.limit:
-                        break
-                        
-            except Exception as e:
-                logger.error(f"Error reading log file {log_file}", error=str(e))
-                continue
-    
+        result = await asyncio.to_thread(
+            log_search_index.search,
+            query=params.keywords,
+            levels=params.levels,
+            services=params.services,
+            start=start_ts,
+            end=end_ts,
+            offset=params.offset,
+            limit=params.limit
+        )
     except Exception as e:
         logger.error("Error searching logs", error=str(e))
         raise HTTPException(status_code=500, detail=f"日志搜索失败: {str(e)}")
-    
-    # 按时间倒序排列
-    logs.sort(key=lambda x: x.timestamp, reverse=True)
-    
+
+    logs = []
+    for hit in result['hits']:
+        log_entry = parse_log_line(hit.line)
+        if not log_entry:
+            continue
+        # 设置唯一ID
+        log_entry.id = f"{Path(hit.path).name}:{hit.line_number}"
+        logs.append(log_entry)
+
+    total_count = result['total_count']
     page = (params.offset // params.limit) + 1
     has_more = total_count > (params.offset + len(logs))
-    
+
     return LogSearchResult(
         logs=logs,
         total_count=total_count,
@@ -526,10 +477,8 @@ async def rebuild_log_index(background_tasks: BackgroundTasks):
         """后台重建索引任务"""
         logger.info("Starting log index rebuild")
         try:
-            # 这里可以实现更复杂的索引重建逻辑
-            # 例如：创建全文搜索索引、缓存热点数据等
-            await asyncio.sleep(2)  # 模拟重建过程
-            logger.info("Log index rebuild completed")
+            stats = await asyncio.to_thread(log_search_index.rebuild)
+            logger.info("Log index rebuild completed", **stats)
         except Exception as e:
             logger.error("Log index rebuild failed", error=str(e))
     
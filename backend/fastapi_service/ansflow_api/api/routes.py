@@ -1,7 +1,7 @@
 """
 API routes for high-performance endpoints - AnsFlow优化版本
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -23,6 +23,8 @@ from ..models.schemas import (
     PaginatedResponseSchema
 )
 from ..services.pipeline_service import pipeline_service
+from ..services.django_db import django_db_service, encode_log_cursor, decode_log_cursor
+from ..services.execution_log_stream import execution_log_tail
 from ..services.websocket_service import websocket_service
 
 api_router = APIRouter()
@@ -36,56 +38,23 @@ async def get_current_active_user():
 
 
 @api_router.get("/pipelines/status", response_model=List[Dict[str, Any]])
-@async_cache(ttl=60, key_prefix="pipeline_status_fast")  # 1分钟缓存
+@async_cache(ttl=5, key_prefix="pipeline_status_fast")  # 读模型随执行状态实时更新，只做短缓存
 async def get_pipelines_status_fast(
-    project_id: Optional[str] = Query(None, description="项目ID过滤"),
+    project_id: Optional[int] = Query(None, description="项目ID过滤"),
     status: Optional[str] = Query(None, description="状态过滤"),
     limit: int = Query(50, le=200, description="返回数量限制"),
     session: AsyncSession = Depends(get_session)
 ):
     """
-    高性能Pipeline状态查询 - 1分钟缓存
-    专门为Dashboard等高频查询场景优化
+    高性能Pipeline状态查询
+    专门为Dashboard等高频查询场景优化：直接读取执行器维护的流水线状态汇总表，一次索引查询
     """
     try:
-        # 模拟获取Pipeline状态数据（实际应该从数据库获取）
-        pipelines_status = [
-            {
-                "id": 1,
-                "name": "Backend CI/CD Pipeline",
-                "status": "running",
-                "last_execution_id": 123,
-                "last_execution_status": "running",
-                "last_execution_time": "2025-07-10T06:42:00Z",
-                "success_rate": 0.85,
-                "avg_duration": 300,
-                "project_id": "proj_001",
-                "project_name": "AnsFlow Backend",
-                "updated_at": "2025-07-10T06:42:41Z"
-            },
-            {
-                "id": 2,
-                "name": "Frontend Build Pipeline",
-                "status": "completed",
-                "last_execution_id": 124,
-                "last_execution_status": "completed",
-                "last_execution_time": "2025-07-10T06:40:00Z",
-                "success_rate": 0.92,
-                "avg_duration": 180,
-                "project_id": "proj_002",
-                "project_name": "AnsFlow Frontend",
-                "updated_at": "2025-07-10T06:40:30Z"
-            }
-        ]
-        
-        # 应用过滤器
-        if project_id:
-            pipelines_status = [p for p in pipelines_status if p["project_id"] == project_id]
-        if status:
-            pipelines_status = [p for p in pipelines_status if p["status"] == status]
-        
-        # 应用限制
-        pipelines_status = pipelines_status[:limit]
+        pipelines_status = await django_db_service.get_pipeline_status_summaries(
+            project_id=project_id,
+            status=status,
+            limit=limit
+        )
         
         logger.info("Pipeline status retrieved", count=len(pipelines_status))
         return pipelines_status
@@ -144,57 +113,49 @@ async def get_system_metrics_fast(
         raise HTTPException(status_code=500, detail="获取系统指标失败")
 
 
+@api_router.get("/executions/{execution_id}/logs", response_model=Dict[str, Any])
+async def get_execution_logs_since(
+    execution_id: int,
+    since: Optional[str] = Query(None, description="上一次返回的日志游标，为空时从头读取"),
+    limit: int = Query(500, ge=1, le=5000, description="本次最多读取的日志分片数")
+):
+    """
+    增量获取执行日志
+    只返回游标之后的新日志，客户端用返回的 cursor 作为下一次请求的 since
+    """
+    cursor = decode_log_cursor(since)
+    if since and cursor is None:
+        raise HTTPException(status_code=400, detail="无效的日志游标")
+    
+    result = await django_db_service.get_execution_logs_since(execution_id, cursor, limit=limit)
+    return {
+        "execution_id": execution_id,
+        "logs": result["logs"],
+        "cursor": encode_log_cursor(result["cursor"]),
+        "has_more": result["has_more"]
+    }
+
+
 @api_router.get("/executions/{execution_id}/logs/stream")
 async def stream_execution_logs_fast(
     execution_id: int,
     follow: bool = Query(False, description="实时跟踪日志"),
     lines: int = Query(100, le=1000, description="返回行数"),
-    session: AsyncSession = Depends(get_session)
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", description="断点续传位置"),
 ):
     """
-    流式获取执行日志 - 支持实时跟踪
-    高性能日志流式传输
+    流式获取执行日志（Server-Sent Events）- 支持实时跟踪
+    先发送最后 lines 行历史日志，follow=true 时通过 Redis Streams 跟踪新输出直到执行结束；
+    浏览器重连时自动携带 Last-Event-ID，只补发断点之后的日志
     """
     async def log_generator():
         try:
-            # 模拟历史日志
-            historical_logs = [
-                {"timestamp": "2025-07-10T06:42:00Z", "level": "INFO", "message": "Pipeline execution started"},
-                {"timestamp": "2025-07-10T06:42:05Z", "level": "INFO", "message": "Checking out code from repository"},
-                {"timestamp": "2025-07-10T06:42:10Z", "level": "INFO", "message": "Installing dependencies"},
-                {"timestamp": "2025-07-10T06:42:20Z", "level": "INFO", "message": "Running tests"},
-                {"timestamp": "2025-07-10T06:42:35Z", "level": "WARNING", "message": "Some tests have warnings"},
-                {"timestamp": "2025-07-10T06:42:40Z", "level": "INFO", "message": "Building application"},
-            ]
-            
-            # 返回历史日志
-            for log in historical_logs[-lines:]:
-                yield f"data: {json.dumps(log, ensure_ascii=False)}\n\n"
-            
-            # 如果需要实时跟踪
-            if follow:
-                last_timestamp = historical_logs[-1]['timestamp'] if historical_logs else None
-                
-                # 模拟实时日志生成
-                for i in range(5):
-                    await asyncio.sleep(2)  # 每2秒生成新日志
-                    
-                    new_log = {
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "level": "INFO",
-                        "message": f"执行进度更新 {i+1}/5"
-                    }
-                    
-                    yield f"data: {json.dumps(new_log, ensure_ascii=False)}\n\n"
-                
-                # 完成日志
-                final_log = {
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "level": "INFO",
-                    "message": "Pipeline execution completed successfully"
-                }
-                yield f"data: {json.dumps(final_log, ensure_ascii=False)}\n\n"
-                        
+            async for frame in execution_log_tail.stream(
+                execution_id, lines=lines, follow=follow, last_event_id=last_event_id
+            ):
+                yield frame
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error("Error streaming logs", execution_id=execution_id, error=str(e))
             error_log = {
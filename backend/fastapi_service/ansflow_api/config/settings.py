@@ -26,6 +26,10 @@ class RedisSettings(BaseSettings):
     
     url: str = Field(default="redis://localhost:6379/0", description="Redis connection URL")
     max_connections: int = Field(default=10, description="Maximum Redis connections")
+    events_url: str = Field(
+        default="redis://localhost:6379/1",
+        description="Redis holding Django execution log streams (same database as Django's default cache)"
+    )
     
     model_config = SettingsConfigDict(env_prefix="REDIS_")
 
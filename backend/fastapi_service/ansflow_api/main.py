@@ -19,11 +19,14 @@ from .config.settings import settings
 from .core.database import create_tables
 from .api.routes import api_router
 from .webhooks.routes import webhook_router
-from .websockets.routes import websocket_router
+from .websockets.routes import websocket_router, execution_event_hub, manager as websocket_manager
 from .monitoring.middleware import PrometheusMiddleware
 from .monitoring.health import health_router
 from .monitoring import init_monitoring
 from .services.django_db import django_db_service
+from .services.execution_log_stream import execution_log_tail
+from .services.jenkins_catalog import jenkins_catalog_invalidator
+from .services.remote_run_events import remote_run_event_publisher
 
 # 导入统一日志系统集成
 try:
@@ -84,6 +87,13 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down AnsFlow FastAPI service")
     
+    # Stop execution event subscriptions
+    await execution_event_hub.close()
+    await execution_log_tail.close()
+    await jenkins_catalog_invalidator.close()
+    await remote_run_event_publisher.close()
+    await websocket_manager.close()
+    
     # Close Django database connection pool
     await django_db_service.close_connection_pool()
     logger.info("Django database connection pool closed")
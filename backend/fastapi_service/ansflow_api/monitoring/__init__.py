@@ -8,6 +8,8 @@ from .prometheus import (
     get_monitoring,
     track_websocket_connection,
     track_websocket_message,
+    track_websocket_dropped_frames,
+    register_websocket_queue_depth,
     track_pipeline_execution,
     track_cicd_tool_request,
     track_cache_operation,
@@ -23,6 +25,8 @@ __all__ = [
     "get_monitoring", 
     "track_websocket_connection",
     "track_websocket_message",
+    "track_websocket_dropped_frames",
+    "register_websocket_queue_depth",
     "track_pipeline_execution",
     "track_cicd_tool_request",
     "track_cache_operation",
@@ -25,6 +25,18 @@ websocket_messages = Counter(
     ['endpoint', 'direction', 'type']
 )
 
+websocket_dropped_frames = Counter(
+    'ansflow_websocket_dropped_frames_total',
+    'Total number of outgoing WebSocket frames dropped',
+    ['reason']
+)
+
+websocket_send_queue_depth = Gauge(
+    'ansflow_websocket_send_queue_depth',
+    'Outgoing WebSocket frames waiting in per-connection send queues',
+    ['manager']
+)
+
 # 流水线执行指标
 pipeline_executions = Counter(
     'ansflow_pipeline_executions_total',
@@ -210,6 +222,14 @@ def track_websocket_message(endpoint: str, direction: str, message_type: str):
     """跟踪WebSocket消息"""
     websocket_messages.labels(endpoint=endpoint, direction=direction, type=message_type).inc()
 
+def track_websocket_dropped_frames(reason: str, count: int = 1):
+    """跟踪被丢弃的WebSocket发送帧"""
+    websocket_dropped_frames.labels(reason=reason).inc(count)
+
+def register_websocket_queue_depth(manager: str, depth_fn):
+    """注册WebSocket发送队列深度的采集函数（抓取时计算）"""
+    websocket_send_queue_depth.labels(manager=manager).set_function(depth_fn)
+
 def track_pipeline_execution(status: str, pipeline_type: str, duration: float = None):
     """跟踪流水线执行"""
     pipeline_executions.labels(status=status, pipeline_type=pipeline_type).inc()
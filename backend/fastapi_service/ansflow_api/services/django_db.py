@@ -3,6 +3,8 @@ Django数据库连接服务
 用于从FastAPI连接到Django的MySQL数据库获取真实的执行数据
 """
 import asyncio
+import base64
+import json
 import aiomysql
 import structlog
 import os
@@ -12,6 +14,24 @@ from datetime import datetime
 logger = structlog.get_logger(__name__)
 
 
+def encode_log_cursor(cursor: Dict) -> str:
+    """把日志游标编码为可放入查询参数的字符串"""
+    raw = json.dumps(cursor, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_log_cursor(token: Optional[str]) -> Optional[Dict]:
+    """解析 encode_log_cursor 生成的游标，无效时返回 None"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor = json.loads(raw)
+        return cursor if isinstance(cursor, dict) else None
+    except (ValueError, TypeError):
+        return None
+
+
 class DjangoDBService:
     """Django数据库连接服务"""
     
@@ -174,120 +194,358 @@ class DjangoDBService:
             # 出错时返回静态模拟数据
             return await self._get_mock_execution_data(execution_id)
     
+    async def get_pipeline_status_summaries(
+        self,
+        project_id: Optional[int] = None,
+        status: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        """
+        读取流水线状态汇总（Django 执行器维护的 PipelineStatusSummary 读模型）
+        过滤、排序和数量限制都在 SQL 中完成，按 updated_at 索引读取
+        """
+        if not self.connection_pool:
+            logger.warning("No database connection available for pipeline status")
+            return []
+
+        conditions = []
+        params: List = []
+        if project_id is not None:
+            conditions.append("s.project_id = %s")
+            params.append(project_id)
+        if status:
+            conditions.append("s.last_execution_status = %s")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+
+        async with self.connection_pool.acquire() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(f"""
+                    SELECT s.pipeline_id, s.pipeline_name, s.project_id, s.project_name,
+                           s.last_execution_id, s.last_execution_status, s.last_execution_time,
+                           s.success_rate, s.avg_duration, s.updated_at
+                    FROM cicd_integrations_pipelinestatussummary s
+                    {where}
+                    ORDER BY s.updated_at DESC
+                    LIMIT %s
+                """, params)
+                rows = await cursor.fetchall()
+
+        return [
+            {
+                "id": row["pipeline_id"],
+                "name": row["pipeline_name"],
+                "status": row["last_execution_status"] or "pending",
+                "last_execution_id": row["last_execution_id"],
+                "last_execution_status": row["last_execution_status"] or None,
+                "last_execution_time": row["last_execution_time"].isoformat() if row["last_execution_time"] else None,
+                "success_rate": round(row["success_rate"] or 0, 4),
+                "avg_duration": round(row["avg_duration"], 1) if row["avg_duration"] is not None else None,
+                "project_id": row["project_id"],
+                "project_name": row["project_name"],
+                "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None
+            }
+            for row in rows
+        ]
+
+    async def get_execution_status(self, execution_id: int) -> Optional[str]:
+        """只读取执行状态"""
+        if not self.connection_pool:
+            return None
+        async with self.connection_pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT status FROM cicd_integrations_pipelineexecution WHERE id = %s", (execution_id,)
+                )
+                row = await cursor.fetchone()
+        return row[0].lower() if row and row[0] else None
+
+    async def get_log_stream_sizes(self, execution_id: int) -> Dict[int, int]:
+        """各日志流（流水线级为0，其余为步骤执行ID）当前的字符长度"""
+        if not self.connection_pool:
+            return {}
+        async with self.connection_pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("""
+                    SELECT stream_id, MAX(`offset` + length)
+                    FROM cicd_integrations_executionlogchunk
+                    WHERE pipeline_execution_id = %s
+                    GROUP BY stream_id
+                """, (execution_id,))
+                rows = await cursor.fetchall()
+        return {int(stream_id): int(size) for stream_id, size in rows}
+
+    async def get_log_tail_chunks(self, execution_id: int, lines: int, page_size: int = 50) -> List[Dict]:
+        """
+        从最新的日志分片向前读取，直到凑够 lines 行，按写入顺序返回
+        首个分片被裁剪为只包含需要的行（offset 同步调整）
+        """
+        if not self.connection_pool or lines <= 0:
+            return []
+
+        chunks: List[Dict] = []
+        line_count = 0
+        before_id = None
+        async with self.connection_pool.acquire() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                while line_count < lines:
+                    query = """
+                        SELECT id, stream_id, step_execution_id, `offset`, length, content, created_at
+                        FROM cicd_integrations_executionlogchunk
+                        WHERE pipeline_execution_id = %s
+                    """
+                    params: List = [execution_id]
+                    if before_id is not None:
+                        query += " AND id < %s"
+                        params.append(before_id)
+                    query += " ORDER BY id DESC LIMIT %s"
+                    params.append(page_size)
+
+                    await cursor.execute(query, params)
+                    rows = await cursor.fetchall()
+                    if not rows:
+                        break
+                    for row in rows:
+                        chunks.append(row)
+                        line_count += row["content"].count("\n")
+                        if line_count >= lines:
+                            break
+                    before_id = rows[-1]["id"]
+
+        chunks.reverse()
+        if chunks and line_count > lines:
+            first = chunks[0]
+            kept = "\n".join(first["content"].split("\n")[line_count - lines:])
+            first["offset"] += len(first["content"]) - len(kept)
+            first["content"] = kept
+        return chunks
+
+    async def get_log_chunks_after(
+        self,
+        execution_id: int,
+        stream_offsets: Dict[int, int],
+        limit: int = 200
+    ) -> List[Dict]:
+        """
+        读取各日志流在给定字符偏移之后的分片（按写入顺序），未出现在 stream_offsets 中的流从头读取
+        返回的分片可能从偏移之前开始，调用方按偏移裁剪
+        """
+        if not self.connection_pool:
+            return []
+
+        conditions = []
+        params: List = [execution_id]
+        if stream_offsets:
+            placeholders = ", ".join(["%s"] * len(stream_offsets))
+            conditions.append(f"stream_id NOT IN ({placeholders})")
+            params.extend(stream_offsets.keys())
+            for stream_id, offset in stream_offsets.items():
+                conditions.append("(stream_id = %s AND `offset` + length > %s)")
+                params.extend([stream_id, offset])
+        where = f"AND ({' OR '.join(conditions)})" if conditions else ""
+        params.append(limit)
+
+        async with self.connection_pool.acquire() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(f"""
+                    SELECT id, stream_id, step_execution_id, `offset`, length, content, created_at
+                    FROM cicd_integrations_executionlogchunk
+                    WHERE pipeline_execution_id = %s {where}
+                    ORDER BY id ASC
+                    LIMIT %s
+                """, params)
+                return list(await cursor.fetchall())
+
     async def get_execution_logs(self, execution_id: int, last_count: int = 0) -> List[Dict]:
-        """获取执行日志（增量获取）"""
+        """获取执行日志（按条数跳过，兼容旧接口；增量读取请使用 get_execution_logs_since）"""
+        result = await self.get_execution_logs_since(execution_id, limit=None)
+        return result["logs"][last_count:]
+    
+    async def get_execution_logs_since(
+        self,
+        execution_id: int,
+        cursor: Optional[Dict] = None,
+        limit: Optional[int] = 500
+    ) -> Dict:
+        """
+        基于游标增量获取执行日志，只传输游标之后的新内容
+        
+        游标记录已发送的日志分片ID、每个步骤 logs 字段已读取的字符偏移以及已发送的开始/完成事件，
+        步骤日志正文只通过 SUBSTRING 读取偏移之后的部分，查询成本与新增输出成正比。
+        
+        Args:
+            cursor: 上一次返回的游标，None 表示从头读取
+            limit: 本次最多读取的日志分片数，None 表示不限制
+        
+        Returns:
+            {"logs": [...], "cursor": {...}, "has_more": bool}
+        """
+        cursor = self._normalize_log_cursor(cursor)
         if not self.connection_pool:
             # 如果没有数据库连接，返回空列表（避免模拟日志）
-            return []
+            return {"logs": [], "cursor": cursor, "has_more": False}
         
         try:
             async with self.connection_pool.acquire() as connection:
-                async with connection.cursor(aiomysql.DictCursor) as cursor:
-                    # 从执行记录和步骤记录中提取日志信息
-                    # 先获取主执行日志
-                    await cursor.execute("""
-                        SELECT pe.id, pe.logs, pe.status, pe.started_at, pe.completed_at,
+                async with connection.cursor(aiomysql.DictCursor) as db_cursor:
+                    await db_cursor.execute("""
+                        SELECT pe.id, pe.status, pe.started_at, pe.completed_at,
                                p.name as pipeline_name
                         FROM cicd_integrations_pipelineexecution pe
                         LEFT JOIN pipelines_pipeline p ON pe.pipeline_id = p.id
                         WHERE pe.id = %s
                     """, (execution_id,))
                     
-                    execution_row = await cursor.fetchone()
+                    execution_row = await db_cursor.fetchone()
                     if not execution_row:
-                        return []
+                        return {"logs": [], "cursor": cursor, "has_more": False}
                     
-                    # 获取步骤日志
-                    await cursor.execute("""
-                        SELECT se.id, se.logs, se.status, se.started_at, se.completed_at,
-                               se.order, atos.name as step_name
+                    # 步骤状态与日志长度，不读取日志正文
+                    await db_cursor.execute("""
+                        SELECT se.id, se.status, se.started_at, se.completed_at, se.order,
+                               atos.name as step_name,
+                               CHAR_LENGTH(se.logs) as logs_length,
+                               EXISTS(
+                                   SELECT 1 FROM cicd_integrations_executionlogchunk c
+                                   WHERE c.pipeline_execution_id = se.pipeline_execution_id
+                                     AND c.stream_id = se.id
+                               ) as has_chunks
                         FROM cicd_integrations_stepexecution se
                         LEFT JOIN cicd_integrations_atomicstep atos ON se.atomic_step_id = atos.id
                         WHERE se.pipeline_execution_id = %s
                         ORDER BY se.order ASC, se.id ASC
                     """, (execution_id,))
+                    step_rows = await db_cursor.fetchall()
                     
-                    step_rows = await cursor.fetchall()
+                    # 游标之后新追加的日志分片
+                    chunk_query = """
+                        SELECT id, stream_id, content, created_at
+                        FROM cicd_integrations_executionlogchunk
+                        WHERE pipeline_execution_id = %s AND id > %s
+                        ORDER BY id ASC
+                    """
+                    chunk_params = [execution_id, cursor["chunk_id"]]
+                    if limit:
+                        chunk_query += " LIMIT %s"
+                        chunk_params.append(limit)
+                    await db_cursor.execute(chunk_query, chunk_params)
+                    chunk_rows = await db_cursor.fetchall()
                     
-                    # 构建日志条目
-                    logs = []
-                    log_id = 1
-                    
-                    # 添加执行开始日志
-                    if execution_row["started_at"]:
-                        logs.append({
-                            "id": log_id,
-                            "timestamp": execution_row["started_at"].isoformat(),
-                            "level": "info",
-                            "message": f"🚀 开始执行流水线: {execution_row['pipeline_name']}",
-                            "step_name": None,
-                            "source": "pipeline"
-                        })
-                        log_id += 1
-                    
-                    # 添加步骤日志
+                    # 未使用日志分片的步骤：只读取 logs 字段偏移之后的部分
+                    step_log_tails = {}
                     for step_row in step_rows:
-                        if step_row["started_at"]:
-                            logs.append({
-                                "id": log_id,
-                                "timestamp": step_row["started_at"].isoformat(),
-                                "level": "info",
-                                "message": f"⏳ 开始执行步骤: {step_row['step_name'] or ('步骤' + str(step_row['id']))}",
-                                "step_name": step_row["step_name"],
-                                "source": "step"
-                            })
-                            log_id += 1
-                        
-                        # 添加步骤详细日志
-                        if step_row["logs"]:
-                            log_lines = step_row["logs"].split('\n')
-                            for line in log_lines:
-                                if line.strip():
-                                    logs.append({
-                                        "id": log_id,
-                                        "timestamp": step_row["started_at"].isoformat() if step_row["started_at"] else datetime.now().isoformat(),
-                                        "level": "info",
-                                        "message": line,
-                                        "step_name": step_row["step_name"],
-                                        "source": "step_output"
-                                    })
-                                    log_id += 1
-                        
-                        if step_row["completed_at"]:
-                            status_emoji = "✅" if step_row["status"] == "success" else "❌" if step_row["status"] == "failed" else "⏹️"
-                            logs.append({
-                                "id": log_id,
-                                "timestamp": step_row["completed_at"].isoformat(),
-                                "level": "success" if step_row["status"] == "success" else "error" if step_row["status"] == "failed" else "info",
-                                "message": f"{status_emoji} 步骤完成: {step_row['step_name'] or ('步骤' + str(step_row['id']))}",
-                                "step_name": step_row["step_name"],
-                                "source": "step"
-                            })
-                            log_id += 1
-                    
-                    # 添加执行完成日志
-                    if execution_row["completed_at"]:
-                        status_emoji = "🎉" if execution_row["status"] == "success" else "💥" if execution_row["status"] == "failed" else "⏹️"
-                        logs.append({
-                            "id": log_id,
-                            "timestamp": execution_row["completed_at"].isoformat(),
-                            "level": "success" if execution_row["status"] == "success" else "error" if execution_row["status"] == "failed" else "info",
-                            "message": f"{status_emoji} 流水线执行完成，状态: {execution_row['status'].upper()}",
-                            "step_name": None,
-                            "source": "pipeline"
-                        })
-                    
-                    # 返回增量日志（从 last_count 开始）
-                    if last_count < len(logs):
-                        return logs[last_count:]
-                    else:
-                        return []
+                        step_state = cursor["steps"].get(str(step_row["id"]), {})
+                        offset = step_state.get("offset", 0)
+                        if step_row["has_chunks"] or not step_row["logs_length"] or step_row["logs_length"] <= offset:
+                            continue
+                        await db_cursor.execute("""
+                            SELECT SUBSTRING(logs, %s) as tail
+                            FROM cicd_integrations_stepexecution
+                            WHERE id = %s
+                        """, (offset + 1, step_row["id"]))
+                        tail_row = await db_cursor.fetchone()
+                        step_log_tails[step_row["id"]] = (tail_row or {}).get("tail") or ""
+            
+            has_more = bool(limit) and len(chunk_rows) >= limit
+            logs = self._build_incremental_logs(
+                execution_row, step_rows, chunk_rows, step_log_tails, cursor,
+                include_completion=not has_more
+            )
+            return {"logs": logs, "cursor": cursor, "has_more": has_more}
                 
         except Exception as e:
             logger.error("Error fetching execution logs from Django DB", 
                         execution_id=execution_id, error=str(e))
-            # 出错时返回空列表
-            return []
+            # 出错时返回空列表，游标保持不变
+            return {"logs": [], "cursor": cursor, "has_more": False}
+    
+    @staticmethod
+    def _normalize_log_cursor(cursor: Optional[Dict]) -> Dict:
+        cursor = dict(cursor or {})
+        return {
+            "chunk_id": int(cursor.get("chunk_id", 0)),
+            "log_id": int(cursor.get("log_id", 0)),
+            "pipeline_started": bool(cursor.get("pipeline_started", False)),
+            "pipeline_completed": bool(cursor.get("pipeline_completed", False)),
+            "steps": {
+                str(step_id): dict(state) for step_id, state in (cursor.get("steps") or {}).items()
+            },
+        }
+    
+    @staticmethod
+    def _build_incremental_logs(execution_row, step_rows, chunk_rows, step_log_tails, cursor: Dict,
+                                include_completion: bool = True) -> List[Dict]:
+        """
+        根据查询结果生成新日志条目并推进游标（原地修改 cursor）
+        还有未读取的日志分片时不生成完成事件，保证完成事件排在对应输出之后
+        """
+        logs = []
+        
+        def add(timestamp, level, message, step_name, source):
+            cursor["log_id"] += 1
+            logs.append({
+                "id": cursor["log_id"],
+                "timestamp": timestamp.isoformat() if timestamp else datetime.now().isoformat(),
+                "level": level,
+                "message": message,
+                "step_name": step_name,
+                "source": source
+            })
+        
+        # 添加执行开始日志
+        if execution_row["started_at"] and not cursor["pipeline_started"]:
+            cursor["pipeline_started"] = True
+            add(execution_row["started_at"], "info",
+                f"🚀 开始执行流水线: {execution_row['pipeline_name']}", None, "pipeline")
+        
+        step_names = {}
+        for step_row in step_rows:
+            step_name = step_row["step_name"]
+            step_names[step_row["id"]] = step_name
+            state = cursor["steps"].setdefault(str(step_row["id"]), {})
+            if step_row["started_at"] and not state.get("started"):
+                state["started"] = True
+                add(step_row["started_at"], "info",
+                    f"⏳ 开始执行步骤: {step_name or ('步骤' + str(step_row['id']))}", step_name, "step")
+        
+        # 实时输出（日志分片）
+        for chunk_row in chunk_rows:
+            cursor["chunk_id"] = max(cursor["chunk_id"], chunk_row["id"])
+            stream_id = chunk_row["stream_id"]
+            for line in chunk_row["content"].split('\n'):
+                if line.strip():
+                    add(chunk_row["created_at"], "info", line, step_names.get(stream_id),
+                        "step_output" if stream_id else "pipeline")
+        
+        for step_row in step_rows:
+            step_name = step_names[step_row["id"]]
+            state = cursor["steps"][str(step_row["id"])]
+            
+            # 添加步骤详细日志（logs 字段新增部分）
+            tail = step_log_tails.get(step_row["id"])
+            if tail:
+                state["offset"] = state.get("offset", 0) + len(tail)
+                for line in tail.split('\n'):
+                    if line.strip():
+                        add(step_row["started_at"], "info", line, step_name, "step_output")
+            
+            if include_completion and step_row["completed_at"] and not state.get("completed"):
+                state["completed"] = True
+                status_emoji = "✅" if step_row["status"] == "success" else "❌" if step_row["status"] == "failed" else "⏹️"
+                add(step_row["completed_at"],
+                    "success" if step_row["status"] == "success" else "error" if step_row["status"] == "failed" else "info",
+                    f"{status_emoji} 步骤完成: {step_name or ('步骤' + str(step_row['id']))}", step_name, "step")
+        
+        # 添加执行完成日志
+        if include_completion and execution_row["completed_at"] and not cursor["pipeline_completed"]:
+            cursor["pipeline_completed"] = True
+            status_emoji = "🎉" if execution_row["status"] == "success" else "💥" if execution_row["status"] == "failed" else "⏹️"
+            add(execution_row["completed_at"],
+                "success" if execution_row["status"] == "success" else "error" if execution_row["status"] == "failed" else "info",
+                f"{status_emoji} 流水线执行完成，状态: {execution_row['status'].upper()}", None, "pipeline")
+        
+        return logs
     
     async def _get_mock_execution_data(self, execution_id: int) -> Dict:
         """获取模拟执行数据（当无法连接到真实数据库时使用）"""
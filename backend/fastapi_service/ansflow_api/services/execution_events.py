@@ -0,0 +1,420 @@
+"""
+执行事件订阅中心
+Django 执行器把执行状态、步骤状态和日志输出的增量事件发布到 Redis 频道 ansflow:execution:<id>，
+这里每个执行只维护一个订阅，把事件原样转发给该执行房间内的所有 WebSocket 连接。
+
+Redis 不可用时退化为按执行共享的数据库轮询，并定期尝试重新订阅；订阅模式下也会低频对账一次数据库，
+补上未经执行器发布的状态变化（如远程 CI 工具回写的状态）。
+转发过程中的数据库或 Redis 错误按指数退避重试，转发任务只在执行结束、最后一个订阅者离开或被取消时退出。
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import redis.asyncio as redis
+import structlog
+
+from ..config.settings import settings
+from .django_db import django_db_service
+from ..websockets.fanout import coalesce_key
+
+logger = structlog.get_logger(__name__)
+
+EXECUTION_CHANNEL_PREFIX = "ansflow:execution:"
+TERMINAL_STATUSES = {"success", "failed", "cancelled", "timeout"}
+
+# send_to_room(message, room, coalesce_key, resync_key=None, snapshot=None)：
+# message 为已序列化的字符串或待序列化的字典；丢过 resync_key 增量帧的连接改收 snapshot() 的完整消息
+SendToRoom = Callable[..., Awaitable[Any]]
+
+
+def get_execution_room(execution_id: int) -> str:
+    return f"execution_{execution_id}"
+
+
+def iter_steps(steps: Iterable[Dict[str, Any]]):
+    """展开并行组，逐个返回步骤"""
+    for step in steps:
+        if step.get("type") == "parallel_group":
+            yield from step.get("steps", [])
+        else:
+            yield step
+
+
+# step_progress 中按字段比较的内容；output 只在步骤结束后推送
+STEP_FIELDS = ("step_name", "status", "execution_time", "error_message", "output")
+
+
+def step_fields(step: Dict[str, Any]) -> Dict[str, Any]:
+    """把快照中的步骤或 step_progress 事件归一为可比较的字段"""
+    status = step.get("status")
+    return {
+        "step_name": step.get("step_name") or step.get("name"),
+        "status": status,
+        "execution_time": step.get("execution_time"),
+        "error_message": step.get("error_message") or None,
+        "output": (step.get("output") or None) if status in TERMINAL_STATUSES else None,
+    }
+
+
+def _fingerprint(field: str, value: Any) -> Any:
+    # 输出可能很长，只保留指纹用于比较
+    if field == "output" and isinstance(value, str):
+        return len(value), hash(value)
+    return value
+
+
+class _ExecutionSubscription:
+    """
+    单个执行的订阅状态
+
+    记录已推送给房间的最新快照（执行状态、每个步骤各字段的指纹与取值），
+    之后只推送与快照不同的步骤和字段；取值用于给丢过增量帧的连接补发完整步骤状态
+    """
+
+    def __init__(self, execution_id: int, snapshot: Optional[Dict[str, Any]] = None,
+                 log_cursor: Optional[Dict[str, Any]] = None):
+        self.execution_id = execution_id
+        self.subscribers = 0
+        self.patch_subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.status: Optional[str] = None
+        self.step_states: Dict[Any, Dict[str, Any]] = {}
+        self.step_values: Dict[Any, Dict[str, Any]] = {}
+        self.log_cursor = log_cursor
+
+        if snapshot:
+            self.status = snapshot.get("status")
+            for step in iter_steps(snapshot.get("steps", [])):
+                fields = step_fields(step)
+                self.step_states[step.get("id")] = self._state(fields)
+                self.step_values[step.get("id")] = fields
+
+    @staticmethod
+    def _state(fields: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: _fingerprint(field, value) for field, value in fields.items()}
+
+    def step_delta(self, step_id: Any, fields: Dict[str, Any], partial: bool = False) -> Dict[str, Any]:
+        """
+        返回与已推送快照不同的字段，并把它们记入快照
+
+        Args:
+            partial: fields 只包含部分字段（如执行器事件不带 output），缺失的字段不视为变化
+        """
+        sent = self.step_states.setdefault(step_id, {})
+        values = self.step_values.setdefault(step_id, {})
+        changes = {}
+        for field in STEP_FIELDS:
+            if partial and field not in fields:
+                continue
+            value = fields.get(field)
+            fingerprint = _fingerprint(field, value)
+            if field not in sent or sent[field] != fingerprint:
+                sent[field] = fingerprint
+                values[field] = value
+                changes[field] = value
+        return changes
+
+    def step_snapshot(self, timestamp: str) -> List[Dict[str, Any]]:
+        """已推送的全部步骤状态，每个步骤一条完整（非增量）的 step_progress"""
+        return [
+            {
+                "type": "step_progress",
+                "execution_id": self.execution_id,
+                "step_id": step_id,
+                **values,
+                "timestamp": timestamp,
+            }
+            for step_id, values in self.step_values.items()
+        ]
+
+    def rebase(self, snapshot: Dict[str, Any]):
+        """
+        某个连接刚收到完整快照：快照与已推送状态不一致的步骤从基线中移除，
+        下次对账时整步重发，避免该连接停留在比房间更旧的状态
+        """
+        for step in iter_steps(snapshot.get("steps", [])):
+            step_id = step.get("id")
+            if step_id in self.step_states and self.step_states[step_id] != self._state(step_fields(step)):
+                del self.step_states[step_id]
+                self.step_values.pop(step_id, None)
+        if snapshot.get("status") != self.status:
+            self.status = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+class ExecutionEventHub:
+    """按执行共享的事件订阅中心"""
+
+    def __init__(
+        self,
+        send_to_room: SendToRoom,
+        redis_url: Optional[str] = None,
+        reconcile_interval: float = 10.0,
+        poll_interval: float = 2.0,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0
+    ):
+        self.send_to_room = send_to_room
+        self.redis_url = redis_url or settings.redis.url
+        self.reconcile_interval = reconcile_interval
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._subscriptions: Dict[int, _ExecutionSubscription] = {}
+        self._client = None
+
+    def subscribe(self, execution_id: int, snapshot: Optional[Dict[str, Any]] = None,
+                  log_cursor: Optional[Dict[str, Any]] = None, patch: bool = False):
+        """
+        连接加入执行房间后调用；首个订阅者启动该执行的事件转发任务
+
+        Args:
+            snapshot: 刚发送给客户端的执行快照，作为对账基线
+            log_cursor: 客户端已收到日志的游标（见 DjangoDBService.get_execution_logs_since）
+            patch: 连接要求在增量消息中附带 JSON Patch 形式的变更
+        """
+        subscription = self._subscriptions.get(execution_id)
+        if subscription is None:
+            subscription = _ExecutionSubscription(execution_id, snapshot, log_cursor)
+            self._subscriptions[execution_id] = subscription
+        elif snapshot:
+            subscription.rebase(snapshot)
+
+        subscription.subscribers += 1
+        if patch:
+            subscription.patch_subscribers += 1
+        if subscription.task is None or (subscription.task.done() and not subscription.finished):
+            subscription.task = asyncio.create_task(self._run(subscription))
+
+    def rebase(self, execution_id: int, snapshot: Dict[str, Any]):
+        """房间内某个连接重新收到完整快照（如 get_status）后调用"""
+        subscription = self._subscriptions.get(execution_id)
+        if subscription is not None and snapshot:
+            subscription.rebase(snapshot)
+
+    def unsubscribe(self, execution_id: int, patch: bool = False):
+        """连接离开执行房间后调用；最后一个订阅者离开时停止转发任务"""
+        subscription = self._subscriptions.get(execution_id)
+        if subscription is None:
+            return
+
+        subscription.subscribers -= 1
+        if patch:
+            subscription.patch_subscribers -= 1
+        if subscription.subscribers <= 0:
+            del self._subscriptions[execution_id]
+            if subscription.task and not subscription.task.done():
+                subscription.task.cancel()
+
+    async def close(self):
+        tasks = [sub.task for sub in self._subscriptions.values() if sub.task and not sub.task.done()]
+        self._subscriptions.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "subscribed_executions": len(self._subscriptions),
+            "subscribers": sum(sub.subscribers for sub in self._subscriptions.values()),
+        }
+
+    async def _open_pubsub(self, execution_id: int):
+        if self._client is None:
+            # 所有执行的订阅共用一个连接池，每个订阅占用一个连接
+            self._client = redis.from_url(self.redis_url)
+        pubsub = self._client.pubsub()
+        await pubsub.subscribe(f"{EXECUTION_CHANNEL_PREFIX}{execution_id}")
+        return pubsub
+
+    @staticmethod
+    async def _close_pubsub(pubsub):
+        try:
+            await pubsub.aclose()
+        except Exception:
+            pass
+
+    async def _run(self, subscription: _ExecutionSubscription):
+        """转发循环出错后退避重试，直到执行结束或订阅被移除（unsubscribe 会取消本任务）"""
+        execution_id = subscription.execution_id
+        loop = asyncio.get_running_loop()
+        delay = self.retry_delay
+
+        while not subscription.finished and self._subscriptions.get(execution_id) is subscription:
+            started = loop.time()
+            try:
+                await self._follow(subscription)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if loop.time() - started > self.max_retry_delay:
+                    # 已稳定运行一段时间后的错误，从最短间隔重新退避
+                    delay = self.retry_delay
+                logger.warning("Execution event forwarding interrupted, retrying",
+                               execution_id=execution_id, error=str(e), retry_in=delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    async def _subscribe_or_poll(self, execution_id: int):
+        try:
+            return await self._open_pubsub(execution_id)
+        except Exception as e:
+            logger.warning("Execution event subscription unavailable, polling database",
+                           execution_id=execution_id, error=str(e))
+            return None
+
+    async def _follow(self, subscription: _ExecutionSubscription):
+        execution_id = subscription.execution_id
+        room = get_execution_room(execution_id)
+        loop = asyncio.get_running_loop()
+        pubsub = await self._subscribe_or_poll(execution_id)
+        last_subscribe = loop.time()
+
+        try:
+            # 订阅建立后立即对账，补上快照与订阅之间的变化
+            last_reconcile = loop.time()
+            await self._reconcile(subscription, room, include_logs=pubsub is None)
+
+            while not subscription.finished:
+                if pubsub is None and loop.time() - last_subscribe >= self.reconcile_interval:
+                    # 轮询期间定期尝试恢复订阅；恢复后按日志游标补读一次，填补上次轮询与订阅之间的空档
+                    last_subscribe = loop.time()
+                    pubsub = await self._subscribe_or_poll(execution_id)
+                    if pubsub is not None:
+                        logger.info("Execution event subscription restored", execution_id=execution_id)
+                        await self._reconcile(subscription, room, include_logs=True)
+                        last_reconcile = loop.time()
+
+                if pubsub is not None:
+                    try:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=self.reconcile_interval
+                        )
+                    except Exception as e:
+                        logger.warning("Execution event subscription lost, polling database",
+                                       execution_id=execution_id, error=str(e))
+                        await self._close_pubsub(pubsub)
+                        pubsub = None
+                        last_subscribe = loop.time()
+                        continue
+
+                    if message is not None:
+                        data = message["data"]
+                        if isinstance(data, bytes):
+                            data = data.decode("utf-8", errors="replace")
+                        await self._forward(subscription, room, data)
+                else:
+                    await asyncio.sleep(self.poll_interval)
+
+                now = loop.time()
+                if pubsub is None or now - last_reconcile >= self.reconcile_interval:
+                    last_reconcile = now
+                    await self._reconcile(subscription, room, include_logs=pubsub is None)
+        finally:
+            if pubsub is not None:
+                await self._close_pubsub(pubsub)
+
+    async def _forward(self, subscription: _ExecutionSubscription, room: str, data: str):
+        """转发执行器发布的事件；状态类事件与已推送快照比较，没有变化的不发送"""
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            event = None
+        if not isinstance(event, dict):
+            await self.send_to_room(data, room)
+            return
+
+        if event.get("type") == "execution_update" and event.get("status"):
+            subscription.status = event["status"]
+        elif event.get("type") == "step_progress" and event.get("step_id") is not None:
+            fields = step_fields(event)
+            # 执行器事件不携带输出，步骤名也可能为空，这些字段沿用已推送的值
+            if "output" not in event:
+                fields.pop("output")
+            if not fields["step_name"]:
+                fields.pop("step_name")
+            changes = subscription.step_delta(event["step_id"], fields, partial=True)
+            if not changes:
+                return
+            await self._send_step_delta(subscription, room, event["step_id"], changes,
+                                        event.get("timestamp") or datetime.utcnow().isoformat())
+            return
+
+        # 高频的状态事件在房间内按键合并，日志事件保持逐条有序
+        await self.send_to_room(data, room, coalesce_key(event))
+
+    async def _send_step_delta(self, subscription: _ExecutionSubscription, room: str, step_id: Any,
+                               changes: Dict[str, Any], timestamp: str):
+        """
+        发送步骤增量：只包含变化的字段（status 始终携带，便于旧客户端）；
+        有连接要求时附带 JSON Patch 形式的 patch，路径为 /steps/<step_id>/<field>。
+        连接的发送队列丢过本执行的步骤增量时，该连接改为收到全部步骤的完整状态
+        """
+        message = {
+            "type": "step_progress",
+            "execution_id": subscription.execution_id,
+            "step_id": step_id,
+            "status": changes.get("status", subscription.step_states.get(step_id, {}).get("status")),
+            **changes,
+            "delta": True,
+            "timestamp": timestamp,
+        }
+        if subscription.patch_subscribers > 0:
+            message["patch"] = [
+                {"op": "replace", "path": f"/steps/{step_id}/{field}", "value": value}
+                for field, value in changes.items()
+            ]
+        await self.send_to_room(
+            message, room, resync_key=("step_progress", subscription.execution_id),
+            snapshot=lambda: subscription.step_snapshot(timestamp)
+        )
+
+    async def _reconcile(self, subscription: _ExecutionSubscription, room: str, include_logs: bool):
+        """读取一次数据库，只发送与已推送状态不同的步骤和字段"""
+        execution_id = subscription.execution_id
+        execution = await django_db_service.get_execution_with_steps(execution_id)
+        if not execution:
+            return
+
+        timestamp = datetime.utcnow().isoformat()
+        steps = list(iter_steps(execution.get("steps", [])))
+
+        for step in steps:
+            changes = subscription.step_delta(step.get("id"), step_fields(step))
+            if changes:
+                await self._send_step_delta(subscription, room, step.get("id"), changes, timestamp)
+        if include_logs:
+            result = await django_db_service.get_execution_logs_since(execution_id, subscription.log_cursor)
+            subscription.log_cursor = result["cursor"]
+            for log in result["logs"]:
+                await self.send_to_room({
+                    "type": "log_entry",
+                    "execution_id": execution_id,
+                    "timestamp": log.get("timestamp", timestamp),
+                    "level": log.get("level", "info"),
+                    "message": log.get("message", ""),
+                    "step_name": log.get("step_name"),
+                    "source": log.get("source", "system")
+                }, room)
+
+        if execution.get("status") != subscription.status:
+            subscription.status = execution.get("status")
+            await self.send_to_room({
+                "type": "execution_update",
+                "execution_id": execution_id,
+                "status": execution.get("status"),
+                "pipeline_name": execution.get("pipeline_name"),
+                "total_steps": len(steps),
+                "completed_steps": sum(1 for s in steps if s.get("status") in ["success", "failed"]),
+                "execution_time": execution.get("execution_time", 0),
+                "timestamp": timestamp
+            }, room)
@@ -0,0 +1,215 @@
+"""
+执行日志 SSE 跟踪
+历史部分从日志分片表按偏移读取最后 N 行，之后通过 Redis Streams（ansflow:execution-log:<id>）
+XREAD BLOCK 跟踪新写入的分片。每个事件的 id 是各日志流已发送到的字符偏移，
+浏览器重连时带上 Last-Event-ID 即可从断点继续，不会重新下载整份日志。
+
+Redis 不可用时退化为按偏移轮询数据库。
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+import redis.asyncio as redis
+import structlog
+
+from ..config.settings import settings
+from .django_db import django_db_service, encode_log_cursor, decode_log_cursor
+
+logger = structlog.get_logger(__name__)
+
+EXECUTION_LOG_STREAM_PREFIX = "ansflow:execution-log:"
+TERMINAL_STATUSES = {"success", "failed", "cancelled", "timeout"}
+
+
+def format_sse(data: Dict[str, Any], event_id: Optional[str] = None, event: Optional[str] = None) -> str:
+    frame = ""
+    if event_id:
+        frame += f"id: {event_id}\n"
+    if event:
+        frame += f"event: {event}\n"
+    return frame + f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class ExecutionLogTail:
+    """执行日志跟踪器，所有连接共用一个 Redis 连接池"""
+
+    def __init__(self, redis_url: Optional[str] = None, block_ms: int = 15000,
+                 poll_interval: float = 1.0, catch_up_page: int = 200):
+        self.redis_url = redis_url or settings.redis.events_url
+        self.block_ms = block_ms
+        self.poll_interval = poll_interval
+        self.catch_up_page = catch_up_page
+        self._client = None
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    @staticmethod
+    def decode_event_id(event_id: Optional[str]) -> Optional[Dict[int, int]]:
+        cursor = decode_log_cursor(event_id)
+        if not cursor or not isinstance(cursor.get("s"), dict):
+            return None
+        try:
+            return {int(stream_id): int(offset) for stream_id, offset in cursor["s"].items()}
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def encode_event_id(offsets: Dict[int, int]) -> str:
+        return encode_log_cursor({"s": {str(stream_id): offset for stream_id, offset in offsets.items()}})
+
+    async def stream(self, execution_id: int, lines: int = 100, follow: bool = False,
+                     last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """生成 SSE 帧"""
+        key = f"{EXECUTION_LOG_STREAM_PREFIX}{execution_id}"
+        offsets = self.decode_event_id(last_event_id)
+
+        # 先记下 Redis 流的当前位置，再读数据库：之后写入的分片一定能从流中读到，重复部分按偏移去重
+        stream_position = None
+        if follow:
+            stream_position = await self._stream_position(key)
+
+        if offsets is None:
+            offsets = await django_db_service.get_log_stream_sizes(execution_id)
+            if offsets:
+                chunks = await django_db_service.get_log_tail_chunks(execution_id, lines)
+                for chunk in chunks:
+                    yield self._chunk_event(chunk, None)
+                    # 读取长度之后才写入的分片也已包含在尾部中
+                    end = int(chunk["offset"]) + len(chunk["content"])
+                    offsets[chunk["stream_id"]] = max(offsets.get(chunk["stream_id"], 0), end)
+                # 历史部分结束后统一给出可续传的位置
+                yield f"id: {self.encode_event_id(offsets)}\n\n"
+            else:
+                # 旧执行没有日志分片，回退到按步骤汇总的日志（不支持续传）
+                result = await django_db_service.get_execution_logs_since(execution_id, limit=None)
+                for log in result["logs"][-lines:]:
+                    yield format_sse(log)
+        else:
+            # 续传：只补发断点之后的分片
+            async for frame in self._catch_up(execution_id, offsets):
+                yield frame
+
+        if not follow:
+            return
+
+        # 执行不存在（或数据库不可用）时不进入跟踪
+        status = await django_db_service.get_execution_status(execution_id)
+        while status is not None and status not in TERMINAL_STATUSES:
+            if stream_position is None:
+                await asyncio.sleep(self.poll_interval)
+                async for frame in self._catch_up(execution_id, offsets):
+                    yield frame
+                status = await django_db_service.get_execution_status(execution_id)
+                continue
+
+            try:
+                response = await self._get_client().xread(
+                    {key: stream_position}, block=self.block_ms, count=100
+                )
+            except Exception as e:
+                logger.warning("Execution log stream unavailable, polling database",
+                               execution_id=execution_id, error=str(e))
+                stream_position = None
+                continue
+
+            if not response:
+                # 阻塞超时：发送注释保持连接，并确认执行是否已在别处结束
+                yield ": keep-alive\n\n"
+                status = await django_db_service.get_execution_status(execution_id)
+                continue
+
+            for entry_id, fields in response[0][1]:
+                stream_position = entry_id
+                if fields.get("type") == "end":
+                    status = fields.get("status") or "success"
+                    continue
+
+                stream_id = int(fields.get("stream_id", 0))
+                offset = int(fields.get("offset", 0))
+                if offset > offsets.get(stream_id, 0):
+                    # 流被裁剪或漏掉了消息，从数据库补齐
+                    async for frame in self._catch_up(execution_id, offsets):
+                        yield frame
+                    continue
+
+                chunk = {
+                    "stream_id": stream_id,
+                    "step_execution_id": int(fields["step_execution_id"]) if fields.get("step_execution_id") else None,
+                    "offset": offset,
+                    "content": fields.get("content", ""),
+                    "created_at": fields.get("created_at"),
+                }
+                frame = self._chunk_event(chunk, offsets)
+                if frame:
+                    yield frame
+
+        # 执行结束：补齐最后写入的分片后关闭
+        async for frame in self._catch_up(execution_id, offsets):
+            yield frame
+        yield format_sse({"execution_id": execution_id, "status": status}, event="end")
+
+    async def _stream_position(self, key: str) -> Optional[str]:
+        try:
+            entries = await self._get_client().xrevrange(key, count=1)
+        except Exception as e:
+            logger.warning("Execution log stream unavailable, polling database", key=key, error=str(e))
+            return None
+        return entries[0][0] if entries else "0-0"
+
+    async def _catch_up(self, execution_id: int, offsets: Dict[int, int]) -> AsyncIterator[str]:
+        """按偏移从数据库读取并发送断点之后的分片"""
+        while True:
+            chunks = await django_db_service.get_log_chunks_after(
+                execution_id, offsets, limit=self.catch_up_page
+            )
+            for chunk in chunks:
+                frame = self._chunk_event(chunk, offsets)
+                if frame:
+                    yield frame
+            if len(chunks) < self.catch_up_page:
+                return
+
+    def _chunk_event(self, chunk: Dict[str, Any], offsets: Optional[Dict[int, int]]) -> Optional[str]:
+        """
+        把分片转换为 SSE 帧；传入 offsets 时裁掉已发送部分并推进偏移，事件 id 为推进后的偏移
+        """
+        stream_id = int(chunk["stream_id"])
+        content = chunk["content"]
+        offset = int(chunk["offset"])
+        event_id = None
+
+        if offsets is not None:
+            sent = offsets.get(stream_id, 0)
+            if offset + len(content) <= sent:
+                return None
+            if offset < sent:
+                content = content[sent - offset:]
+                offset = sent
+            offsets[stream_id] = offset + len(content)
+            event_id = self.encode_event_id(offsets)
+
+        created_at = chunk.get("created_at")
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+
+        return format_sse({
+            "timestamp": created_at or datetime.utcnow().isoformat(),
+            "level": "INFO",
+            "message": content.rstrip("\n"),
+            "stream_id": stream_id,
+            "step_execution_id": chunk.get("step_execution_id"),
+            "offset": offset,
+        }, event_id=event_id)
+
+
+execution_log_tail = ExecutionLogTail()
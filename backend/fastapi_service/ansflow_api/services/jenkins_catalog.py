@@ -0,0 +1,63 @@
+"""
+Jenkins 作业目录缓存失效
+Django 服务把每个 Jenkins 地址的作业目录缓存在默认缓存库的 ansflow:jenkins-catalog:<hash> 中，
+收到该 Jenkins 的 webhook（构建开始/结束）时删除，下次打开作业列表即取到最新状态。
+"""
+import hashlib
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+import structlog
+
+from ..config.settings import settings
+
+logger = structlog.get_logger(__name__)
+
+JENKINS_CATALOG_KEY_PREFIX = "ansflow:jenkins-catalog:"
+
+
+def catalog_key(base_url: str) -> str:
+    """与 Django 端 cicd_integrations.jenkins_catalog.catalog_key 保持一致"""
+    normalized = (base_url or "").rstrip("/").lower()
+    return f"{JENKINS_CATALOG_KEY_PREFIX}{hashlib.sha1(normalized.encode()).hexdigest()[:16]}"
+
+
+def jenkins_base_url(payload: Dict[str, Any]) -> Optional[str]:
+    """从 Notification 插件的 payload 中推导 Jenkins 地址（build.full_url 中 /job/ 之前的部分）"""
+    build = payload.get("build") or {}
+    full_url = build.get("full_url") if isinstance(build, dict) else None
+    if not full_url or "/job/" not in full_url:
+        return None
+    return full_url.split("/job/", 1)[0]
+
+
+class JenkinsCatalogInvalidator:
+    """共用一个 Redis 连接池删除作业目录缓存"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or settings.redis.events_url
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def invalidate_from_payload(self, payload: Dict[str, Any]) -> bool:
+        base_url = jenkins_base_url(payload)
+        if not base_url:
+            return False
+        try:
+            await self._get_client().delete(catalog_key(base_url))
+        except Exception as e:
+            logger.warning("Failed to invalidate Jenkins job catalog", base_url=base_url, error=str(e))
+            return False
+        return True
+
+
+jenkins_catalog_invalidator = JenkinsCatalogInvalidator()
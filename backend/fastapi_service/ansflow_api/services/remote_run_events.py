@@ -0,0 +1,117 @@
+"""
+远程执行状态事件
+把 Jenkins / GitLab / GitHub 的 webhook 规范化为 {tool_type, external_id, status, base_url}，
+写入 Redis Stream（ansflow:remote-run-events，与 Django 默认缓存同库），
+由 Django 的远程执行跟踪器消费并立即更新 PipelineExecution。
+external_id 的格式与各适配器触发执行时记录的一致。
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+import structlog
+
+from ..config.settings import settings
+from .jenkins_catalog import jenkins_base_url
+
+logger = structlog.get_logger(__name__)
+
+REMOTE_RUN_EVENTS_STREAM = "ansflow:remote-run-events"
+STREAM_MAXLEN = 10000
+
+JENKINS_RESULTS = {
+    "SUCCESS": "success",
+    "FAILURE": "failed",
+    "UNSTABLE": "failed",
+    "ABORTED": "cancelled",
+}
+
+
+def normalize_jenkins_event(payload: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Notification 插件：external_id 为 job_name#build_number"""
+    build = payload.get("build")
+    if not isinstance(build, dict) or not payload.get("name") or build.get("number") is None:
+        return None
+    phase = (build.get("phase") or "").upper()
+    if phase in ("QUEUED", "STARTED"):
+        status = "running"
+    elif phase in ("COMPLETED", "FINALIZED"):
+        status = JENKINS_RESULTS.get((build.get("status") or "").upper(), "failed")
+    else:
+        return None
+    return {
+        "tool_type": "jenkins",
+        "external_id": f"{payload['name']}#{build['number']}",
+        "status": status,
+        "base_url": jenkins_base_url(payload) or "",
+    }
+
+
+def normalize_gitlab_event(payload: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Pipeline Hook：external_id 为流水线ID"""
+    if payload.get("object_kind") != "pipeline":
+        return None
+    attributes = payload.get("object_attributes") or {}
+    if attributes.get("id") is None or not attributes.get("status"):
+        return None
+    return {
+        "tool_type": "gitlab_ci",
+        "external_id": str(attributes["id"]),
+        "status": attributes["status"],
+        "base_url": "",
+    }
+
+
+def normalize_github_event(event_type: str, payload: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """workflow_run 事件：external_id 为运行ID"""
+    if event_type != "workflow_run":
+        return None
+    run = payload.get("workflow_run") or {}
+    if run.get("id") is None:
+        return None
+    if run.get("status") == "completed":
+        status = {"success": "success", "cancelled": "cancelled"}.get(run.get("conclusion"), "failure")
+    else:
+        status = run.get("status") or "unknown"
+    return {
+        "tool_type": "github_actions",
+        "external_id": str(run["id"]),
+        "status": status,
+        "base_url": "",
+    }
+
+
+class RemoteRunEventPublisher:
+    """共用一个 Redis 连接池写入远程执行状态事件"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or settings.redis.events_url
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def publish(self, event: Optional[Dict[str, str]]) -> bool:
+        if not event:
+            return False
+        try:
+            await self._get_client().xadd(
+                REMOTE_RUN_EVENTS_STREAM,
+                {**event, "received_at": datetime.utcnow().isoformat()},
+                maxlen=STREAM_MAXLEN,
+                approximate=True,
+            )
+        except Exception as e:
+            logger.warning("Failed to publish remote run event", event=event, error=str(e))
+            return False
+        return True
+
+
+remote_run_event_publisher = RemoteRunEventPublisher()
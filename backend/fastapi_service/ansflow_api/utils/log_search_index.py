@@ -0,0 +1,771 @@
+#!/usr/bin/env python3
+"""
+AnsFlow 日志检索索引
+为日志目录维护持久化的磁盘索引，日志搜索不再逐行扫描所有 .log 文件
+
+- 清单（manifest.json）：记录每个日志文件已索引到的位置（inode + 字节偏移）以及按小时分桶的分段
+- 分段（seg_*.json）：一个文件在一个时间桶内的一段日志，包含每行的字节偏移、行号、时间戳，
+  按级别/服务的位图，以及分词后的倒排索引
+- 增量更新：文件增长时只索引新增部分；文件被轮转或截断（inode 变化 / 变小）时重建该文件的分段
+- 文件列表：默认按 patterns 遍历日志目录；调用方已维护文件清单（如 Django 的 LogFileIndexer）时
+  通过 file_source 提供，刷新时不再遍历目录
+
+仅依赖标准库；Django（common/log_search_index.py）与 FastAPI（ansflow_api/utils/log_search_index.py）
+各自打包一份相同的副本（容器内只挂载服务目录），修改时需同步；日志行的解析由调用方提供
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+BUCKET_SECONDS = 3600          # 时间桶大小：1小时
+MAX_SEGMENT_ENTRIES = 10000    # 单个分段最多条目数
+SEGMENT_CACHE_SIZE = 128       # 内存中缓存的分段数量
+
+# 解析结果：(时间戳秒数或None, 级别, 服务, 用于检索的文本)
+IndexedLine = Tuple[Optional[float], str, str, str]
+LineParser = Callable[[str, str], Optional[IndexedLine]]
+
+
+class LogFile(NamedTuple):
+    """待索引的日志文件及其当前 inode / 大小 / mtime"""
+    path: str
+    inode: int
+    size: int
+    mtime: float
+
+
+FileSource = Callable[[], Iterable[LogFile]]
+
+_TOKEN_RE = re.compile(r'[0-9a-z_]+|[一-鿿]')
+
+
+def tokenize(text: str) -> List[str]:
+    """分词：英文数字按单词切分（小写），中文按单字切分"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _popcount(bits: int) -> int:
+    return bits.bit_count()
+
+
+def _bitmap_from_positions(positions: Iterable[int]) -> int:
+    bits = 0
+    for position in positions:
+        bits |= 1 << position
+    return bits
+
+
+def iter_set_bits(bits: int) -> List[int]:
+    """返回位图中所有置位的下标（升序）"""
+    positions = []
+    position = 0
+    while bits:
+        low = bits & -bits
+        index = low.bit_length() - 1
+        positions.append(position + index)
+        bits >>= index + 1
+        position += index + 1
+    return positions
+
+
+# ---------------------------------------------------------------------------
+# 查询解析
+# ---------------------------------------------------------------------------
+
+class QueryNode:
+    """查询语法树节点：term / and / or / not"""
+    __slots__ = ('op', 'children', 'text', 'tokens')
+
+    def __init__(self, op: str, children: Optional[List['QueryNode']] = None, text: str = ''):
+        self.op = op
+        self.children = children or []
+        self.text = text.lower()
+        self.tokens = tokenize(text) if op == 'term' else []
+
+    @property
+    def is_word(self) -> bool:
+        """单个完整词项：包含该词的行一定匹配，其余包含该片段的行需要回读原文校验"""
+        return len(self.tokens) == 1 and self.tokens[0] == self.text
+
+    def matches(self, text: str) -> bool:
+        """在原始日志文本（小写）上求值，词项按子串匹配，与原有的逐行扫描语义一致"""
+        if self.op == 'term':
+            return self.text in text
+        if self.op == 'and':
+            return all(child.matches(text) for child in self.children)
+        if self.op == 'or':
+            return any(child.matches(text) for child in self.children)
+        return not self.children[0].matches(text)
+
+
+_QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\()|(\))|([^\s()"]+)')
+
+
+def parse_query(query: Optional[str]) -> Optional[QueryNode]:
+    """
+    解析关键词查询
+    支持 AND / OR / NOT（大写）、括号、双引号短语；相邻词项默认为 AND，NOT 优先级最高，其次 AND，最后 OR
+    例：error AND (timeout OR refused) NOT debug
+    """
+    if not query or not query.strip():
+        return None
+
+    tokens = []
+    for match in _QUERY_TOKEN_RE.finditer(query):
+        phrase, lparen, rparen, word = match.groups()
+        if phrase is not None:
+            tokens.append(('term', phrase))
+        elif lparen:
+            tokens.append(('(', None))
+        elif rparen:
+            tokens.append((')', None))
+        elif word in ('AND', 'OR', 'NOT'):
+            tokens.append((word, None))
+        else:
+            tokens.append(('term', word))
+
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def parse_or():
+        nonlocal position
+        children = [parse_and()]
+        while peek() == 'OR':
+            position += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else QueryNode('or', children)
+
+    def parse_and():
+        nonlocal position
+        children = [parse_not()]
+        while peek() in ('AND', 'NOT', 'term', '('):
+            if peek() == 'AND':
+                position += 1
+            children.append(parse_not())
+        return children[0] if len(children) == 1 else QueryNode('and', children)
+
+    def parse_not():
+        nonlocal position
+        if peek() == 'NOT':
+            position += 1
+            return QueryNode('not', [parse_not()])
+        return parse_primary()
+
+    def parse_primary():
+        nonlocal position
+        kind = peek()
+        if kind == '(':
+            position += 1
+            node = parse_or()
+            if peek() == ')':
+                position += 1
+            return node
+        if kind == 'term':
+            text = tokens[position][1]
+            position += 1
+            return QueryNode('term', text=text)
+        # 不完整的表达式（如末尾的 AND）按空词项处理
+        position += 1
+        return QueryNode('term', text='')
+
+    node = parse_or()
+    while position < len(tokens):
+        # 多余的右括号等
+        position += 1
+    return node
+
+
+# ---------------------------------------------------------------------------
+# 分段
+# ---------------------------------------------------------------------------
+
+class Segment:
+    """一个文件在一个时间桶内的日志分段"""
+
+    def __init__(self, segment_id: str, path: str, bucket: int):
+        self.segment_id = segment_id
+        self.path = path
+        self.bucket = bucket
+        self.offsets: List[int] = []
+        self.line_numbers: List[int] = []
+        self.timestamps: List[float] = []
+        self.levels: Dict[str, int] = {}
+        self.services: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+
+    @property
+    def count(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def universe(self) -> int:
+        return (1 << self.count) - 1
+
+    def add(self, offset: int, line_number: int, timestamp: float, level: str, service: str, text: str):
+        position = self.count
+        self.offsets.append(offset)
+        self.line_numbers.append(line_number)
+        self.timestamps.append(timestamp)
+        self.levels[level] = self.levels.get(level, 0) | (1 << position)
+        self.services[service] = self.services.get(service, 0) | (1 << position)
+        for token in set(tokenize(text)):
+            self.postings.setdefault(token, []).append(position)
+
+    def summary(self) -> Dict:
+        return {
+            'path': self.path,
+            'bucket': self.bucket,
+            'start': min(self.timestamps) if self.timestamps else self.bucket,
+            'end': max(self.timestamps) if self.timestamps else self.bucket,
+            'count': self.count,
+            'levels': sorted(self.levels),
+            'services': sorted(self.services),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'path': self.path,
+            'bucket': self.bucket,
+            'offsets': self.offsets,
+            'line_numbers': self.line_numbers,
+            'timestamps': self.timestamps,
+            'levels': {key: format(bits, 'x') for key, bits in self.levels.items()},
+            'services': {key: format(bits, 'x') for key, bits in self.services.items()},
+            'postings': self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, segment_id: str, data: Dict) -> 'Segment':
+        segment = cls(segment_id, data['path'], data['bucket'])
+        segment.offsets = data['offsets']
+        segment.line_numbers = data['line_numbers']
+        segment.timestamps = data['timestamps']
+        segment.levels = {key: int(bits, 16) for key, bits in data['levels'].items()}
+        segment.services = {key: int(bits, 16) for key, bits in data['services'].items()}
+        segment.postings = data['postings']
+        return segment
+
+    def token_bitmap(self, token: str, partial: bool = False) -> int:
+        """
+        词项位图；partial=True 时合并所有包含该片段的词项（子串匹配的上界）
+        """
+        if not partial:
+            return _bitmap_from_positions(self.postings.get(token, ()))
+        bits = 0
+        for key, positions in self.postings.items():
+            if token in key:
+                bits |= _bitmap_from_positions(positions)
+        return bits
+
+    def evaluate(self, node: QueryNode) -> Tuple[int, int]:
+        """
+        在分段上求值查询，返回 (确定匹配, 可能匹配) 两个位图
+        两者之差是需要回读原文校验的候选行
+        """
+        universe = self.universe
+        if node.op == 'term':
+            if not node.text:
+                return universe, universe
+            if not node.tokens:
+                # 纯符号无法走索引，全部候选行回读校验
+                return 0, universe
+            upper = universe
+            for token in node.tokens:
+                upper &= self.token_bitmap(token, partial=True)
+                if not upper:
+                    break
+            lower = self.token_bitmap(node.tokens[0]) if node.is_word else 0
+            return lower, upper
+        if node.op == 'not':
+            lower, upper = self.evaluate(node.children[0])
+            return universe & ~upper, universe & ~lower
+        results = [self.evaluate(child) for child in node.children]
+        if node.op == 'and':
+            lower, upper = universe, universe
+            for child_lower, child_upper in results:
+                lower &= child_lower
+                upper &= child_upper
+        else:
+            lower, upper = 0, 0
+            for child_lower, child_upper in results:
+                lower |= child_lower
+                upper |= child_upper
+        return lower, upper
+
+    def filter_bitmap(self, levels: Optional[Iterable[str]], services: Optional[Iterable[str]],
+                      start: Optional[float], end: Optional[float]) -> int:
+        bits = self.universe
+        if levels:
+            level_bits = 0
+            for level in levels:
+                level_bits |= self.levels.get(level, 0)
+            bits &= level_bits
+        if services:
+            service_bits = 0
+            for service in services:
+                service_bits |= self.services.get(service, 0)
+            bits &= service_bits
+        if bits and (start is not None or end is not None):
+            time_bits = 0
+            for position, timestamp in enumerate(self.timestamps):
+                if (start is None or timestamp >= start) and (end is None or timestamp <= end):
+                    time_bits |= 1 << position
+            bits &= time_bits
+        return bits
+
+
+# ---------------------------------------------------------------------------
+# 索引
+# ---------------------------------------------------------------------------
+
+class LogSearchHit:
+    """搜索命中的日志行"""
+    __slots__ = ('path', 'offset', 'line_number', 'timestamp', 'line')
+
+    def __init__(self, path: str, offset: int, line_number: int, timestamp: float, line: str = ''):
+        self.path = path
+        self.offset = offset
+        self.line_number = line_number
+        self.timestamp = timestamp
+        self.line = line
+
+
+class LogSearchIndex:
+    """
+    日志目录检索索引
+
+    Args:
+        log_dir: 日志目录
+        parser: 行解析函数 parser(line, path) -> (timestamp, level, service, text) 或 None（不索引）
+        name: 索引名称，不同解析规则使用不同的索引目录
+        patterns: 需要索引的文件匹配模式
+        index_dir: 索引存放目录，默认 <log_dir>/.index/<name>
+        refresh_interval: 搜索前自动增量刷新的最小间隔（秒）
+        file_source: 返回当前全部日志文件（LogFile）的函数；为空时按 patterns 遍历 log_dir
+    """
+
+    def __init__(self, log_dir, parser: LineParser, name: str = 'default',
+                 patterns: Iterable[str] = ('**/*.log',), index_dir=None,
+                 refresh_interval: float = 5.0, file_source: Optional[FileSource] = None):
+        self.log_dir = Path(log_dir)
+        self.parser = parser
+        self.patterns = tuple(patterns)
+        self.index_dir = Path(index_dir) if index_dir else self.log_dir / '.index' / name
+        self.refresh_interval = refresh_interval
+        self.file_source = file_source
+        self._manifest: Optional[Dict] = None
+        self._segments: 'OrderedDict[str, Segment]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_refresh = 0.0
+
+    # -- 清单 ---------------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.index_dir / 'manifest.json'
+
+    def _empty_manifest(self) -> Dict:
+        return {'version': INDEX_VERSION, 'next_segment': 0, 'files': {}, 'segments': {}}
+
+    def _load_manifest(self) -> Dict:
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') != INDEX_VERSION:
+                    raise ValueError('index version changed')
+                self._manifest = manifest
+            except FileNotFoundError:
+                self._manifest = self._empty_manifest()
+            except Exception as e:
+                logger.warning(f"日志索引清单无效，重建索引: {e}")
+                self._manifest = self._empty_manifest()
+            self._drop_stale_segments()
+        return self._manifest
+
+    def _drop_stale_segments(self):
+        """清单重新加载后，丢弃与清单记录不一致的缓存分段（其他进程已向其追加或已重建索引）"""
+        summaries = self._manifest['segments']
+        for segment_id, segment in list(self._segments.items()):
+            summary = summaries.get(segment_id) or {}
+            if (summary.get('path'), summary.get('bucket'), summary.get('count')) != (
+                    segment.path, segment.bucket, segment.count):
+                del self._segments[segment_id]
+
+    def _write_json(self, path: Path, data: Dict):
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _segment_path(self, segment_id: str) -> Path:
+        return self.index_dir / f"seg_{segment_id}.json"
+
+    def _get_segment(self, segment_id: str) -> Optional[Segment]:
+        segment = self._segments.get(segment_id)
+        if segment is not None:
+            self._segments.move_to_end(segment_id)
+            return segment
+        try:
+            with open(self._segment_path(segment_id), 'r', encoding='utf-8') as f:
+                segment = Segment.from_dict(segment_id, json.load(f))
+        except Exception as e:
+            logger.warning(f"读取日志索引分段失败 {segment_id}: {e}")
+            return None
+        self._cache_segment(segment)
+        return segment
+
+    def _cache_segment(self, segment: Segment):
+        self._segments[segment.segment_id] = segment
+        self._segments.move_to_end(segment.segment_id)
+        while len(self._segments) > SEGMENT_CACHE_SIZE:
+            self._segments.popitem(last=False)
+
+    # -- 增量刷新 -------------------------------------------------------------
+
+    def _scan_log_files(self) -> Iterable[LogFile]:
+        """默认文件来源：按 patterns 遍历日志目录"""
+        seen = set()
+        for pattern in self.patterns:
+            for path in self.log_dir.glob(pattern):
+                if self.index_dir in path.parents or path in seen or not path.is_file():
+                    continue
+                seen.add(path)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                yield LogFile(str(path), stat.st_ino, stat.st_size, stat.st_mtime)
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """多进程（多个 worker）共用索引目录时的文件锁：刷新和重建独占，搜索共享"""
+        if not fcntl or not self.index_dir.exists():
+            yield
+            return
+        with open(self.index_dir / '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """增量刷新索引，返回本次处理的统计"""
+        with self._lock:
+            now = time.monotonic()
+            if (not force and now - self._last_refresh < self.refresh_interval) or not self.log_dir.exists():
+                return {'files_indexed': 0, 'lines_indexed': 0, 'files_removed': 0}
+
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                # 其他进程可能已更新清单，重新加载
+                self._manifest = None
+                stats = self._refresh_locked()
+
+            self._last_refresh = time.monotonic()
+            return stats
+
+    def rebuild(self) -> Dict[str, int]:
+        """丢弃现有索引并全量重建（与其他进程的刷新、搜索互斥）"""
+        with self._lock:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                self._manifest = self._empty_manifest()
+                self._segments.clear()
+                for segment_path in self.index_dir.glob('seg_*.json'):
+                    segment_path.unlink()
+                self._write_json(self.manifest_path, self._manifest)
+                if self.log_dir.exists():
+                    stats = self._refresh_locked()
+                else:
+                    stats = {'files_indexed': 0, 'lines_indexed': 0, 'files_removed': 0}
+            self._last_refresh = time.monotonic()
+            return stats
+
+    def _refresh_locked(self) -> Dict[str, int]:
+        manifest = self._load_manifest()
+        files = manifest['files']
+        stats = {'files_indexed': 0, 'lines_indexed': 0, 'files_removed': 0}
+        changed = False
+        present = set()
+
+        for log_file in (self.file_source or self._scan_log_files)():
+            key = log_file.path
+            present.add(key)
+
+            state = files.get(key)
+            if state and state['inode'] == log_file.inode and state['file_size'] == log_file.size \
+                    and state['mtime'] == log_file.mtime:
+                continue
+
+            if state and (state['inode'] != log_file.inode or log_file.size < state['file_size']
+                          or key.endswith('.gz')):
+                # 文件被轮转/截断（压缩文件无法追加），重建该文件的分段
+                self._drop_file_segments(key)
+                state = None
+
+            lines = self._index_file(Path(key), log_file, state)
+            stats['files_indexed'] += 1
+            stats['lines_indexed'] += lines
+            changed = True
+
+        for key in list(files):
+            if key not in present:
+                self._drop_file_segments(key)
+                stats['files_removed'] += 1
+                changed = True
+
+        if changed:
+            self._write_json(self.manifest_path, manifest)
+            logger.debug(f"日志索引已刷新: {stats}")
+        return stats
+
+    def _drop_file_segments(self, key: str):
+        manifest = self._load_manifest()
+        state = manifest['files'].pop(key, None)
+        for segment_id in (state or {}).get('segments', []):
+            manifest['segments'].pop(segment_id, None)
+            self._segments.pop(segment_id, None)
+            try:
+                self._segment_path(segment_id).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _open_source(self, path: Path):
+        if path.suffix == '.gz':
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
+
+    def _index_file(self, path: Path, log_file: LogFile, state: Optional[Dict]) -> int:
+        """从上次索引位置继续索引文件，只处理以换行结尾的完整行"""
+        manifest = self._load_manifest()
+        key = str(path)
+        if state is None:
+            state = {
+                'inode': log_file.inode, 'file_size': 0, 'size': 0, 'mtime': 0, 'line_count': 0,
+                'last_timestamp': None, 'segments': []
+            }
+            manifest['files'][key] = state
+
+        # 继续写入该文件最后一个未写满的分段
+        segment = None
+        if state['segments']:
+            last_id = state['segments'][-1]
+            if manifest['segments'].get(last_id, {}).get('count', MAX_SEGMENT_ENTRIES) < MAX_SEGMENT_ENTRIES:
+                segment = self._get_segment(last_id)
+
+        dirty: Dict[str, Segment] = {}
+        offset = state['size']
+        line_number = state['line_count']
+        last_timestamp = state['last_timestamp'] or log_file.mtime
+        lines_indexed = 0
+        complete = True
+
+        try:
+            with self._open_source(path) as f:
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b'\n') and path.suffix != '.gz':
+                        # 未写完的行，下次再索引
+                        complete = False
+                        break
+                    line_offset = offset
+                    offset += len(raw)
+                    line_number += 1
+
+                    line = raw.decode('utf-8', errors='ignore').rstrip('\r\n')
+                    if not line.strip():
+                        continue
+                    parsed = self.parser(line, key)
+                    if parsed is None:
+                        continue
+                    timestamp, level, service, text = parsed
+                    if timestamp is None:
+                        # 无法解析时间的行沿用上一行的时间
+                        timestamp = last_timestamp
+                    last_timestamp = timestamp
+
+                    bucket = int(timestamp // BUCKET_SECONDS * BUCKET_SECONDS)
+                    if segment is None or segment.bucket != bucket or segment.count >= MAX_SEGMENT_ENTRIES:
+                        if segment is not None:
+                            dirty[segment.segment_id] = segment
+                        segment = self._new_segment(key, bucket)
+                        state['segments'].append(segment.segment_id)
+
+                    segment.add(line_offset, line_number, timestamp, level, service, text)
+                    dirty[segment.segment_id] = segment
+                    lines_indexed += 1
+        except (OSError, EOFError) as e:
+            logger.warning(f"索引日志文件失败 {path}: {e}")
+            complete = False
+
+        for segment_id, dirty_segment in dirty.items():
+            self._write_json(self._segment_path(segment_id), dirty_segment.to_dict())
+            manifest['segments'][segment_id] = dirty_segment.summary()
+            self._cache_segment(dirty_segment)
+
+        state.update({
+            'inode': log_file.inode,
+            'file_size': log_file.size,
+            'size': offset,
+            # 尾部有未写完的行时不记录 mtime，下次刷新继续检查该文件
+            'mtime': log_file.mtime if complete else 0,
+            'line_count': line_number,
+            'last_timestamp': last_timestamp,
+        })
+        return lines_indexed
+
+    def _new_segment(self, key: str, bucket: int) -> Segment:
+        manifest = self._load_manifest()
+        segment_id = f"{manifest['next_segment']:08d}"
+        manifest['next_segment'] += 1
+        return Segment(segment_id, key, bucket)
+
+    # -- 查询 ---------------------------------------------------------------
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        levels: Optional[Iterable[str]] = None,
+        services: Optional[Iterable[str]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        offset: int = 0,
+        limit: int = 100,
+        refresh: bool = True
+    ) -> Dict:
+        """
+        搜索日志，结果按时间倒序
+
+        Returns:
+            {'hits': [LogSearchHit], 'total_count': int, 'segments_searched': int}
+            total_count 为全部匹配条数（不受 offset/limit 影响）
+        """
+        if refresh:
+            self.refresh()
+
+        node = parse_query(query)
+        levels = set(levels or []) or None
+        services = set(services or []) or None
+
+        with self._lock, self._file_lock(shared=True):
+            manifest = self._load_manifest()
+            candidates = []
+            for segment_id, summary in manifest['segments'].items():
+                if start is not None and summary['end'] < start:
+                    continue
+                if end is not None and summary['start'] > end:
+                    continue
+                if levels and not levels.intersection(summary['levels']):
+                    continue
+                if services and not services.intersection(summary['services']):
+                    continue
+                candidates.append((segment_id, summary))
+
+            # 新的时间桶在前；同一时间桶内的条目合并后再按时间排序
+            candidates.sort(key=lambda item: item[1]['bucket'], reverse=True)
+
+            wanted = offset + limit
+            total_count = 0
+            collected: List[LogSearchHit] = []
+            bucket_hits: List[LogSearchHit] = []
+            current_bucket = None
+
+            for segment_id, summary in candidates:
+                if summary['bucket'] != current_bucket:
+                    collected.extend(sorted(bucket_hits, key=lambda hit: hit.timestamp, reverse=True))
+                    bucket_hits = []
+                    current_bucket = summary['bucket']
+
+                segment = self._get_segment(segment_id)
+                if segment is None:
+                    continue
+
+                # 分段完全落在时间范围内时无需逐条比较时间
+                fully_covered = (start is None or summary['start'] >= start) and \
+                    (end is None or summary['end'] <= end)
+                bits = segment.filter_bitmap(
+                    levels, services,
+                    None if fully_covered else start,
+                    None if fully_covered else end
+                )
+                if bits and node is not None:
+                    lower, upper = segment.evaluate(node)
+                    verify = bits & upper & ~lower
+                    bits &= lower
+                    if verify:
+                        bits |= self._verify(segment, node, verify)
+                if not bits:
+                    continue
+
+                total_count += _popcount(bits)
+                if len(collected) < wanted:
+                    bucket_hits.extend(
+                        LogSearchHit(segment.path, segment.offsets[position],
+                                     segment.line_numbers[position], segment.timestamps[position])
+                        for position in iter_set_bits(bits)
+                    )
+
+            collected.extend(sorted(bucket_hits, key=lambda hit: hit.timestamp, reverse=True))
+
+        hits = collected[offset:wanted]
+        self._load_lines(hits)
+        return {'hits': hits, 'total_count': total_count, 'segments_searched': len(candidates)}
+
+    def _verify(self, segment: Segment, node: QueryNode, bits: int) -> int:
+        """回读候选行原文，精确求值短语/子串条件"""
+        verified = 0
+        positions = iter_set_bits(bits)
+        hits = [LogSearchHit(segment.path, segment.offsets[p], segment.line_numbers[p], 0.0) for p in positions]
+        self._load_lines(hits)
+        for position, hit in zip(positions, hits):
+            # 与建索引时一致，只在解析出的检索文本上求值
+            parsed = self.parser(hit.line, segment.path)
+            if parsed is not None and node.matches(parsed[3].lower()):
+                verified |= 1 << position
+        return verified
+
+    def _load_lines(self, hits: List[LogSearchHit]):
+        """按文件分组，按偏移读取命中行的原文"""
+        by_path: Dict[str, List[LogSearchHit]] = {}
+        for hit in hits:
+            by_path.setdefault(hit.path, []).append(hit)
+
+        for path, path_hits in by_path.items():
+            try:
+                with self._open_source(Path(path)) as f:
+                    for hit in sorted(path_hits, key=lambda h: h.offset):
+                        f.seek(hit.offset)
+                        hit.line = f.readline().decode('utf-8', errors='ignore').rstrip('\r\n')
+            except OSError as e:
+                logger.warning(f"读取日志行失败 {path}: {e}")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            manifest = self._load_manifest()
+            return {
+                'files': len(manifest['files']),
+                'segments': len(manifest['segments']),
+                'entries': sum(s['count'] for s in manifest['segments'].values()),
+                'cached_segments': len(self._segments),
+            }
@@ -8,6 +8,13 @@ from fastapi.responses import JSONResponse
 import structlog
 
 from ..services.webhook_service import webhook_service
+from ..services.jenkins_catalog import jenkins_catalog_invalidator
+from ..services.remote_run_events import (
+    remote_run_event_publisher,
+    normalize_github_event,
+    normalize_gitlab_event,
+    normalize_jenkins_event,
+)
 
 webhook_router = APIRouter()
 logger = structlog.get_logger(__name__)
@@ -19,6 +26,8 @@ async def process_github_webhook_background(
     delivery_id: str
 ):
     """Process GitHub webhook in background"""
+    # 远程执行状态交给 Django 远程执行跟踪器（不依赖下面的数据库处理）
+    await remote_run_event_publisher.publish(normalize_github_event(event_type, payload))
     try:
         from ..core.database import get_session
         async for session in get_session():
@@ -41,6 +50,7 @@ async def process_gitlab_webhook_background(
     delivery_id: str
 ):
     """Process GitLab webhook in background"""
+    await remote_run_event_publisher.publish(normalize_gitlab_event(payload))
     try:
         from ..core.database import get_session
         async for session in get_session():
@@ -62,6 +72,9 @@ async def process_jenkins_webhook_background(
     delivery_id: str
 ):
     """Process Jenkins webhook in background"""
+    # 作业状态已变化，先让 Django 端缓存的作业目录失效（不依赖下面的数据库处理）
+    await jenkins_catalog_invalidator.invalidate_from_payload(payload)
+    await remote_run_event_publisher.publish(normalize_jenkins_event(payload))
     try:
         from ..core.database import get_session
         async for session in get_session():
@@ -0,0 +1,282 @@
+"""
+WebSocket 广播分发层
+- 每条消息只序列化一次，同一帧写入房间内所有连接
+- 每个连接有独立的有界发送队列和写入任务，慢客户端只影响自己：
+  队列满时丢弃最旧的帧（drop_oldest）或直接断开（disconnect），发送超时一律断开
+- 增量帧带有 resync_key；drop_oldest 丢弃增量帧后该连接记为失步，
+  下次同一 resync_key 的消息改为发送完整快照
+- 高频状态类消息（执行状态、步骤进度等）在房间内按短窗口合并，窗口内同一键只保留最后一条
+"""
+import asyncio
+import itertools
+import json
+from collections import deque, OrderedDict
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Optional, Set, Tuple, Union
+
+from fastapi import WebSocket
+import structlog
+
+from ..monitoring import track_websocket_dropped_frames, register_websocket_queue_depth
+
+logger = structlog.get_logger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# 可按房间合并的消息类型 -> 区分同类消息的字段
+COALESCE_FIELDS = {
+    "execution_update": ("execution_id",),
+    "execution_status": ("execution_id",),
+    "step_progress": ("execution_id", "step_id"),
+    "pipeline_status_update": ("pipeline_id",),
+    "system_metrics": (),
+}
+
+Message = Union[str, Dict[str, Any]]
+# 失步连接改发的完整快照，在分发时生成
+Snapshot = Callable[[], Iterable[Message]]
+
+
+def serialize_message(message: Message) -> str:
+    if isinstance(message, str):
+        return message
+    return json.dumps(message, ensure_ascii=False, default=str)
+
+
+def coalesce_key(message: Message) -> Optional[tuple]:
+    """
+    字典消息按类型推导合并键；不可合并的消息（日志、只含变化字段的增量消息等）返回 None
+    """
+    if not isinstance(message, dict) or message.get("delta"):
+        return None
+    message_type = message.get("type")
+    fields = COALESCE_FIELDS.get(message_type)
+    if fields is None:
+        return None
+    return (message_type,) + tuple(message.get(field) for field in fields)
+
+
+class ConnectionSender:
+    """单个连接的发送队列与写入任务"""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, policy: str,
+                 send_timeout: float, on_dead: Callable[[WebSocket], None]):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_dead = on_dead
+        # (帧, resync_key)；resync_key 为空的帧丢弃后不需要补发
+        self.queue: Deque[Tuple[str, Optional[Hashable]]] = deque()
+        self.stale: Set[Hashable] = set()
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, frame: str, resync_key: Optional[Hashable] = None) -> bool:
+        if self.closed:
+            return False
+        if len(self.queue) >= self.max_queue:
+            if self.policy == DISCONNECT:
+                track_websocket_dropped_frames("slow_consumer_disconnect", len(self.queue) + 1)
+                logger.warning("Disconnecting slow WebSocket consumer", queued=len(self.queue))
+                self._fail(close_code=1013)
+                return False
+            _, dropped_key = self.queue.popleft()
+            if dropped_key is not None:
+                self.stale.add(dropped_key)
+            track_websocket_dropped_frames("queue_full")
+        self.queue.append((frame, resync_key))
+        self._ready.set()
+        return True
+
+    async def _run(self):
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                frame, _ = self.queue.popleft()
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(frame), timeout=self.send_timeout)
+                except asyncio.TimeoutError:
+                    track_websocket_dropped_frames("send_timeout", len(self.queue) + 1)
+                    logger.warning("WebSocket send timed out, disconnecting", timeout=self.send_timeout)
+                    self._fail(close_code=1013)
+                except Exception as e:
+                    track_websocket_dropped_frames("send_error", len(self.queue) + 1)
+                    logger.info("WebSocket send failed, disconnecting", error=str(e), error_type=type(e).__name__)
+                    self._fail()
+        except asyncio.CancelledError:
+            pass
+
+    def _fail(self, close_code: Optional[int] = None):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self._ready.set()
+        if close_code is not None:
+            asyncio.create_task(self._close_socket(close_code))
+        self.on_dead(self.websocket)
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def stop(self):
+        self.closed = True
+        self.queue.clear()
+        self._ready.set()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+
+
+class _RoomBuffer:
+    """房间内等待合并窗口结束的消息，保持到达顺序；同键消息移到末尾并替换为最新内容"""
+
+    def __init__(self):
+        # 键 -> (消息, resync_key, 快照)
+        self.messages: "OrderedDict[Hashable, Tuple[Message, Optional[Hashable], Optional[Snapshot]]]" = OrderedDict()
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+
+class WebSocketFanout:
+    """按连接排队、按房间合并的广播分发器"""
+
+    def __init__(self, name: str, max_queue: int = 256, slow_consumer_policy: str = DROP_OLDEST,
+                 send_timeout: float = 10.0, coalesce_window: float = 0.05,
+                 on_dead: Optional[Callable[[WebSocket], None]] = None):
+        if slow_consumer_policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"Unsupported slow consumer policy: {slow_consumer_policy}")
+        self.max_queue = max_queue
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.coalesce_window = coalesce_window
+        self.on_dead = on_dead
+        self._senders: Dict[WebSocket, ConnectionSender] = {}
+        self._rooms: Dict[str, _RoomBuffer] = {}
+        self._sequence = itertools.count()
+        self._stats = {"published": 0, "coalesced": 0, "frames_enqueued": 0, "resync_snapshots": 0}
+        register_websocket_queue_depth(name, self.queued_frames)
+
+    def register(self, websocket: WebSocket):
+        if websocket not in self._senders:
+            self._senders[websocket] = ConnectionSender(
+                websocket, self.max_queue, self.slow_consumer_policy,
+                self.send_timeout, self._handle_dead
+            )
+
+    def unregister(self, websocket: WebSocket):
+        sender = self._senders.pop(websocket, None)
+        if sender is not None:
+            sender.stop()
+
+    def is_registered(self, websocket: WebSocket) -> bool:
+        sender = self._senders.get(websocket)
+        return sender is not None and not sender.closed
+
+    def _handle_dead(self, websocket: WebSocket):
+        self._senders.pop(websocket, None)
+        if self.on_dead is not None:
+            self.on_dead(websocket)
+
+    def send(self, websocket: WebSocket, message: Message) -> bool:
+        """发送给单个连接（按连接顺序排队，不合并）"""
+        sender = self._senders.get(websocket)
+        if sender is None:
+            return False
+        return self._enqueue(sender, serialize_message(message))
+
+    def publish(self, room: str, message: Message, connections: Callable[[], Iterable[WebSocket]],
+                key: Optional[Hashable] = None, resync_key: Optional[Hashable] = None,
+                snapshot: Optional[Snapshot] = None):
+        """
+        广播到房间
+
+        Args:
+            connections: 返回房间当前连接的函数，在真正分发时调用，合并窗口内新加入的连接也能收到
+            key: 合并键；为空时对字典消息按类型推导，仍为空则不合并
+            resync_key: 增量消息所属的状态；连接丢过同一 resync_key 的帧时改发 snapshot() 生成的完整消息
+        """
+        self._stats["published"] += 1
+        if key is None:
+            key = coalesce_key(message)
+
+        buffer = self._rooms.get(room)
+        if buffer is None:
+            if key is None or self.coalesce_window <= 0:
+                self._dispatch(serialize_message(message), connections(), resync_key, snapshot)
+                return
+            buffer = self._rooms[room] = _RoomBuffer()
+
+        if key is None:
+            # 不可合并的消息排在已缓冲消息之后，保证房间内顺序
+            key = ("_seq", next(self._sequence))
+        elif key in buffer.messages:
+            del buffer.messages[key]
+            self._stats["coalesced"] += 1
+        buffer.messages[key] = (message, resync_key, snapshot)
+
+        if buffer.flush_handle is None:
+            loop = asyncio.get_running_loop()
+            buffer.flush_handle = loop.call_later(self.coalesce_window, self._flush_room, room, connections)
+
+    def _flush_room(self, room: str, connections: Callable[[], Iterable[WebSocket]]):
+        buffer = self._rooms.pop(room, None)
+        if buffer is None:
+            return
+        targets = list(connections())
+        for message, resync_key, snapshot in buffer.messages.values():
+            self._dispatch(serialize_message(message), targets, resync_key, snapshot)
+
+    def _dispatch(self, frame: str, connections: Iterable[WebSocket],
+                  resync_key: Optional[Hashable] = None, snapshot: Optional[Snapshot] = None):
+        snapshot_frames = None
+        for websocket in list(connections):
+            sender = self._senders.get(websocket)
+            if sender is None:
+                continue
+            if resync_key is not None and resync_key in sender.stale and snapshot is not None:
+                # 该连接丢过增量帧，后续增量无法在客户端拼出正确状态，改发完整快照
+                if snapshot_frames is None:
+                    snapshot_frames = [serialize_message(message) for message in snapshot()]
+                    self._stats["resync_snapshots"] += 1
+                sender.stale.discard(resync_key)
+                for snapshot_frame in snapshot_frames:
+                    self._enqueue(sender, snapshot_frame, resync_key)
+                continue
+            self._enqueue(sender, frame, resync_key)
+
+    def _enqueue(self, sender: ConnectionSender, frame: str, resync_key: Optional[Hashable] = None) -> bool:
+        queued = sender.enqueue(frame, resync_key)
+        if queued:
+            self._stats["frames_enqueued"] += 1
+        return queued
+
+    async def close(self):
+        for buffer in self._rooms.values():
+            if buffer.flush_handle is not None:
+                buffer.flush_handle.cancel()
+        self._rooms.clear()
+        for sender in list(self._senders.values()):
+            sender.stop()
+        self._senders.clear()
+
+    def queued_frames(self) -> int:
+        return sum(len(sender.queue) for sender in self._senders.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        depths = [len(sender.queue) for sender in self._senders.values()]
+        return {
+            **self._stats,
+            "connections": len(self._senders),
+            "queued_frames": sum(depths),
+            "max_connection_queue": max(depths, default=0),
+            "stale_connections": sum(1 for sender in self._senders.values() if sender.stale),
+            "pending_rooms": len(self._rooms),
+            "slow_consumer_policy": self.slow_consumer_policy,
+        }
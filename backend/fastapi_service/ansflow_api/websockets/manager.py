@@ -5,13 +5,14 @@ WebSocket实时推送服务 - AnsFlow优化版本
 
 import json
 import asyncio
-from typing import Dict, List, Set, Optional, Any
+from typing import Dict, List, Set, Optional, Any, Callable, Iterable
 from datetime import datetime
 from fastapi import WebSocket, WebSocketDisconnect, Depends
 import structlog
 
 from ..core.redis import cache_service
 from ..dependencies import get_cache_service, get_database_service
+from .fanout import WebSocketFanout
 
 logger = structlog.get_logger(__name__)
 
@@ -29,10 +30,14 @@ class ConnectionManager:
         # 所有活跃连接
         self.active_connections: Set[WebSocket] = set()
         
+        # 每个连接独立的发送队列，广播只序列化一次，慢连接不阻塞其他连接
+        self.fanout = WebSocketFanout("manager", on_dead=self.disconnect)
+        
     async def connect(self, websocket: WebSocket, connection_type: str, resource_id: Optional[int] = None, user_id: Optional[int] = None):
         """建立WebSocket连接"""
         await websocket.accept()
         self.active_connections.add(websocket)
+        self.fanout.register(websocket)
         
         # 根据连接类型进行分类管理
         if connection_type == "pipeline" and resource_id:
@@ -60,6 +65,7 @@ class ConnectionManager:
         """断开WebSocket连接"""
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self.fanout.unregister(websocket)
         
         # 从各类连接集合中移除
         self._remove_from_pipeline_connections(websocket)
@@ -99,81 +105,61 @@ class ConnectionManager:
                     del self.user_connections[user_id]
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        """发送个人消息"""
-        try:
-            # Check if WebSocket is still connected before sending
-            if hasattr(websocket, 'client_state') and hasattr(websocket.client_state, 'name'):
-                if websocket.client_state.name != 'CONNECTED':
-                    logger.warning("Attempted to send message to disconnected WebSocket", 
-                                 state=websocket.client_state.name)
-                    self.disconnect(websocket)
-                    return False
-            
-            await websocket.send_text(message)
-            return True
-        except WebSocketDisconnect:
-            logger.info("WebSocket disconnected during message send")
-            self.disconnect(websocket)
-            return False
-        except RuntimeError as e:
-            if "WebSocket is disconnected" in str(e) or "close message has been sent" in str(e):
-                logger.info("WebSocket connection closed during message send", error=str(e))
+        """发送个人消息（进入该连接的发送队列后立即返回）"""
+        # Check if WebSocket is still connected before sending
+        if hasattr(websocket, 'client_state') and hasattr(websocket.client_state, 'name'):
+            if websocket.client_state.name != 'CONNECTED':
+                logger.warning("Attempted to send message to disconnected WebSocket", 
+                             state=websocket.client_state.name)
                 self.disconnect(websocket)
                 return False
-            else:
-                logger.error("Runtime error sending personal message", error=str(e))
-                return False
-        except Exception as e:
-            logger.error("Error sending personal message", error=str(e), error_type=type(e).__name__)
-            self.disconnect(websocket)
-            return False
+        
+        return self.fanout.send(websocket, message)
     
     async def broadcast_to_pipeline(self, message: Dict[str, Any], pipeline_id: int):
         """向特定Pipeline的所有连接广播消息"""
         if pipeline_id in self.pipeline_connections:
-            await self._broadcast_to_connections(
-                message, 
-                self.pipeline_connections[pipeline_id]
+            self._broadcast_to_connections(
+                f"pipeline_{pipeline_id}", message,
+                lambda: self.pipeline_connections.get(pipeline_id, ())
             )
     
     async def broadcast_to_execution(self, message: Dict[str, Any], execution_id: int):
         """向特定执行的所有连接广播消息"""
         if execution_id in self.execution_connections:
-            await self._broadcast_to_connections(
-                message, 
-                self.execution_connections[execution_id]
+            self._broadcast_to_connections(
+                f"execution_{execution_id}", message,
+                lambda: self.execution_connections.get(execution_id, ())
             )
     
     async def broadcast_to_system(self, message: Dict[str, Any]):
         """向系统监控连接广播消息"""
-        await self._broadcast_to_connections(message, self.system_connections)
+        if self.system_connections:
+            self._broadcast_to_connections("system", message, lambda: self.system_connections)
     
     async def broadcast_to_user(self, message: Dict[str, Any], user_id: int):
         """向特定用户的所有连接广播消息"""
         if user_id in self.user_connections:
-            await self._broadcast_to_connections(
-                message, 
-                self.user_connections[user_id]
+            self._broadcast_to_connections(
+                f"user_{user_id}", message,
+                lambda: self.user_connections.get(user_id, ())
             )
     
     async def broadcast_to_all(self, message: Dict[str, Any]):
         """向所有连接广播消息"""
-        await self._broadcast_to_connections(message, self.active_connections)
+        if self.active_connections:
+            self._broadcast_to_connections("all", message, lambda: self.active_connections)
     
-    async def _broadcast_to_connections(self, message: Dict[str, Any], connections: Set[WebSocket]):
-        """向连接集合广播消息"""
-        if not connections:
-            return
-        
-        message_str = json.dumps(message, ensure_ascii=False, default=str)
-        dead_connections = set()
-        
-        for connection in connections.copy():  # Use copy to avoid modification during iteration
-            success = await self.send_personal_message(message_str, connection)
-            if not success:
-                dead_connections.add(connection)
-        
-        # 清理失效连接已经在 send_personal_message 中处理
+    def _broadcast_to_connections(self, room: str, message: Dict[str, Any],
+                                  connections: Callable[[], Iterable[WebSocket]]):
+        """
+        向连接集合广播消息：消息只序列化一次，写入各连接的发送队列；
+        状态类消息在短窗口内按房间合并（见 fanout.COALESCE_FIELDS）
+        """
+        self.fanout.publish(room, message, connections)
+    
+    async def close(self):
+        await self.fanout.close()
     
     def get_connection_stats(self) -> Dict[str, Any]:
         """获取连接统计信息"""
@@ -190,7 +176,8 @@ class ConnectionManager:
             "execution_details": {
                 execution_id: len(connections) 
                 for execution_id, connections in self.execution_connections.items()
-            }
+            },
+            "fanout": self.fanout.get_stats()
         }
 
 
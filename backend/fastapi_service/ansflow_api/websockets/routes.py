@@ -3,7 +3,7 @@ WebSocket routes for real-time communication
 """
 import asyncio
 import json
-from typing import Dict, Set
+from typing import Any, Dict, Set, Union
 from datetime import datetime, timedelta
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from fastapi.security import HTTPBearer
@@ -12,6 +12,8 @@ import structlog
 from ..auth.dependencies import get_current_user_ws
 from ..monitoring import track_websocket_connection, track_websocket_message
 from ..services.django_db import django_db_service
+from ..services.execution_events import ExecutionEventHub
+from .fanout import WebSocketFanout
 
 logger = structlog.get_logger(__name__)
 
@@ -25,10 +27,13 @@ class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         self.user_connections: Dict[str, Set[WebSocket]] = {}
+        # 每个连接独立的发送队列，广播只序列化一次，慢连接不阻塞房间内其他连接
+        self.fanout = WebSocketFanout("routes", on_dead=self._cleanup_disconnected_websocket)
     
     async def connect(self, websocket: WebSocket, room: str, user_id: str = None):
         """Accept a new WebSocket connection"""
         await websocket.accept()
+        self.fanout.register(websocket)
         
         # Add to room
         if room not in self.active_connections:
@@ -48,6 +53,8 @@ class ConnectionManager:
     
     def disconnect(self, websocket: WebSocket, room: str, user_id: str = None):
         """Remove a WebSocket connection"""
+        self.fanout.unregister(websocket)
+        
         # Remove from room
         if room in self.active_connections:
             self.active_connections[room].discard(websocket)
@@ -66,36 +73,24 @@ class ConnectionManager:
         logger.info("WebSocket disconnected", room=room, user_id=user_id)
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        """Send a message to a specific WebSocket connection"""
-        try:
-            # Check if WebSocket is still connected before sending
-            if hasattr(websocket, 'client_state') and hasattr(websocket.client_state, 'name'):
-                if websocket.client_state.name != 'CONNECTED':
-                    logger.warning("Attempted to send message to disconnected WebSocket", 
-                                 state=websocket.client_state.name)
-                    return False
-            
-            await websocket.send_text(message)
-            return True
-        except WebSocketDisconnect:
-            logger.info("WebSocket disconnected during message send")
-            self._cleanup_disconnected_websocket(websocket)
-            return False
-        except RuntimeError as e:
-            if "WebSocket is disconnected" in str(e) or "close message has been sent" in str(e):
-                logger.info("WebSocket connection closed during message send", error=str(e))
-                self._cleanup_disconnected_websocket(websocket)
-                return False
-            else:
-                logger.error("Runtime error sending personal message", error=str(e))
+        """
+        Send a message to a specific WebSocket connection
+        
+        消息进入该连接的发送队列后立即返回；连接已失效时返回 False
+        """
+        # Check if WebSocket is still connected before sending
+        if hasattr(websocket, 'client_state') and hasattr(websocket.client_state, 'name'):
+            if websocket.client_state.name != 'CONNECTED':
+                logger.warning("Attempted to send message to disconnected WebSocket", 
+                             state=websocket.client_state.name)
                 return False
-        except Exception as e:
-            logger.error("Failed to send personal message", error=str(e), error_type=type(e).__name__)
-            self._cleanup_disconnected_websocket(websocket)
-            return False
+        
+        return self.fanout.send(websocket, message)
     
     def _cleanup_disconnected_websocket(self, websocket: WebSocket):
         """Clean up a disconnected WebSocket from all connection sets"""
+        self.fanout.unregister(websocket)
+        
         # Remove from room connections
         for room in list(self.active_connections.keys()):
             if websocket in self.active_connections[room]:
@@ -110,57 +105,50 @@ class ConnectionManager:
                 if not self.user_connections[user_id]:
                     del self.user_connections[user_id]
     
-    async def send_to_room(self, message: str, room: str):
-        """Send a message to all connections in a room"""
+    async def send_to_room(self, message: Union[str, Dict[str, Any]], room: str, coalesce_key=None,
+                           resync_key=None, snapshot=None):
+        """
+        Send a message to all connections in a room
+        
+        状态类消息在短窗口内按 coalesce_key（字典消息可自动推导）合并，只发送最新的一条；
+        丢过 resync_key 增量帧的连接改为收到 snapshot() 生成的完整消息
+        """
         if room in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[room].copy():  # Use copy to avoid modification during iteration
-                success = await self.send_personal_message(message, connection)
-                if not success:
-                    disconnected.add(connection)
-            
-            # Remove disconnected connections
-            for connection in disconnected:
-                self.active_connections[room].discard(connection)
-                
-            # Clean up empty room
-            if not self.active_connections[room]:
-                del self.active_connections[room]
+            self.fanout.publish(
+                room, message, lambda: self.active_connections.get(room, ()), key=coalesce_key,
+                resync_key=resync_key, snapshot=snapshot
+            )
     
-    async def send_to_user(self, message: str, user_id: str):
+    async def send_to_user(self, message: Union[str, Dict[str, Any]], user_id: str):
         """Send a message to all connections of a specific user"""
         if user_id in self.user_connections:
-            disconnected = set()
-            for connection in self.user_connections[user_id].copy():  # Use copy to avoid modification during iteration
-                success = await self.send_personal_message(message, connection)
-                if not success:
-                    disconnected.add(connection)
-            
-            # Remove disconnected connections
-            for connection in disconnected:
-                self.user_connections[user_id].discard(connection)
-                
-            # Clean up empty user connection set
-            if not self.user_connections[user_id]:
-                del self.user_connections[user_id]
+            self.fanout.publish(
+                f"user:{user_id}", message, lambda: self.user_connections.get(user_id, ())
+            )
     
-    async def broadcast(self, message: str):
+    async def broadcast(self, message: Union[str, Dict[str, Any]]):
         """Broadcast a message to all active connections"""
-        disconnected = set()
-        for room_connections in self.active_connections.values():
-            for connection in room_connections.copy():  # Use copy to avoid modification during iteration
-                success = await self.send_personal_message(message, connection)
-                if not success:
-                    disconnected.add(connection)
-        
-        # Clean up disconnected connections from all rooms
-        for connection in disconnected:
-            self._cleanup_disconnected_websocket(connection)
+        self.fanout.publish(
+            "*", message, lambda: set().union(*self.active_connections.values())
+        )
+    
+    async def close(self):
+        await self.fanout.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rooms": len(self.active_connections),
+            "users": len(self.user_connections),
+            **self.fanout.get_stats(),
+        }
 
 
 # Global connection manager instance
 manager = ConnectionManager()
 
+# 执行事件订阅中心：按执行订阅 Redis 频道并转发到对应房间
+execution_event_hub = ExecutionEventHub(manager.send_to_room)
+
 
 @websocket_router.websocket("/pipeline/{pipeline_id}")
 async def websocket_pipeline_updates(
@@ -441,11 +429,15 @@ async def websocket_global_monitor(
 async def websocket_execution_updates(
     websocket: WebSocket,
     execution_id: str,
-    token: str = None
+    token: str = None,
+    patch: bool = False
 ):
     """
     WebSocket endpoint for real-time execution updates
     替代 Django Channels 的 execution WebSocket
+    
+    连接时和 get_status 时发送完整快照，之后的 step_progress 只包含变化的字段（delta=true）；
+    patch=true 时增量消息额外附带 JSON Patch 形式的 patch 数组
     """
     user = None
     user_id = None
@@ -460,6 +452,7 @@ async def websocket_execution_updates(
     
     room = f"execution_{execution_id}"
     await manager.connect(websocket, room, user_id)
+    subscribed = False
     
     try:
         # Send initial connection message
@@ -496,83 +489,27 @@ async def websocket_execution_updates(
                 websocket
             )
         
-        # Start real-time monitoring loop
-        last_log_count = 0  # 跟踪已推送的日志数量
-        
-        async def monitoring_loop():
-            nonlocal last_log_count
-            
-            while True:
-                try:
-                    # 获取最新执行状态
-                    current_execution = await get_execution_with_steps(int(execution_id))
-                    if current_execution:
-                        # 推送执行状态更新
-                        await manager.send_personal_message(
-                            json.dumps({
-                                "type": "execution_update",
-                                "execution_id": int(execution_id),
-                                "status": current_execution.get("status"),
-                                "pipeline_name": current_execution.get("pipeline_name"),
-                                "steps": current_execution.get("steps", []),
-                                "total_steps": len(current_execution.get("steps", [])),
-                                "completed_steps": sum(1 for s in current_execution.get("steps", []) if s.get("status") in ["success", "failed"]),
-                                "execution_time": current_execution.get("execution_time", 0),
-                                "timestamp": datetime.utcnow().isoformat()
-                            }),
-                            websocket
-                        )
-                        
-                        # 推送每个步骤的状态更新
-                        for step in current_execution.get("steps", []):
-                            await manager.send_personal_message(
-                                json.dumps({
-                                    "type": "step_progress",
-                                    "execution_id": int(execution_id),
-                                    "step_id": step.get("id"),
-                                    "step_name": step.get("name"),
-                                    "status": step.get("status"),
-                                    "execution_time": step.get("execution_time"),
-                                    "output": step.get("output"),
-                                    "error_message": step.get("error_message"),
-                                    "timestamp": datetime.utcnow().isoformat()
-                                }),
-                                websocket
-                            )
-                        
-                        # 获取新增的日志（从last_log_count开始）
-                        new_logs = await get_execution_logs(int(execution_id), last_log_count)
-                        
-                        for log in new_logs:
-                            await manager.send_personal_message(
-                                json.dumps({
-                                    "type": "log_entry",
-                                    "execution_id": int(execution_id),
-                                    "timestamp": log.get("timestamp", datetime.utcnow().isoformat()),
-                                    "level": log.get("level", "info"),
-                                    "message": log.get("message", ""),
-                                    "step_name": log.get("step_name"),
-                                    "source": log.get("source", "system")
-                                }),
-                                websocket
-                            )
-                        
-                        # 更新已推送的日志数量
-                        last_log_count += len(new_logs)
-                        
-                        # 如果执行完成，停止监控
-                        if current_execution.get("status") in ["success", "failed", "cancelled"]:
-                            break
-                    
-                    # 每500ms检查一次，保证实时性
-                    await asyncio.sleep(0.5)
-                    
-                except Exception as e:
-                    logger.error("Error in monitoring loop", error=str(e))
-                    break
+        # 发送已有日志，之后的状态和日志变化由执行事件订阅中心推送
+        history = await django_db_service.get_execution_logs_since(int(execution_id), limit=None)
+        for log in history["logs"]:
+            await manager.send_personal_message(
+                json.dumps({
+                    "type": "log_entry",
+                    "execution_id": int(execution_id),
+                    "timestamp": log.get("timestamp", datetime.utcnow().isoformat()),
+                    "level": log.get("level", "info"),
+                    "message": log.get("message", ""),
+                    "step_name": log.get("step_name"),
+                    "source": log.get("source", "system")
+                }),
+                websocket
+            )
         
-        # 启动监控任务
-        monitoring_task = asyncio.create_task(monitoring_loop())
+        # 每个执行只订阅一次 Redis 频道，房间内所有连接共享
+        execution_event_hub.subscribe(
+            int(execution_id), snapshot=execution_data, log_cursor=history["cursor"], patch=patch
+        )
+        subscribed = True
         
         while True:
             # Wait for messages from client
@@ -610,6 +547,7 @@ async def websocket_execution_updates(
                     # 立即发送当前状态
                     current_execution = await get_execution_with_steps(int(execution_id))
                     if current_execution:
+                        execution_event_hub.rebase(int(execution_id), current_execution)
                         await manager.send_personal_message(
                             json.dumps({
                                 "type": "execution_status",
@@ -630,17 +568,14 @@ async def websocket_execution_updates(
                 )
                 
     except WebSocketDisconnect:
-        # 取消监控任务
-        if 'monitoring_task' in locals():
-            monitoring_task.cancel()
         manager.disconnect(websocket, room, user_id)
         logger.info("Execution WebSocket disconnected", execution_id=execution_id, user_id=user_id)
     except Exception as e:
-        # 取消监控任务
-        if 'monitoring_task' in locals():
-            monitoring_task.cancel()
         logger.error("Execution WebSocket error", error=str(e), execution_id=execution_id, user_id=user_id)
         manager.disconnect(websocket, room, user_id)
+    finally:
+        if subscribed:
+            execution_event_hub.unsubscribe(int(execution_id), patch=patch)
 
 
 async def get_execution_with_steps(execution_id: int):
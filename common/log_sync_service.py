@@ -9,6 +9,7 @@ import json
 import logging
 import sys
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from pathlib import Path
@@ -34,7 +35,13 @@ class LogSyncService:
         self.logger = logging.getLogger(__name__)
         self.last_sync_id = '$'  # 从最新开始
         self.sync_interval = 30  # 30秒同步一次
-        self.batch_size = 100    # 每批处理100条
+        
+        # 自适应批大小：积压时逐步增大，单批写入过慢时减小
+        self.min_batch_size = 100
+        self.max_batch_size = 5000
+        self.batch_size = self.min_batch_size
+        self.target_batch_seconds = 1.0  # 单批写入的目标耗时
+        self.has_backlog = False  # 上一批读满，说明Stream中还有积压
         
     async def initialize(self):
         """初始化服务"""
@@ -71,25 +78,30 @@ class LogSyncService:
         except Exception as e:
             self.logger.error(f"加载同步位置失败: {e}")
             
-    async def _save_sync_position(self, stream_id: str):
-        """保存同步位置"""
+    async def _save_sync_position(self, stream_id: str, cursor=None):
+        """保存同步位置；传入 cursor 时在调用方的事务中执行，由调用方提交"""
+        sql = """
+            INSERT INTO log_sync_position (service_name, redis_stream_id, updated_at)
+            VALUES ('log_sync_service', %s, NOW())
+            ON DUPLICATE KEY UPDATE 
+            redis_stream_id = VALUES(redis_stream_id),
+            updated_at = VALUES(updated_at)
+        """
+        if cursor is not None:
+            await cursor.execute(sql, (stream_id,))
+            return
+        
         try:
             async with self.connector.mysql_pool.acquire() as conn:
                 async with conn.cursor() as cursor:
-                    await cursor.execute("""
-                        INSERT INTO log_sync_position (service_name, redis_stream_id, updated_at)
-                        VALUES ('log_sync_service', %s, NOW())
-                        ON DUPLICATE KEY UPDATE 
-                        redis_stream_id = VALUES(redis_stream_id),
-                        updated_at = VALUES(updated_at)
-                    """, (stream_id,))
+                    await cursor.execute(sql, (stream_id,))
                     await conn.commit()
                     
         except Exception as e:
             self.logger.error(f"保存同步位置失败: {e}")
             
     async def sync_logs_to_mysql(self):
-        """将Redis Stream中的日志同步到MySQL"""
+        """将Redis Stream中的日志按批同步到MySQL"""
         try:
             # 从Redis Stream读取新日志
             messages = await self.connector.redis_client.xread(
@@ -99,13 +111,17 @@ class LogSyncService:
             )
             
             if not messages:
+                self.has_backlog = False
                 return 0
                 
-            synced_count = 0
+            rows = []
+            read_count = 0
             last_message_id = None
             
             for stream_name, stream_messages in messages:
                 for message_id, fields in stream_messages:
+                    read_count += 1
+                    last_message_id = message_id
                     try:
                         # 解析日志条目
                         log_entry = LogEntry(
@@ -120,66 +136,82 @@ class LogSyncService:
                             trace_id=fields.get('trace_id'),
                             extra_data=json.loads(fields['extra_data']) if fields.get('extra_data') else None
                         )
-                        
-                        # 存储到MySQL（检查是否已存在）
-                        await self._store_log_if_not_exists(log_entry)
-                        
-                        synced_count += 1
-                        last_message_id = message_id
+                        rows.append(self._to_row(log_entry))
                         
                     except Exception as e:
-                        self.logger.error(f"同步单条日志失败 {message_id}: {e}")
+                        # 无法解析的日志跳过，同步位置照常推进
+                        self.logger.error(f"解析日志失败 {message_id}: {e}")
                         continue
             
-            # 更新同步位置
-            if last_message_id:
-                self.last_sync_id = last_message_id
-                await self._save_sync_position(last_message_id)
+            started = time.monotonic()
+            await self._store_batch(rows, last_message_id)
+            elapsed = time.monotonic() - started
+            
+            # 批量写入与同步位置在同一事务中提交后才推进内存中的位置
+            self.last_sync_id = last_message_id
+            self._adjust_batch_size(read_count, elapsed)
                 
-            if synced_count > 0:
-                self.logger.info(f"同步 {synced_count} 条日志到MySQL")
+            if rows:
+                self.logger.info(f"同步 {len(rows)} 条日志到MySQL（批大小 {self.batch_size}，耗时 {elapsed:.2f}s）")
                 
-            return synced_count
+            return len(rows)
             
         except Exception as e:
+            # 写入失败时按无积压处理，由同步循环等待一个同步间隔后重试，避免空转重试；同时减小批大小降低重试压力
+            self.has_backlog = False
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
             self.logger.error(f"同步日志到MySQL失败: {e}")
             return 0
+    
+    @staticmethod
+    def _to_row(log_entry: LogEntry) -> tuple:
+        return (
+            log_entry.id,
+            log_entry.timestamp,
+            log_entry.level,
+            log_entry.service,
+            log_entry.component,
+            log_entry.module,
+            log_entry.message,
+            log_entry.execution_id,
+            log_entry.trace_id,
+            json.dumps(log_entry.extra_data) if log_entry.extra_data else None
+        )
             
-    async def _store_log_if_not_exists(self, log_entry: LogEntry):
-        """存储日志到MySQL（如果不存在）"""
-        try:
-            async with self.connector.mysql_pool.acquire() as conn:
+    async def _store_batch(self, rows: List[tuple], last_message_id: str):
+        """
+        批量写入日志并保存同步位置，一个事务一次提交
+        INSERT IGNORE 依赖 log_id 唯一键去重，重复同步同一批日志是幂等的
+        """
+        async with self.connector.mysql_pool.acquire() as conn:
+            try:
                 async with conn.cursor() as cursor:
-                    # 检查是否已存在
-                    await cursor.execute(
-                        "SELECT 1 FROM unified_logs WHERE log_id = %s",
-                        (log_entry.id,)
-                    )
-                    
-                    if not await cursor.fetchone():
-                        # 插入新记录
-                        await cursor.execute("""
-                            INSERT INTO unified_logs (
+                    if rows:
+                        # aiomysql 会把 executemany 合并为一条多行 INSERT
+                        await cursor.executemany("""
+                            INSERT IGNORE INTO unified_logs (
                                 log_id, timestamp, level, service, component, module,
                                 message, execution_id, trace_id, extra_data
                             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """, (
-                            log_entry.id,
-                            log_entry.timestamp,
-                            log_entry.level,
-                            log_entry.service,
-                            log_entry.component,
-                            log_entry.module,
-                            log_entry.message,
-                            log_entry.execution_id,
-                            log_entry.trace_id,
-                            json.dumps(log_entry.extra_data) if log_entry.extra_data else None
-                        ))
-                        await conn.commit()
-                        
-        except Exception as e:
-            self.logger.error(f"存储日志到MySQL失败: {e}")
-            raise
+                        """, rows)
+                    await self._save_sync_position(last_message_id, cursor=cursor)
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                self.logger.error(f"批量存储日志到MySQL失败: {e}")
+                raise
+    
+    def _adjust_batch_size(self, read_count: int, elapsed: float):
+        """根据积压情况和写入耗时调整批大小"""
+        self.has_backlog = read_count >= self.batch_size
+        
+        if elapsed > self.target_batch_seconds:
+            # 数据库写入跟不上，减小批大小降低单次事务压力
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif self.has_backlog:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+        elif read_count < self.batch_size // 4:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
             
     async def cleanup_old_logs(self, days: int = 30):
         """清理超过指定天数的旧日志"""
@@ -214,18 +246,22 @@ class LogSyncService:
     async def run_sync_loop(self):
         """运行同步循环"""
         self.logger.info("日志同步服务启动")
+        last_cleanup_hour = None
         
         while True:
             try:
                 # 同步日志
                 synced = await self.sync_logs_to_mysql()
                 
-                # 每小时清理一次旧日志
-                if datetime.now().minute == 0:
+                # 每小时清理一次旧日志（积压时循环不休眠，按小时去重）
+                now = datetime.now()
+                if now.minute == 0 and last_cleanup_hour != now.replace(minute=0, second=0, microsecond=0):
+                    last_cleanup_hour = now.replace(minute=0, second=0, microsecond=0)
                     await self.cleanup_old_logs()
                     
-                # 等待下次同步
-                await asyncio.sleep(self.sync_interval)
+                # 有积压时立即读取下一批，否则等待下次同步
+                if not self.has_backlog:
+                    await asyncio.sleep(self.sync_interval)
                 
             except KeyboardInterrupt:
                 self.logger.info("收到停止信号，正在关闭...")
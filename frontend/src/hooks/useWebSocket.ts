@@ -106,15 +106,22 @@ export function useWebSocket(executionId: number | null) {
       })
 
       ws.onStepUpdate((data: StepUpdateMessage) => {
-        setStepStates(prev => new Map(prev.set(data.step_id || 0, {
-          stepId: data.step_id || 0,
-          stepName: data.step_name,
-          status: data.status,
-          executionTime: data.execution_time,
-          output: data.output,
-          errorMessage: data.error_message,
-          lastUpdated: data.timestamp
-        })))
+        setStepStates(prev => {
+          const stepId = data.step_id || 0
+          const current = prev.get(stepId)
+          // 增量消息只包含变化的字段，未出现的字段沿用当前值
+          const pick = <K extends keyof StepUpdateMessage>(key: K, fallback: any) =>
+            data.delta && !(key in data) ? fallback : data[key]
+          return new Map(prev.set(stepId, {
+            stepId,
+            stepName: pick('step_name', current?.stepName),
+            status: pick('status', current?.status),
+            executionTime: pick('execution_time', current?.executionTime),
+            output: pick('output', current?.output),
+            errorMessage: pick('error_message', current?.errorMessage),
+            lastUpdated: data.timestamp
+          }))
+        })
       })
 
       ws.onLogUpdate((data: LogUpdateMessage) => {
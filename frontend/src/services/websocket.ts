@@ -33,6 +33,8 @@ type StepUpdateMessage = {
   output?: string
   error_message?: string
   message?: string
+  // 为 true 时只包含变化的字段
+  delta?: boolean
 }
 
 // 日志更新消息